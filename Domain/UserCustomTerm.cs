@@ -30,6 +30,11 @@ public class UserCommunicationPattern
     public DateTime UpdatedAt { get; set; } = DateTime.UtcNow;
 }
 
+// Usos acumulados en LearningWriteBuffer que todavía no llegaron a la base
+public record UserTermIncrement(long ChatId, string UserTerm, string StandardTerm, string TermType, int Hits, decimal InitialConfidence);
+
+public record UserPatternIncrement(long ChatId, string PatternType, string PatternValue, int Hits);
+
 // Enums para tipos
 public static class TermTypes
 {
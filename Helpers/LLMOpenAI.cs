@@ -25,8 +25,6 @@ namespace RegistroCx.Helpers
         private static readonly string apiKey = Environment.GetEnvironmentVariable("OPENAI_API_KEY") 
     ?? throw new InvalidOperationException("OPENAI_API_KEY environment variable is not set");
 
-        private const string ChatEndpoint = "https://api.openai.com/v1/chat/completions";
-
         private const string PROMPT_TEMPLATE = @"
         Eres un extractor de datos para agendas de cirugías.
         Recibes un texto de entrada y devuelves un JSON con estas claves:
@@ -61,7 +59,7 @@ namespace RegistroCx.Helpers
                 top_p = 0.9
             };
 
-            using var request = new HttpRequestMessage(HttpMethod.Post, ChatEndpoint)
+            using var request = new HttpRequestMessage(HttpMethod.Post, RegistroCx.Helpers.OpenAI.OpenAIEndpoints.ChatCompletions)
             {
                 Content = new StringContent(System.Text.Json.JsonSerializer.Serialize(requestPayload), Encoding.UTF8, "application/json")
             };
@@ -73,7 +73,7 @@ public class AssistantExtractorClient
     private async Task<JsonElement> PostJsonAsync(string path, object payload)
     {
         var json = JsonSerializer.Serialize(payload);
-        var req = new HttpRequestMessage(HttpMethod.Post, "https://api.openai.com" + path)
+        var req = new HttpRequestMessage(HttpMethod.Post, OpenAIEndpoints.BaseUrl + path)
         {
             Content = new StringContent(json, Encoding.UTF8, "application/json")
         };
@@ -86,7 +86,7 @@ public class AssistantExtractorClient
 
     private async Task<JsonElement> GetJsonAsync(string path)
     {
-        var resp = await _http.GetAsync("https://api.openai.com" + path);
+        var resp = await _http.GetAsync(OpenAIEndpoints.BaseUrl + path);
         var body = await resp.Content.ReadAsStringAsync();
         if (!resp.IsSuccessStatusCode)
             throw new Exception($"Error {resp.StatusCode}: {body}");
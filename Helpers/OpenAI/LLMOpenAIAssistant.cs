@@ -173,7 +173,7 @@ public class LLMOpenAIAssistant
     private async Task<JsonElement> PostJsonAsync(string path, object payload)
     {
         var json = JsonSerializer.Serialize(payload);
-        using var req = new HttpRequestMessage(HttpMethod.Post, "https://api.openai.com" + path);
+        using var req = new HttpRequestMessage(HttpMethod.Post, OpenAIEndpoints.BaseUrl + path);
         req.Content = new StringContent(json, Encoding.UTF8, "application/json");
         var resp = await _http.SendAsync(req);
         var body = await resp.Content.ReadAsStringAsync();
@@ -184,7 +184,7 @@ public class LLMOpenAIAssistant
 
     private async Task<JsonElement> GetJsonAsync(string path)
     {
-        using var req = new HttpRequestMessage(HttpMethod.Get, "https://api.openai.com" + path);
+        using var req = new HttpRequestMessage(HttpMethod.Get, OpenAIEndpoints.BaseUrl + path);
         var resp = await _http.SendAsync(req);
         var body = await resp.Content.ReadAsStringAsync();
         if (!resp.IsSuccessStatusCode)
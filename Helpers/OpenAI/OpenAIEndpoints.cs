@@ -0,0 +1,20 @@
+using System;
+
+namespace RegistroCx.Helpers.OpenAI;
+
+public static class OpenAIEndpoints
+{
+    public const string DefaultBaseUrl = "https://api.openai.com";
+
+    /// <summary>
+    /// URL base de la API de OpenAI. OPENAI_BASE_URL permite apuntar a fake_openai_api.py para testing offline.
+    /// </summary>
+    public static string BaseUrl =>
+        (Environment.GetEnvironmentVariable("OPENAI_BASE_URL") ?? DefaultBaseUrl).TrimEnd('/');
+
+    public static string Responses => BaseUrl + "/v1/responses";
+
+    public static string Transcriptions => BaseUrl + "/v1/audio/transcriptions";
+
+    public static string ChatCompletions => BaseUrl + "/v1/chat/completions";
+}
@@ -0,0 +1,22 @@
+using System.Globalization;
+using System.Text;
+
+namespace RegistroCx.Helpers;
+
+public static class TextoHelper
+{
+    /// <summary>
+    /// Minúsculas y sin acentos ("Mañana Clínica" -> "manana clinica") para comparar texto del usuario.
+    /// </summary>
+    public static string Normalizar(string texto)
+    {
+        var descompuesto = texto.ToLowerInvariant().Normalize(NormalizationForm.FormD);
+        var sb = new StringBuilder(descompuesto.Length);
+        foreach (var c in descompuesto)
+        {
+            if (CharUnicodeInfo.GetUnicodeCategory(c) != UnicodeCategory.NonSpacingMark)
+                sb.Append(c);
+        }
+        return sb.ToString().Normalize(NormalizationForm.FormC);
+    }
+}
@@ -5,6 +5,14 @@ public class TelegramBotOptions
 {
     public string Token { get; set; } = string.Empty;
     public string Environment { get; set; } = "Production";
+    public string? ApiBaseUrl { get; set; } // null = api.telegram.org; permite apuntar a fake_telegram_api.py
+    public string UpdateMode { get; set; } = "polling"; // "polling" o "webhook"
+    public string? WebhookUrl { get; set; } // URL pública que Telegram llama, terminada en /telegram/webhook
+    public string? WebhookSecret { get; set; } // Se valida contra X-Telegram-Bot-Api-Secret-Token
+    public int UpdateWorkers { get; set; } = 8; // Chats procesados en paralelo
+    public int UpdateQueueCapacity { get; set; } = 5000; // Updates pendientes antes de rechazar (webhook) o frenar (polling)
+
+    public bool UseWebhook => string.Equals(UpdateMode, "webhook", StringComparison.OrdinalIgnoreCase);
 }
 
 public class OpenAIOptions
@@ -0,0 +1,29 @@
+using System;
+using System.Diagnostics;
+using Microsoft.AspNetCore.Mvc;
+using RegistroCx.Services;
+using Telegram.Bot;
+
+namespace RegistroCx.ProgramServices.Endpoints;
+
+public static class CalendarEndpoints
+{
+    public static void MapCalendarEndpoints(this WebApplication app)
+    {
+        // Solo en Development: dispara el mismo sync que el callback de OAuth
+        // (calendar_sync_benchmark.py bench). Sin autenticación.
+        if (!app.Environment.IsDevelopment())
+            return;
+
+        app.MapPost("/calendar/sync", async (
+            [FromServices] CalendarSyncService calendarSync,
+            [FromServices] TelegramBotClient botClient,
+            long chatId,
+            CancellationToken ct) =>
+        {
+            var stopwatch = Stopwatch.StartNew();
+            var synced = await calendarSync.SyncPendingAppointmentsAsync(botClient, chatId, ct);
+            return Results.Json(new { chatId, synced, elapsedMs = stopwatch.Elapsed.TotalMilliseconds });
+        });
+    }
+}
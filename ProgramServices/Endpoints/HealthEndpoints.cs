@@ -1,4 +1,10 @@
 using System;
+using System.Collections.Concurrent;
+using System.Diagnostics;
+using Microsoft.AspNetCore.Mvc;
+using Microsoft.Extensions.Caching.Memory;
+using RegistroCx.Services.Reports;
+using RegistroCx.Services.UI;
 using Telegram.Bot;
 
 namespace RegistroCx.ProgramServices.Endpoints;
@@ -27,5 +33,54 @@ public static class HealthEndpoints
                 return Results.Problem($"Bot unhealthy: {ex.Message}");
             }
         });
+
+        // Memoria del proceso y tamaño del estado en memoria, para soak tests (soak_test_bot.py).
+        // Con ?collect=true fuerza un GC completo antes de medir: así se ve lo retenido, no la basura pendiente.
+        app.MapGet("/health/memory", (
+            [FromServices] IMemoryCache cache,
+            [FromServices] ConcurrentDictionary<long, RegistroCx.Models.Appointment> pendingAppointments,
+            [FromServices] ConcurrentDictionary<long, ReportService.ReportCommandState> reportCommandStates,
+            bool? collect) =>
+        {
+            if (collect == true)
+            {
+                GC.Collect();
+                GC.WaitForPendingFinalizers();
+                GC.Collect();
+            }
+
+            using var process = Process.GetCurrentProcess();
+            var gcInfo = GC.GetGCMemoryInfo();
+
+            return Results.Json(new
+            {
+                timestamp = DateTime.UtcNow,
+                uptimeSeconds = (DateTime.Now - process.StartTime).TotalSeconds,
+                process = new
+                {
+                    workingSetBytes = process.WorkingSet64,
+                    privateBytes = process.PrivateMemorySize64,
+                    threads = process.Threads.Count,
+                    handles = process.HandleCount
+                },
+                gc = new
+                {
+                    totalMemoryBytes = GC.GetTotalMemory(false),
+                    heapSizeBytes = gcInfo.HeapSizeBytes,
+                    fragmentedBytes = gcInfo.FragmentedBytes,
+                    gen0Collections = GC.CollectionCount(0),
+                    gen1Collections = GC.CollectionCount(1),
+                    gen2Collections = GC.CollectionCount(2),
+                    pauseTimePercentage = gcInfo.PauseTimePercentage
+                },
+                state = new
+                {
+                    pendingAppointments = pendingAppointments.Count,
+                    reportCommandStates = reportCommandStates.Count,
+                    quickEditPendingEdits = QuickEditService.PendingEditCount,
+                    memoryCacheEntries = (cache as MemoryCache)?.Count ?? -1
+                }
+            });
+        });
     }
 }
@@ -0,0 +1,12 @@
+using RegistroCx.Services.Analytics;
+
+namespace RegistroCx.ProgramServices.Endpoints;
+
+public static class MetricsEndpoints
+{
+    public static void MapMetricsEndpoints(this WebApplication app)
+    {
+        // Formato de texto Prometheus: lo puede scrapear Prometheus o el harness (load_test_bot.py --metrics-url)
+        app.MapGet("/metrics", () => Results.Text(BotMetrics.RenderPrometheus(), "text/plain; version=0.0.4"));
+    }
+}
@@ -0,0 +1,42 @@
+using System;
+using System.Diagnostics;
+using System.Linq;
+using Microsoft.AspNetCore.Mvc;
+using RegistroCx.Domain;
+using RegistroCx.Services;
+
+namespace RegistroCx.ProgramServices.Endpoints;
+
+public static class NameIndexEndpoints
+{
+    public static void MapNameIndexEndpoints(this WebApplication app)
+    {
+        // Solo en Development: la misma búsqueda que hace el wizard de anestesiólogos, con el tiempo
+        // medido del lado del servidor (name_index_benchmark.py). Sin autenticación.
+        if (!app.Environment.IsDevelopment())
+            return;
+
+        app.MapGet("/names/search", async (
+            [FromServices] NameLookupService nameLookup,
+            string kind,
+            string q,
+            long chatId,
+            CancellationToken ct) =>
+        {
+            if (kind is not (TermTypes.Anesthesiologist or TermTypes.Surgeon or TermTypes.Place))
+                return Results.BadRequest(new { error = $"kind debe ser {TermTypes.Anesthesiologist}, {TermTypes.Surgeon} o {TermTypes.Place}" });
+
+            var stopwatch = Stopwatch.StartNew();
+            var matches = await nameLookup.SearchAsync(kind, q, chatId, ct);
+            var elapsedUs = stopwatch.Elapsed.TotalMilliseconds * 1000;
+
+            return Results.Json(new
+            {
+                kind,
+                query = q,
+                elapsedUs,
+                matches = matches.Select(m => new { name = m.Name, email = m.Email, score = m.Score, exact = m.Exact })
+            });
+        });
+    }
+}
@@ -0,0 +1,51 @@
+using System;
+using System.Linq;
+using Microsoft.AspNetCore.Mvc;
+using RegistroCx.Models.ReportModels;
+using RegistroCx.Services.Reports;
+
+namespace RegistroCx.ProgramServices.Endpoints;
+
+public static class ReportEndpoints
+{
+    public static void MapReportEndpoints(this WebApplication app)
+    {
+        // Solo en Development: compara el reporte armado desde appointment_rollups con el scan de appointments
+        // (report_benchmark.py check --bot-url). Expone datos de reportes sin autenticación.
+        if (!app.Environment.IsDevelopment())
+            return;
+
+        app.MapGet("/reports/compare", async (
+            [FromServices] ReportDataService dataService,
+            long chatId,
+            string? type,
+            int? month,
+            int? year,
+            CancellationToken ct) =>
+        {
+            var lastMonth = DateTime.Today.AddMonths(-1);
+            var period = type?.ToLowerInvariant() switch
+            {
+                "anual" or "annual" => ReportPeriod.CreateAnnual(year ?? DateTime.Today.Year - 1),
+                _ => ReportPeriod.CreateMonthly(month ?? lastMonth.Month, year ?? lastMonth.Year)
+            };
+
+            var raw = ReportDataService.FlattenNumbers(await dataService.GenerateReportDataAsync(chatId, period, fromRollups: false, ct));
+            var rollups = ReportDataService.FlattenNumbers(await dataService.GenerateReportDataAsync(chatId, period, fromRollups: true, ct));
+
+            var differences = raw.Keys.Union(rollups.Keys)
+                .Where(key => raw.GetValueOrDefault(key) != rollups.GetValueOrDefault(key))
+                .Select(key => new { key, raw = raw.GetValueOrDefault(key), rollups = rollups.GetValueOrDefault(key) })
+                .ToList();
+
+            return Results.Json(new
+            {
+                chatId,
+                period = period.DisplayName,
+                keys = raw.Count,
+                matches = differences.Count == 0,
+                differences
+            });
+        });
+    }
+}
@@ -0,0 +1,59 @@
+using System;
+using System.Security.Cryptography;
+using System.Text;
+using System.Text.Json;
+using Microsoft.Extensions.Options;
+using RegistroCx.ProgramServices.Configuration;
+using RegistroCx.ProgramServices.Services.Telegram;
+using RegistroCx.Services.Analytics;
+using Telegram.Bot;
+using Telegram.Bot.Types;
+
+namespace RegistroCx.ProgramServices.Endpoints;
+
+public static class TelegramWebhookEndpoints
+{
+    public const string WebhookPath = "/telegram/webhook";
+
+    public static void MapTelegramWebhookEndpoints(this WebApplication app)
+    {
+        var options = app.Services.GetRequiredService<IOptions<TelegramBotOptions>>().Value;
+
+        // Solo con TELEGRAM_UPDATE_MODE=webhook: en polling nadie debería poder inyectar updates
+        if (!options.UseWebhook)
+            return;
+
+        var secret = string.IsNullOrWhiteSpace(options.WebhookSecret) ? null : Encoding.UTF8.GetBytes(options.WebhookSecret);
+
+        app.MapPost(WebhookPath, async (HttpRequest request, UpdateDispatcher dispatcher, ILogger<UpdateDispatcher> logger) =>
+        {
+            if (secret != null)
+            {
+                var header = Encoding.UTF8.GetBytes(request.Headers["X-Telegram-Bot-Api-Secret-Token"].ToString());
+                if (!CryptographicOperations.FixedTimeEquals(header, secret))
+                    return Results.Unauthorized();
+            }
+
+            Update? update;
+            try
+            {
+                update = await JsonSerializer.DeserializeAsync<Update>(request.Body, JsonBotAPI.Options, request.HttpContext.RequestAborted);
+            }
+            catch (JsonException ex)
+            {
+                logger.LogWarning("[WEBHOOK] Invalid update payload: {Message}", ex.Message);
+                return Results.BadRequest();
+            }
+
+            if (update == null)
+                return Results.BadRequest();
+
+            BotMetrics.Increment("webhook_received");
+
+            // Se responde apenas se encola: Telegram no espera al LLM. Con la cola llena, 503 y Telegram reintenta
+            return dispatcher.TryEnqueue(update)
+                ? Results.Ok()
+                : Results.StatusCode(StatusCodes.Status503ServiceUnavailable);
+        });
+    }
+}
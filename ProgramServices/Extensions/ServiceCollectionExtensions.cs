@@ -1,4 +1,7 @@
 using System;
+using System.Collections.Concurrent;
+using System.Globalization;
+using Npgsql;
 using RegistroCx.ProgramServices.Configuration;
 using RegistroCx.Services.Repositories;
 using RegistroCx.Services.Onboarding;
@@ -26,6 +29,14 @@ public static class ServiceCollectionExtensions
             options.Token = Environment.GetEnvironmentVariable("TELEGRAM_BOT_TOKEN") 
                 ?? throw new InvalidOperationException("Falta TELEGRAM_BOT_TOKEN");
             options.Environment = Environment.GetEnvironmentVariable("ASPNETCORE_ENVIRONMENT") ?? "Production";
+            options.ApiBaseUrl = Environment.GetEnvironmentVariable("TELEGRAM_API_URL");
+            options.UpdateMode = Environment.GetEnvironmentVariable("TELEGRAM_UPDATE_MODE") ?? "polling";
+            options.WebhookUrl = Environment.GetEnvironmentVariable("TELEGRAM_WEBHOOK_URL");
+            options.WebhookSecret = Environment.GetEnvironmentVariable("TELEGRAM_WEBHOOK_SECRET");
+            if (int.TryParse(Environment.GetEnvironmentVariable("TELEGRAM_UPDATE_WORKERS"), out var workers))
+                options.UpdateWorkers = workers;
+            if (int.TryParse(Environment.GetEnvironmentVariable("TELEGRAM_UPDATE_QUEUE_CAPACITY"), out var capacity))
+                options.UpdateQueueCapacity = capacity;
         });
 
         services.Configure<OpenAIOptions>(options =>
@@ -64,7 +75,7 @@ public static class ServiceCollectionExtensions
         {
             var options = provider.GetRequiredService<Microsoft.Extensions.Options.IOptions<TelegramBotOptions>>();
             var httpClient = provider.GetRequiredService<IHttpClientFactory>().CreateClient("telegram_bot_client");
-            return new TelegramBotClient(options.Value.Token, httpClient);
+            return new TelegramBotClient(new TelegramBotClientOptions(options.Value.Token, options.Value.ApiBaseUrl), httpClient);
         });
         services.AddSingleton<TelegramHttpClientHandler>();
         
@@ -77,14 +88,19 @@ public static class ServiceCollectionExtensions
         services.AddScoped<IAppointmentRepository>(provider =>
         {
             var dbOptions = provider.GetRequiredService<Microsoft.Extensions.Options.IOptions<DatabaseOptions>>();
-            return new AppointmentRepository(dbOptions.Value.ConnectionString);
+            return new AppointmentRepository(dbOptions.Value.ConnectionString, provider.GetRequiredService<AppointmentReminderService>());
         });
         
+        // Pool compartido para el aprendizaje: la cadena de conexión se arma una sola vez
+        services.AddSingleton<NpgsqlDataSource>(provider =>
+        {
+            var dbOptions = provider.GetRequiredService<Microsoft.Extensions.Options.IOptions<DatabaseOptions>>();
+            return NpgsqlDataSource.Create(UserLearningRepository.BuildConnectionString(dbOptions.Value.ConnectionString));
+        });
         services.AddScoped<IUserLearningRepository>(provider =>
         {
             var logger = provider.GetRequiredService<ILogger<UserLearningRepository>>();
-            var dbOptions = provider.GetRequiredService<Microsoft.Extensions.Options.IOptions<DatabaseOptions>>();
-            return new UserLearningRepository(logger, dbOptions.Value.ConnectionString);
+            return new UserLearningRepository(logger, provider.GetRequiredService<NpgsqlDataSource>());
         });
         
         services.AddScoped<IAnesthesiologistRepository>(provider =>
@@ -121,28 +137,70 @@ public static class ServiceCollectionExtensions
             var logger = provider.GetRequiredService<ILogger<RegistroCx.Services.Onboarding.OnboardingService>>();
             return new RegistroCx.Services.Onboarding.OnboardingService(userRepo, googleOAuth, logger);
         });
+        // Cache de respuestas de extracción del LLM (LLM_RESPONSE_CACHE=false lo desactiva)
+        var useResponseCache = !string.Equals(Environment.GetEnvironmentVariable("LLM_RESPONSE_CACHE"), "false", StringComparison.OrdinalIgnoreCase);
+        services.AddSingleton<LlmResponseCache>(provider =>
+        {
+            var maxEntries = int.TryParse(Environment.GetEnvironmentVariable("LLM_CACHE_MAX_ENTRIES"), out var n) ? n : 5000;
+            var ttlMinutes = int.TryParse(Environment.GetEnvironmentVariable("LLM_CACHE_TTL_MINUTES"), out var m) ? m : 60;
+            return new LlmResponseCache(maxEntries, TimeSpan.FromMinutes(ttlMinutes));
+        });
         services.AddScoped<LLMOpenAIAssistant>(provider =>
         {
             var openAiOptions = provider.GetRequiredService<Microsoft.Extensions.Options.IOptions<OpenAIOptions>>().Value;
-            return new LLMOpenAIAssistant(openAiOptions.ApiKey);
+            var responseCache = useResponseCache ? provider.GetRequiredService<LlmResponseCache>() : null;
+            return new LLMOpenAIAssistant(openAiOptions.ApiKey, responseCache, provider.GetRequiredService<UserLearningService>());
         });
         services.AddScoped<RegistroCx.Services.Extraction.LLMOpenAIAssistant>(provider =>
         {
             var openAiOptions = provider.GetRequiredService<Microsoft.Extensions.Options.IOptions<OpenAIOptions>>().Value;
-            return new RegistroCx.Services.Extraction.LLMOpenAIAssistant(openAiOptions.ApiKey);
+            var responseCache = useResponseCache ? provider.GetRequiredService<LlmResponseCache>() : null;
+            return new RegistroCx.Services.Extraction.LLMOpenAIAssistant(openAiOptions.ApiKey, responseCache, provider.GetRequiredService<UserLearningService>());
         });
         
+        // Índice de nombres en memoria para buscar anestesiólogos sin LLM (NAME_INDEX=false vuelve al LLM)
+        var useNameIndex = !string.Equals(Environment.GetEnvironmentVariable("NAME_INDEX"), "false", StringComparison.OrdinalIgnoreCase);
+        services.AddSingleton<NameIndexRegistry>();
+        services.AddScoped<NameLookupService>(provider =>
+        {
+            var registry = provider.GetRequiredService<NameIndexRegistry>();
+            var cache = provider.GetRequiredService<ICacheService>();
+            var anesthesiologistRepo = provider.GetRequiredService<IAnesthesiologistRepository>();
+            var equipoService = provider.GetRequiredService<EquipoService>();
+            var learningService = provider.GetRequiredService<UserLearningService>();
+            return new NameLookupService(registry, cache, anesthesiologistRepo, equipoService, learningService);
+        });
         services.AddScoped<IAnesthesiologistSearchService>(provider =>
         {
             var llmAssistant = provider.GetRequiredService<RegistroCx.Services.Extraction.LLMOpenAIAssistant>();
-            return new AnesthesiologistSearchService(llmAssistant);
+            var nameLookup = useNameIndex ? provider.GetRequiredService<NameLookupService>() : null;
+            return new AnesthesiologistSearchService(llmAssistant, nameLookup);
         });
         
+        // Escritura diferida del aprendizaje (LEARNING_WRITE_BEHIND=false escribe cada uso en el momento)
+        var useLearningWriteBehind = !string.Equals(Environment.GetEnvironmentVariable("LEARNING_WRITE_BEHIND"), "false", StringComparison.OrdinalIgnoreCase);
+        services.AddSingleton<LearningWriteBuffer>(provider =>
+        {
+            var intervalMs = int.TryParse(Environment.GetEnvironmentVariable("LEARNING_FLUSH_INTERVAL_MS"), out var i) ? i : 2000;
+            var batchSize = int.TryParse(Environment.GetEnvironmentVariable("LEARNING_FLUSH_BATCH"), out var n) ? n : 500;
+            var maxPending = int.TryParse(Environment.GetEnvironmentVariable("LEARNING_BUFFER_MAX"), out var m) ? m : 50_000;
+            return new LearningWriteBuffer(
+                provider.GetRequiredService<IServiceScopeFactory>(),
+                provider.GetRequiredService<ILogger<LearningWriteBuffer>>(),
+                TimeSpan.FromMilliseconds(Math.Max(intervalMs, 100)),
+                batchSize,
+                maxPending,
+                useResponseCache ? provider.GetRequiredService<LlmResponseCache>() : null,
+                provider.GetRequiredService<NameIndexRegistry>());
+        });
+
         services.AddScoped<UserLearningService>(provider =>
         {
             var learningRepo = provider.GetRequiredService<IUserLearningRepository>();
             var logger = provider.GetRequiredService<ILogger<UserLearningService>>();
-            return new UserLearningService(learningRepo, logger);
+            var responseCache = useResponseCache ? provider.GetRequiredService<LlmResponseCache>() : null;
+            var writeBuffer = useLearningWriteBehind ? provider.GetRequiredService<LearningWriteBuffer>() : null;
+            return new UserLearningService(learningRepo, logger, responseCache, writeBuffer);
         });
         
         services.AddScoped<EquipoService>(provider =>
@@ -165,12 +223,25 @@ public static class ServiceCollectionExtensions
             var surgeonRepo = provider.GetRequiredService<ISurgeonRepository>();
             var equipoService = provider.GetRequiredService<EquipoService>();
             var confirmationService = provider.GetRequiredService<AppointmentConfirmationService>();
-            var pendingAppointments = provider.GetRequiredService<Dictionary<long, RegistroCx.Models.Appointment>>();
+            var pendingAppointments = provider.GetRequiredService<ConcurrentDictionary<long, RegistroCx.Models.Appointment>>();
             return new QuickEditService(cacheService, logger, anesthesiologistRepo, surgeonRepo, equipoService, confirmationService, pendingAppointments);
         });
         
         // Context Management
-        services.AddScoped<IConversationContextManager, ConversationContextManager>();
+        // Clasificador local de relevancia en conversaciones activas (CONTEXT_LOCAL_CLASSIFIER=false consulta siempre al LLM)
+        var useLocalContextClassifier = !string.Equals(Environment.GetEnvironmentVariable("CONTEXT_LOCAL_CLASSIFIER"), "false", StringComparison.OrdinalIgnoreCase);
+        services.AddSingleton<LocalRelevanceClassifier>(provider =>
+        {
+            var minConfidence = double.TryParse(Environment.GetEnvironmentVariable("CONTEXT_CLASSIFIER_MIN_CONFIDENCE"), NumberStyles.Float, CultureInfo.InvariantCulture, out var c) && c > 0 ? c : 0.9;
+            return new LocalRelevanceClassifier(minConfidence, Environment.GetEnvironmentVariable("CONTEXT_CLASSIFIER_MODEL"));
+        });
+        services.AddScoped<IConversationContextManager>(provider =>
+        {
+            var llm = provider.GetRequiredService<RegistroCx.Services.Extraction.LLMOpenAIAssistant>();
+            var logger = provider.GetRequiredService<ILogger<ConversationContextManager>>();
+            var localClassifier = useLocalContextClassifier ? provider.GetRequiredService<LocalRelevanceClassifier>() : null;
+            return new ConversationContextManager(llm, logger, localClassifier);
+        });
         
         // Medical Context Validation
         services.AddScoped<MedicalContextValidator>(provider =>
@@ -186,16 +257,25 @@ public static class ServiceCollectionExtensions
             var llm = provider.GetRequiredService<LLMOpenAIAssistant>();
             return new ConversationHumanizer(logger, llm);
         });
+
+        // Extracción local sin LLM (LLM_FAST_PATH=false la desactiva)
+        services.AddScoped<LocalFastPathExtractor>(provider =>
+        {
+            var cache = provider.GetRequiredService<ICacheService>();
+            var learningRepo = provider.GetRequiredService<IUserLearningRepository>();
+            return new LocalFastPathExtractor(cache, learningRepo);
+        });
         
         // Diccionarios compartidos para mantener estado entre requests
-        services.AddSingleton<Dictionary<long, RegistroCx.Models.Appointment>>();
-        services.AddSingleton<Dictionary<long, RegistroCx.Services.Reports.ReportService.ReportCommandState>>();
+        services.AddSingleton<ConcurrentDictionary<long, RegistroCx.Models.Appointment>>();
+        services.AddSingleton<ConcurrentDictionary<long, RegistroCx.Services.Reports.ReportService.ReportCommandState>>();
         services.AddScoped<CalendarSyncService>(provider =>
         {
             var appointmentRepo = provider.GetRequiredService<IAppointmentRepository>();
+            var userRepo = provider.GetRequiredService<IUserProfileRepository>();
             var calendarService = provider.GetRequiredService<IGoogleCalendarService>();
             var equipoService = provider.GetRequiredService<EquipoService>();
-            return new CalendarSyncService(appointmentRepo, calendarService, equipoService);
+            return new CalendarSyncService(appointmentRepo, userRepo, calendarService, equipoService);
         });
         
         // Nuevos servicios para modificación de appointments
@@ -211,7 +291,7 @@ public static class ServiceCollectionExtensions
         services.AddScoped<CirugiaFlowService>(provider =>
         {
             var llm = provider.GetRequiredService<LLMOpenAIAssistant>();
-            var pending = provider.GetRequiredService<Dictionary<long, RegistroCx.Models.Appointment>>();
+            var pending = provider.GetRequiredService<ConcurrentDictionary<long, RegistroCx.Models.Appointment>>();
             var confirmationService = provider.GetRequiredService<AppointmentConfirmationService>();
             var oauthService = provider.GetRequiredService<RegistroCx.Helpers._0Auth.IGoogleOAuthService>();
             var userRepo = provider.GetRequiredService<IUserProfileRepository>();
@@ -231,7 +311,9 @@ public static class ServiceCollectionExtensions
             var equipoService = provider.GetRequiredService<EquipoService>();
             var medicalValidator = provider.GetRequiredService<MedicalContextValidator>();
             var conversationHumanizer = provider.GetRequiredService<ConversationHumanizer>();
-            return new CirugiaFlowService(llm, pending, confirmationService, oauthService, userRepo, calendarSync, appointmentRepo, multiSurgeryParser, reportService, anesthesiologistSearchService, learningService, searchService, modificationService, updateCoordinator, analytics, cache, quickEdit, contextManager, equipoService, medicalValidator, conversationHumanizer);
+            var useFastPath = !string.Equals(Environment.GetEnvironmentVariable("LLM_FAST_PATH"), "false", StringComparison.OrdinalIgnoreCase);
+            var fastPath = useFastPath ? provider.GetRequiredService<LocalFastPathExtractor>() : null;
+            return new CirugiaFlowService(llm, pending, confirmationService, oauthService, userRepo, calendarSync, appointmentRepo, multiSurgeryParser, reportService, anesthesiologistSearchService, learningService, searchService, modificationService, updateCoordinator, analytics, cache, quickEdit, contextManager, equipoService, medicalValidator, conversationHumanizer, fastPath);
         });
         services.AddScoped<AppointmentConfirmationService>(provider =>
         {
@@ -251,18 +333,34 @@ public static class ServiceCollectionExtensions
             var logger = provider.GetRequiredService<ILogger<AudioTranscriptionService>>();
             return new AudioTranscriptionService(httpClient, logger);
         });
+        // Transcripciones en paralelo, fuera del loop de updates (VOICE_TRANSCRIPTION_CONCURRENCY)
+        services.AddSingleton<TranscriptionPool>(provider =>
+        {
+            var concurrency = int.TryParse(Environment.GetEnvironmentVariable("VOICE_TRANSCRIPTION_CONCURRENCY"), out var n) ? n : 4;
+            return new TranscriptionPool(
+                provider.GetRequiredService<IServiceScopeFactory>(),
+                provider.GetRequiredService<Microsoft.Extensions.Caching.Memory.IMemoryCache>(),
+                provider.GetRequiredService<ILogger<TranscriptionPool>>(),
+                concurrency,
+                provider.GetRequiredService<IHostApplicationLifetime>().ApplicationStopping);
+        });
+        // Cirugías de un mismo mensaje procesadas en paralelo (MULTI_SURGERY_CONCURRENCY)
         services.AddScoped<MultiSurgeryParser>(provider =>
         {
             var logger = provider.GetRequiredService<ILogger<MultiSurgeryParser>>();
             var llm = provider.GetRequiredService<RegistroCx.Services.Extraction.LLMOpenAIAssistant>();
             var learningService = provider.GetRequiredService<UserLearningService>();
-            return new MultiSurgeryParser(logger, llm, learningService);
+            var concurrency = int.TryParse(Environment.GetEnvironmentVariable("MULTI_SURGERY_CONCURRENCY"), out var c) ? c : 4;
+            return new MultiSurgeryParser(logger, llm, learningService, concurrency);
         });
         services.AddScoped<IGoogleCalendarService>(provider =>
         {
             var userRepo = provider.GetRequiredService<IUserProfileRepository>();
             var oauthService = provider.GetRequiredService<RegistroCx.Helpers._0Auth.IGoogleOAuthService>();
-            return new GoogleCalendarService(userRepo, oauthService);
+            // GOOGLE_CALENDAR_API_URL apunta a fake_calendar_api.py; CALENDAR_BATCH_CONCURRENCY = lotes en vuelo por usuario
+            var apiUrl = Environment.GetEnvironmentVariable("GOOGLE_CALENDAR_API_URL");
+            var batchConcurrency = int.TryParse(Environment.GetEnvironmentVariable("CALENDAR_BATCH_CONCURRENCY"), out var c) ? c : 2;
+            return new GoogleCalendarService(userRepo, oauthService, apiUrl, batchConcurrency);
         });
 
         // Servicios de reportes
@@ -271,21 +369,95 @@ public static class ServiceCollectionExtensions
             var appointmentRepo = provider.GetRequiredService<IAppointmentRepository>();
             var userRepo = provider.GetRequiredService<IUserProfileRepository>();
             var equipoService = provider.GetRequiredService<EquipoService>();
-            return new ReportDataService(appointmentRepo, userRepo, equipoService);
+            // REPORT_ROLLUPS=false vuelve a armar los reportes mensuales/anuales recorriendo appointments
+            var useRollups = !string.Equals(Environment.GetEnvironmentVariable("REPORT_ROLLUPS"), "false", StringComparison.OrdinalIgnoreCase);
+            return new ReportDataService(appointmentRepo, userRepo, equipoService, useRollups);
         });
         services.AddScoped<ChartGeneratorService>();
         services.AddScoped<PdfGeneratorService>();
         services.AddScoped<IReportService>(provider =>
         {
             var dataService = provider.GetRequiredService<ReportDataService>();
-            var pdfGenerator = provider.GetRequiredService<PdfGeneratorService>();
-            var commandStates = provider.GetRequiredService<Dictionary<long, RegistroCx.Services.Reports.ReportService.ReportCommandState>>();
-            return new ReportService(dataService, pdfGenerator, commandStates);
+            var renderQueue = provider.GetRequiredService<ReportRenderQueue>();
+            var commandStates = provider.GetRequiredService<ConcurrentDictionary<long, RegistroCx.Services.Reports.ReportService.ReportCommandState>>();
+            return new ReportService(dataService, renderQueue, commandStates);
+        });
+
+        // Render de PDFs en segundo plano + cache por contenido (REPORT_WORKERS, REPORT_QUEUE_CAPACITY, REPORT_CACHE_MAX_MB)
+        services.AddSingleton<ReportCache>(provider =>
+        {
+            var maxMb = int.TryParse(Environment.GetEnvironmentVariable("REPORT_CACHE_MAX_MB"), out var mb) ? mb : 256;
+            var directory = Path.Combine(Path.GetTempPath(), "RegistroCx_Reports", "cache");
+            return new ReportCache(directory, maxMb * 1024L * 1024L);
+        });
+        services.AddSingleton<ReportRenderQueue>(provider =>
+        {
+            var workers = int.TryParse(Environment.GetEnvironmentVariable("REPORT_WORKERS"), out var w) ? w : 2;
+            var capacity = int.TryParse(Environment.GetEnvironmentVariable("REPORT_QUEUE_CAPACITY"), out var c) ? c : 64;
+            return new ReportRenderQueue(
+                provider.GetRequiredService<IServiceScopeFactory>(),
+                provider.GetRequiredService<ReportCache>(),
+                provider.GetRequiredService<ILogger<ReportRenderQueue>>(),
+                workers,
+                capacity);
+        });
+
+        // Salida hacia Telegram con rate limiting (TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE, TELEGRAM_CHAT_BURST)
+        services.AddSingleton<OutboundDispatcher>(provider =>
+        {
+            var globalRate = double.TryParse(Environment.GetEnvironmentVariable("TELEGRAM_GLOBAL_RATE"), NumberStyles.Float, CultureInfo.InvariantCulture, out var g) && g > 0 ? g : 25;
+            var chatRate = double.TryParse(Environment.GetEnvironmentVariable("TELEGRAM_CHAT_RATE"), NumberStyles.Float, CultureInfo.InvariantCulture, out var r) && r > 0 ? r : 1;
+            var chatBurst = int.TryParse(Environment.GetEnvironmentVariable("TELEGRAM_CHAT_BURST"), out var b) ? b : 3;
+            return new OutboundDispatcher(provider.GetRequiredService<ILogger<OutboundDispatcher>>(), globalRate, chatRate, chatBurst);
+        });
+
+        // Colas por chat para los updates entrantes (polling o webhook)
+        services.AddSingleton<UpdateDispatcher>(provider =>
+        {
+            var options = provider.GetRequiredService<Microsoft.Extensions.Options.IOptions<TelegramBotOptions>>().Value;
+            return new UpdateDispatcher(provider.GetRequiredService<ILogger<UpdateDispatcher>>(), options.UpdateWorkers, options.UpdateQueueCapacity);
+        });
+        services.AddSingleton<TelegramBotService>();
+
+        // Captura anonimizada del tráfico para replay (TRAFFIC_CAPTURE=true, TRAFFIC_CAPTURE_PATH, TRAFFIC_CAPTURE_SALT)
+        var useTrafficCapture = string.Equals(Environment.GetEnvironmentVariable("TRAFFIC_CAPTURE"), "true", StringComparison.OrdinalIgnoreCase);
+        if (useTrafficCapture)
+        {
+            services.AddSingleton<TrafficCapture>(provider =>
+            {
+                var path = Environment.GetEnvironmentVariable("TRAFFIC_CAPTURE_PATH");
+                if (string.IsNullOrWhiteSpace(path))
+                    path = Path.Combine("traffic", $"capture-{DateTime.UtcNow:yyyyMMdd-HHmmss}.jsonl.gz");
+                return new TrafficCapture(
+                    provider.GetRequiredService<ILogger<TrafficCapture>>(),
+                    path,
+                    Environment.GetEnvironmentVariable("TRAFFIC_CAPTURE_SALT"));
+            });
+        }
+
+        // Recordatorios por hora de vencimiento (REMINDER_LEAD_HOURS, REMINDER_LOAD_HORIZON_MINUTES, REMINDER_SEND_CONCURRENCY)
+        services.AddSingleton<AppointmentReminderService>(provider =>
+        {
+            var leadHours = int.TryParse(Environment.GetEnvironmentVariable("REMINDER_LEAD_HOURS"), out var h) ? h : 24;
+            var horizonMinutes = int.TryParse(Environment.GetEnvironmentVariable("REMINDER_LOAD_HORIZON_MINUTES"), out var m) ? m : 60;
+            var concurrency = int.TryParse(Environment.GetEnvironmentVariable("REMINDER_SEND_CONCURRENCY"), out var c) ? c : 8;
+            return new AppointmentReminderService(
+                provider.GetRequiredService<IServiceScopeFactory>(),
+                provider.GetRequiredService<ILogger<AppointmentReminderService>>(),
+                TimeSpan.FromHours(leadHours),
+                TimeSpan.FromMinutes(horizonMinutes),
+                concurrency);
         });
 
-        // Background services
-        services.AddHostedService<TelegramBotService>();
-        services.AddHostedService<AppointmentReminderService>();
+        // Background services (el despachador primero: los demás envían a través de él)
+        services.AddHostedService(provider => provider.GetRequiredService<OutboundDispatcher>());
+        if (useTrafficCapture)
+            services.AddHostedService(provider => provider.GetRequiredService<TrafficCapture>());
+        services.AddHostedService(provider => provider.GetRequiredService<TelegramBotService>());
+        services.AddHostedService(provider => provider.GetRequiredService<AppointmentReminderService>());
+        services.AddHostedService(provider => provider.GetRequiredService<ReportRenderQueue>());
+        if (useLearningWriteBehind)
+            services.AddHostedService(provider => provider.GetRequiredService<LearningWriteBuffer>());
 
         return services;
     }
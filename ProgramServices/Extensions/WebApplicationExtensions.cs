@@ -11,6 +11,11 @@ public static class WebApplicationExtensions
     {
         app.MapOAuthEndpoints();
         app.MapHealthEndpoints();
+        app.MapMetricsEndpoints();
+        app.MapReportEndpoints();
+        app.MapCalendarEndpoints();
+        app.MapNameIndexEndpoints();
+        app.MapTelegramWebhookEndpoints();
     }
 
     public static async Task ConfigureTelegramBot(this WebApplication app)
@@ -1,4 +1,5 @@
 using System;
+using RegistroCx.Services.Analytics;
 using Telegram.Bot;
 using Telegram.Bot.Exceptions;
 using Telegram.Bot.Types.Enums;
@@ -11,26 +12,51 @@ public static class MessageSender
 {
     private const int MaxRetries = 3;
     private const int BaseDelayMs = 1000;
-    
+
     public static ITelegramBotClient? Bot { get; set; }
 
-    public static async Task SendWithRetry(long chatId, string message, ReplyMarkup? replyMarkup = null, CancellationToken cancellationToken = default)
+    /// <summary>
+    /// Despachador con rate limiting; lo registra OutboundDispatcher al construirse.
+    /// Sin él (herramientas, tests) se envía directo con reintentos como antes.
+    /// </summary>
+    public static OutboundDispatcher? Dispatcher { get; set; }
+
+    /// <summary>
+    /// Captura de tráfico (TRAFFIC_CAPTURE); la registra TrafficCapture al construirse.
+    /// </summary>
+    public static TrafficCapture? Capture { get; set; }
+
+    public static async Task SendWithRetry(long chatId, string message, ReplyMarkup? replyMarkup = null, CancellationToken cancellationToken = default,
+        OutboundPriority priority = OutboundPriority.Interactive)
     {
         if (Bot == null)
             throw new InvalidOperationException("Bot instance not set. Set MessageSender.Bot before calling SendWithRetry.");
-            
+
+        using var timer = BotMetrics.Time(BotMetrics.ReplySend);
+        Capture?.RecordReply(chatId, "sendMessage", message, replyMarkup != null);
+
+        var dispatcher = Dispatcher;
+        if (dispatcher != null)
+        {
+            await dispatcher.SendAsync(chatId, message, replyMarkup, priority, cancellationToken);
+            timer.Success();
+            return;
+        }
+
         for (int attempt = 0; attempt < MaxRetries; attempt++)
         {
             try
             {
                 await Bot.SendMessage(chatId, message, parseMode: ParseMode.Html, replyMarkup: replyMarkup, cancellationToken: cancellationToken);
-                
+
+                timer.Success();
                 return;
             }
             catch (ApiRequestException ex) when (ex.ErrorCode == 429)
             {
-                var delay = ex.Parameters?.RetryAfter ?? (BaseDelayMs * Math.Pow(2, attempt));
-                await Task.Delay(TimeSpan.FromSeconds(delay), cancellationToken);
+                BotMetrics.Increment("reply_send_rate_limited");
+                var delay = TimeSpan.FromSeconds(ex.Parameters?.RetryAfter ?? Math.Pow(2, attempt));
+                await Task.Delay(delay, cancellationToken);
             }
             catch (HttpRequestException ex)
             {
@@ -44,4 +70,44 @@ public static class MessageSender
             }
         }
     }
-}
\ No newline at end of file
+
+    /// <summary>
+    /// Edita texto (y teclado inline) de un mensaje. Con el despachador, ediciones seguidas del mismo
+    /// mensaje que todavía no salieron se envían como una sola.
+    /// </summary>
+    public static Task EditWithRetry(long chatId, int messageId, string text, InlineKeyboardMarkup? replyMarkup = null, CancellationToken cancellationToken = default)
+    {
+        if (Bot == null)
+            throw new InvalidOperationException("Bot instance not set. Set MessageSender.Bot before calling EditWithRetry.");
+
+        Capture?.RecordReply(chatId, "editMessageText", text, replyMarkup != null);
+
+        return Dispatcher?.EditTextAsync(chatId, messageId, text, replyMarkup, cancellationToken)
+            ?? Bot.EditMessageText(chatId, messageId, text, replyMarkup: replyMarkup, cancellationToken: cancellationToken);
+    }
+
+    public static Task EditReplyMarkupWithRetry(long chatId, int messageId, InlineKeyboardMarkup? replyMarkup, CancellationToken cancellationToken = default)
+    {
+        if (Bot == null)
+            throw new InvalidOperationException("Bot instance not set. Set MessageSender.Bot before calling EditReplyMarkupWithRetry.");
+
+        Capture?.RecordReply(chatId, "editMessageReplyMarkup", null, replyMarkup != null);
+
+        return Dispatcher?.EditReplyMarkupAsync(chatId, messageId, replyMarkup, cancellationToken)
+            ?? Bot.EditMessageReplyMarkup(chatId, messageId, replyMarkup: replyMarkup, cancellationToken: cancellationToken);
+    }
+
+    /// <summary>
+    /// Cualquier otra llamada saliente hacia un chat (documentos, etc.) bajo los mismos límites.
+    /// </summary>
+    public static Task RunWithRetry(long chatId, Func<ITelegramBotClient, CancellationToken, Task> call, CancellationToken cancellationToken = default,
+        OutboundPriority priority = OutboundPriority.Interactive)
+    {
+        if (Bot == null)
+            throw new InvalidOperationException("Bot instance not set. Set MessageSender.Bot before calling RunWithRetry.");
+
+        Capture?.RecordReply(chatId, "other", null, false);
+
+        return Dispatcher?.RunAsync(chatId, priority, call, cancellationToken) ?? call(Bot, cancellationToken);
+    }
+}
@@ -0,0 +1,455 @@
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Threading;
+using System.Threading.Tasks;
+using Microsoft.Extensions.Hosting;
+using Microsoft.Extensions.Logging;
+using RegistroCx.Services.Analytics;
+using Telegram.Bot;
+using Telegram.Bot.Exceptions;
+using Telegram.Bot.Types.Enums;
+using Telegram.Bot.Types.ReplyMarkups;
+
+namespace RegistroCx.ProgramServices.Services.Telegram;
+
+public enum OutboundPriority
+{
+    Interactive = 0,   // Respuestas a lo que el usuario acaba de escribir (confirmaciones incluidas)
+    Background = 1     // Recordatorios y avisos que no esperan a nadie
+}
+
+/// <summary>
+/// Único punto de salida hacia Telegram. Respeta los límites antes de chocar con ellos:
+/// un token bucket global (TELEGRAM_GLOBAL_RATE) y uno por chat (TELEGRAM_CHAT_RATE/BURST).
+/// Dentro de un chat se mantiene el orden y hay un solo envío en vuelo; entre chats gana lo interactivo.
+/// Ediciones pendientes del mismo mensaje se combinan en una sola llamada.
+/// Si igual llega un 429, se pausa todo el despacho durante retry_after.
+/// </summary>
+public class OutboundDispatcher : BackgroundService
+{
+    private const int MaxRetries = 3;
+    private const int BaseDelayMs = 1000;
+
+    private readonly ILogger<OutboundDispatcher> _logger;
+    private readonly object _lock = new();
+    private readonly Dictionary<long, ChatOutbox> _chats = new();
+    private readonly TokenBucket _global;
+    private readonly double _chatRate;
+    private readonly int _chatBurst;
+    private readonly SemaphoreSlim _signal = new(0);
+    private DateTime _pausedUntil = DateTime.MinValue;
+    private int _queued;
+    private int _inFlight;
+
+    public OutboundDispatcher(ILogger<OutboundDispatcher> logger, double globalRate, double chatRate, int chatBurst)
+    {
+        _logger = logger;
+        _global = new TokenBucket(globalRate, Math.Max(1, globalRate));
+        _chatRate = chatRate;
+        _chatBurst = Math.Max(1, chatBurst);
+
+        BotMetrics.RegisterGauge("outbound_queued", () => Volatile.Read(ref _queued));
+        BotMetrics.RegisterGauge("outbound_in_flight", () => Volatile.Read(ref _inFlight));
+        BotMetrics.RegisterGauge("outbound_chats", () => { lock (_lock) return _chats.Count; });
+
+        MessageSender.Dispatcher = this;
+    }
+
+    public Task SendAsync(long chatId, string text, ReplyMarkup? replyMarkup, OutboundPriority priority, CancellationToken ct) =>
+        Enqueue(new OutboundOperation(chatId, priority, OutboundKind.Send) { Text = text, ReplyMarkup = replyMarkup }, ct);
+
+    public Task EditTextAsync(long chatId, int messageId, string text, InlineKeyboardMarkup? replyMarkup, CancellationToken ct) =>
+        Enqueue(new OutboundOperation(chatId, OutboundPriority.Interactive, OutboundKind.EditText)
+        {
+            MessageId = messageId,
+            Text = text,
+            ReplyMarkup = replyMarkup
+        }, ct);
+
+    public Task EditReplyMarkupAsync(long chatId, int messageId, InlineKeyboardMarkup? replyMarkup, CancellationToken ct) =>
+        Enqueue(new OutboundOperation(chatId, OutboundPriority.Interactive, OutboundKind.EditReplyMarkup)
+        {
+            MessageId = messageId,
+            ReplyMarkup = replyMarkup
+        }, ct);
+
+    /// <summary>
+    /// Cualquier otra llamada que cuente para los límites (ej. SendDocument).
+    /// </summary>
+    public Task RunAsync(long chatId, OutboundPriority priority, Func<ITelegramBotClient, CancellationToken, Task> call, CancellationToken ct) =>
+        Enqueue(new OutboundOperation(chatId, priority, OutboundKind.Custom) { Call = call }, ct);
+
+    private Task Enqueue(OutboundOperation operation, CancellationToken ct)
+    {
+        var waiter = new TaskCompletionSource(TaskCreationOptions.RunContinuationsAsynchronously);
+        if (ct.CanBeCanceled)
+        {
+            var registration = ct.Register(() => waiter.TrySetCanceled(ct));
+            waiter.Task.ContinueWith(_ => registration.Dispose(), TaskScheduler.Default);
+        }
+
+        lock (_lock)
+        {
+            if (!_chats.TryGetValue(operation.ChatId, out var outbox))
+            {
+                outbox = new ChatOutbox(new TokenBucket(_chatRate, _chatBurst));
+                _chats[operation.ChatId] = outbox;
+            }
+
+            var pending = operation.Kind is OutboundKind.EditText or OutboundKind.EditReplyMarkup
+                ? outbox.FindPendingEdit(operation.MessageId)
+                : null;
+
+            if (pending != null)
+            {
+                pending.MergeEdit(operation);
+                pending.Waiters.Add(waiter);
+                BotMetrics.Increment("outbound_coalesced");
+                return waiter.Task;
+            }
+
+            operation.Waiters.Add(waiter);
+            outbox.Enqueue(operation);
+            _queued++;
+        }
+
+        _signal.Release();
+        return waiter.Task;
+    }
+
+    protected override async Task ExecuteAsync(CancellationToken stoppingToken)
+    {
+        _logger.LogInformation("[OUTBOUND] Dispatcher started: {GlobalRate}/s global, {ChatRate}/s per chat (burst {Burst})",
+            _global.Rate, _chatRate, _chatBurst);
+
+        try
+        {
+            while (!stoppingToken.IsCancellationRequested)
+            {
+                OutboundOperation? operation;
+                ChatOutbox? outbox;
+                TimeSpan wait;
+                lock (_lock)
+                {
+                    (operation, outbox, wait) = PickNext(DateTime.UtcNow);
+                }
+
+                if (operation != null)
+                {
+                    _ = ExecuteOperationAsync(operation, outbox!, stoppingToken);
+                    continue;
+                }
+
+                await _signal.WaitAsync(wait, stoppingToken);
+            }
+        }
+        catch (OperationCanceledException) when (stoppingToken.IsCancellationRequested)
+        {
+        }
+        finally
+        {
+            MessageSender.Dispatcher = null;
+            CancelPending();
+        }
+    }
+
+    /// <summary>
+    /// Próxima operación que puede salir ya, o cuánto esperar hasta que alguna pueda. Se llama con _lock tomado.
+    /// </summary>
+    private (OutboundOperation?, ChatOutbox?, TimeSpan) PickNext(DateTime now)
+    {
+        if (now < _pausedUntil)
+            return (null, null, _pausedUntil - now);
+
+        ChatOutbox? best = null;
+        OutboundOperation? bestOperation = null;
+        var wait = Timeout.InfiniteTimeSpan;
+        List<long>? idle = null;
+
+        foreach (var (chatId, outbox) in _chats)
+        {
+            var head = outbox.Peek();
+            if (head == null)
+            {
+                // Se conserva el bucket hasta que se llene: si no, un chat podría reiniciar su ráfaga
+                if (!outbox.Busy && outbox.Bucket.IsFull(now))
+                    (idle ??= new List<long>()).Add(chatId);
+                continue;
+            }
+            if (outbox.Busy)
+                continue;
+
+            var ready = Max(outbox.Bucket.TimeUntilAvailable(now), outbox.BlockedUntil - now);
+            if (ready > TimeSpan.Zero)
+            {
+                wait = Min(wait, ready);
+                continue;
+            }
+
+            if (bestOperation == null
+                || head.Priority < bestOperation.Priority
+                || (head.Priority == bestOperation.Priority && head.EnqueuedAt < bestOperation.EnqueuedAt))
+            {
+                best = outbox;
+                bestOperation = head;
+            }
+        }
+
+        if (idle != null)
+        {
+            foreach (var chatId in idle)
+                _chats.Remove(chatId);
+        }
+
+        if (bestOperation == null)
+            return (null, null, wait);
+
+        var globalWait = _global.TimeUntilAvailable(now);
+        if (globalWait > TimeSpan.Zero)
+            return (null, null, globalWait);
+
+        _global.Take(now);
+        best!.Bucket.Take(now);
+        best.Dequeue(bestOperation);
+        best.Busy = true;
+        _queued--;
+        return (bestOperation, best, TimeSpan.Zero);
+    }
+
+    private async Task ExecuteOperationAsync(OutboundOperation operation, ChatOutbox outbox, CancellationToken stoppingToken)
+    {
+        Interlocked.Increment(ref _inFlight);
+        var requeue = false;
+        try
+        {
+            // Todos los que esperaban cancelaron: no tiene sentido gastar un token en Telegram
+            if (operation.Waiters.All(w => w.Task.IsCompleted))
+                return;
+
+            if (operation.Attempts == 0)
+                BotMetrics.Observe(BotMetrics.OutboundQueueWait, DateTime.UtcNow - operation.EnqueuedAt);
+
+            var bot = MessageSender.Bot
+                ?? throw new InvalidOperationException("Bot instance not set. Set MessageSender.Bot before sending messages.");
+            await operation.ExecuteAsync(bot, stoppingToken);
+            operation.Complete();
+            BotMetrics.Increment("outbound_sent");
+        }
+        catch (ApiRequestException ex) when (ex.ErrorCode == 429)
+        {
+            // Telegram aplica el flood limit a todo el bot: se frena todo el despacho, no solo este chat
+            var retryAfter = TimeSpan.FromSeconds(ex.Parameters?.RetryAfter ?? 1);
+            BotMetrics.Increment("reply_send_rate_limited");
+            _logger.LogWarning("[OUTBOUND] 429 from Telegram for chat {ChatId}, pausing {Seconds}s", operation.ChatId, retryAfter.TotalSeconds);
+            lock (_lock)
+            {
+                var until = DateTime.UtcNow + retryAfter;
+                if (until > _pausedUntil)
+                    _pausedUntil = until;
+            }
+            requeue = true;
+        }
+        catch (HttpRequestException ex)
+        {
+            operation.Attempts++;
+            if (operation.Attempts >= MaxRetries)
+            {
+                Console.WriteLine($"Failed to send message after {MaxRetries} attempts: {ex.Message}");
+                operation.Complete();
+            }
+            else
+            {
+                lock (_lock)
+                {
+                    outbox.BlockedUntil = DateTime.UtcNow.AddMilliseconds(BaseDelayMs * Math.Pow(2, operation.Attempts - 1));
+                }
+                requeue = true;
+            }
+        }
+        catch (OperationCanceledException) when (stoppingToken.IsCancellationRequested)
+        {
+            operation.Cancel();
+        }
+        catch (Exception ex)
+        {
+            operation.Fail(ex);
+        }
+        finally
+        {
+            lock (_lock)
+            {
+                if (requeue)
+                {
+                    outbox.EnqueueFirst(operation);
+                    _queued++;
+                }
+                outbox.Busy = false;
+            }
+            Interlocked.Decrement(ref _inFlight);
+            _signal.Release();
+        }
+    }
+
+    private void CancelPending()
+    {
+        lock (_lock)
+        {
+            foreach (var outbox in _chats.Values)
+            {
+                OutboundOperation? operation;
+                while ((operation = outbox.Peek()) != null)
+                {
+                    outbox.Dequeue(operation);
+                    operation.Cancel();
+                }
+            }
+            _chats.Clear();
+            _queued = 0;
+        }
+    }
+
+    private static TimeSpan Min(TimeSpan a, TimeSpan b) => a == Timeout.InfiniteTimeSpan ? b : (a < b ? a : b);
+    private static TimeSpan Max(TimeSpan a, TimeSpan b) => a > b ? a : b;
+
+    private enum OutboundKind
+    {
+        Send,
+        EditText,
+        EditReplyMarkup,
+        Custom
+    }
+
+    private sealed class OutboundOperation
+    {
+        public OutboundOperation(long chatId, OutboundPriority priority, OutboundKind kind)
+        {
+            ChatId = chatId;
+            Priority = priority;
+            Kind = kind;
+        }
+
+        public long ChatId { get; }
+        public OutboundPriority Priority { get; }
+        public OutboundKind Kind { get; private set; }
+        public DateTime EnqueuedAt { get; } = DateTime.UtcNow;
+        public int MessageId { get; init; }
+        public string? Text { get; set; }
+        public ReplyMarkup? ReplyMarkup { get; set; }
+        public Func<ITelegramBotClient, CancellationToken, Task>? Call { get; init; }
+        public List<TaskCompletionSource> Waiters { get; } = new();
+        public int Attempts { get; set; }
+
+        /// <summary>
+        /// Combina una edición posterior del mismo mensaje: el resultado es el estado final que pidió la última.
+        /// </summary>
+        public void MergeEdit(OutboundOperation later)
+        {
+            if (later.Kind == OutboundKind.EditText)
+            {
+                Kind = OutboundKind.EditText;
+                Text = later.Text;
+            }
+            ReplyMarkup = later.ReplyMarkup;
+        }
+
+        public Task ExecuteAsync(ITelegramBotClient bot, CancellationToken ct) => Kind switch
+        {
+            OutboundKind.Send => bot.SendMessage(ChatId, Text!, parseMode: ParseMode.Html, replyMarkup: ReplyMarkup, cancellationToken: ct),
+            OutboundKind.EditText => bot.EditMessageText(ChatId, MessageId, Text!, replyMarkup: ReplyMarkup as InlineKeyboardMarkup, cancellationToken: ct),
+            OutboundKind.EditReplyMarkup => bot.EditMessageReplyMarkup(ChatId, MessageId, replyMarkup: ReplyMarkup as InlineKeyboardMarkup, cancellationToken: ct),
+            _ => Call!(bot, ct)
+        };
+
+        public void Complete()
+        {
+            foreach (var waiter in Waiters)
+                waiter.TrySetResult();
+        }
+
+        public void Fail(Exception ex)
+        {
+            foreach (var waiter in Waiters)
+                waiter.TrySetException(ex);
+        }
+
+        public void Cancel()
+        {
+            foreach (var waiter in Waiters)
+                waiter.TrySetCanceled();
+        }
+    }
+
+    private sealed class ChatOutbox
+    {
+        private readonly LinkedList<OutboundOperation> _interactive = new();
+        private readonly LinkedList<OutboundOperation> _background = new();
+
+        public ChatOutbox(TokenBucket bucket)
+        {
+            Bucket = bucket;
+        }
+
+        public TokenBucket Bucket { get; }
+        public bool Busy { get; set; }
+        public DateTime BlockedUntil { get; set; } = DateTime.MinValue;
+
+        // Lo interactivo adelanta a los recordatorios del mismo chat; dentro de cada prioridad, FIFO
+        public OutboundOperation? Peek() => _interactive.First?.Value ?? _background.First?.Value;
+
+        public void Enqueue(OutboundOperation operation) => QueueFor(operation).AddLast(operation);
+
+        public void EnqueueFirst(OutboundOperation operation) => QueueFor(operation).AddFirst(operation);
+
+        public void Dequeue(OutboundOperation operation) => QueueFor(operation).Remove(operation);
+
+        public OutboundOperation? FindPendingEdit(int messageId) =>
+            _interactive.FirstOrDefault(o =>
+                o.MessageId == messageId && o.Kind is OutboundKind.EditText or OutboundKind.EditReplyMarkup);
+
+        private LinkedList<OutboundOperation> QueueFor(OutboundOperation operation) =>
+            operation.Priority == OutboundPriority.Interactive ? _interactive : _background;
+    }
+
+    private sealed class TokenBucket
+    {
+        private readonly double _capacity;
+        private double _tokens;
+        private DateTime _updated = DateTime.UtcNow;
+
+        public TokenBucket(double rate, double capacity)
+        {
+            Rate = rate;
+            _capacity = capacity;
+            _tokens = capacity;
+        }
+
+        public double Rate { get; }
+
+        public TimeSpan TimeUntilAvailable(DateTime now)
+        {
+            Refill(now);
+            return _tokens >= 1 ? TimeSpan.Zero : TimeSpan.FromSeconds((1 - _tokens) / Rate);
+        }
+
+        public bool IsFull(DateTime now)
+        {
+            Refill(now);
+            return _tokens >= _capacity;
+        }
+
+        public void Take(DateTime now)
+        {
+            Refill(now);
+            _tokens -= 1;
+        }
+
+        private void Refill(DateTime now)
+        {
+            if (now <= _updated)
+                return;
+            _tokens = Math.Min(_capacity, _tokens + (now - _updated).TotalSeconds * Rate);
+            _updated = now;
+        }
+    }
+}
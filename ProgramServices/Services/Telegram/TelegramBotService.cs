@@ -1,7 +1,10 @@
 using Microsoft.Extensions.Hosting;
 using Microsoft.Extensions.Logging;
+using Microsoft.Extensions.Options;
+using RegistroCx.ProgramServices.Configuration;
 using RegistroCx.ProgramServices.Services.Telegram;
 using RegistroCx.Services.Onboarding;
+using RegistroCx.Services.Analytics;
 using RegistroCx.Services;
 using RegistroCx.Services.UI;
 using Telegram.Bot;
@@ -19,12 +22,24 @@ public class TelegramBotService : BackgroundService
     private readonly ILogger<TelegramBotService> _logger;
     private readonly ReceiverOptions _receiverOptions;
     private readonly IServiceProvider _serviceProvider;
+    private readonly TelegramBotOptions _options;
+    private readonly TranscriptionPool _transcriptionPool;
+    private readonly UpdateDispatcher _updates;
+    private readonly TrafficCapture? _capture;
 
-    public TelegramBotService(TelegramBotClient bot, ILogger<TelegramBotService> logger, IServiceProvider serviceProvider)
+    // Chats con un audio transcribiéndose: sus updates siguientes esperan detrás, en orden
+    private readonly Dictionary<long, Task> _chatChains = new();
+    private readonly object _chainLock = new();
+
+    public TelegramBotService(TelegramBotClient bot, ILogger<TelegramBotService> logger, IServiceProvider serviceProvider, IOptions<TelegramBotOptions> options, TranscriptionPool transcriptionPool, UpdateDispatcher updates, TrafficCapture? capture = null)
     {
         _bot = bot;
         _logger = logger;
         _serviceProvider = serviceProvider;
+        _options = options.Value;
+        _transcriptionPool = transcriptionPool;
+        _updates = updates;
+        _capture = capture;
         
         // Configuración robusta para el polling
         _receiverOptions = new ReceiverOptions
@@ -38,24 +53,70 @@ public class TelegramBotService : BackgroundService
     {
         _logger.LogInformation("Bot iniciado correctamente");
 
+        // Los workers procesan en paralelo entre chats y en orden dentro de cada chat
+        var workers = _updates.RunAsync((update, ct) => HandleUpdate(_bot, update, ct), stoppingToken);
+
+        if (_options.UseWebhook)
+        {
+            await RegisterWebhookAsync(stoppingToken);
+        }
+        else
+        {
+            await RunPollingAsync(stoppingToken);
+        }
+
+        await workers;
+        _logger.LogInformation("Servicio de bot detenido");
+    }
+
+    private async Task RegisterWebhookAsync(CancellationToken stoppingToken)
+    {
+        if (string.IsNullOrWhiteSpace(_options.WebhookUrl))
+            throw new InvalidOperationException("TELEGRAM_UPDATE_MODE=webhook requiere TELEGRAM_WEBHOOK_URL");
+
         while (!stoppingToken.IsCancellationRequested)
         {
             try
             {
-                // Configurar HttpClient con timeouts más largos
-                var httpClient = new HttpClient()
+                // Los updates llegan a TelegramWebhookEndpoints; acá solo se le avisa a Telegram adónde mandarlos
+                await _bot.SetWebhook(
+                    url: _options.WebhookUrl,
+                    allowedUpdates: Array.Empty<UpdateType>(),
+                    secretToken: string.IsNullOrWhiteSpace(_options.WebhookSecret) ? null : _options.WebhookSecret,
+                    maxConnections: Math.Clamp(_updates.Workers * 5, 1, 100),
+                    cancellationToken: stoppingToken);
+                _logger.LogInformation("Webhook registrado en {Url} ({Workers} workers)", _options.WebhookUrl, _updates.Workers);
+                return;
+            }
+            catch (Exception ex) when (!stoppingToken.IsCancellationRequested)
+            {
+                _logger.LogError(ex, "Error registrando el webhook. Reintentando en 10 segundos...");
+                try
+                {
+                    await Task.Delay(TimeSpan.FromSeconds(10), stoppingToken);
+                }
+                catch (OperationCanceledException)
                 {
-                    Timeout = TimeSpan.FromMinutes(5) // 5 minutos en lugar de 30 segundos
-                };
+                    return;
+                }
+            }
+        }
+    }
 
-                var botClient = new TelegramBotClient(_bot.Token, httpClient);
-                MessageSender.Bot = botClient; // Actualizar la referencia estática
+    private async Task RunPollingAsync(CancellationToken stoppingToken)
+    {
+        while (!stoppingToken.IsCancellationRequested)
+        {
+            try
+            {
+                // Un webhook registrado antes haría fallar getUpdates con 409
+                await _bot.DeleteWebhook(cancellationToken: stoppingToken);
 
                 _logger.LogInformation("Iniciando polling...");
 
-                // Usar polling con manejo robusto de errores
-                await botClient.ReceiveAsync(
-                    updateHandler: HandleUpdate,
+                // El handler solo encola: getUpdates sigue mientras los workers procesan
+                await _bot.ReceiveAsync(
+                    updateHandler: (_, update, ct) => _updates.EnqueueAsync(update, ct),
                     errorHandler: HandlePollingErrorAsync,
                     receiverOptions: _receiverOptions,
                     cancellationToken: stoppingToken
@@ -80,12 +141,12 @@ public class TelegramBotService : BackgroundService
                 }
             }
         }
-
-        _logger.LogInformation("Servicio de bot detenido");
     }
 
     private async Task HandleUpdate(ITelegramBotClient botClient, Update update, CancellationToken cancellationToken)
     {
+        using var timer = BotMetrics.Time(BotMetrics.UpdateReceive);
+        _capture?.RecordUpdate(update);
         try
         {
             if (update.Message is { } message)
@@ -93,24 +154,27 @@ public class TelegramBotService : BackgroundService
                 // Handle text messages
                 if (!string.IsNullOrWhiteSpace(message.Text))
                 {
+                    BotMetrics.Increment("update_message");
                     _logger.LogInformation("Mensaje recibido de {Username}: {Text}",
                         message.From?.Username ?? "Usuario desconocido",
                         message.Text);
 
-                    await HandleMessageAsync(botClient, message, cancellationToken);
+                    await RunInChatOrderAsync(message.Chat.Id, () => HandleMessageAsync(botClient, message, cancellationToken));
                 }
                 // Handle contact messages (phone sharing)
                 else if (message.Contact != null)
                 {
+                    BotMetrics.Increment("update_contact");
                     _logger.LogInformation("Contacto compartido de {Username}: {Phone}",
                         message.From?.Username ?? "Usuario desconocido",
                         message.Contact.PhoneNumber);
 
-                    await HandleMessageAsync(botClient, message, cancellationToken);
+                    await RunInChatOrderAsync(message.Chat.Id, () => HandleMessageAsync(botClient, message, cancellationToken));
                 }
                 // Handle voice messages
                 else if (message.Voice != null)
                 {
+                    BotMetrics.Increment("update_voice");
                     _logger.LogInformation("Mensaje de voz recibido de {Username}: {Duration}s",
                         message.From?.Username ?? "Usuario desconocido",
                         message.Voice.Duration);
@@ -120,6 +184,7 @@ public class TelegramBotService : BackgroundService
                 // Handle audio messages
                 else if (message.Audio != null)
                 {
+                    BotMetrics.Increment("update_audio");
                     _logger.LogInformation("Archivo de audio recibido de {Username}: {Duration}s",
                         message.From?.Username ?? "Usuario desconocido",
                         message.Audio.Duration);
@@ -129,13 +194,19 @@ public class TelegramBotService : BackgroundService
             }
             else if (update.CallbackQuery is { } callbackQuery)
             {
+                BotMetrics.Increment("update_callback");
                 // Handle callback query from inline keyboards
                 _logger.LogInformation("Callback query recibido de {Username}: {Data}",
                     callbackQuery.From?.Username ?? "Usuario desconocido",
                     callbackQuery.Data);
 
-                await HandleCallbackQueryAsync(botClient, callbackQuery, cancellationToken);
+                if (callbackQuery.Message != null)
+                    await RunInChatOrderAsync(callbackQuery.Message.Chat.Id, () => HandleCallbackQueryAsync(botClient, callbackQuery, cancellationToken));
+                else
+                    await HandleCallbackQueryAsync(botClient, callbackQuery, cancellationToken);
             }
+
+            timer.Success();
         }
         catch (Exception ex)
         {
@@ -183,32 +254,58 @@ public class TelegramBotService : BackgroundService
 
     private async Task HandleVoiceMessageAsync(ITelegramBotClient botClient, Message message, CancellationToken cancellationToken)
     {
-        using var scope = _serviceProvider.CreateScope();
-        var audioService = scope.ServiceProvider.GetRequiredService<AudioTranscriptionService>();
-        
-        var chatId = message.Chat.Id;
-        
+        var voice = message.Voice!;
+
         // Notify user that we're processing the voice message
-        await MessageSender.SendWithRetry(chatId, 
-            "🎤 Procesando mensaje de voz...", 
+        await MessageSender.SendWithRetry(message.Chat.Id,
+            "🎤 Procesando mensaje de voz...",
             cancellationToken: cancellationToken);
 
+        // La transcripción arranca ya en el pool; el update no espera a Whisper
+        var transcription = _transcriptionPool.TranscribeAsync(voice.FileUniqueId,
+            (audioService, ct) => audioService.TranscribeVoiceAsync(botClient, voice, ct),
+            cancellationToken);
+
+        EnqueueInChat(message.Chat.Id, () => HandleTranscriptionAsync(botClient, message, transcription, "🎤", "el mensaje de voz", cancellationToken));
+    }
+
+    private async Task HandleAudioMessageAsync(ITelegramBotClient botClient, Message message, CancellationToken cancellationToken)
+    {
+        var audio = message.Audio!;
+
+        // Notify user that we're processing the audio file
+        await MessageSender.SendWithRetry(message.Chat.Id,
+            "🎵 Procesando archivo de audio...",
+            cancellationToken: cancellationToken);
+
+        var transcription = _transcriptionPool.TranscribeAsync(audio.FileUniqueId,
+            (audioService, ct) => audioService.TranscribeAudioAsync(botClient, audio, ct),
+            cancellationToken);
+
+        EnqueueInChat(message.Chat.Id, () => HandleTranscriptionAsync(botClient, message, transcription, "🎵", "el archivo de audio", cancellationToken));
+    }
+
+    private async Task HandleTranscriptionAsync(ITelegramBotClient botClient, Message message, Task<string?> transcription, string icon, string description, CancellationToken cancellationToken)
+    {
+        var chatId = message.Chat.Id;
+
         try
         {
-            // Transcribe the voice message
-            var transcribedText = await audioService.TranscribeVoiceAsync(botClient, message.Voice!, cancellationToken);
-            
+            var transcribedText = await transcription;
+
             if (string.IsNullOrWhiteSpace(transcribedText))
             {
                 await MessageSender.SendWithRetry(chatId,
-                    "❌ No pude entender el mensaje de voz. Por favor, intenta nuevamente o escribe el mensaje.",
+                    $"❌ No pude entender {description}. Por favor, intenta nuevamente o escribe el mensaje.",
                     cancellationToken: cancellationToken);
                 return;
             }
 
+            _capture?.RecordTranscript(chatId, message.MessageId, transcribedText);
+
             // Show what was transcribed
             await MessageSender.SendWithRetry(chatId,
-                $"🎤➡️📝 Entendí: \"{transcribedText}\"",
+                $"{icon}➡️📝 Entendí: \"{transcribedText}\"",
                 cancellationToken: cancellationToken);
 
             // Process the transcribed text through normal flow
@@ -216,52 +313,58 @@ public class TelegramBotService : BackgroundService
         }
         catch (Exception ex)
         {
-            _logger.LogError(ex, "Error processing voice message");
+            _logger.LogError(ex, "Error processing {Description}", description);
             await MessageSender.SendWithRetry(chatId,
-                "❌ Hubo un error procesando el mensaje de voz. Por favor, intenta nuevamente.",
+                $"❌ Hubo un error procesando {description}. Por favor, intenta nuevamente.",
                 cancellationToken: cancellationToken);
         }
     }
 
-    private async Task HandleAudioMessageAsync(ITelegramBotClient botClient, Message message, CancellationToken cancellationToken)
+    /// <summary>
+    /// Si el chat tiene audios pendientes, el update se encola detrás de ellos para no adelantarse;
+    /// si no, se procesa en línea como siempre.
+    /// </summary>
+    private Task RunInChatOrderAsync(long chatId, Func<Task> work)
     {
-        using var scope = _serviceProvider.CreateScope();
-        var audioService = scope.ServiceProvider.GetRequiredService<AudioTranscriptionService>();
-        
-        var chatId = message.Chat.Id;
-        
-        // Notify user that we're processing the audio file
-        await MessageSender.SendWithRetry(chatId, 
-            "🎵 Procesando archivo de audio...", 
-            cancellationToken: cancellationToken);
-
-        try
+        lock (_chainLock)
         {
-            // Transcribe the audio file
-            var transcribedText = await audioService.TranscribeAudioAsync(botClient, message.Audio!, cancellationToken);
-            
-            if (string.IsNullOrWhiteSpace(transcribedText))
+            if (_chatChains.ContainsKey(chatId))
             {
-                await MessageSender.SendWithRetry(chatId,
-                    "❌ No pude entender el archivo de audio. Por favor, intenta nuevamente o escribe el mensaje.",
-                    cancellationToken: cancellationToken);
-                return;
+                EnqueueInChat(chatId, work);
+                return Task.CompletedTask;
             }
+        }
 
-            // Show what was transcribed
-            await MessageSender.SendWithRetry(chatId,
-                $"🎵➡️📝 Entendí: \"{transcribedText}\"",
-                cancellationToken: cancellationToken);
+        return work();
+    }
 
-            // Process the transcribed text through normal flow
-            await ProcessTranscribedText(botClient, message, transcribedText, cancellationToken);
-        }
-        catch (Exception ex)
+    private void EnqueueInChat(long chatId, Func<Task> work)
+    {
+        lock (_chainLock)
         {
-            _logger.LogError(ex, "Error processing audio message");
-            await MessageSender.SendWithRetry(chatId,
-                "❌ Hubo un error procesando el archivo de audio. Por favor, intenta nuevamente.",
-                cancellationToken: cancellationToken);
+            var previous = _chatChains.TryGetValue(chatId, out var tail) ? tail : Task.CompletedTask;
+            Task next = null!;
+            next = previous.ContinueWith(async _ =>
+            {
+                try
+                {
+                    await work();
+                }
+                catch (Exception ex)
+                {
+                    _logger.LogError(ex, "Error al procesar update encolado del chat {ChatId}", chatId);
+                }
+                finally
+                {
+                    // El lock garantiza que next ya está asignado cuando corre este bloque
+                    lock (_chainLock)
+                    {
+                        if (_chatChains.TryGetValue(chatId, out var current) && current == next)
+                            _chatChains.Remove(chatId);
+                    }
+                }
+            }, CancellationToken.None, TaskContinuationOptions.None, TaskScheduler.Default).Unwrap();
+            _chatChains[chatId] = next;
         }
     }
 
@@ -308,7 +411,7 @@ public class TelegramBotService : BackgroundService
                 if (callbackQuery.Data == "context_continue")
                 {
                     await botClient.AnswerCallbackQuery(callbackQuery.Id, "✅ Continuando con la tarea actual", cancellationToken: cancellationToken);
-                    await botClient.EditMessageText(
+                    await MessageSender.EditWithRetry(
                         chatId: chatId,
                         messageId: messageId,
                         text: "✅ Perfecto, continuamos con lo que estábamos haciendo. ¿Qué necesitás?",
@@ -319,7 +422,7 @@ public class TelegramBotService : BackgroundService
                 if (callbackQuery.Data == "context_new_surgery")
                 {
                     await botClient.AnswerCallbackQuery(callbackQuery.Id, "🆕 Iniciando nueva cirugía", cancellationToken: cancellationToken);
-                    await botClient.EditMessageText(
+                    await MessageSender.EditWithRetry(
                         chatId: chatId,
                         messageId: messageId,
                         text: "🆕 ¡Perfecto! Empezamos con una nueva cirugía. Contame los datos:",
@@ -0,0 +1,218 @@
+using System;
+using System.IO;
+using System.IO.Compression;
+using System.Security.Cryptography;
+using System.Text;
+using System.Text.Encodings.Web;
+using System.Text.Json;
+using System.Text.Json.Serialization;
+using System.Text.RegularExpressions;
+using System.Threading;
+using System.Threading.Channels;
+using System.Threading.Tasks;
+using Microsoft.Extensions.Hosting;
+using Microsoft.Extensions.Logging;
+using RegistroCx.Services.Analytics;
+using Telegram.Bot.Types;
+
+namespace RegistroCx.ProgramServices.Services.Telegram;
+
+/// <summary>
+/// Captura del tráfico real (TRAFFIC_CAPTURE=true) para reproducirlo después con traffic_replay.py.
+/// Cada update entrante, cada transcripción de audio y cada envío saliente se anota como una línea JSON
+/// con timestamp en un .jsonl.gz. Se anonimiza antes de encolar: el chat pasa a un HMAC con sal,
+/// no se guardan nombres, usuarios ni teléfonos de contacto, y del texto se tapan emails y números largos.
+/// El mensaje nunca espera al disco: si la cola se llena la línea se descarta (traffic_capture_dropped).
+/// </summary>
+public class TrafficCapture : BackgroundService
+{
+    private const int QueueCapacity = 10_000;
+
+    private static readonly JsonSerializerOptions JsonOptions = new()
+    {
+        DefaultIgnoreCondition = JsonIgnoreCondition.WhenWritingNull,
+        Encoder = JavaScriptEncoder.UnsafeRelaxedJsonEscaping
+    };
+
+    private static readonly Regex EmailRegex = new(@"[\w.+-]+@[\w-]+(\.[\w-]+)+", RegexOptions.Compiled);
+    // Corridas de dígitos con espacios/guiones: se tapan si suman 8 dígitos o más (teléfonos, documentos),
+    // así "15/08/2025 16:30" queda intacto
+    private static readonly Regex DigitRunRegex = new(@"\+?\d[\d \-]{6,}\d", RegexOptions.Compiled);
+    // "15-08-2025" también es una corrida de 8 dígitos: las fechas con guiones se separan antes de tapar
+    private static readonly Regex DashedDateRegex = new(@"\b\d{1,2}-\d{1,2}-(?:\d{4}|\d{2})\b", RegexOptions.Compiled);
+
+    private readonly ILogger<TrafficCapture> _logger;
+    private readonly string _path;
+    private readonly byte[] _salt;
+    private readonly Channel<string> _lines = Channel.CreateBounded<string>(new BoundedChannelOptions(QueueCapacity)
+    {
+        SingleReader = true,
+        // Con Wait, TryWrite devuelve false si la cola está llena: se descarta y se cuenta sin bloquear
+        FullMode = BoundedChannelFullMode.Wait
+    });
+    private int _queued;
+
+    public TrafficCapture(ILogger<TrafficCapture> logger, string path, string? salt)
+    {
+        _logger = logger;
+        _path = path;
+        // Sin sal configurada se usa una al azar: los chats quedan anónimos pero no se pueden cruzar entre capturas
+        _salt = string.IsNullOrEmpty(salt) ? RandomNumberGenerator.GetBytes(32) : Encoding.UTF8.GetBytes(salt);
+
+        BotMetrics.RegisterGauge("traffic_capture_queued", () => Volatile.Read(ref _queued));
+
+        MessageSender.Capture = this;
+    }
+
+    /// <summary>
+    /// Update tal como llega a TelegramBotService.HandleUpdate.
+    /// </summary>
+    public void RecordUpdate(Update update)
+    {
+        if (update.Message is { } message)
+        {
+            var type = !string.IsNullOrWhiteSpace(message.Text) ? "message"
+                : message.Contact != null ? "contact"
+                : message.Voice != null ? "voice"
+                : message.Audio != null ? "audio"
+                : null;
+            if (type == null)
+                return;
+
+            Write(new CaptureRecord("in", type, Anonymize(message.Chat.Id))
+            {
+                UpdateId = update.Id,
+                MessageId = message.MessageId,
+                Text = type == "message" ? Scrub(message.Text) : null,
+                Duration = message.Voice?.Duration ?? message.Audio?.Duration,
+                Forwarded = message.ForwardOrigin != null ? true : null
+            });
+        }
+        else if (update.CallbackQuery is { Message: { } callbackMessage } callbackQuery)
+        {
+            Write(new CaptureRecord("in", "callback", Anonymize(callbackMessage.Chat.Id))
+            {
+                UpdateId = update.Id,
+                MessageId = callbackMessage.MessageId,
+                Data = callbackQuery.Data
+            });
+        }
+    }
+
+    /// <summary>
+    /// Texto que salió de Whisper para un audio: el replay lo usa para regenerar el clip.
+    /// </summary>
+    public void RecordTranscript(long chatId, int messageId, string text) =>
+        Write(new CaptureRecord("transcript", null, Anonymize(chatId)) { MessageId = messageId, Text = Scrub(text) });
+
+    public void RecordReply(long chatId, string method, string? text, bool keyboard) =>
+        Write(new CaptureRecord("out", method, Anonymize(chatId)) { Text = Scrub(text), Keyboard = keyboard ? true : null });
+
+    public override Task StopAsync(CancellationToken cancellationToken)
+    {
+        // Lo que ya está en la cola se escribe antes de cerrar el gzip
+        _lines.Writer.TryComplete();
+        return base.StopAsync(cancellationToken);
+    }
+
+    protected override async Task ExecuteAsync(CancellationToken stoppingToken)
+    {
+        var directory = Path.GetDirectoryName(_path);
+        if (!string.IsNullOrEmpty(directory))
+            Directory.CreateDirectory(directory);
+
+        Console.WriteLine($"[TRAFFIC-CAPTURE] Grabando tráfico anonimizado en {_path}");
+        long written = 0;
+
+        try
+        {
+            await using var file = new FileStream(_path, FileMode.Create, FileAccess.Write, FileShare.Read);
+            await using var gzip = new GZipStream(file, CompressionLevel.Fastest);
+            await using var writer = new StreamWriter(gzip, new UTF8Encoding(false));
+
+            while (await _lines.Reader.WaitToReadAsync(CancellationToken.None))
+            {
+                while (_lines.Reader.TryRead(out var line))
+                {
+                    Interlocked.Decrement(ref _queued);
+                    await writer.WriteLineAsync(line);
+                    written++;
+                }
+
+                // Flush por tanda: el archivo se puede leer (hasta acá) mientras se sigue grabando
+                await writer.FlushAsync(CancellationToken.None);
+            }
+        }
+        catch (Exception ex)
+        {
+            _logger.LogError(ex, "Error escribiendo la captura de tráfico en {Path}", _path);
+        }
+
+        Console.WriteLine($"[TRAFFIC-CAPTURE] Captura cerrada: {written} línea(s) en {_path}");
+    }
+
+    private void Write(CaptureRecord record)
+    {
+        record.T = Math.Round(DateTimeOffset.UtcNow.ToUnixTimeMilliseconds() / 1000.0, 3);
+        var line = JsonSerializer.Serialize(record, JsonOptions);
+
+        if (_lines.Writer.TryWrite(line))
+        {
+            Interlocked.Increment(ref _queued);
+            BotMetrics.Increment("traffic_capture_lines");
+        }
+        else
+        {
+            BotMetrics.Increment("traffic_capture_dropped");
+        }
+    }
+
+    private string Anonymize(long chatId)
+    {
+        using var hmac = new HMACSHA256(_salt);
+        var hash = hmac.ComputeHash(Encoding.UTF8.GetBytes(chatId.ToString()));
+        return Convert.ToHexString(hash, 0, 8).ToLowerInvariant();
+    }
+
+    private static string? Scrub(string? text)
+    {
+        if (string.IsNullOrEmpty(text))
+            return text;
+
+        text = EmailRegex.Replace(text, "<email>");
+
+        var scrubbed = new StringBuilder(text.Length);
+        var last = 0;
+        foreach (Match date in DashedDateRegex.Matches(text))
+        {
+            scrubbed.Append(MaskDigitRuns(text[last..date.Index])).Append(date.Value);
+            last = date.Index + date.Length;
+        }
+        return scrubbed.Append(MaskDigitRuns(text[last..])).ToString();
+    }
+
+    private static string MaskDigitRuns(string text) =>
+        DigitRunRegex.Replace(text, m =>
+        {
+            var digits = 0;
+            foreach (var c in m.Value)
+                if (char.IsDigit(c))
+                    digits++;
+            return digits >= 8 ? "<numero>" : m.Value;
+        });
+
+    private sealed record CaptureRecord(
+        [property: JsonPropertyName("dir")] string Dir,
+        [property: JsonPropertyName("type")] string? Type,
+        [property: JsonPropertyName("chat")] string Chat)
+    {
+        [JsonPropertyName("t")] public double T { get; set; }
+        [JsonPropertyName("update_id")] public int? UpdateId { get; init; }
+        [JsonPropertyName("message_id")] public int? MessageId { get; init; }
+        [JsonPropertyName("text")] public string? Text { get; init; }
+        [JsonPropertyName("duration")] public int? Duration { get; init; }
+        [JsonPropertyName("forwarded")] public bool? Forwarded { get; init; }
+        [JsonPropertyName("data")] public string? Data { get; init; }
+        [JsonPropertyName("keyboard")] public bool? Keyboard { get; init; }
+    }
+}
@@ -0,0 +1,160 @@
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Threading;
+using System.Threading.Channels;
+using System.Threading.Tasks;
+using Microsoft.Extensions.Logging;
+using RegistroCx.Services.Analytics;
+using Telegram.Bot.Types;
+
+namespace RegistroCx.ProgramServices.Services.Telegram;
+
+/// <summary>
+/// Reparte los updates entrantes (polling o webhook) en colas por chat.
+/// Cada chat se procesa en orden y de a uno; chats distintos corren en paralelo
+/// hasta TELEGRAM_UPDATE_WORKERS. Un LLM lento solo demora a su propio chat.
+/// </summary>
+public class UpdateDispatcher
+{
+    private readonly ILogger<UpdateDispatcher> _logger;
+    private readonly object _lock = new();
+    private readonly Dictionary<long, Queue<QueuedUpdate>> _chats = new();
+    // Chats con updates pendientes y sin worker asignado; cada chat aparece a lo sumo una vez
+    private readonly Channel<long> _ready = Channel.CreateUnbounded<long>();
+    private readonly SemaphoreSlim _capacity;
+    private readonly int _workers;
+    private int _queued;
+    private int _busy;
+
+    public UpdateDispatcher(ILogger<UpdateDispatcher> logger, int workers, int capacity)
+    {
+        _logger = logger;
+        _workers = Math.Max(1, workers);
+        _capacity = new SemaphoreSlim(Math.Max(1, capacity));
+
+        BotMetrics.RegisterGauge("update_queue_depth", () => Volatile.Read(ref _queued));
+        BotMetrics.RegisterGauge("update_workers_busy", () => Volatile.Read(ref _busy));
+        BotMetrics.RegisterGauge("update_workers", () => _workers);
+        BotMetrics.RegisterGauge("update_chats_active", () => { lock (_lock) return _chats.Count; });
+    }
+
+    public int Workers => _workers;
+
+    /// <summary>
+    /// Webhook: no espera. Con la cola llena devuelve false y Telegram reintenta la entrega más tarde.
+    /// </summary>
+    public bool TryEnqueue(Update update)
+    {
+        if (!_capacity.Wait(0))
+        {
+            BotMetrics.Increment("update_rejected");
+            return false;
+        }
+
+        Add(update);
+        return true;
+    }
+
+    /// <summary>
+    /// Polling: espera lugar en la cola, así getUpdates no confirma más de lo que se puede procesar.
+    /// </summary>
+    public async Task EnqueueAsync(Update update, CancellationToken ct)
+    {
+        await _capacity.WaitAsync(ct);
+        Add(update);
+    }
+
+    public Task RunAsync(Func<Update, CancellationToken, Task> handler, CancellationToken stoppingToken)
+    {
+        _logger.LogInformation("[UPDATES] Starting {Workers} update workers", _workers);
+        return Task.WhenAll(Enumerable.Range(0, _workers).Select(_ => RunWorkerAsync(handler, stoppingToken)));
+    }
+
+    private void Add(Update update)
+    {
+        var chatId = GetChatId(update);
+        lock (_lock)
+        {
+            _queued++;
+            if (_chats.TryGetValue(chatId, out var pending))
+            {
+                // El chat ya tiene worker o ya está en _ready: lo toma al terminar el update actual
+                pending.Enqueue(new QueuedUpdate(update));
+                return;
+            }
+
+            _chats[chatId] = new Queue<QueuedUpdate>(new[] { new QueuedUpdate(update) });
+        }
+
+        _ready.Writer.TryWrite(chatId);
+    }
+
+    private async Task RunWorkerAsync(Func<Update, CancellationToken, Task> handler, CancellationToken stoppingToken)
+    {
+        try
+        {
+            await foreach (var chatId in _ready.Reader.ReadAllAsync(stoppingToken))
+            {
+                QueuedUpdate next;
+                lock (_lock)
+                {
+                    next = _chats[chatId].Peek();
+                }
+
+                Interlocked.Increment(ref _busy);
+                BotMetrics.Observe(BotMetrics.UpdateQueueWait, DateTime.UtcNow - next.EnqueuedAt);
+                try
+                {
+                    await handler(next.Update, stoppingToken);
+                }
+                catch (Exception ex) when (!stoppingToken.IsCancellationRequested)
+                {
+                    _logger.LogError(ex, "[UPDATES] Error processing update {UpdateId} for chat {ChatId}", next.Update.Id, chatId);
+                }
+                finally
+                {
+                    Interlocked.Decrement(ref _busy);
+                    _capacity.Release();
+                }
+
+                bool more;
+                lock (_lock)
+                {
+                    var pending = _chats[chatId];
+                    pending.Dequeue();
+                    _queued--;
+                    more = pending.Count > 0;
+                    if (!more)
+                        _chats.Remove(chatId);
+                }
+
+                // Un update por turno: el chat vuelve al final de la fila y no acapara al worker
+                if (more)
+                    _ready.Writer.TryWrite(chatId);
+            }
+        }
+        catch (OperationCanceledException) when (stoppingToken.IsCancellationRequested)
+        {
+            // Apagado del host: lo pendiente se pierde; con webhook Telegram lo vuelve a entregar
+        }
+    }
+
+    private static long GetChatId(Update update) =>
+        update.Message?.Chat.Id
+        ?? update.EditedMessage?.Chat.Id
+        ?? update.CallbackQuery?.Message?.Chat.Id
+        ?? update.CallbackQuery?.From.Id
+        ?? 0;
+
+    private sealed class QueuedUpdate
+    {
+        public QueuedUpdate(Update update)
+        {
+            Update = update;
+        }
+
+        public Update Update { get; }
+        public DateTime EnqueuedAt { get; } = DateTime.UtcNow;
+    }
+}
@@ -0,0 +1,194 @@
+using System;
+using System.Collections.Concurrent;
+using System.Diagnostics;
+using System.Globalization;
+using System.Linq;
+using System.Text;
+using System.Threading;
+
+namespace RegistroCx.Services.Analytics
+{
+    /// <summary>
+    /// Contadores e histogramas de tiempo por etapa del hot path, expuestos en /metrics
+    /// en formato de texto Prometheus. Estático como MessageSender: se usa desde servicios
+    /// scoped y singleton sin pasar por DI.
+    /// </summary>
+    public static class BotMetrics
+    {
+        // Etapas del procesamiento de un mensaje
+        public const string UpdateReceive = "update_receive";
+        public const string UpdateQueueWait = "update_queue_wait";       // Espera en UpdateDispatcher hasta que el chat tiene worker
+        public const string IntentClassification = "intent_classification";
+        public const string ContextClassification = "context_classification";  // Relevancia en contexto activo sin LLM (LocalRelevanceClassifier)
+        public const string ContextRelevanceLlm = "context_relevance_llm";       // Relevancia y detección de nueva cirugía con el LLM
+        public const string LlmExtraction = "llm_extraction";
+        public const string FastPathExtraction = "fast_path_extraction";  // Extracción local que evita el LLM (LocalFastPathExtractor)
+        public const string NameLookup = "name_lookup";                   // Búsqueda en el índice de nombres (NameLookupService)
+        public const string DbWrite = "db_write";
+        public const string CalendarSync = "calendar_sync";
+        public const string MultiSurgeryFanOut = "multi_surgery_fanout";  // Cirugías de un mismo mensaje procesadas en paralelo
+        public const string ReplySend = "reply_send";
+        public const string OutboundQueueWait = "outbound_queue_wait";   // Espera en OutboundDispatcher antes de salir a Telegram
+
+        // Reportes PDF (ReportRenderQueue)
+        public const string ReportQueueWait = "report_queue_wait";
+        public const string ReportRender = "report_render";
+
+        // Voz/audio (TranscriptionPool)
+        public const string VoiceTranscription = "voice_transcription";
+
+        // Recordatorios (AppointmentReminderService)
+        public const string ReminderDelay = "reminder_delay";   // Envío real menos hora en que vencía
+        public const string ReminderDb = "reminder_db";         // Consultas del índice de recordatorios
+
+        // Aprendizaje del usuario (LearningWriteBuffer)
+        public const string LearningFlush = "learning_flush";   // Escritura de un lote de términos y patrones
+
+        // Límites superiores de los buckets en segundos (como los default de los clientes Prometheus, extendidos para el LLM)
+        private static readonly double[] BucketBounds = { 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60 };
+
+        private static readonly ConcurrentDictionary<string, StageHistogram> _stages = new();
+        private static readonly ConcurrentDictionary<string, long> _events = new();
+        private static readonly ConcurrentDictionary<string, Func<double>> _gauges = new();
+
+        public static void Observe(string stage, TimeSpan duration, bool success = true)
+        {
+            var histogram = _stages.GetOrAdd(stage, _ => new StageHistogram(BucketBounds.Length));
+            histogram.Observe(duration.TotalSeconds, success);
+        }
+
+        /// <summary>
+        /// Mide desde ahora hasta el Dispose: <c>using var _ = BotMetrics.Time(BotMetrics.DbWrite);</c>
+        /// </summary>
+        public static StageTimer Time(string stage) => new(stage);
+
+        public static void Increment(string eventName, long value = 1)
+        {
+            _events.AddOrUpdate(eventName, value, (_, current) => current + value);
+        }
+
+        /// <summary>
+        /// Valor instantáneo (profundidad de cola, bytes en cache) que se lee recién al renderizar /metrics.
+        /// </summary>
+        public static void RegisterGauge(string name, Func<double> read)
+        {
+            _gauges[name] = read;
+        }
+
+        public static string RenderPrometheus()
+        {
+            var sb = new StringBuilder();
+
+            sb.AppendLine("# HELP registrocx_stage_duration_seconds Duración por etapa del procesamiento.");
+            sb.AppendLine("# TYPE registrocx_stage_duration_seconds histogram");
+            foreach (var (stage, histogram) in _stages.OrderBy(s => s.Key))
+            {
+                var snapshot = histogram.Snapshot();
+                long cumulative = 0;
+                for (int i = 0; i < BucketBounds.Length; i++)
+                {
+                    cumulative += snapshot.Buckets[i];
+                    sb.AppendLine($"registrocx_stage_duration_seconds_bucket{{stage=\"{stage}\",le=\"{Format(BucketBounds[i])}\"}} {cumulative}");
+                }
+                sb.AppendLine($"registrocx_stage_duration_seconds_bucket{{stage=\"{stage}\",le=\"+Inf\"}} {snapshot.Count}");
+                sb.AppendLine($"registrocx_stage_duration_seconds_sum{{stage=\"{stage}\"}} {Format(snapshot.Sum)}");
+                sb.AppendLine($"registrocx_stage_duration_seconds_count{{stage=\"{stage}\"}} {snapshot.Count}");
+            }
+
+            sb.AppendLine("# HELP registrocx_stage_errors_total Ejecuciones de la etapa que terminaron con error.");
+            sb.AppendLine("# TYPE registrocx_stage_errors_total counter");
+            foreach (var (stage, histogram) in _stages.OrderBy(s => s.Key))
+            {
+                sb.AppendLine($"registrocx_stage_errors_total{{stage=\"{stage}\"}} {histogram.Snapshot().Errors}");
+            }
+
+            sb.AppendLine("# HELP registrocx_events_total Eventos contados (updates por tipo, reintentos, etc.).");
+            sb.AppendLine("# TYPE registrocx_events_total counter");
+            foreach (var (eventName, value) in _events.OrderBy(e => e.Key))
+            {
+                sb.AppendLine($"registrocx_events_total{{event=\"{eventName}\"}} {value}");
+            }
+
+            sb.AppendLine("# HELP registrocx_gauge Valores instantáneos (colas, caches).");
+            sb.AppendLine("# TYPE registrocx_gauge gauge");
+            foreach (var (gauge, read) in _gauges.OrderBy(g => g.Key))
+            {
+                sb.AppendLine($"registrocx_gauge{{gauge=\"{gauge}\"}} {Format(read())}");
+            }
+
+            return sb.ToString();
+        }
+
+        private static string Format(double value) => value.ToString("0.######", CultureInfo.InvariantCulture);
+
+        private static int BucketIndex(double seconds)
+        {
+            for (int i = 0; i < BucketBounds.Length; i++)
+            {
+                if (seconds <= BucketBounds[i])
+                    return i;
+            }
+            return BucketBounds.Length; // Solo cuenta en +Inf
+        }
+
+        private class StageHistogram
+        {
+            private readonly long[] _buckets;
+            private readonly object _lock = new();
+            private long _count;
+            private long _errors;
+            private double _sum;
+
+            public StageHistogram(int bucketCount)
+            {
+                _buckets = new long[bucketCount + 1];
+            }
+
+            public void Observe(double seconds, bool success)
+            {
+                lock (_lock)
+                {
+                    _buckets[BucketIndex(seconds)]++;
+                    _count++;
+                    _sum += seconds;
+                    if (!success) _errors++;
+                }
+            }
+
+            public (long[] Buckets, long Count, long Errors, double Sum) Snapshot()
+            {
+                lock (_lock)
+                {
+                    return ((long[])_buckets.Clone(), _count, _errors, _sum);
+                }
+            }
+        }
+
+        public sealed class StageTimer : IDisposable
+        {
+            private readonly string _stage;
+            private readonly long _started = Stopwatch.GetTimestamp();
+            private bool _disposed;
+
+            public StageTimer(string stage)
+            {
+                _stage = stage;
+            }
+
+            /// <summary>
+            /// Si no se llama antes del Dispose, la ejecución cuenta como error
+            /// (una excepción sale del using sin pasar por acá).
+            /// </summary>
+            public bool Succeeded { get; private set; }
+
+            public void Success() => Succeeded = true;
+
+            public void Dispose()
+            {
+                if (_disposed) return;
+                _disposed = true;
+                Observe(_stage, Stopwatch.GetElapsedTime(_started), Succeeded);
+            }
+        }
+    }
+}
@@ -1,7 +1,9 @@
 using System;
 using System.Collections.Generic;
+using System.Linq;
 using System.Text.Json;
 using System.Threading.Tasks;
+using RegistroCx.Domain;
 using RegistroCx.Services.Extraction;
 
 namespace RegistroCx.Services;
@@ -9,20 +11,35 @@ namespace RegistroCx.Services;
 public class AnesthesiologistSearchService : IAnesthesiologistSearchService
 {
     private readonly LLMOpenAIAssistant _llm;
+    private readonly NameLookupService? _nameLookup;
     private readonly JsonSerializerOptions _jsonOptions = new JsonSerializerOptions
     {
         PropertyNamingPolicy = JsonNamingPolicy.CamelCase
     };
 
-    public AnesthesiologistSearchService(LLMOpenAIAssistant llm)
+    public AnesthesiologistSearchService(LLMOpenAIAssistant llm, NameLookupService? nameLookup = null)
     {
         _llm = llm ?? throw new ArgumentNullException(nameof(llm));
+        _nameLookup = nameLookup;
     }
 
-    public async Task<List<AnesthesiologistCandidate>> SearchByPartialNameAsync(string partialName, string teamEmail)
+    public async Task<List<AnesthesiologistCandidate>> SearchByPartialNameAsync(string partialName, string teamEmail, long chatId = 0)
     {
         try
         {
+            // Con el índice de nombres no hace falta el LLM: el LLM tampoco conoce el plantel del equipo
+            if (_nameLookup != null && chatId != 0)
+            {
+                var matches = await _nameLookup.SearchAsync(TermTypes.Anesthesiologist, partialName, chatId);
+                Console.WriteLine($"[ANESTHESIOLOGIST_SEARCH] Found {matches.Count} candidates in name index");
+                return matches.Select(m => new AnesthesiologistCandidate
+                {
+                    Nombre = m.Name,
+                    Email = m.Email ?? "",
+                    Coincidencia = m.Exact ? "exacta" : "parcial"
+                }).ToList();
+            }
+
             // Usar el método centralizado del LLMOpenAIAssistant
             var assistantText = await _llm.SearchAnesthesiologistAsync(partialName, teamEmail);
             
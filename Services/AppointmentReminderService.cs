@@ -1,99 +1,263 @@
 using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.Linq;
 using System.Threading;
 using System.Threading.Tasks;
 using Microsoft.Extensions.Hosting;
 using Microsoft.Extensions.DependencyInjection;
 using Microsoft.Extensions.Logging;
-using Telegram.Bot;
+using RegistroCx.Services.Analytics;
 using RegistroCx.Services.Repositories;
 using RegistroCx.ProgramServices.Services.Telegram;
 
 namespace RegistroCx.Services;
 
-public class AppointmentReminderService : BackgroundService
+/// <summary>
+/// Recordatorios de cirugía por hora de vencimiento (fecha_hora - REMINDER_LEAD_HOURS).
+/// En lugar de escanear la tabla cada 30 minutos, mantiene en memoria una cola de prioridad
+/// con los appointments que vencen dentro de la ventana cargada; la ventana avanza de a
+/// tramos (REMINDER_LOAD_HORIZON_MINUTES) y AppointmentRepository avisa altas, cambios y bajas.
+/// Al vencer se envían en paralelo por el OutboundDispatcher con prioridad de fondo.
+/// </summary>
+public class AppointmentReminderService : BackgroundService, IAppointmentReminderSchedule
 {
+    private const int MaxBatch = 500;
+    private static readonly TimeSpan RetryDelay = TimeSpan.FromMinutes(1);
+    // Cada tanto se recarga la ventana completa: cambios hechos por fuera del bot (SQL, otra instancia)
+    private static readonly TimeSpan ResyncInterval = TimeSpan.FromHours(6);
+
     private readonly IServiceScopeFactory _scopeFactory;
     private readonly ILogger<AppointmentReminderService> _logger;
-    private readonly TimeSpan _checkInterval = TimeSpan.FromMinutes(30); // Check every 30 minutes
+    private readonly TimeSpan _lead;
+    private readonly TimeSpan _loadHorizon;
+    private readonly int _concurrency;
+
+    private readonly object _lock = new();
+    // Entradas viejas quedan en la cola hasta salir; vale la que coincide con _dueAt
+    private readonly PriorityQueue<long, DateTime> _queue = new();
+    private readonly Dictionary<long, DateTime> _dueAt = new();
+    private readonly SemaphoreSlim _wake = new(0, 1);
+    private DateTime _loadedUntil;
+    private DateTime _nextResync;
 
     public AppointmentReminderService(
         IServiceScopeFactory scopeFactory,
-        ILogger<AppointmentReminderService> logger)
+        ILogger<AppointmentReminderService> logger,
+        TimeSpan lead,
+        TimeSpan loadHorizon,
+        int concurrency)
     {
         _scopeFactory = scopeFactory;
         _logger = logger;
+        _lead = lead;
+        _loadHorizon = loadHorizon > TimeSpan.Zero ? loadHorizon : TimeSpan.FromHours(1);
+        _concurrency = Math.Max(1, concurrency);
+
+        BotMetrics.RegisterGauge("reminders_scheduled", () => { lock (_lock) return _dueAt.Count; });
+    }
+
+    public void Schedule(long appointmentId, DateTime? fechaHora)
+    {
+        if (!fechaHora.HasValue || fechaHora.Value <= DateTime.Now)
+        {
+            Cancel(appointmentId);
+            return;
+        }
+
+        Enqueue(appointmentId, fechaHora.Value - _lead);
+    }
+
+    public void Cancel(long appointmentId)
+    {
+        lock (_lock)
+        {
+            _dueAt.Remove(appointmentId);
+        }
     }
 
     protected override async Task ExecuteAsync(CancellationToken stoppingToken)
     {
-        _logger.LogInformation("[REMINDER-SERVICE] Starting appointment reminder service");
+        _logger.LogInformation("[REMINDER-SERVICE] Starting appointment reminder scheduler (lead {Lead}, horizon {Horizon})", _lead, _loadHorizon);
 
+        var nextLoad = DateTime.MinValue;
         while (!stoppingToken.IsCancellationRequested)
         {
             try
             {
-                await CheckAndSendReminders(stoppingToken);
+                var now = DateTime.Now;
+                if (now >= nextLoad)
+                {
+                    await LoadWindowAsync(now, stoppingToken);
+                    // A mitad de la ventana: siempre hay al menos medio horizonte cargado por delante
+                    nextLoad = now + _loadHorizon / 2;
+                }
+
+                var due = TakeDue(now);
+                if (due.Count > 0)
+                {
+                    await SendDueAsync(due, stoppingToken);
+                    continue;
+                }
+
+                var wait = nextLoad - now;
+                var nextDue = PeekNextDue();
+                if (nextDue.HasValue && nextDue.Value - now < wait)
+                    wait = nextDue.Value - now;
+
+                // Un Schedule() nuevo puede vencer antes que lo que se está esperando
+                await _wake.WaitAsync(wait > TimeSpan.Zero ? wait : TimeSpan.Zero, stoppingToken);
+            }
+            catch (OperationCanceledException) when (stoppingToken.IsCancellationRequested)
+            {
+                break;
             }
             catch (Exception ex)
             {
-                _logger.LogError(ex, "[REMINDER-SERVICE] Error occurred while checking reminders");
+                _logger.LogError(ex, "[REMINDER-SERVICE] Error occurred while processing reminders");
+                await Task.Delay(RetryDelay, stoppingToken);
             }
-
-            // Wait for next check interval
-            await Task.Delay(_checkInterval, stoppingToken);
         }
 
         _logger.LogInformation("[REMINDER-SERVICE] Appointment reminder service stopped");
     }
 
-    private async Task CheckAndSendReminders(CancellationToken ct)
+    private void Enqueue(long appointmentId, DateTime dueAt)
+    {
+        lock (_lock)
+        {
+            _dueAt[appointmentId] = dueAt;
+            _queue.Enqueue(appointmentId, dueAt);
+        }
+
+        if (_wake.CurrentCount == 0)
+        {
+            try { _wake.Release(); } catch (SemaphoreFullException) { }
+        }
+    }
+
+    /// <summary>
+    /// Trae de la base solo el tramo de fecha_hora que todavía no está en memoria.
+    /// </summary>
+    private async Task LoadWindowAsync(DateTime now, CancellationToken ct)
     {
+        if (now >= _nextResync || _loadedUntil < now)
+        {
+            _loadedUntil = now;
+            _nextResync = now + ResyncInterval;
+        }
+
+        var until = now + _lead + _loadHorizon;
+        if (until <= _loadedUntil)
+            return;
+
         using var scope = _scopeFactory.CreateScope();
         var appointmentRepo = scope.ServiceProvider.GetRequiredService<IAppointmentRepository>();
-        var botClient = scope.ServiceProvider.GetRequiredService<TelegramBotClient>();
-
-        _logger.LogInformation("[REMINDER-SERVICE] Checking for appointments needing reminders...");
+        var rows = await appointmentRepo.GetReminderScheduleAsync(_loadedUntil, until, ct);
 
-        try
+        foreach (var appointment in rows)
         {
-            var appointmentsNeedingReminders = await appointmentRepo.GetAppointmentsNeedingRemindersAsync(ct);
-            
-            if (appointmentsNeedingReminders.Count == 0)
+            var dueAt = appointment.FechaHora!.Value - _lead;
+            lock (_lock)
             {
-                _logger.LogDebug("[REMINDER-SERVICE] No appointments needing reminders found");
-                return;
+                // Si pisa un Schedule() más nuevo no pasa nada: al enviar se relee la fecha de la base
+                if (_dueAt.TryGetValue(appointment.Id, out var current) && current == dueAt)
+                    continue;
+                _dueAt[appointment.Id] = dueAt;
+                _queue.Enqueue(appointment.Id, dueAt);
             }
+        }
 
-            _logger.LogInformation("[REMINDER-SERVICE] Found {Count} appointment(s) needing reminders", 
-                appointmentsNeedingReminders.Count);
+        BotMetrics.Increment("reminder_rows_loaded", rows.Count);
+        _logger.LogDebug("[REMINDER-SERVICE] Loaded {Count} reminder(s) for surgeries until {Until}", rows.Count, until);
+        _loadedUntil = until;
+    }
 
-            foreach (var appointment in appointmentsNeedingReminders)
+    private List<long> TakeDue(DateTime now)
+    {
+        var due = new List<long>();
+        lock (_lock)
+        {
+            while (due.Count < MaxBatch && _queue.TryPeek(out var id, out var dueAt) && dueAt <= now)
             {
-                try
+                _queue.Dequeue();
+                if (_dueAt.TryGetValue(id, out var current) && current == dueAt)
                 {
-                    await SendReminderNotification(botClient, appointment, ct);
-                    await appointmentRepo.MarkReminderSentAsync(appointment.Id, ct);
-                    
-                    _logger.LogInformation("[REMINDER-SERVICE] ✅ Reminder sent for appointment ID {Id} - {Surgery} on {Date}",
-                        appointment.Id, appointment.Cirugia, appointment.FechaHora);
-                }
-                catch (Exception ex)
-                {
-                    _logger.LogError(ex, "[REMINDER-SERVICE] ❌ Failed to send reminder for appointment ID {Id}", 
-                        appointment.Id);
+                    _dueAt.Remove(id);
+                    due.Add(id);
                 }
             }
         }
-        catch (Exception ex)
+        return due;
+    }
+
+    private DateTime? PeekNextDue()
+    {
+        lock (_lock)
         {
-            _logger.LogError(ex, "[REMINDER-SERVICE] Error checking for reminders");
+            while (_queue.TryPeek(out var id, out var dueAt))
+            {
+                if (_dueAt.TryGetValue(id, out var current) && current == dueAt)
+                    return dueAt;
+                _queue.Dequeue(); // Cancelado o reprogramado
+            }
         }
+        return null;
+    }
+
+    private async Task SendDueAsync(List<long> ids, CancellationToken ct)
+    {
+        using var scope = _scopeFactory.CreateScope();
+        var appointmentRepo = scope.ServiceProvider.GetRequiredService<IAppointmentRepository>();
+
+        // Una consulta por tanda: descarta borrados, ya enviados y cirugías que pasaron
+        var appointments = await appointmentRepo.GetRemindersDueAsync(ids, ct);
+        var sent = new ConcurrentBag<long>();
+        var now = DateTime.Now;
+
+        await Parallel.ForEachAsync(appointments, new ParallelOptions { MaxDegreeOfParallelism = _concurrency, CancellationToken = ct }, async (appointment, token) =>
+        {
+            var dueAt = appointment.FechaHora!.Value - _lead;
+            if (dueAt > now.AddSeconds(1))
+            {
+                // La fecha cambió sin pasar por el repositorio: se reprograma con la de la base
+                Enqueue(appointment.Id, dueAt);
+                return;
+            }
+
+            if (!appointment.ChatId.HasValue)
+            {
+                _logger.LogWarning("[REMINDER-SERVICE] Appointment ID {Id} has no chat to remind", appointment.Id);
+                sent.Add(appointment.Id);
+                return;
+            }
+
+            try
+            {
+                await SendReminderNotification(appointment, token);
+                BotMetrics.Observe(BotMetrics.ReminderDelay, DateTime.Now - dueAt);
+                BotMetrics.Increment("reminder_sent");
+                sent.Add(appointment.Id);
+
+                _logger.LogInformation("[REMINDER-SERVICE] ✅ Reminder sent for appointment ID {Id} - {Surgery} on {Date}",
+                    appointment.Id, appointment.Cirugia, appointment.FechaHora);
+            }
+            catch (Exception ex) when (!token.IsCancellationRequested)
+            {
+                BotMetrics.Increment("reminder_failed");
+                _logger.LogError(ex, "[REMINDER-SERVICE] ❌ Failed to send reminder for appointment ID {Id}", appointment.Id);
+                Enqueue(appointment.Id, DateTime.Now + RetryDelay);
+            }
+        });
+
+        if (!sent.IsEmpty)
+            await appointmentRepo.MarkRemindersSentAsync(sent.ToArray(), ct);
     }
 
-    private async Task SendReminderNotification(TelegramBotClient botClient, Models.Appointment appointment, CancellationToken ct)
+    private async Task SendReminderNotification(Models.Appointment appointment, CancellationToken ct)
     {
         if (!appointment.FechaHora.HasValue) return;
-        
+
         var timeUntilSurgery = appointment.FechaHora.Value - DateTime.Now;
         var hoursUntil = (int)timeUntilSurgery.TotalHours;
         var minutesUntil = timeUntilSurgery.Minutes;
@@ -125,9 +289,10 @@ public class AppointmentReminderService : BackgroundService
         if (appointment.ChatId.HasValue)
         {
             await MessageSender.SendWithRetry(
-                appointment.ChatId.Value, 
-                reminderMessage, 
-                cancellationToken: ct);
+                appointment.ChatId.Value,
+                reminderMessage,
+                cancellationToken: ct,
+                priority: OutboundPriority.Background);
         }
     }
-}
\ No newline at end of file
+}
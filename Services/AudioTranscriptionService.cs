@@ -3,6 +3,7 @@ using System.IO;
 using System.Threading;
 using System.Threading.Tasks;
 using Microsoft.Extensions.Logging;
+using RegistroCx.Helpers.OpenAI;
 using Telegram.Bot;
 using Telegram.Bot.Types;
 
@@ -111,9 +112,6 @@ public class AudioTranscriptionService
     {
         try
         {
-            _httpClient.DefaultRequestHeaders.Clear();
-            _httpClient.DefaultRequestHeaders.Add("Authorization", $"Bearer {_openAiApiKey}");
-
             using var form = new MultipartFormDataContent();
             form.Add(new StringContent("whisper-1"), "model");
             form.Add(new StringContent("es"), "language"); // Spanish language
@@ -125,7 +123,11 @@ public class AudioTranscriptionService
 
             _logger.LogInformation("[WHISPER] Sending audio to OpenAI Whisper API");
             
-            var response = await _httpClient.PostAsync("https://api.openai.com/v1/audio/transcriptions", form, ct);
+            // Header por request: TranscriptionPool corre varias transcripciones en paralelo
+            using var request = new HttpRequestMessage(HttpMethod.Post, OpenAIEndpoints.Transcriptions) { Content = form };
+            request.Headers.Add("Authorization", $"Bearer {_openAiApiKey}");
+
+            using var response = await _httpClient.SendAsync(request, ct);
             
             if (!response.IsSuccessStatusCode)
             {
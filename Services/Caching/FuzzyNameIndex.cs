@@ -0,0 +1,276 @@
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text.RegularExpressions;
+using RegistroCx.Helpers;
+
+namespace RegistroCx.Services.Caching;
+
+/// <summary>
+/// Nombre a indexar con su email (si se conoce) y apodos o alias que también lo identifican.
+/// </summary>
+public record NameIndexEntry(string Name, string? Email = null, IReadOnlyList<string>? Aliases = null);
+
+/// <summary>
+/// Índice en memoria de nombres (cirujanos, anestesiólogos, lugares) para búsquedas sin acentos
+/// y tolerantes a errores de tipeo: trigramas para juntar candidatos y distancia de Damerau-Levenshtein
+/// para ordenarlos. Cada entrada indexa el nombre completo, cada palabra, los finales de varias palabras
+/// y sus alias.
+/// Las entradas se agrupan por origen (lista base, plantel del equipo, alias aprendidos) y cada origen
+/// se sincroniza por diferencia: solo se reindexa lo que cambió.
+/// </summary>
+public class FuzzyNameIndex
+{
+    private const double MinScore = 0.65;
+    private const double PrefixScore = 0.9;
+    private const double RankingWindow = 0.1;   // Además del mejor, los que quedan a menos de esto
+    private const int MinWordLength = 3;
+
+    private static readonly Regex Titles = new(@"\b(dra?|doctora?|anest)\b\.?", RegexOptions.Compiled);
+    private static readonly Regex NonLetters = new(@"[^a-z0-9 ]+", RegexOptions.Compiled);
+    private static readonly Regex Spaces = new(@"\s+", RegexOptions.Compiled);
+
+    public record NameMatch(string Name, string? Email, double Score, bool Exact);
+
+    private record Term(int Id, string Key, string Name, string? Email, string Text, string[] Trigrams);
+
+    private readonly object _lock = new();
+    private readonly Dictionary<int, Term> _terms = new();
+    private readonly Dictionary<string, HashSet<int>> _postings = new();
+    private readonly Dictionary<string, Dictionary<string, (NameIndexEntry Entry, List<int> TermIds)>> _sources = new();
+    private readonly Dictionary<string, DateTime> _syncedAt = new();
+    private int _nextId;
+
+    public int Count
+    {
+        get { lock (_lock) return _sources.Values.Sum(s => s.Count); }
+    }
+
+    /// <summary>
+    /// Si el origen se sincronizó hace menos de maxAge y nadie lo marcó como viejo.
+    /// </summary>
+    public bool IsFresh(string source, TimeSpan maxAge)
+    {
+        lock (_lock)
+            return _syncedAt.TryGetValue(source, out var at) && DateTime.UtcNow - at < maxAge;
+    }
+
+    public void MarkStale(string source)
+    {
+        lock (_lock)
+            _syncedAt.Remove(source);
+    }
+
+    /// <summary>
+    /// Deja el origen con exactamente estas entradas: agrega las nuevas, saca las que ya no están y
+    /// reindexa solo las que cambiaron. Devuelve cuántas entradas se tocaron.
+    /// </summary>
+    public int SyncSource(string source, IEnumerable<NameIndexEntry> entries)
+    {
+        var incoming = new Dictionary<string, NameIndexEntry>();
+        foreach (var entry in entries)
+        {
+            var key = NormalizeName(entry.Name);
+            if (key.Length > 0)
+                incoming[key] = entry;
+        }
+
+        lock (_lock)
+        {
+            if (!_sources.TryGetValue(source, out var current))
+                _sources[source] = current = new Dictionary<string, (NameIndexEntry, List<int>)>();
+
+            int changed = 0;
+            foreach (var key in current.Keys.Where(k => !incoming.ContainsKey(k)).ToList())
+            {
+                RemoveTerms(current[key].TermIds);
+                current.Remove(key);
+                changed++;
+            }
+
+            foreach (var (key, entry) in incoming)
+            {
+                if (current.TryGetValue(key, out var existing) && SameEntry(existing.Entry, entry))
+                    continue;
+                if (existing.TermIds != null)
+                    RemoveTerms(existing.TermIds);
+                current[key] = (entry, AddTerms(key, entry));
+                changed++;
+            }
+
+            _syncedAt[source] = DateTime.UtcNow;
+            return changed;
+        }
+    }
+
+    /// <summary>
+    /// Mejores coincidencias para lo que escribió el usuario. Si hay coincidencias exactas se devuelven
+    /// solo esas; si no, la mejor y las que quedan cerca de ella.
+    /// </summary>
+    public List<NameMatch> Search(string query, int limit = 5)
+    {
+        var text = NormalizeName(query);
+        if (text.Length < 2)
+            return new List<NameMatch>();
+
+        var best = new Dictionary<string, NameMatch>();
+        lock (_lock)
+        {
+            var candidates = new HashSet<int>();
+            foreach (var trigram in Trigrams(text))
+            {
+                if (_postings.TryGetValue(trigram, out var ids))
+                    candidates.UnionWith(ids);
+            }
+
+            foreach (var id in candidates)
+            {
+                var term = _terms[id];
+                var score = Similarity(text, term.Text);
+                if (score < MinScore)
+                    continue;
+
+                // La misma persona puede venir de varios orígenes: queda el mejor puntaje y el email que haya
+                if (best.TryGetValue(term.Key, out var previous))
+                {
+                    var email = previous.Email ?? term.Email;
+                    best[term.Key] = score > previous.Score
+                        ? new NameMatch(term.Name, email, score, score >= 1.0)
+                        : previous with { Email = email };
+                }
+                else
+                {
+                    best[term.Key] = new NameMatch(term.Name, term.Email, score, score >= 1.0);
+                }
+            }
+        }
+
+        if (best.Count == 0)
+            return new List<NameMatch>();
+
+        var top = best.Values.Max(m => m.Score);
+        return best.Values
+            .Where(m => top >= 1.0 ? m.Exact : m.Score >= top - RankingWindow)
+            .OrderByDescending(m => m.Score)
+            .ThenBy(m => m.Name, StringComparer.OrdinalIgnoreCase)
+            .Take(limit)
+            .ToList();
+    }
+
+    /// <summary>
+    /// Minúsculas, sin acentos, sin títulos (Dr., Dra., Anest.) ni signos.
+    /// </summary>
+    public static string NormalizeName(string name)
+    {
+        var text = TextoHelper.Normalizar(name);
+        text = Titles.Replace(text, " ");
+        text = NonLetters.Replace(text, " ");
+        return Spaces.Replace(text, " ").Trim();
+    }
+
+    // ------------------------------------------------------------------
+    // Indexado (con _lock tomado)
+    // ------------------------------------------------------------------
+
+    private List<int> AddTerms(string key, NameIndexEntry entry)
+    {
+        var texts = new HashSet<string> { key };
+        var words = key.Split(' ');
+        for (int i = 0; i < words.Length; i++)
+        {
+            if (words[i].Length >= MinWordLength)
+                texts.Add(words[i]);
+            // "santa isabel" -> "Clínica Santa Isabel": el final del nombre sin las primeras palabras
+            if (i > 0 && i < words.Length - 1)
+                texts.Add(string.Join(' ', words[i..]));
+        }
+        foreach (var alias in entry.Aliases ?? Array.Empty<string>())
+        {
+            var normalized = NormalizeName(alias);
+            if (normalized.Length >= 2)
+                texts.Add(normalized);
+        }
+
+        var ids = new List<int>(texts.Count);
+        foreach (var text in texts)
+        {
+            var term = new Term(_nextId++, key, entry.Name.Trim(), entry.Email, text, Trigrams(text).ToArray());
+            _terms[term.Id] = term;
+            foreach (var trigram in term.Trigrams)
+            {
+                if (!_postings.TryGetValue(trigram, out var postings))
+                    _postings[trigram] = postings = new HashSet<int>();
+                postings.Add(term.Id);
+            }
+            ids.Add(term.Id);
+        }
+        return ids;
+    }
+
+    private void RemoveTerms(List<int> ids)
+    {
+        foreach (var id in ids)
+        {
+            if (!_terms.Remove(id, out var term))
+                continue;
+            foreach (var trigram in term.Trigrams)
+            {
+                if (_postings.TryGetValue(trigram, out var postings))
+                {
+                    postings.Remove(id);
+                    if (postings.Count == 0)
+                        _postings.Remove(trigram);
+                }
+            }
+        }
+    }
+
+    private static bool SameEntry(NameIndexEntry a, NameIndexEntry b) =>
+        a.Name == b.Name && a.Email == b.Email &&
+        (a.Aliases ?? Array.Empty<string>()).SequenceEqual(b.Aliases ?? Array.Empty<string>());
+
+    // ------------------------------------------------------------------
+    // Similitud
+    // ------------------------------------------------------------------
+
+    private static IEnumerable<string> Trigrams(string text)
+    {
+        var padded = $"${text}$";
+        for (int i = 0; i + 3 <= padded.Length; i++)
+            yield return padded.Substring(i, 3);
+    }
+
+    private static double Similarity(string query, string text)
+    {
+        if (query == text)
+            return 1.0;
+        // "mend" -> "mendez": el usuario escribió el principio del nombre
+        if (query.Length >= MinWordLength && text.StartsWith(query, StringComparison.Ordinal))
+            return PrefixScore;
+
+        var distance = DamerauLevenshtein(query, text);
+        return 1.0 - (double)distance / Math.Max(query.Length, text.Length);
+    }
+
+    /// <summary>
+    /// Distancia de edición con transposiciones de letras vecinas ("Itlaiano" -> "Italiano" = 1).
+    /// </summary>
+    private static int DamerauLevenshtein(string a, string b)
+    {
+        var d = new int[a.Length + 1, b.Length + 1];
+        for (int i = 0; i <= a.Length; i++) d[i, 0] = i;
+        for (int j = 0; j <= b.Length; j++) d[0, j] = j;
+
+        for (int i = 1; i <= a.Length; i++)
+        {
+            for (int j = 1; j <= b.Length; j++)
+            {
+                var cost = a[i - 1] == b[j - 1] ? 0 : 1;
+                d[i, j] = Math.Min(Math.Min(d[i - 1, j] + 1, d[i, j - 1] + 1), d[i - 1, j - 1] + cost);
+                if (i > 1 && j > 1 && a[i - 1] == b[j - 2] && a[i - 2] == b[j - 1])
+                    d[i, j] = Math.Min(d[i, j], d[i - 2, j - 2] + 1);
+            }
+        }
+        return d[a.Length, b.Length];
+    }
+}
@@ -6,6 +6,7 @@ using System.Threading;
 using System.Threading.Tasks;
 using Microsoft.Extensions.Caching.Memory;
 using Microsoft.Extensions.Logging;
+using RegistroCx.Domain;
 using RegistroCx.Services.Repositories;
 
 namespace RegistroCx.Services.Caching
@@ -16,6 +17,7 @@ namespace RegistroCx.Services.Caching
         private readonly IAnesthesiologistRepository _anesthesiologistRepo;
         private readonly IAppointmentRepository _appointmentRepo;
         private readonly ILogger<MemoryCacheService> _logger;
+        private readonly NameIndexRegistry? _nameIndexes;
         
         // Cache keys
         private const string SURGEONS_KEY = "cache:surgeons";
@@ -30,12 +32,14 @@ namespace RegistroCx.Services.Caching
             IMemoryCache cache,
             IAnesthesiologistRepository anesthesiologistRepo,
             IAppointmentRepository appointmentRepo,
-            ILogger<MemoryCacheService> logger)
+            ILogger<MemoryCacheService> logger,
+            NameIndexRegistry? nameIndexes = null)
         {
             _cache = cache;
             _anesthesiologistRepo = anesthesiologistRepo;
             _appointmentRepo = appointmentRepo;
             _logger = logger;
+            _nameIndexes = nameIndexes;
         }
 
         public Task<T?> GetAsync<T>(string key, CancellationToken ct = default) where T : class
@@ -167,22 +171,31 @@ namespace RegistroCx.Services.Caching
             );
         }
 
+        // Al invalidar, la lista se recarga enseguida y los índices de nombres reindexan solo las diferencias
         public async Task InvalidateSurgeonCacheAsync(CancellationToken ct = default)
         {
             await RemoveAsync(SURGEONS_KEY, ct);
             _logger.LogInformation("Invalidated surgeon cache");
+            _nameIndexes?.SyncBaseNames(TermTypes.Surgeon, await GetSurgeonNamesAsync(ct));
         }
 
         public async Task InvalidateLocationCacheAsync(CancellationToken ct = default)
         {
             await RemoveAsync(LOCATIONS_KEY, ct);
             _logger.LogInformation("Invalidated location cache");
+            _nameIndexes?.SyncBaseNames(TermTypes.Place, await GetLocationNamesAsync(ct));
         }
 
         public async Task InvalidateAnesthesiologistCacheAsync(CancellationToken ct = default)
         {
             await RemoveAsync(ANESTHESIOLOGISTS_KEY, ct);
             _logger.LogInformation("Invalidated anesthesiologist cache");
+            if (_nameIndexes != null)
+            {
+                _nameIndexes.SyncBaseNames(TermTypes.Anesthesiologist, await GetAnesthesiologistNamesAsync(ct));
+                // El plantel de cada equipo sale de la base: se vuelve a leer en la próxima búsqueda
+                _nameIndexes.MarkStale(TermTypes.Anesthesiologist, NameIndexRegistry.RosterSource);
+            }
         }
     }
 }
\ No newline at end of file
@@ -0,0 +1,74 @@
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.Linq;
+using RegistroCx.Services.Analytics;
+
+namespace RegistroCx.Services.Caching;
+
+/// <summary>
+/// Índices de nombres (FuzzyNameIndex) vivos en el proceso, uno por tipo de término (TermTypes) y alcance:
+/// el equipo del usuario o, si no tiene equipo, su chat. Los orígenes de cada índice son la lista base de
+/// ICacheService, el plantel del equipo y los alias aprendidos de cada chat que buscó en él.
+/// </summary>
+public class NameIndexRegistry
+{
+    public const string BaseSource = "base";
+    public const string RosterSource = "roster";
+
+    private readonly ConcurrentDictionary<(string Kind, string Scope), FuzzyNameIndex> _indexes = new();
+
+    public NameIndexRegistry()
+    {
+        BotMetrics.RegisterGauge("name_index_count", () => _indexes.Count);
+        BotMetrics.RegisterGauge("name_index_entries", () => _indexes.Values.Sum(i => i.Count));
+    }
+
+    public static string TeamScope(int equipoId) => $"equipo:{equipoId}";
+    public static string ChatScope(long chatId) => $"chat:{chatId}";
+    public static string LearnedSource(long chatId) => $"learned:{chatId}";
+
+    public FuzzyNameIndex GetOrCreate(string kind, string scope) =>
+        _indexes.GetOrAdd((kind, scope), _ => new FuzzyNameIndex());
+
+    /// <summary>
+    /// La lista base de un tipo cambió: se reindexan solo las diferencias en todos los índices de ese tipo.
+    /// </summary>
+    public void SyncBaseNames(string kind, IEnumerable<string> names)
+    {
+        var entries = names.Select(n => new NameIndexEntry(n)).ToList();
+        int indexes = 0, changed = 0;
+        foreach (var ((indexKind, _), index) in _indexes)
+        {
+            if (indexKind != kind)
+                continue;
+            changed += index.SyncSource(BaseSource, entries);
+            indexes++;
+        }
+
+        if (indexes > 0)
+            Console.WriteLine($"[NAME-INDEX] {kind}: lista base resincronizada en {indexes} índice(s), {changed} nombre(s) cambiados");
+    }
+
+    /// <summary>
+    /// El origen se recarga en la próxima búsqueda de cada índice de ese tipo.
+    /// </summary>
+    public void MarkStale(string kind, string source)
+    {
+        foreach (var ((indexKind, _), index) in _indexes)
+        {
+            if (indexKind == kind)
+                index.MarkStale(source);
+        }
+    }
+
+    /// <summary>
+    /// Se escribieron términos aprendidos nuevos del chat: sus alias se recargan en la próxima búsqueda.
+    /// </summary>
+    public void MarkLearnedStale(long chatId)
+    {
+        var source = LearnedSource(chatId);
+        foreach (var index in _indexes.Values)
+            index.MarkStale(source);
+    }
+}
@@ -1,5 +1,6 @@
 using System;
 using System.Collections.Generic;
+using System.Linq;
 using System.Threading;
 using System.Threading.Tasks;
 using Telegram.Bot;
@@ -12,37 +13,47 @@ namespace RegistroCx.Services;
 public class CalendarSyncService
 {
     private readonly IAppointmentRepository _appointmentRepo;
+    private readonly IUserProfileRepository _userRepo;
     private readonly IGoogleCalendarService _calendarService;
     private readonly EquipoService _equipoService;
 
     public CalendarSyncService(
-        IAppointmentRepository appointmentRepo, 
+        IAppointmentRepository appointmentRepo,
+        IUserProfileRepository userRepo,
         IGoogleCalendarService calendarService,
         EquipoService equipoService)
     {
         _appointmentRepo = appointmentRepo;
+        _userRepo = userRepo;
         _calendarService = calendarService;
         _equipoService = equipoService;
     }
 
     /// <summary>
-    /// Sincroniza appointments pendientes con Google Calendar después de re-autorización
+    /// Sincroniza appointments pendientes con Google Calendar después de re-autorización.
+    /// 1. Con el sync token del usuario trae solo los eventos que cambiaron en Calendar y marca
+    ///    para re-sincronizar los appointments cuyo evento se borró o se movió.
+    /// 2. Empuja en lotes los appointments sin evento, marcados o modificados desde el último sync.
+    /// 3. Guarda el nuevo sync token recién cuando todo lo anterior quedó en la base.
     /// </summary>
     public async Task<int> SyncPendingAppointmentsAsync(ITelegramBotClient bot, long chatId, CancellationToken ct)
     {
         try
         {
             Console.WriteLine($"[CALENDAR-SYNC] Starting sync for chat {chatId}");
-            
+
             // Resolver chatId a equipoId para el nuevo sistema de equipos
             var equipoId = await _equipoService.ObtenerPrimerEquipoIdPorChatIdAsync(chatId, ct);
-            
-            // Obtener appointments que no tienen calendar_event_id
+
+            var changes = await ReconcileChangesAsync(chatId, equipoId, ct);
+
+            // Appointments sin evento, con evento desactualizado o marcados por la reconciliación
             var pendingAppointments = await _appointmentRepo.GetPendingCalendarSyncAsync(equipoId, ct);
-            
+
             if (pendingAppointments.Count == 0)
             {
                 Console.WriteLine($"[CALENDAR-SYNC] No pending appointments found for team {equipoId}");
+                await SaveSyncTokenAsync(chatId, changes, ct);
                 return 0;
             }
 
@@ -50,31 +61,22 @@ public class CalendarSyncService
                 $"🔄 Encontré {pendingAppointments.Count} cirugia(s) que no están en tu calendario. Sincronizando...",
                 cancellationToken: ct);
 
-            int syncedCount = 0;
-            int failedCount = 0;
+            var result = await _calendarService.SyncAppointmentEventsAsync(pendingAppointments, chatId, ct);
+            await _appointmentRepo.UpdateCalendarEventsAsync(result.EventIds, ct);
 
-            foreach (var appointment in pendingAppointments)
+            foreach (var (appointmentId, reason) in result.Failures)
             {
-                try
-                {
-                    Console.WriteLine($"[CALENDAR-SYNC] Syncing appointment: {appointment.Cirugia} on {appointment.FechaHora}");
-                    
-                    // Crear el evento en Google Calendar
-                    var eventId = await _calendarService.CreateAppointmentEventAsync(appointment, chatId, ct);
-                    
-                    // Actualizar la BD con el calendar_event_id
-                    await _appointmentRepo.UpdateCalendarEventAsync(appointment.Id, eventId, ct);
-                    
-                    syncedCount++;
-                    Console.WriteLine($"[CALENDAR-SYNC] ✅ Synced appointment ID {appointment.Id} with calendar event {eventId}");
-                }
-                catch (Exception ex)
-                {
-                    failedCount++;
-                    Console.WriteLine($"[CALENDAR-SYNC] ❌ Failed to sync appointment ID {appointment.Id}: {ex.Message}");
-                }
+                Console.WriteLine($"[CALENDAR-SYNC] ❌ Failed to sync appointment ID {appointmentId}: {reason}");
             }
 
+            int syncedCount = result.EventIds.Count;
+            int failedCount = pendingAppointments.Count - syncedCount;
+            Console.WriteLine($"[CALENDAR-SYNC] ✅ Synced {syncedCount}/{pendingAppointments.Count} appointment(s) for chat {chatId} in {result.BatchRequests} batch request(s)");
+
+            // Si algo falló, el token no avanza: el próximo sync vuelve a revisar los mismos cambios
+            if (failedCount == 0)
+                await SaveSyncTokenAsync(chatId, changes, ct);
+
             // Enviar resumen al usuario
             var resultMessage = syncedCount > 0
                 ? $"✅ {syncedCount} cirugia(s) sincronizada(s) exitosamente con tu calendario."
@@ -92,12 +94,37 @@ public class CalendarSyncService
         catch (Exception ex)
         {
             Console.WriteLine($"[CALENDAR-SYNC] ❌ Error during sync for chat {chatId}: {ex}");
-            
+
             await MessageSender.SendWithRetry(chatId,
                 "❌ Hubo un error durante la sincronización del calendario. Por favor, intenta nuevamente.",
                 cancellationToken: ct);
-            
+
             return 0;
         }
     }
-}
\ No newline at end of file
+
+    private async Task<CalendarChanges?> ReconcileChangesAsync(long chatId, int equipoId, CancellationToken ct)
+    {
+        try
+        {
+            var syncToken = await _userRepo.GetCalendarSyncTokenAsync(chatId, ct);
+            var changes = await _calendarService.GetChangedEventsAsync(chatId, syncToken, ct);
+            var marked = await _appointmentRepo.MarkCalendarChangesAsync(equipoId, changes.Changes, ct);
+
+            Console.WriteLine($"[CALENDAR-SYNC] {(changes.FullSync ? "Full" : "Incremental")} sync: {changes.Changes.Count} changed event(s), {marked} appointment(s) to re-sync");
+            return changes;
+        }
+        catch (Exception ex) when (ex is not OperationCanceledException)
+        {
+            // Sin reconciliación igual se pueden empujar los pendientes
+            Console.WriteLine($"[CALENDAR-SYNC] ⚠️ Could not read calendar changes for chat {chatId}: {ex.Message}");
+            return null;
+        }
+    }
+
+    private async Task SaveSyncTokenAsync(long chatId, CalendarChanges? changes, CancellationToken ct)
+    {
+        if (changes?.NextSyncToken != null)
+            await _userRepo.UpdateCalendarSyncTokenAsync(chatId, changes.NextSyncToken, ct);
+    }
+}
@@ -1,3 +1,4 @@
+using System.Collections.Concurrent;
 using Telegram.Bot;
 using RegistroCx.Models;
 using RegistroCx.Services.Extraction;
@@ -54,7 +55,7 @@ namespace RegistroCx.Services;
 public class CirugiaFlowService
 {
     private readonly LLMOpenAIAssistant _llm;
-    private readonly Dictionary<long, Appointment> _pending;
+    private readonly ConcurrentDictionary<long, Appointment> _pending;
 
     // Helpers especializados
     private readonly FlowStateManager _stateManager;
@@ -86,9 +87,12 @@ public class CirugiaFlowService
     // Humanizador de conversaciones
     private readonly ConversationHumanizer _conversationHumanizer;
 
+    // Extracción local sin LLM para mensajes completos y reconocibles (null = desactivada)
+    private readonly LocalFastPathExtractor? _fastPath;
+
     public CirugiaFlowService(
         LLMOpenAIAssistant llm, 
-        Dictionary<long, Appointment> pending,
+        ConcurrentDictionary<long, Appointment> pending,
         AppointmentConfirmationService confirmationService,
         IGoogleOAuthService oauthService,
         IUserProfileRepository userRepo,
@@ -107,7 +111,8 @@ public class CirugiaFlowService
         IConversationContextManager contextManager,
         EquipoService equipoService,
         MedicalContextValidator medicalValidator,
-        ConversationHumanizer conversationHumanizer)
+        ConversationHumanizer conversationHumanizer,
+        LocalFastPathExtractor? fastPath = null)
     {
         _llm = llm;
         _pending = pending;
@@ -125,6 +130,7 @@ public class CirugiaFlowService
         _equipoService = equipoService;
         _medicalValidator = medicalValidator;
         _conversationHumanizer = conversationHumanizer;
+        _fastPath = fastPath;
         _stateManager = new FlowStateManager(_pending);
         _messageHandler = new FlowMessageHandler(oauthService, userRepo, calendarSync, appointmentRepo, reportService, quickEdit);
         _wizardHandler = new FlowWizardHandler(anesthesiologistSearchService, userRepo, analytics, quickEdit);
@@ -156,7 +162,29 @@ public class CirugiaFlowService
         // NUEVA LÓGICA: Verificar contexto conversacional y detectar nueva cirugía
         var appt = _stateManager.GetOrCreateAppointment(chatId);
         var currentContext = _contextManager.ExtractContext(appt);
-        
+
+        // 0. Sin conversación en curso, un mensaje con todos los datos reconocibles no necesita el LLM
+        if (_fastPath != null && currentContext.Type == ContextType.None && appt.HistoricoInputs.Count == 0)
+        {
+            var fastPath = await _fastPath.TryExtractAsync(rawText, chatId, DateTime.Now, ct);
+            if (fastPath.Matched)
+            {
+                Console.WriteLine("[FLOW] ⚡ Fast path: new surgery extracted locally, skipping intent classification and LLM");
+                appt.HistoricoInputs.Add(rawText);
+                await ProcessWithHumanizedResponse(bot, appt, rawText, chatId, ct, isNewSurgery: true, extracted: fastPath.Fields);
+                return;
+            }
+        }
+
+        // 0b. Respuesta reconocida localmente dentro del wizard o la confirmación: ni intent ni relevancia por LLM
+        if (currentContext.Type is ContextType.FieldWizard or ContextType.Confirming &&
+            _contextManager.TryClassifyLocally(rawText, currentContext) is { IsRelevant: true })
+        {
+            Console.WriteLine("[FLOW] ⚡ Local classifier: contextual reply, skipping intent classification and relevance LLM");
+            await HandleWithActiveContext(bot, chatId, rawText, appt, currentContext, ct);
+            return;
+        }
+
         // 1. PRIMERO: Verificar si es una nueva cirugía usando el LLM
         // PERO SOLO si no hay contexto activo que esté esperando datos
         var intent = await _llmProcessor.ClassifyIntentAsync(rawText);
@@ -691,45 +719,52 @@ public class CirugiaFlowService
             var confirmedSurgeries = new List<string>();
             var emailRequests = new List<string>();
 
-            // Procesar cada cirugía guardada SILENCIOSAMENTE
-            for (int i = 1; i <= surgeryCount; i++)
+            var savedAppts = Enumerable.Range(1, surgeryCount)
+                .Select(i => _stateManager.GetOrCreateAppointment(chatId + i * 100))
+                .ToList();
+
+            // Confirmar cada cirugía guardada SILENCIOSAMENTE y en paralelo (base, calendario, aprendizaje e invitación);
+            // null = contexto vacío, no había cirugía que confirmar
+            var outcomes = await _multiSurgeryParser.ProcessEachAsync(savedAppts.Count, async (index, token) =>
             {
+                var savedAppt = savedAppts[index];
+                if (string.IsNullOrWhiteSpace(savedAppt.Cirugia))
+                    return (bool?)null;
+
                 try
                 {
-                    var tempChatId = chatId + i * 100;
-                    var savedAppt = _stateManager.GetOrCreateAppointment(tempChatId);
-                    
-                    if (!string.IsNullOrWhiteSpace(savedAppt.Cirugia))
+                    return await _confirmationService.ProcessConfirmationAsync(bot, savedAppt, chatId, token, silent: true);
+                }
+                catch (Exception ex)
+                {
+                    Console.WriteLine($"[MULTI-CONFIRM] Error confirming surgery {index + 1}: {ex}");
+                    return false;
+                }
+            }, ct);
+
+            // Resultados en el orden original de las cirugías
+            for (int i = 0; i < savedAppts.Count; i++)
+            {
+                var savedAppt = savedAppts[i];
+                if (outcomes[i] == true)
+                {
+                    successCount++;
+                    confirmedSurgeries.Add($"✅ **{savedAppt.Cantidad} {savedAppt.Cirugia?.ToUpper()}**");
+
+                    // Si hay anestesiólogo sin email, agregar a lista de pendientes
+                    if (!string.IsNullOrWhiteSpace(savedAppt.Anestesiologo) &&
+                        savedAppt.CampoQueFalta == Appointment.CampoPendiente.EsperandoEmailAnestesiologo)
                     {
-                        // Procesar confirmación sin enviar mensajes individuales (modo silencioso)
-                        var success = await _confirmationService.ProcessConfirmationAsync(bot, savedAppt, chatId, ct, silent: true);
-                        
-                        if (success)
-                        {
-                            successCount++;
-                            confirmedSurgeries.Add($"✅ **{savedAppt.Cantidad} {savedAppt.Cirugia?.ToUpper()}**");
-                            
-                            // Si hay anestesiólogo sin email, agregar a lista de pendientes
-                            if (!string.IsNullOrWhiteSpace(savedAppt.Anestesiologo) && 
-                                savedAppt.CampoQueFalta == Appointment.CampoPendiente.EsperandoEmailAnestesiologo)
-                            {
-                                emailRequests.Add($"• {savedAppt.Anestesiologo}");
-                            }
-                        }
-                        else
-                        {
-                            errors.Add($"Cirugía {i}: {savedAppt.Cirugia}");
-                        }
+                        emailRequests.Add($"• {savedAppt.Anestesiologo}");
                     }
-                    
-                    // Limpiar contexto temporal
-                    _stateManager.ClearContext(tempChatId);
                 }
-                catch (Exception ex)
+                else if (outcomes[i] == false)
                 {
-                    Console.WriteLine($"[MULTI-CONFIRM] Error confirming surgery {i}: {ex}");
-                    errors.Add($"Cirugía {i}");
+                    errors.Add($"Cirugía {i + 1}: {savedAppt.Cirugia}");
                 }
+
+                // Limpiar contexto temporal
+                _stateManager.ClearContext(chatId + (i + 1) * 100);
             }
 
             // MENSAJE CONSOLIDADO ÚNICO
@@ -1148,54 +1183,47 @@ public class CirugiaFlowService
                 "\n\nProcesando cada una...",
                 cancellationToken: ct);
 
-            var processedAppointments = new List<Appointment>();
-            var errors = new List<string>();
-
-            // Procesar cada cirugía individualmente
-            for (int i = 0; i < parseResult.IndividualInputs.Count; i++)
+            // Extraer cada cirugía con el LLM en paralelo; cada una en su contexto temporal (con el chatId real)
+            var extracted = await _multiSurgeryParser.ProcessEachAsync<Appointment?>(parseResult.IndividualInputs.Count, async (index, token) =>
             {
+                var individualInput = parseResult.IndividualInputs[index];
+                Console.WriteLine($"[MULTI-SURGERY] Processing surgery {index + 1}: {individualInput}");
+
                 try
                 {
-                    var individualInput = parseResult.IndividualInputs[i];
-                    var surgeryInfo = parseResult.DetectedSurgeries[i];
-                    
-                    Console.WriteLine($"[MULTI-SURGERY] Processing surgery {i + 1}: {individualInput}");
-
-                    // Crear un contexto temporal para esta cirugía (usar el chatId real)
                     var tempAppt = new Appointment { ChatId = chatId };
                     tempAppt.HistoricoInputs.Add(individualInput);
 
                     // Procesar con LLM usando el chatId real pero sin guardar en el state manager
-                    await ProcessSingleSurgeryWithLLM(bot, tempAppt, individualInput, chatId, ct);
-
-                    // Verificar si el procesamiento fue exitoso
-                    if (!string.IsNullOrWhiteSpace(tempAppt.Cirugia))
-                    {
-                        processedAppointments.Add(tempAppt);
-                        
-                        await MessageSender.SendWithRetry(chatId,
-                            $"✅ Cirugía {i + 1} procesada: {tempAppt.Cantidad} {tempAppt.Cirugia?.ToUpper()}",
-                            cancellationToken: ct);
-                    }
-                    else
-                    {
-                        errors.Add($"Cirugía {i + 1}: {surgeryInfo.SurgeryName}");
-                    }
+                    await ProcessSingleSurgeryWithLLM(bot, tempAppt, individualInput, chatId, token);
+                    return tempAppt;
                 }
                 catch (Exception ex)
                 {
-                    Console.WriteLine($"[MULTI-SURGERY] Error processing surgery {i + 1}: {ex}");
-                    errors.Add($"Cirugía {i + 1}: Error de procesamiento");
+                    Console.WriteLine($"[MULTI-SURGERY] Error processing surgery {index + 1}: {ex}");
+                    return null;
                 }
+            }, ct);
+
+            var processedAppointments = new List<Appointment>();
+            var errors = new List<string>();
+            for (int i = 0; i < extracted.Length; i++)
+            {
+                // Verificar si el procesamiento fue exitoso
+                if (!string.IsNullOrWhiteSpace(extracted[i]?.Cirugia))
+                    processedAppointments.Add(extracted[i]!);
+                else if (extracted[i] == null)
+                    errors.Add($"Cirugía {i + 1}: Error de procesamiento");
+                else
+                    errors.Add($"Cirugía {i + 1}: {parseResult.DetectedSurgeries[i].SurgeryName}");
             }
 
-            // Mostrar resumen final
+            // Un solo mensaje con el resumen (y lo que no se pudo procesar)
             if (processedAppointments.Count > 0)
             {
-                await ShowMultipleSurgeriesSummary(bot, processedAppointments, chatId, ct);
+                await ShowMultipleSurgeriesSummary(bot, processedAppointments, errors, chatId, ct);
             }
-
-            if (errors.Count > 0)
+            else if (errors.Count > 0)
             {
                 await MessageSender.SendWithRetry(chatId,
                     $"⚠️ Algunas cirugías no se pudieron procesar:\n{string.Join("\n", errors)}",
@@ -1214,7 +1242,7 @@ public class CirugiaFlowService
         }
     }
 
-    private async Task ShowMultipleSurgeriesSummary(ITelegramBotClient bot, List<Appointment> appointments, long chatId, CancellationToken ct)
+    private async Task ShowMultipleSurgeriesSummary(ITelegramBotClient bot, List<Appointment> appointments, List<string> errors, long chatId, CancellationToken ct)
     {
         var summary = "📋 **RESUMEN DE CIRUGÍAS PROCESADAS**\n\n";
         
@@ -1228,8 +1256,12 @@ public class CirugiaFlowService
                       $"💉 {appt.Anestesiologo}\n\n";
         }
 
-        summary += $"🔥 **Total: {appointments.Count} cirugías**\n\n" +
-                   "¿Querés confirmar todas estas cirugías? Responde **'confirmar todas'** o **'si'** para proceder.";
+        summary += $"🔥 **Total: {appointments.Count} cirugías**\n\n";
+
+        if (errors.Count > 0)
+            summary += $"⚠️ Algunas cirugías no se pudieron procesar:\n{string.Join("\n", errors)}\n\n";
+
+        summary += "¿Querés confirmar todas estas cirugías? Responde **'confirmar todas'** o **'si'** para proceder.";
 
         await MessageSender.SendWithRetry(chatId, summary, cancellationToken: ct);
 
@@ -1250,13 +1282,6 @@ public class CirugiaFlowService
         {
             Console.WriteLine($"[MULTI-SURGERY-VALIDATED] Processing {parseResult.DetectedSurgeries.Count} surgeries with validated data");
 
-            // Informar al usuario sobre las múltiples cirugías detectadas
-            await MessageSender.SendWithRetry(chatId,
-                $"🔍 **¡Detecté {parseResult.DetectedSurgeries.Count} cirugías diferentes!**\n\n" +
-                string.Join("\n", parseResult.DetectedSurgeries.Select((s, i) => $"{i + 1}. **{s.Quantity} {s.SurgeryName.ToUpper()}**")) +
-                "\n\n✅ Todos los datos están completos, creando cada cirugía...",
-                cancellationToken: ct);
-
             var processedAppointments = new List<Appointment>();
             var errors = new List<string>();
 
@@ -1285,10 +1310,6 @@ public class CirugiaFlowService
                     };
 
                     processedAppointments.Add(newAppt);
-                    
-                    await MessageSender.SendWithRetry(chatId,
-                        $"✅ **Cirugía {i + 1}:** {newAppt.Cantidad} {newAppt.Cirugia?.ToUpper()}",
-                        cancellationToken: ct);
                 }
                 catch (Exception ex)
                 {
@@ -1297,13 +1318,12 @@ public class CirugiaFlowService
                 }
             }
 
-            // Mostrar resumen final y proceder con confirmación
+            // Un solo mensaje: lo detectado, el resumen final y el pedido de confirmación
             if (processedAppointments.Count > 0)
             {
-                await ShowFinalMultipleSurgeriesSummary(bot, processedAppointments, chatId, ct);
+                await ShowFinalMultipleSurgeriesSummary(bot, processedAppointments, errors, chatId, ct);
             }
-
-            if (errors.Count > 0)
+            else if (errors.Count > 0)
             {
                 await MessageSender.SendWithRetry(chatId,
                     $"⚠️ Algunas cirugías no se pudieron crear:\n{string.Join("\n", errors)}",
@@ -1319,9 +1339,10 @@ public class CirugiaFlowService
         }
     }
 
-    private async Task ShowFinalMultipleSurgeriesSummary(ITelegramBotClient bot, List<Appointment> appointments, long chatId, CancellationToken ct)
+    private async Task ShowFinalMultipleSurgeriesSummary(ITelegramBotClient bot, List<Appointment> appointments, List<string> errors, long chatId, CancellationToken ct)
     {
-        var summary = "🎯 **RESUMEN FINAL DE CIRUGÍAS**\n\n";
+        var summary = $"🔍 **¡Detecté {appointments.Count + errors.Count} cirugías diferentes!** Todos los datos están completos.\n\n" +
+                      "🎯 **RESUMEN FINAL DE CIRUGÍAS**\n\n";
         
         for (int i = 0; i < appointments.Count; i++)
         {
@@ -1335,6 +1356,9 @@ public class CirugiaFlowService
 
         summary += $"🔥 **Total: {appointments.Count} cirugías programadas**";
 
+        if (errors.Count > 0)
+            summary += $"\n\n⚠️ Algunas cirugías no se pudieron crear:\n{string.Join("\n", errors)}";
+
         // En lugar de texto simple, usar botones de edición rápida para múltiples cirugías
         // Nota: Para múltiples cirugías, por ahora seguimos con el método tradicional
         // TODO: Implementar botones individuales para cada cirugía
@@ -1369,7 +1393,7 @@ public class CirugiaFlowService
             Console.WriteLine($"[LLM-PROCESSOR] Processing input for surgery: {individualInput}");
 
             // Llamar directamente al LLM sin pasar por el FlowLLMProcessor que envía mensajes
-            var llmResponse = await CallLLMDirectly(individualInput);
+            var llmResponse = await CallLLMDirectly(individualInput, chatId);
             
             if (!string.IsNullOrWhiteSpace(llmResponse))
             {
@@ -1389,13 +1413,13 @@ public class CirugiaFlowService
         }
     }
 
-    private async Task<string> CallLLMDirectly(string input)
+    private async Task<string> CallLLMDirectly(string input, long chatId)
     {
         var startTime = DateTime.UtcNow;
         try
         {
             // Usar el método que usa assistants (el prompt está ya configurado en el assistant)
-            var dict = await _llm.ExtractWithPublishedPromptAsync(input, DateTime.Today);
+            var dict = await _llm.ExtractWithPublishedPromptAsync(input, DateTime.Today, chatId);
             var duration = DateTime.UtcNow - startTime;
             
             if (dict != null && dict.Count > 0)
@@ -1895,12 +1919,12 @@ public class CirugiaFlowService
     /// <summary>
     /// Procesa el mensaje con LLM y envía respuesta humanizada consolidada
     /// </summary>
-    private async Task ProcessWithHumanizedResponse(ITelegramBotClient bot, Appointment appt, string rawText, long chatId, CancellationToken ct, bool isNewSurgery = false)
+    private async Task ProcessWithHumanizedResponse(ITelegramBotClient bot, Appointment appt, string rawText, long chatId, CancellationToken ct, bool isNewSurgery = false, Dictionary<string, string>? extracted = null)
     {
         try
         {
             // 1. Procesar con LLM tradicional (sin enviar mensajes)
-            var processingResult = await ProcessWithLLMSilently(appt, rawText);
+            var processingResult = await ProcessWithLLMSilently(appt, rawText, extracted);
             
             // 2. Crear contexto para humanización
             var humanizationContext = new HumanizationContext
@@ -1929,16 +1953,17 @@ public class CirugiaFlowService
     }
 
     /// <summary>
-    /// Procesa con LLM sin enviar mensajes (modo silencioso)
+    /// Procesa con LLM sin enviar mensajes (modo silencioso).
+    /// Si ya vienen campos extraídos (fast path local) se aplican directamente sin llamar al LLM.
     /// </summary>
-    private async Task<Dictionary<string, object>> ProcessWithLLMSilently(Appointment appt, string rawText)
+    private async Task<Dictionary<string, object>> ProcessWithLLMSilently(Appointment appt, string rawText, Dictionary<string, string>? extracted = null)
     {
         // Esta lógica debería ser similar a ProcessWithLLM pero sin enviar mensajes
         // Por ahora, simulamos el procesamiento básico
         var result = new Dictionary<string, object>();
         
         // Extraer datos usando el LLM (método existente adaptado)
-        var llmResponse = await _llm.ExtractWithPublishedPromptAsync(rawText, DateTime.Today);
+        var llmResponse = extracted ?? await _llm.ExtractWithPublishedPromptAsync(rawText, DateTime.Today, appt.ChatId ?? 0);
         
         if (llmResponse != null)
         {
@@ -9,6 +9,7 @@ using RegistroCx.Models;
 using RegistroCx.Services.Extraction;
 using RegistroCx.ProgramServices.Services.Telegram;
 using RegistroCx.Helpers;
+using RegistroCx.Services.Analytics;
 using Telegram.Bot.Types.ReplyMarkups;
 
 namespace RegistroCx.Services.Context
@@ -17,6 +18,10 @@ namespace RegistroCx.Services.Context
     {
         private readonly LLMOpenAIAssistant _llm;
         private readonly ILogger<ConversationContextManager> _logger;
+        private readonly LocalRelevanceClassifier? _localClassifier;
+
+        // Último veredicto local: el flujo puede consultarlo antes de AnalyzeMessageRelevanceAsync con el mismo mensaje
+        private (string Message, ConversationContext Context, LocalRelevanceVerdict? Verdict)? _lastLocal;
         
         // Prompt ID para análisis de contexto conversacional
         private const string ContextAnalysisPromptId = "pmpt_68a10cd97c48819685ba35869b43c3ec031d14b92f3fc512"; // TODO: Reemplazar con el prompt ID real
@@ -35,16 +40,24 @@ namespace RegistroCx.Services.Context
             "reporte", "report", "informe", "consulta", "buscar", "ver"
         };
 
-        public ConversationContextManager(LLMOpenAIAssistant llm, ILogger<ConversationContextManager> logger)
+        public ConversationContextManager(LLMOpenAIAssistant llm, ILogger<ConversationContextManager> logger, LocalRelevanceClassifier? localClassifier = null)
         {
             _llm = llm;
             _logger = logger;
+            _localClassifier = localClassifier;
         }
 
         public async Task<ContextRelevance> AnalyzeMessageRelevanceAsync(string message, ConversationContext currentContext, CancellationToken ct = default)
         {
             try
             {
+                // 0. Reglas locales: "cambiá el lugar" o "cambiar" en la confirmación son ediciones, no cambios de contexto
+                var local = ClassifyLocally(message, currentContext);
+                if (local?.Tier == LocalRelevanceClassifier.RulesTier)
+                {
+                    return ToRelevance(local);
+                }
+
                 // 1. Verificar cambio explícito de contexto
                 var explicitSwitch = DetectExplicitContextSwitch(message);
                 if (explicitSwitch.IsExplicitSwitch)
@@ -69,8 +82,16 @@ namespace RegistroCx.Services.Context
                     };
                 }
 
-                // 3. Usar LLM para análisis contextual
+                // 3. Modelo local con confianza suficiente
+                if (local != null)
+                {
+                    return ToRelevance(local);
+                }
+
+                // 4. Usar LLM para análisis contextual
+                using var timer = BotMetrics.Time(BotMetrics.ContextRelevanceLlm);
                 var relevance = await AnalyzeRelevanceWithLLM(message, currentContext, ct);
+                timer.Success();
                 return relevance;
             }
             catch (Exception ex)
@@ -188,6 +209,23 @@ namespace RegistroCx.Services.Context
             return context;
         }
 
+        public ContextRelevance? TryClassifyLocally(string message, ConversationContext context)
+        {
+            var local = ClassifyLocally(message, context);
+            if (local == null)
+            {
+                return null;
+            }
+
+            // Un "cancelar" o "reporte" sin regla que lo explique lo sigue resolviendo el camino de siempre
+            if (local.Tier == LocalRelevanceClassifier.ModelTier && DetectExplicitContextSwitch(message).IsExplicitSwitch)
+            {
+                return null;
+            }
+
+            return ToRelevance(local);
+        }
+
         public bool ShouldBypassIntentClassification(string message, ConversationContext context)
         {
             Console.WriteLine($"[BYPASS-CHECK] Context type: {context.Type}, Message: '{message}'");
@@ -196,6 +234,13 @@ namespace RegistroCx.Services.Context
             // a menos que sea un cambio explícito de contexto
             if (context.Type == ContextType.FieldWizard || context.Type == ContextType.Confirming)
             {
+                // Una edición o respuesta reconocida por las reglas locales no es cambio de contexto aunque diga "cambiar"
+                if (_localClassifier?.ClassifyWithRules(message, context) is { Label: LocalRelevanceLabel.Relevant })
+                {
+                    Console.WriteLine("[BYPASS-CHECK] Local rules: contextual reply, bypassing");
+                    return true;
+                }
+
                 Console.WriteLine($"[BYPASS-CHECK] In {context.Type} mode, checking for explicit context switch...");
                 var explicitSwitch = DetectExplicitContextSwitch(message);
                 var shouldBypass = !explicitSwitch.IsExplicitSwitch;
@@ -209,6 +254,46 @@ namespace RegistroCx.Services.Context
 
         // ===== MÉTODOS PRIVADOS =====
 
+        /// <summary>
+        /// Veredicto del clasificador local (reglas y modelo), una vez por mensaje. null si no está activo o no alcanza la confianza.
+        /// </summary>
+        private LocalRelevanceVerdict? ClassifyLocally(string message, ConversationContext context)
+        {
+            if (_localClassifier == null || context.Type == ContextType.None)
+            {
+                return null;
+            }
+
+            if (_lastLocal is { } last && last.Message == message && ReferenceEquals(last.Context, context))
+            {
+                return last.Verdict;
+            }
+
+            using var timer = BotMetrics.Time(BotMetrics.ContextClassification);
+            var verdict = _localClassifier.Classify(message, context);
+            timer.Success();
+
+            _lastLocal = (message, context, verdict);
+            BotMetrics.Increment(verdict == null ? "context_local_unsure"
+                : verdict.Tier == LocalRelevanceClassifier.RulesTier ? "context_local_rules" : "context_local_model");
+            Console.WriteLine(verdict == null
+                ? "[CONTEXT-LOCAL] Sin confianza suficiente, se consulta al LLM"
+                : $"[CONTEXT-LOCAL] {verdict.Label} ({verdict.Tier}, {verdict.Confidence:F2}): {verdict.Reason}");
+            return verdict;
+        }
+
+        private static ContextRelevance ToRelevance(LocalRelevanceVerdict verdict)
+        {
+            return new ContextRelevance
+            {
+                IsRelevant = verdict.Label == LocalRelevanceLabel.Relevant,
+                ConfidenceScore = verdict.Confidence,
+                Reason = verdict.Reason,
+                // Otra cirugía en medio de la conversación se procesa directo, como lo marca el detector LLM
+                IsExplicitContextSwitch = verdict.Label == LocalRelevanceLabel.NewSurgery
+            };
+        }
+
         private async Task<ContextRelevance> AnalyzeRelevanceWithLLM(string message, ConversationContext context, CancellationToken ct)
         {
             try
@@ -279,7 +364,7 @@ namespace RegistroCx.Services.Context
             httpClient.DefaultRequestHeaders.Authorization = new System.Net.Http.Headers.AuthenticationHeaderValue("Bearer", GetOpenAIApiKey());
             
             var content = new StringContent(jsonBody, System.Text.Encoding.UTF8, "application/json");
-            var response = await httpClient.PostAsync("https://api.openai.com/v1/responses", content, ct);
+            var response = await httpClient.PostAsync(RegistroCx.Helpers.OpenAI.OpenAIEndpoints.Responses, content, ct);
             
             if (!response.IsSuccessStatusCode)
             {
@@ -566,7 +651,7 @@ namespace RegistroCx.Services.Context
             httpClient.DefaultRequestHeaders.Authorization = new System.Net.Http.Headers.AuthenticationHeaderValue("Bearer", GetOpenAIApiKey());
             
             var content = new StringContent(jsonBody, System.Text.Encoding.UTF8, "application/json");
-            var response = await httpClient.PostAsync("https://api.openai.com/v1/responses", content, ct);
+            var response = await httpClient.PostAsync(RegistroCx.Helpers.OpenAI.OpenAIEndpoints.Responses, content, ct);
             
             if (!response.IsSuccessStatusCode)
             {
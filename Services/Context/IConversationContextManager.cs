@@ -19,6 +19,9 @@ namespace RegistroCx.Services.Context
         // Extraer contexto actual de una cita
         ConversationContext ExtractContext(Appointment appointment);
         
+        // Relevancia resuelta localmente (reglas y modelo), sin LLM; null si hay que preguntarle al LLM
+        ContextRelevance? TryClassifyLocally(string message, ConversationContext context);
+        
         // Determinar si un mensaje requiere clasificación de intent global
         bool ShouldBypassIntentClassification(string message, ConversationContext context);
     }
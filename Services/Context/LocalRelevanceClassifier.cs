@@ -0,0 +1,272 @@
+using System;
+using System.Collections.Generic;
+using System.IO;
+using System.Linq;
+using System.Reflection;
+using System.Text.Json;
+using System.Text.RegularExpressions;
+using RegistroCx.Helpers;
+using RegistroCx.Models;
+
+namespace RegistroCx.Services.Context;
+
+public enum LocalRelevanceLabel
+{
+    Relevant,       // Respuesta a lo que se estaba pidiendo
+    NewSurgery,     // Datos de otra cirugía en medio de la conversación
+    Unrelated       // Nada que ver con la cirugía en curso
+}
+
+public record LocalRelevanceVerdict(LocalRelevanceLabel Label, double Confidence, string Tier, string Reason);
+
+/// <summary>
+/// Decide sin LLM si un mensaje dentro de una conversación activa responde a lo que se estaba pidiendo,
+/// trae otra cirugía o no tiene que ver. Primero reglas (ediciones de campo de CamposExistentes, sí/no en la
+/// confirmación, valores con la forma del campo que pide el wizard); si ninguna aplica con confianza, un naive Bayes
+/// entrenado offline con context_relevance_benchmark.py (context_relevance_model.json, recurso embebido).
+/// Devuelve null cuando la confianza no llega al mínimo: esos mensajes siguen yendo al LLM.
+/// </summary>
+public class LocalRelevanceClassifier
+{
+    public const string RulesTier = "rules";
+    public const string ModelTier = "model";
+
+    private const string ModelResource = "RegistroCx.Services.Context.context_relevance_model.json";
+    private const int MaxFieldValueTokens = 4;
+    private const int MinFullSurgeryTokens = 5;
+    // Un texto corto en Lugar/Cirujano/Cirugía/Anestesiólogo puede ser el nombre pedido o "hola", "gracias",
+    // "ver mis cirugías": queda por debajo de cualquier umbral razonable y decide el modelo o el LLM
+    private const double ShortNameConfidence = 0.6;
+
+    private static readonly Regex TokenPattern = new(@"[a-z0-9][a-z0-9/:\-]*", RegexOptions.Compiled);
+    private static readonly Regex DatePattern = new(@"^\d{1,2}[/\-]\d{1,2}(?:[/\-]\d{2,4})?$", RegexOptions.Compiled);
+    private static readonly Regex HourPattern = new(@"^(?:\d{1,2}(?::\d{2})?(?:hs|h|hrs)|\d{1,2}:\d{2})$", RegexOptions.Compiled);
+    private static readonly Regex NumberPattern = new(@"^\d+$", RegexOptions.Compiled);
+    // "cambiá el lugar", "corregime la hora": el verbo y el artículo que TryParseCambioCampo no saca
+    private static readonly Regex EditPrefix = new(
+        @"^(cambia|cambiame|cambiar|cambio|corregi|corregime|corregir|modifica|modificame|modificar|edita|editar|pone|poneme)\s+((el|la|los|las)\s+)?",
+        RegexOptions.Compiled);
+    private static readonly Regex LeadingArticle = new(@"^(el|la|los|las)\s+", RegexOptions.Compiled);
+
+    private static readonly HashSet<string> ConfirmationReplies = new()
+    {
+        "si", "ok", "okey", "dale", "confirmo", "confirmar", "perfecto", "correcto", "listo", "de una",
+        "esta bien", "todo bien", "si confirmo", "ok dale", "si dale",
+        "no", "nope", "cambiar", "editar", "modificar", "corregir"
+    };
+    private static readonly HashSet<string> YesNoReplies = new() { "si", "no", "dale", "ok", "nope" };
+    private static readonly HashSet<string> DateWords = new()
+    {
+        "hoy", "manana", "pasado", "a", "las", "la", "el", "de", "del", "para", "tarde", "temprano", "noche",
+        "lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo", "<fecha>", "<hora>", "<num>"
+    };
+    private static readonly HashSet<string> QuantityWords = new() { "<num>", "una", "uno", "sola", "solo", "dos", "tres", "cuatro", "cinco", "son", "cirugias", "cirugia" };
+    private static readonly HashSet<string> EmptyIndicators = new() { "nadie", "ninguno", "ninguna", "sin", "no", "vacio" };
+    private static readonly HashSet<string> SwitchWords = new()
+    {
+        "nuevo", "nueva", "otra", "otro", "cancelar", "cancela", "reporte", "informe", "semanal", "mensual"
+    };
+
+    private readonly double _minConfidence;
+    private readonly string[] _classes = Array.Empty<string>();
+    private readonly double[] _bias = Array.Empty<double>();
+    private readonly Dictionary<string, double[]> _weights = new();
+
+    public LocalRelevanceClassifier(double minConfidence, string? modelPath = null)
+    {
+        _minConfidence = minConfidence;
+        try
+        {
+            using var stream = OpenModel(modelPath);
+            if (stream == null)
+            {
+                Console.WriteLine("[CONTEXT-LOCAL] ⚠️ Modelo de relevancia no encontrado, solo reglas");
+                return;
+            }
+
+            using var doc = JsonDocument.Parse(stream);
+            var root = doc.RootElement;
+            _classes = root.GetProperty("classes").EnumerateArray().Select(c => c.GetString() ?? "").ToArray();
+            _bias = root.GetProperty("bias").EnumerateArray().Select(b => b.GetDouble()).ToArray();
+            foreach (var feature in root.GetProperty("features").EnumerateObject())
+                _weights[feature.Name] = feature.Value.EnumerateArray().Select(w => w.GetDouble()).ToArray();
+
+            Console.WriteLine($"[CONTEXT-LOCAL] Modelo de relevancia cargado: {_weights.Count} features, confianza mínima {_minConfidence:F2}");
+        }
+        catch (Exception ex) when (ex is JsonException or KeyNotFoundException or IOException or InvalidOperationException)
+        {
+            Console.WriteLine($"[CONTEXT-LOCAL] ⚠️ Modelo de relevancia inválido, solo reglas: {ex.Message}");
+            _weights.Clear();
+        }
+    }
+
+    public bool HasModel => _weights.Count > 0;
+
+    /// <summary>
+    /// Veredicto local para el mensaje en el contexto activo, o null si hay que preguntarle al LLM.
+    /// </summary>
+    public LocalRelevanceVerdict? Classify(string message, ConversationContext context)
+    {
+        if (context.Type == ContextType.None || string.IsNullOrWhiteSpace(message))
+            return null;
+
+        var tokens = Tokens(message);
+        var verdict = ApplyRules(message, tokens, context);
+        if (verdict == null || verdict.Confidence < _minConfidence)
+            verdict = ApplyModel(tokens, context) ?? verdict;
+        return verdict != null && verdict.Confidence >= _minConfidence ? verdict : null;
+    }
+
+    /// <summary>
+    /// Solo las reglas: alcanza para saber si palabras como "cambiar" son una edición y no un cambio de contexto.
+    /// </summary>
+    public LocalRelevanceVerdict? ClassifyWithRules(string message, ConversationContext context)
+    {
+        if (context.Type == ContextType.None || string.IsNullOrWhiteSpace(message))
+            return null;
+        var verdict = ApplyRules(message, Tokens(message), context);
+        return verdict != null && verdict.Confidence >= _minConfidence ? verdict : null;
+    }
+
+    // ------------------------------------------------------------------
+    // Reglas
+    // ------------------------------------------------------------------
+
+    private static LocalRelevanceVerdict? ApplyRules(string message, List<string> tokens, ConversationContext context)
+    {
+        // Fecha, hora y varios datos más: puede ser otra cirugía, lo decide el modelo o el LLM
+        if (LooksLikeFullSurgery(tokens))
+            return null;
+
+        var text = string.Join(' ', tokens);
+
+        // "lugar Hospital Alemán", "cambiá el lugar", "la hora": edición de un campo de la cirugía en curso
+        var edit = LeadingArticle.Replace(EditPrefix.Replace(TextoHelper.Normalizar(message.Trim()), ""), "");
+        if (CamposExistentes.TryParseCambioCampo(edit, out var campo, out _) || CamposExistentes.TryParseSoloCampo(edit, out campo))
+            return Relevant(0.97, $"Edición del campo {campo}");
+
+        if (context.Type == ContextType.Confirming && ConfirmationReplies.Contains(text))
+            return Relevant(0.98, "Respuesta a la confirmación");
+
+        if (context.Type != ContextType.FieldWizard || tokens.Count == 0)
+            return null;
+
+        if (!Enum.TryParse<Appointment.CampoPendiente>(context.CurrentField, ignoreCase: true, out var field))
+            return null;
+
+        switch (field)
+        {
+            case Appointment.CampoPendiente.FechaHora when tokens.All(DateWords.Contains) && tokens.Any(t => t != "el" && t != "la" && t != "a" && t != "las"):
+                return Relevant(0.95, "Fecha u hora para el campo pedido");
+            case Appointment.CampoPendiente.Cantidad when tokens.Count <= 3 && tokens.All(QuantityWords.Contains):
+                return Relevant(0.95, "Cantidad para el campo pedido");
+            case Appointment.CampoPendiente.SeleccionandoAnestesiologoCandidato when tokens is ["<num>"]:
+                return Relevant(0.97, "Número de candidato");
+            case Appointment.CampoPendiente.PreguntandoSiAsignarAnestesiologo when YesNoReplies.Contains(text):
+                return Relevant(0.97, "Sí o no a asignar anestesiólogo");
+            case Appointment.CampoPendiente.Anestesiologo when tokens.Count <= 3 && tokens.Any(EmptyIndicators.Contains):
+                return Relevant(0.95, "Sin anestesiólogo");
+            case Appointment.CampoPendiente.Lugar or Appointment.CampoPendiente.Cirujano or
+                 Appointment.CampoPendiente.Cirugia or Appointment.CampoPendiente.Anestesiologo
+                when tokens.Count <= MaxFieldValueTokens && !tokens.Any(t => t is "<fecha>" or "<hora>" || SwitchWords.Contains(t)):
+                return Relevant(ShortNameConfidence, "Nombre corto para el campo pedido");
+            default:
+                return null;
+        }
+    }
+
+    private static bool LooksLikeFullSurgery(List<string> tokens) =>
+        tokens.Count >= MinFullSurgeryTokens &&
+        tokens.Contains("<hora>") &&
+        (tokens.Contains("<fecha>") || tokens.Contains("hoy") || tokens.Contains("manana"));
+
+    private static LocalRelevanceVerdict Relevant(double confidence, string reason) =>
+        new(LocalRelevanceLabel.Relevant, confidence, RulesTier, reason);
+
+    // ------------------------------------------------------------------
+    // Modelo
+    // ------------------------------------------------------------------
+
+    private LocalRelevanceVerdict? ApplyModel(List<string> tokens, ConversationContext context)
+    {
+        if (!HasModel)
+            return null;
+
+        var scores = (double[])_bias.Clone();
+        var known = 0;
+        foreach (var feature in Features(tokens, context))
+        {
+            if (!_weights.TryGetValue(feature, out var weights))
+                continue;
+            for (int i = 0; i < scores.Length; i++)
+                scores[i] += weights[i];
+            if (!feature.Contains(':'))
+                known++;
+        }
+
+        // Sin ninguna palabra conocida el modelo solo vería el contexto y el largo
+        if (known == 0)
+            return null;
+
+        var best = Array.IndexOf(scores, scores.Max());
+        var top = scores[best];
+        var confidence = 1.0 / scores.Sum(s => Math.Exp(s - top));
+
+        var label = _classes[best] switch
+        {
+            "new_surgery" => LocalRelevanceLabel.NewSurgery,
+            "unrelated" => LocalRelevanceLabel.Unrelated,
+            _ => LocalRelevanceLabel.Relevant
+        };
+        return new LocalRelevanceVerdict(label, confidence, ModelTier, $"Modelo local: {_classes[best]}");
+    }
+
+    /// <summary>
+    /// Las mismas features que context_relevance_benchmark.py: palabras distintas del mensaje (fechas, horas y
+    /// números por su forma), el contexto activo, el campo esperado y el largo.
+    /// </summary>
+    private static IEnumerable<string> Features(List<string> tokens, ConversationContext context)
+    {
+        foreach (var token in tokens.Distinct())
+            yield return token;
+        yield return $"ctx:{context.Type.ToString().ToLowerInvariant()}";
+        if (!string.IsNullOrEmpty(context.CurrentField))
+            yield return $"campo:{context.CurrentField.ToLowerInvariant()}";
+        yield return tokens.Count switch
+        {
+            <= 1 => "len:1",
+            <= 3 => "len:2-3",
+            <= 6 => "len:4-6",
+            _ => "len:7+"
+        };
+    }
+
+    private static List<string> Tokens(string message)
+    {
+        var tokens = new List<string>();
+        foreach (Match match in TokenPattern.Matches(TextoHelper.Normalizar(message)))
+        {
+            var token = match.Value;
+            if (DatePattern.IsMatch(token))
+                tokens.Add("<fecha>");
+            else if (HourPattern.IsMatch(token))
+                tokens.Add("<hora>");
+            else if (NumberPattern.IsMatch(token))
+                tokens.Add("<num>");
+            else
+                tokens.Add(token);
+        }
+        return tokens;
+    }
+
+    private static Stream? OpenModel(string? modelPath)
+    {
+        if (!string.IsNullOrWhiteSpace(modelPath))
+        {
+            if (File.Exists(modelPath))
+                return File.OpenRead(modelPath);
+            Console.WriteLine($"[CONTEXT-LOCAL] ⚠️ CONTEXT_CLASSIFIER_MODEL no existe ({modelPath}), uso el modelo embebido");
+        }
+        return Assembly.GetExecutingAssembly().GetManifestResourceStream(ModelResource);
+    }
+}
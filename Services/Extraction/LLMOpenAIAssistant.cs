@@ -5,6 +5,7 @@ using System.Net.Http.Headers;
 using System.Text;
 using System.Text.Json;
 using System.Threading.Tasks;
+using RegistroCx.Services.Analytics;
 
 namespace RegistroCx.Services.Extraction
 {
@@ -14,6 +15,8 @@ namespace RegistroCx.Services.Extraction
     public class LLMOpenAIAssistant
     {
         private readonly HttpClient _http;
+        private readonly LlmResponseCache? _responseCache;
+        private readonly UserLearningService? _learningService;
         private readonly JsonSerializerOptions _jsonOptions = new JsonSerializerOptions
         {
             PropertyNamingPolicy = JsonNamingPolicy.CamelCase
@@ -39,11 +42,13 @@ namespace RegistroCx.Services.Extraction
         private const string MedicalValidationPromptId      = "pmpt_68b4fab83c488193be663108cbba406309d25333cda30cf9"; 
         private const string MedicalValidationPromptVersion = "1";
 
-        public LLMOpenAIAssistant(string apiKey)
+        public LLMOpenAIAssistant(string apiKey, LlmResponseCache? responseCache = null, UserLearningService? learningService = null)
         {
+            _responseCache = responseCache;
+            _learningService = learningService;
             _http = new HttpClient
             {
-                BaseAddress = new Uri("https://api.openai.com")
+                BaseAddress = new Uri(RegistroCx.Helpers.OpenAI.OpenAIEndpoints.BaseUrl)
             };
             _http.DefaultRequestHeaders.Authorization = new AuthenticationHeaderValue("Bearer", apiKey);
         }
@@ -51,11 +56,22 @@ namespace RegistroCx.Services.Extraction
         /// <summary>
         /// Envía el texto de usuario y la fecha al prompt publicado
         /// y devuelve el JSON de entidades parseado a Dictionary.
+        /// Con chatId los términos aprendidos del usuario entran en la clave del cache de respuestas.
         /// </summary>
         public async Task<Dictionary<string, string>> ExtractWithPublishedPromptAsync(
             string userText,
-            DateTime referenceDate)
+            DateTime referenceDate,
+            long chatId = 0)
         {
+            var cacheKey = await ComputeCacheKeyAsync("extract", chatId, userText, referenceDate, promptContext: null);
+            if (cacheKey != null && _responseCache!.TryGet(cacheKey, out var cached))
+            {
+                Console.WriteLine($"[LLM-CACHE] ✅ Hit for chat {chatId}, skipping /v1/responses");
+                return cached;
+            }
+
+            using var timer = BotMetrics.Time(BotMetrics.LlmExtraction);
+
             // Construyo el input como un string
             var inputText = $"{userText}\n\nFECHA_HOY={referenceDate:dd/MM/yyyy}";
             var body = new
@@ -126,14 +142,29 @@ namespace RegistroCx.Services.Extraction
             if (dict == null)
                 throw new Exception("Falló el parseo del JSON del assistant.");
 
+            if (cacheKey != null)
+                _responseCache!.Store(cacheKey, dict);
+
+            timer.Success();
             return dict;
         }
         
         /// <summary>
         /// Detecta múltiples cirugías usando el prompt específico para múltiples cirugías con validaciones completas
         /// </summary>
-        public async Task<Dictionary<string, string>> ExtractMultipleSurgeriesAsync(string userText, DateTime referenceDate, object? listasObj = null, string? contextPersonalizado = null)
+        public async Task<Dictionary<string, string>> ExtractMultipleSurgeriesAsync(string userText, DateTime referenceDate, object? listasObj = null, string? contextPersonalizado = null, long chatId = 0)
         {
+            // Listas y contexto personalizado van enteros al prompt: entran en la clave como hash
+            var promptContext = $"{(listasObj is null ? "{}" : JsonSerializer.Serialize(listasObj))}\n{contextPersonalizado}";
+            var cacheKey = await ComputeCacheKeyAsync("multi", chatId, userText, referenceDate, promptContext);
+            if (cacheKey != null && _responseCache!.TryGet(cacheKey, out var cached))
+            {
+                Console.WriteLine($"[LLM-CACHE] ✅ Multi-surgery hit for chat {chatId}, skipping /v1/responses");
+                return cached;
+            }
+
+            using var timer = BotMetrics.Time(BotMetrics.LlmExtraction);
+
             // Usar el mismo builder que el prompt principal para mantener consistencia
             var inputText = RegistroCx.Helpers.OpenAI.CirugiaUserMessageBuilder.Build(
                 referenceDate,
@@ -209,7 +240,30 @@ namespace RegistroCx.Services.Extraction
             Console.WriteLine($"[MULTI-SURGERY-LLM] Assistant text to parse: {assistantText.Trim()}");
             
             // Para múltiples cirugías, necesitamos retornar el JSON raw, no parseado
-            return new Dictionary<string, string> { ["raw_response"] = assistantText.Trim() };
+            var result = new Dictionary<string, string> { ["raw_response"] = assistantText.Trim() };
+            if (cacheKey != null)
+                _responseCache!.Store(cacheKey, result);
+
+            timer.Success();
+            return result;
+        }
+
+        /// <summary>
+        /// Clave del cache de respuestas o null si no hay cache configurado
+        /// </summary>
+        private async Task<string?> ComputeCacheKeyAsync(string kind, long chatId, string userText, DateTime referenceDate, string? promptContext)
+        {
+            if (_responseCache == null)
+                return null;
+
+            var substitutions = TermSubstitutions.Empty;
+            if (chatId != 0 && _learningService != null)
+            {
+                substitutions = await _responseCache.GetSubstitutionsAsync(chatId,
+                    async () => new TermSubstitutions(await _learningService.GetTermSubstitutionsAsync(chatId)));
+            }
+
+            return LlmResponseCache.ComputeKey(kind, chatId, userText, referenceDate, substitutions, promptContext);
         }
 
         /// <summary>
@@ -217,6 +271,8 @@ namespace RegistroCx.Services.Extraction
         /// </summary>
         public async Task<string> ClassifyIntentAsync(string userMessage)
         {
+            using var timer = BotMetrics.Time(BotMetrics.IntentClassification);
+
             var body = new
             {
                 prompt = new { id = IntentClassificationPromptId, version = IntentClassificationPromptVersion },
@@ -261,6 +317,7 @@ namespace RegistroCx.Services.Extraction
             if (assistantText == null)
                 throw new Exception("No se encontró respuesta en la clasificación de intent.");
 
+            timer.Success();
             return assistantText.Trim().ToUpper();
         }
 
@@ -0,0 +1,214 @@
+using System;
+using System.Collections.Generic;
+using System.Globalization;
+using System.Linq;
+using System.Security.Cryptography;
+using System.Text;
+using System.Text.RegularExpressions;
+using System.Threading.Tasks;
+using RegistroCx.Helpers;
+using RegistroCx.Services.Analytics;
+
+namespace RegistroCx.Services.Extraction;
+
+/// <summary>
+/// Respuestas de extracción del LLM ya obtenidas, direccionadas por el input normalizado:
+/// minúsculas y sin acentos, "hoy"/"mañana"/"pasado mañana" resueltos a dd/MM/yyyy contra la
+/// fecha de referencia, y los términos aprendidos del usuario reemplazados por su forma estándar.
+/// La clave suma un hash del contexto del prompt (listas y contexto personalizado).
+/// Se expulsa por cantidad (el menos usado primero) y por TTL. Cuando cambian los términos aprendidos
+/// de un usuario solo se vuelve a leer su tabla de reemplazos: si un texto se normaliza distinto su clave
+/// cambia sola, y los que no tocan los términos nuevos siguen saliendo del cache.
+/// </summary>
+public class LlmResponseCache
+{
+    // Subir cuando cambie el prompt publicado o el formato de la respuesta: invalida todo lo cacheado
+    private const string PromptVersion = "1";
+
+    private static readonly Regex Whitespace = new(@"\s+", RegexOptions.Compiled);
+    private static readonly Regex PasadoManana = new(@"\bpasado\s+manana\b", RegexOptions.Compiled);
+    private static readonly Regex Manana = new(@"\bmanana\b", RegexOptions.Compiled);
+    private static readonly Regex Hoy = new(@"\bhoy\b", RegexOptions.Compiled);
+    private static readonly Regex FullDate = new(@"\b\d{1,2}/\d{1,2}/\d{4}\b", RegexOptions.Compiled);
+    private static readonly Regex PartialDate = new(@"\b\d{1,2}[/\-]\d{1,2}(?![/\-]?\d)", RegexOptions.Compiled);
+    // Lo que el LLM resuelve contra FECHA_HOY y acá no se traduce: la fecha de referencia queda en la clave
+    private static readonly Regex UnresolvedDateWords = new(
+        @"\b(ayer|anteayer|lunes|martes|miercoles|jueves|viernes|sabado|domingo|semana|proxim[oa]|siguiente|viene|mes)\b",
+        RegexOptions.Compiled);
+
+    private readonly int _maxEntries;
+    private readonly TimeSpan _ttl;
+    private readonly object _lock = new();
+    private readonly Dictionary<string, LinkedListNode<CacheEntry>> _entries = new();
+    private readonly LinkedList<CacheEntry> _lru = new();   // Más reciente al principio
+    private readonly Dictionary<long, (TermSubstitutions Terms, DateTime ExpiresAt)> _substitutions = new();
+
+    public LlmResponseCache(int maxEntries, TimeSpan ttl)
+    {
+        _maxEntries = Math.Max(maxEntries, 1);
+        _ttl = ttl;
+        BotMetrics.RegisterGauge("llm_cache_entries", () => { lock (_lock) return _entries.Count; });
+        Console.WriteLine($"[LLM-CACHE] Máximo {_maxEntries} respuestas, TTL {_ttl.TotalMinutes:F0} min");
+    }
+
+    /// <summary>
+    /// Clave para una llamada de extracción. kind separa prompts distintos (single / multi).
+    /// </summary>
+    public static string ComputeKey(string kind, long chatId, string userText, DateTime referenceDate,
+        TermSubstitutions substitutions, string? promptContext = null)
+    {
+        var normalized = NormalizeInput(userText, referenceDate, substitutions, out var dependsOnReferenceDate);
+
+        var sb = new StringBuilder();
+        sb.Append(PromptVersion).Append('\n')
+          .Append(kind).Append('\n')
+          .Append(chatId.ToString(CultureInfo.InvariantCulture)).Append('\n')
+          .Append(dependsOnReferenceDate ? referenceDate.ToString("yyyy-MM-dd", CultureInfo.InvariantCulture) : "-").Append('\n')
+          .Append(normalized).Append('\n')
+          .Append(promptContext ?? string.Empty);
+
+        return Convert.ToHexString(SHA256.HashData(Encoding.UTF8.GetBytes(sb.ToString()))).ToLowerInvariant();
+    }
+
+    /// <summary>
+    /// Forma canónica del input. dependsOnReferenceDate es false solo si todas las fechas del texto
+    /// quedaron completas (dd/MM/yyyy) y no hay otras referencias relativas: ahí la misma respuesta
+    /// sirve cualquier día.
+    /// </summary>
+    public static string NormalizeInput(string userText, DateTime referenceDate, TermSubstitutions substitutions,
+        out bool dependsOnReferenceDate)
+    {
+        var text = Whitespace.Replace(TextoHelper.Normalizar(userText), " ").Trim();
+
+        // Fechas relativas primero: un término aprendido nunca pisa "mañana"
+        text = PasadoManana.Replace(text, referenceDate.AddDays(2).ToString("dd/MM/yyyy", CultureInfo.InvariantCulture));
+        text = Manana.Replace(text, referenceDate.AddDays(1).ToString("dd/MM/yyyy", CultureInfo.InvariantCulture));
+        text = Hoy.Replace(text, referenceDate.ToString("dd/MM/yyyy", CultureInfo.InvariantCulture));
+
+        dependsOnReferenceDate = !FullDate.IsMatch(text) || PartialDate.IsMatch(text) || UnresolvedDateWords.IsMatch(text);
+
+        return substitutions.Apply(text);
+    }
+
+    public bool TryGet(string key, out Dictionary<string, string> response)
+    {
+        lock (_lock)
+        {
+            if (_entries.TryGetValue(key, out var node))
+            {
+                if (node.Value.ExpiresAt > DateTime.UtcNow)
+                {
+                    _lru.Remove(node);
+                    _lru.AddFirst(node);
+                    response = new Dictionary<string, string>(node.Value.Response);
+                    BotMetrics.Increment("llm_cache_hit");
+                    return true;
+                }
+
+                RemoveNode(node);
+                BotMetrics.Increment("llm_cache_expired");
+            }
+        }
+
+        response = new Dictionary<string, string>();
+        BotMetrics.Increment("llm_cache_miss");
+        return false;
+    }
+
+    public void Store(string key, Dictionary<string, string> response)
+    {
+        lock (_lock)
+        {
+            if (_entries.TryGetValue(key, out var existing))
+                RemoveNode(existing);
+
+            var node = _lru.AddFirst(new CacheEntry(key, new Dictionary<string, string>(response), DateTime.UtcNow.Add(_ttl)));
+            _entries[key] = node;
+
+            while (_entries.Count > _maxEntries && _lru.Last != null)
+            {
+                RemoveNode(_lru.Last);
+                BotMetrics.Increment("llm_cache_evicted");
+            }
+        }
+    }
+
+    /// <summary>
+    /// Términos aprendidos del usuario para normalizar, cacheados con el mismo TTL que las respuestas.
+    /// </summary>
+    public async Task<TermSubstitutions> GetSubstitutionsAsync(long chatId, Func<Task<TermSubstitutions>> load)
+    {
+        lock (_lock)
+        {
+            if (_substitutions.TryGetValue(chatId, out var cached) && cached.ExpiresAt > DateTime.UtcNow)
+                return cached.Terms;
+        }
+
+        var terms = await load();
+        lock (_lock)
+        {
+            var now = DateTime.UtcNow;
+            if (_substitutions.Count >= _maxEntries)
+            {
+                foreach (var expired in _substitutions.Where(s => s.Value.ExpiresAt <= now).Select(s => s.Key).ToList())
+                    _substitutions.Remove(expired);
+            }
+            _substitutions[chatId] = (terms, now.Add(_ttl));
+        }
+        return terms;
+    }
+
+    /// <summary>
+    /// Cambiaron los términos aprendidos del usuario: la próxima clave se arma con la tabla nueva.
+    /// Las respuestas no se tocan, la tabla va dentro de la clave.
+    /// </summary>
+    public void RefreshSubstitutions(long chatId)
+    {
+        lock (_lock)
+            _substitutions.Remove(chatId);
+    }
+
+    // Llamar con _lock tomado
+    private void RemoveNode(LinkedListNode<CacheEntry> node)
+    {
+        _lru.Remove(node);
+        _entries.Remove(node.Value.Key);
+    }
+
+    private record CacheEntry(string Key, Dictionary<string, string> Response, DateTime ExpiresAt);
+}
+
+/// <summary>
+/// Términos aprendidos de un usuario ya normalizados (término -> forma estándar), aplicados por palabra completa
+/// y del más largo al más corto.
+/// </summary>
+public class TermSubstitutions
+{
+    public static readonly TermSubstitutions Empty = new(new Dictionary<string, string>());
+
+    private readonly Dictionary<string, string> _terms;
+    private readonly Regex? _pattern;
+
+    public TermSubstitutions(Dictionary<string, string> terms)
+    {
+        _terms = terms
+            .Select(t => (Term: CollapseSpaces(TextoHelper.Normalizar(t.Key)), Standard: CollapseSpaces(TextoHelper.Normalizar(t.Value))))
+            .Where(t => t.Term.Length > 0 && t.Standard.Length > 0 && t.Term != t.Standard)
+            .GroupBy(t => t.Term)
+            .ToDictionary(g => g.Key, g => g.First().Standard);
+
+        if (_terms.Count > 0)
+        {
+            var alternation = string.Join("|", _terms.Keys.OrderByDescending(k => k.Length).Select(Regex.Escape));
+            // Sin Compiled: se arma una vez por usuario y TTL, no vale la pena compilarla
+            _pattern = new Regex($@"\b(?:{alternation})\b");
+        }
+    }
+
+    public int Count => _terms.Count;
+
+    public string Apply(string normalizedText) =>
+        _pattern == null ? normalizedText : _pattern.Replace(normalizedText, m => _terms[m.Value]);
+
+    private static string CollapseSpaces(string text) => string.Join(' ', text.Split(' ', StringSplitOptions.RemoveEmptyEntries));
+}
@@ -0,0 +1,352 @@
+using System;
+using System.Collections.Generic;
+using System.Globalization;
+using System.Linq;
+using System.Text.RegularExpressions;
+using System.Threading;
+using System.Threading.Tasks;
+using RegistroCx.Domain;
+using RegistroCx.Helpers;
+using RegistroCx.Services.Analytics;
+using RegistroCx.Services.Caching;
+using RegistroCx.Services.Repositories;
+
+namespace RegistroCx.Services.Extraction;
+
+/// <summary>
+/// Extracción local, sin LLM, para el primer mensaje de una cirugía nueva cuando todos los campos
+/// se reconocen con certeza: cirugía, lugar y cirujano conocidos (listas del cache y términos
+/// aprendidos del usuario), fecha (hoy / mañana / pasado mañana / dd/mm[/aaaa]) y hora explícitas.
+/// Cualquier palabra que no se entiende, dato repetido o ambiguo, o fecha inválida deja el mensaje
+/// para el LLM: solo se saltea cuando el resultado sería el mismo.
+/// </summary>
+public class LocalFastPathExtractor
+{
+    // Términos aprendidos que cuentan como seguros: confianza alta y usados más de una vez
+    private const decimal MinTermConfidence = 0.7m;
+    private const int MinTermFrequency = 2;
+    private static readonly TimeSpan LearnedTermsExpiration = TimeSpan.FromMinutes(5);
+
+    private const int MaxPhraseTokens = 4;
+    private const int MaxCantidad = 20;
+
+    private const string FieldCirugia = "cirugia";
+    private const string FieldLugar = "lugar";
+    private const string FieldCirujano = "cirujano";
+
+    // Catálogo base: forma normalizada -> nombre estándar
+    private static readonly Dictionary<string, string> BaseSurgeries = new()
+    {
+        ["cers"] = "CERS",
+        ["mld"] = "MLD",
+        ["faco"] = "FACOEMULSIFICACION",
+        ["facoemulsificacion"] = "FACOEMULSIFICACION",
+        ["cataratas"] = "FACOEMULSIFICACION",
+        ["adenoides"] = "ADENOIDECTOMIA",
+        ["adenoidectomia"] = "ADENOIDECTOMIA",
+        ["amigdalas"] = "AMIGDALECTOMIA",
+        ["amigdalectomia"] = "AMIGDALECTOMIA",
+        ["apendicectomia"] = "APENDICECTOMIA",
+        ["colecistectomia"] = "COLECISTECTOMIA",
+        ["hernioplastia"] = "HERNIOPLASTIA",
+        ["artroscopia"] = "ARTROSCOPIA",
+        ["cesarea"] = "CESAREA",
+        ["septoplastia"] = "SEPTOPLASTIA",
+        ["vitrectomia"] = "VITRECTOMIA"
+    };
+
+    private static readonly HashSet<string> Stopwords = new() { "con", "en", "el", "la", "los", "las", "a", "de", "del", "al", "para", "por" };
+    private static readonly HashSet<string> Titles = new() { "dr", "dra", "doctor", "doctora" };
+    private static readonly HashSet<string> HourSuffixes = new() { "hs", "h", "hrs", "horas" };
+    private static readonly Dictionary<string, int> RelativeDays = new() { ["hoy"] = 0, ["manana"] = 1 };
+
+    private static readonly Regex DateToken = new(@"^(\d{1,2})[/\-](\d{1,2})(?:[/\-](\d{4}|\d{2}))?$", RegexOptions.Compiled);
+    private static readonly Regex HourToken = new(@"^(\d{1,2})(?::(\d{2}))?(hs|h|hrs)?$", RegexOptions.Compiled);
+    private static readonly Regex NumberToken = new(@"^\d{1,2}$", RegexOptions.Compiled);
+
+    private readonly ICacheService _cache;
+    private readonly IUserLearningRepository _learningRepo;
+
+    public LocalFastPathExtractor(ICacheService cache, IUserLearningRepository learningRepo)
+    {
+        _cache = cache;
+        _learningRepo = learningRepo;
+    }
+
+    public class Result
+    {
+        public bool Matched { get; init; }
+        public Dictionary<string, string> Fields { get; init; } = new();   // Mismas claves que devuelve el LLM
+        public string? MissReason { get; init; }
+    }
+
+    /// <summary>
+    /// Devuelve los campos con las claves del prompt de extracción (dia, mes, anio, hora, lugar,
+    /// cirujano, cirugia, cantidad) o Matched = false con el motivo para el log.
+    /// </summary>
+    public async Task<Result> TryExtractAsync(string text, long chatId, DateTime referenceDate, CancellationToken ct)
+    {
+        using var timer = BotMetrics.Time(BotMetrics.FastPathExtraction);
+
+        Result result;
+        try
+        {
+            var lexicon = await BuildLexiconAsync(chatId, ct);
+            result = Extract(Tokenize(text), lexicon, referenceDate);
+        }
+        catch (Exception ex) when (ex is not OperationCanceledException)
+        {
+            // Sin listas o términos aprendidos no hay certeza: sigue el LLM
+            result = Miss($"error: {ex.Message}");
+        }
+
+        BotMetrics.Increment(result.Matched ? "llm_fast_path_hit" : "llm_fast_path_miss");
+        Console.WriteLine(result.Matched
+            ? $"[FAST-PATH] ✅ Chat {chatId}: {string.Join(", ", result.Fields.Select(kv => $"{kv.Key}={kv.Value}"))}"
+            : $"[FAST-PATH] Chat {chatId} va al LLM: {result.MissReason}");
+        timer.Success();
+        return result;
+    }
+
+    private static Result Extract(List<string> tokens, Lexicon lexicon, DateTime referenceDate)
+    {
+        if (tokens.Count == 0)
+            return Miss("mensaje vacío");
+
+        var fields = new Dictionary<string, string>();
+        DateTime? fecha = null;
+        TimeSpan? hora = null;
+        int? cantidad = null;
+
+        int i = 0;
+        while (i < tokens.Count)
+        {
+            var token = tokens[i];
+            var next = i + 1 < tokens.Count ? tokens[i + 1] : null;
+
+            if (Stopwords.Contains(token))
+            {
+                i++;
+                continue;
+            }
+
+            // Fecha
+            if ((token == "pasado" && next == "manana") || RelativeDays.ContainsKey(token))
+            {
+                if (fecha != null) return Miss("fecha repetida");
+                var days = token == "pasado" ? 2 : RelativeDays[token];
+                fecha = referenceDate.Date.AddDays(days);
+                i += token == "pasado" ? 2 : 1;
+                continue;
+            }
+
+            var dateMatch = DateToken.Match(token);
+            if (dateMatch.Success)
+            {
+                if (fecha != null) return Miss("fecha repetida");
+                fecha = ParseDate(dateMatch, referenceDate);
+                if (fecha == null) return Miss($"fecha inválida '{token}'");
+                i++;
+                continue;
+            }
+
+            // Hora: "14hs", "16:30", "14 hs"; un número suelto solo vale como cantidad antes de la cirugía
+            var hourMatch = HourToken.Match(token);
+            var hourWithSuffix = hourMatch.Success && next != null && HourSuffixes.Contains(next) && !hourMatch.Groups[3].Success;
+            if (hourMatch.Success && (hourMatch.Groups[2].Success || hourMatch.Groups[3].Success || hourWithSuffix))
+            {
+                if (hora != null) return Miss("hora repetida");
+                hora = ParseHour(hourMatch);
+                if (hora == null) return Miss($"hora inválida '{token}'");
+                i += hourWithSuffix ? 2 : 1;
+                continue;
+            }
+
+            if (NumberToken.IsMatch(token))
+            {
+                var surgery = lexicon.Match(tokens, i + 1, titled: false);
+                if (surgery?.Field != FieldCirugia)
+                    return Miss($"número sin cirugía '{token}'");
+                if (cantidad != null) return Miss("cantidad repetida");
+                cantidad = int.Parse(token, CultureInfo.InvariantCulture);
+                if (cantidad < 1 || cantidad > MaxCantidad) return Miss($"cantidad fuera de rango {cantidad}");
+                i++;
+                continue;
+            }
+
+            // "Dr. García": después del título también valen apellidos sueltos y términos aprendidos
+            var titled = Titles.Contains(token);
+            var start = titled ? i + 1 : i;
+            var match = lexicon.Match(tokens, start, titled);
+            if (match == null)
+                return Miss(titled ? $"cirujano desconocido después de '{token}'" : $"palabra desconocida '{token}'");
+            if (match.Value == null)
+                return Miss($"término ambiguo '{string.Join(' ', tokens.Skip(start).Take(match.Length))}'");
+            if (titled && match.Field != FieldCirujano)
+                return Miss($"'{token}' seguido de {match.Field}");
+            if (!fields.TryAdd(match.Field, match.Value))
+                return Miss($"{match.Field} repetido");
+
+            i = start + match.Length;
+        }
+
+        if (!fields.ContainsKey(FieldCirugia)) return Miss("falta cirugía");
+        if (!fields.ContainsKey(FieldLugar)) return Miss("falta lugar");
+        if (!fields.ContainsKey(FieldCirujano)) return Miss("falta cirujano");
+        if (fecha == null) return Miss("falta fecha");
+        if (hora == null) return Miss("falta hora");
+
+        var fechaHora = fecha.Value.Add(hora.Value);
+        var (ok, error) = FechasHelper.ValidarFechaCirugia(fechaHora, referenceDate);
+        if (!ok) return Miss(error ?? "fecha fuera de rango");
+
+        fields["dia"] = fechaHora.Day.ToString(CultureInfo.InvariantCulture);
+        fields["mes"] = fechaHora.Month.ToString(CultureInfo.InvariantCulture);
+        fields["anio"] = fechaHora.Year.ToString(CultureInfo.InvariantCulture);
+        fields["hora"] = fechaHora.ToString("HH:mm", CultureInfo.InvariantCulture);
+        fields["cantidad"] = (cantidad ?? 1).ToString(CultureInfo.InvariantCulture);
+        return new Result { Matched = true, Fields = fields };
+    }
+
+    private static Result Miss(string reason) => new() { Matched = false, MissReason = reason };
+
+    private static DateTime? ParseDate(Match match, DateTime referenceDate)
+    {
+        var day = int.Parse(match.Groups[1].Value, CultureInfo.InvariantCulture);
+        var month = int.Parse(match.Groups[2].Value, CultureInfo.InvariantCulture);
+        var year = referenceDate.Year;
+        if (match.Groups[3].Success)
+        {
+            year = int.Parse(match.Groups[3].Value, CultureInfo.InvariantCulture);
+            if (year < 100) year += 2000;
+        }
+
+        if (month < 1 || month > 12 || day < 1 || day > DateTime.DaysInMonth(year, month))
+            return null;
+        return new DateTime(year, month, day);
+    }
+
+    private static TimeSpan? ParseHour(Match match)
+    {
+        var hours = int.Parse(match.Groups[1].Value, CultureInfo.InvariantCulture);
+        var minutes = match.Groups[2].Success ? int.Parse(match.Groups[2].Value, CultureInfo.InvariantCulture) : 0;
+        if (hours > 23 || minutes > 59)
+            return null;
+        return new TimeSpan(hours, minutes, 0);
+    }
+
+    // ------------------------------------------------------------------
+    // Vocabulario
+    // ------------------------------------------------------------------
+
+    private async Task<Lexicon> BuildLexiconAsync(long chatId, CancellationToken ct)
+    {
+        var lexicon = new Lexicon();
+
+        foreach (var (term, standard) in BaseSurgeries)
+            lexicon.Add(term, FieldCirugia, standard, titled: false);
+        foreach (var place in await _cache.GetLocationNamesAsync(ct))
+            lexicon.Add(place, FieldLugar, place, titled: false);
+        foreach (var surgeon in await _cache.GetSurgeonNamesAsync(ct))
+        {
+            var name = StripTitle(surgeon);
+            var words = name.Split(' ', StringSplitOptions.RemoveEmptyEntries);
+            if (words.Length == 0)
+                continue;
+            // Nombre y apellido valen sueltos; el apellido solo, únicamente después de "Dr."/"Dra."
+            if (words.Length > 1)
+                lexicon.Add(name, FieldCirujano, name, titled: false);
+            lexicon.Add(words[^1], FieldCirujano, name, titled: true);
+        }
+
+        // Términos aprendidos: nunca pisan el catálogo ni las listas, y los de cirujanos piden título
+        // (LearnSurgeonTerms guarda cualquier palabra con mayúscula del mensaje)
+        var learned = await _cache.GetOrCreateAsync(
+            $"fast_path_terms_{chatId}",
+            () => _learningRepo.GetHighConfidenceTermsAsync(chatId, MinTermConfidence, ct),
+            LearnedTermsExpiration,
+            ct);
+        foreach (var term in learned.Where(t => t.Frequency >= MinTermFrequency))
+        {
+            switch (term.TermType)
+            {
+                case TermTypes.Surgery:
+                    lexicon.AddLearned(term.UserTerm, FieldCirugia, term.StandardTerm, titled: false);
+                    break;
+                case TermTypes.Place:
+                    lexicon.AddLearned(term.UserTerm, FieldLugar, term.StandardTerm, titled: false);
+                    break;
+                case TermTypes.Surgeon:
+                    lexicon.AddLearned(term.UserTerm, FieldCirujano, StripTitle(term.StandardTerm), titled: true);
+                    break;
+            }
+        }
+
+        return lexicon;
+    }
+
+    private static string StripTitle(string name) =>
+        Regex.Replace(name.Trim(), @"^(dra?|doctora?)\.?\s+", "", RegexOptions.IgnoreCase);
+
+    /// <summary>
+    /// Minúsculas, sin acentos ni signos alrededor de cada palabra; "/" y ":" se conservan para fechas y horas.
+    /// Lo que queda vacío (emojis, puntuación suelta) se descarta.
+    /// </summary>
+    private static List<string> Tokenize(string text)
+    {
+        var tokens = new List<string>();
+        foreach (var raw in TextoHelper.Normalizar(text).Split((char[]?)null, StringSplitOptions.RemoveEmptyEntries))
+        {
+            var token = raw.Trim(',', '.', ';', '!', '?', '¡', '¿', '(', ')', '"', '\'');
+            if (token.Length > 0 && token.Any(char.IsLetterOrDigit))
+                tokens.Add(token);
+            else if (token.Length > 0 && token.Any(c => c < 128))
+                tokens.Add(token);   // Símbolos ASCII sueltos ("+", "<"): palabra desconocida
+        }
+        return tokens;
+    }
+
+    private record LexiconMatch(string Field, string? Value, int Length);
+
+    /// <summary>
+    /// Frases normalizadas -> (campo, valor estándar). Una frase con dos significados queda
+    /// marcada como ambigua (Value = null) y manda el mensaje al LLM.
+    /// </summary>
+    private class Lexicon
+    {
+        private readonly Dictionary<string, (string Field, string? Value)> _general = new();
+        private readonly Dictionary<string, (string Field, string? Value)> _titled = new();
+
+        public void Add(string phrase, string field, string value, bool titled) =>
+            Put(titled ? _titled : _general, phrase, field, value, overwrite: true);
+
+        public void AddLearned(string phrase, string field, string value, bool titled) =>
+            Put(titled ? _titled : _general, phrase, field, value, overwrite: false);
+
+        private static void Put(Dictionary<string, (string Field, string? Value)> target, string phrase, string field,
+            string value, bool overwrite)
+        {
+            var key = string.Join(' ', Tokenize(phrase));
+            if (key.Length == 0 || string.IsNullOrWhiteSpace(value))
+                return;
+            if (!target.TryGetValue(key, out var existing))
+                target[key] = (field, value);
+            else if (overwrite && (existing.Field != field || !string.Equals(existing.Value, value, StringComparison.OrdinalIgnoreCase)))
+                target[key] = (field, null);
+        }
+
+        /// <summary>
+        /// Frase más larga que empieza en start; después de un título se prueban también apellidos y términos aprendidos.
+        /// </summary>
+        public LexiconMatch? Match(List<string> tokens, int start, bool titled)
+        {
+            for (int length = Math.Min(MaxPhraseTokens, tokens.Count - start); length >= 1; length--)
+            {
+                var key = string.Join(' ', tokens.Skip(start).Take(length));
+                if (_general.TryGetValue(key, out var entry) || titled && _titled.TryGetValue(key, out entry))
+                    return new LexiconMatch(entry.Field, entry.Value, length);
+            }
+            return null;
+        }
+    }
+}
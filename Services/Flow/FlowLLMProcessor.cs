@@ -53,7 +53,7 @@ public class FlowLLMProcessor
         var (textoParaLLM, tipoOperacion) = LLMContextManager.CrearContextoInteligente(appt, rawText, DateTime.Today);
 
         // Extracción con LLM
-        var dict = await _llm.ExtractWithPublishedPromptAsync(textoParaLLM, DateTime.Today);
+        var dict = await _llm.ExtractWithPublishedPromptAsync(textoParaLLM, DateTime.Today, chatId);
 
         // Procesar respuesta según el tipo
         if (tipoOperacion == LLMContextManager.TipoOperacion.NormalizarCampo)
@@ -297,7 +297,7 @@ public class FlowLLMProcessor
         var (textoParaLLM, tipoOperacion) = LLMContextManager.CrearContextoInteligente(appt, rawText, DateTime.Today);
 
         // Extracción con LLM
-        var dict = await _llm.ExtractWithPublishedPromptAsync(textoParaLLM, DateTime.Today);
+        var dict = await _llm.ExtractWithPublishedPromptAsync(textoParaLLM, DateTime.Today, chatId);
 
         // Usar el método selectivo que preserva campos existentes
         ApplyOnlyProvidedFields(appt, dict);
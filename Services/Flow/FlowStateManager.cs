@@ -1,24 +1,21 @@
+using System.Collections.Concurrent;
 using RegistroCx.Models;
 
 namespace RegistroCx.Services.Flow;
 
 public class FlowStateManager
 {
-    private readonly Dictionary<long, Appointment> _pending;
+    private readonly ConcurrentDictionary<long, Appointment> _pending;
 
-    public FlowStateManager(Dictionary<long, Appointment> pending)
+    public FlowStateManager(ConcurrentDictionary<long, Appointment> pending)
     {
         _pending = pending;
     }
 
+    // Compartido entre los workers de UpdateDispatcher y las transcripciones: acceso concurrente por chats distintos
     public Appointment GetOrCreateAppointment(long chatId)
     {
-        if (!_pending.TryGetValue(chatId, out var appt))
-        {
-            appt = new Appointment { ChatId = chatId };
-            _pending[chatId] = appt;
-        }
-        return appt;
+        return _pending.GetOrAdd(chatId, id => new Appointment { ChatId = id });
     }
 
     public void SetAppointment(long chatId, Appointment appointment)
@@ -29,10 +26,7 @@ public class FlowStateManager
 
     public void ClearContext(long chatId)
     {
-        if (_pending.ContainsKey(chatId))
-        {
-            _pending.Remove(chatId);
-        }
+        _pending.TryRemove(chatId, out _);
     }
 
     public int GetActiveConversationsCount()
@@ -56,7 +50,7 @@ public class FlowStateManager
 
         foreach (var chatId in chatIdsAEliminar)
         {
-            _pending.Remove(chatId);
+            _pending.TryRemove(chatId, out _);
         }
     }
 
@@ -372,7 +372,7 @@ public class FlowWizardHandler
     }
 
     /// <summary>
-    /// Maneja la búsqueda de anestesiólogos con LLM
+    /// Maneja la búsqueda de anestesiólogos (índice de nombres, o LLM si NAME_INDEX=false)
     /// </summary>
     private async Task<bool> HandleAnesthesiologistSearch(ITelegramBotClient bot, Appointment appt, string rawText, long chatId, CancellationToken ct)
     {
@@ -386,8 +386,8 @@ public class FlowWizardHandler
                 return false;
             }
 
-            // Buscar candidatos con LLM
-            var candidates = await _anesthesiologistSearchService!.SearchByPartialNameAsync(rawText, userProfile.GoogleEmail);
+            // Buscar candidatos en el índice de nombres del equipo (o con LLM si está desactivado)
+            var candidates = await _anesthesiologistSearchService!.SearchByPartialNameAsync(rawText, userProfile.GoogleEmail, chatId);
             
             if (candidates.Count == 0)
             {
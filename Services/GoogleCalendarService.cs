@@ -5,9 +5,11 @@ using System.Threading.Tasks;
 using Google.Apis.Auth.OAuth2;
 using Google.Apis.Calendar.v3;
 using Google.Apis.Calendar.v3.Data;
+using Google.Apis.Requests;
 using Google.Apis.Services;
 using RegistroCx.Models;
 using RegistroCx.Services.Repositories;
+using RegistroCx.Services.Analytics;
 using RegistroCx.Helpers._0Auth;
 using Google;
 
@@ -15,60 +17,53 @@ namespace RegistroCx.Services;
 
 public class GoogleCalendarService : IGoogleCalendarService
 {
+    private const string DefaultTimeZone = "America/Argentina/Buenos_Aires";
+
+    // IDs propios para los eventos: reintentar un lote no duplica (el insert repetido da 409).
+    // Google exige base32hex (0-9, a-v) y al menos 5 caracteres
+    public const string EventIdPrefix = "regcir";
+    private const string AppointmentIdProperty = "registrocx_appointment_id";
+
+    // Google recomienda no más de 50 requests por lote; cada uno cuenta igual para la cuota
+    private const int MaxBatchSize = 50;
+    private const int MaxBatchAttempts = 4;
+
     private readonly IUserProfileRepository _userRepo;
     private readonly IGoogleOAuthService _oauthService;
+    private readonly string? _baseUri;
+    private readonly string _batchUri;
+    private readonly int _batchConcurrency;
 
-    public GoogleCalendarService(IUserProfileRepository userRepo, IGoogleOAuthService oauthService)
+    /// <param name="apiBaseUrl">GOOGLE_CALENDAR_API_URL (ej. fake_calendar_api.py); null = API real</param>
+    /// <param name="batchConcurrency">Lotes en vuelo por usuario (CALENDAR_BATCH_CONCURRENCY)</param>
+    public GoogleCalendarService(IUserProfileRepository userRepo, IGoogleOAuthService oauthService,
+        string? apiBaseUrl = null, int batchConcurrency = 2)
     {
         _userRepo = userRepo;
         _oauthService = oauthService;
+        _baseUri = string.IsNullOrWhiteSpace(apiBaseUrl) ? null : apiBaseUrl.TrimEnd('/') + "/calendar/v3/";
+        _batchUri = string.IsNullOrWhiteSpace(apiBaseUrl)
+            ? "https://www.googleapis.com/batch/calendar/v3"
+            : apiBaseUrl.TrimEnd('/') + "/batch/calendar/v3";
+        _batchConcurrency = Math.Max(1, batchConcurrency);
     }
 
+    public static string EventIdFor(long appointmentId) => $"{EventIdPrefix}{appointmentId:D8}";
+
     public async Task<string> CreateAppointmentEventAsync(
         Appointment appointment, 
         long chatId, 
         CancellationToken ct)
     {
-        return await ExecuteWithAuthRetryAsync(chatId, async calendarService =>
+        using var timer = BotMetrics.Time(BotMetrics.CalendarSync);
+        var eventId = await ExecuteWithAuthRetryAsync(chatId, async calendarService =>
         {
             // Obtener zona horaria del usuario
             var userProfile = await _userRepo.GetAsync(chatId, ct);
-            var userTimeZone = userProfile?.TimeZone ?? "America/Argentina/Buenos_Aires";
+            var userTimeZone = userProfile?.TimeZone ?? DefaultTimeZone;
             
             // Crear el evento
-            var calendarEvent = new Event
-            {
-                Summary = BuildEventTitle(appointment),
-                Description = BuildEventDescription(appointment),
-                Location = appointment.Lugar,
-                Start = new EventDateTime
-                {
-                    DateTimeDateTimeOffset = CreateUserDateTime(appointment.FechaHora ?? DateTime.Now, userTimeZone),
-                    TimeZone = userTimeZone
-                },
-                End = new EventDateTime
-                {
-                    DateTimeDateTimeOffset = CreateUserDateTime(appointment.FechaHora?.AddHours(2) ?? DateTime.Now.AddHours(2), userTimeZone), // Duración estimada de 2 horas
-                    TimeZone = userTimeZone
-                },
-                Reminders = new Event.RemindersData
-                {
-                    UseDefault = false,
-                    Overrides = new List<EventReminder>
-                    {
-                        new EventReminder
-                        {
-                            Method = "popup",
-                            Minutes = 24 * 60 // 24 horas antes
-                        },
-                        new EventReminder
-                        {
-                            Method = "email", 
-                            Minutes = 24 * 60 // 24 horas antes
-                        }
-                    }
-                }
-            };
+            var calendarEvent = BuildEvent(appointment, userTimeZone);
 
             // Insertar el evento
             var request = calendarService.Events.Insert(calendarEvent, "primary");
@@ -77,6 +72,9 @@ public class GoogleCalendarService : IGoogleCalendarService
             Console.WriteLine($"[CALENDAR] ✅ Event created with ID: {createdEvent.Id}");
             return createdEvent.Id;
         }, ct);
+
+        timer.Success();
+        return eventId;
     }
 
     public async Task<bool> SendCalendarInviteAsync(
@@ -120,6 +118,214 @@ public class GoogleCalendarService : IGoogleCalendarService
         }
     }
 
+    public async Task<CalendarSyncResult> SyncAppointmentEventsAsync(
+        IReadOnlyList<Appointment> appointments,
+        long chatId,
+        CancellationToken ct)
+    {
+        var result = new CalendarSyncResult();
+        if (appointments.Count == 0)
+            return result;
+
+        using var timer = BotMetrics.Time(BotMetrics.CalendarSync);
+        var userProfile = await _userRepo.GetAsync(chatId, ct);
+        var userTimeZone = userProfile?.TimeZone ?? DefaultTimeZone;
+
+        await ExecuteWithAuthRetryAsync(chatId, async calendarService =>
+        {
+            var options = new ParallelOptions { MaxDegreeOfParallelism = _batchConcurrency, CancellationToken = ct };
+            await Parallel.ForEachAsync(appointments.Where(a => !result.EventIds.ContainsKey(a.Id)).Chunk(MaxBatchSize), options,
+                async (chunk, token) => await ExecuteBatchAsync(calendarService, chunk, userTimeZone, result, token));
+            return true;
+        }, ct);
+
+        timer.Success();
+        return result;
+    }
+
+    /// <summary>
+    /// Un lote de inserts/updates. Lo que Google rechaza por cuota (403/429) o error 5xx se reintenta
+    /// con backoff en un lote nuevo; un insert que ya existía (409) se reintenta como update.
+    /// </summary>
+    private async Task ExecuteBatchAsync(CalendarService calendarService, Appointment[] chunk, string userTimeZone,
+        CalendarSyncResult result, CancellationToken ct)
+    {
+        var pending = chunk.ToList();
+        var asUpdate = new HashSet<long>(chunk.Where(a => !string.IsNullOrEmpty(a.CalendarEventId)).Select(a => a.Id));
+
+        for (int attempt = 0; pending.Count > 0 && attempt < MaxBatchAttempts; attempt++)
+        {
+            if (attempt > 0)
+                await Task.Delay(TimeSpan.FromMilliseconds(1000 * Math.Pow(2, attempt - 1) + Random.Shared.Next(250)), ct);
+
+            var retry = new List<Appointment>();
+            var batch = new BatchRequest(calendarService, _batchUri);
+            foreach (var appointment in pending)
+            {
+                var calendarEvent = BuildEvent(appointment, userTimeZone);
+                var update = asUpdate.Contains(appointment.Id);
+                var eventId = update ? appointment.CalendarEventId ?? EventIdFor(appointment.Id) : EventIdFor(appointment.Id);
+                IClientServiceRequest request;
+                if (update)
+                {
+                    calendarEvent.Status = "confirmed"; // Restaura el evento si el usuario lo había borrado
+                    request = calendarService.Events.Update(calendarEvent, "primary", eventId);
+                }
+                else
+                {
+                    calendarEvent.Id = eventId;
+                    request = calendarService.Events.Insert(calendarEvent, "primary");
+                }
+
+                batch.Queue<Event>(request, (content, error, index, message) =>
+                {
+                    if (error == null)
+                    {
+                        result.EventIds[appointment.Id] = content.Id;
+                        return;
+                    }
+
+                    switch (error.Code)
+                    {
+                        case 409 when !update:
+                            asUpdate.Add(appointment.Id);
+                            retry.Add(appointment);
+                            break;
+                        case 404 or 410 when update:
+                            // El evento ya no existe: se crea de nuevo con el ID propio
+                            asUpdate.Remove(appointment.Id);
+                            appointment.CalendarEventId = null;
+                            retry.Add(appointment);
+                            break;
+                        case 429 or >= 500:
+                        case 403 when IsRateLimit(error):
+                            BotMetrics.Increment("calendar_rate_limited");
+                            retry.Add(appointment);
+                            break;
+                        default:
+                            result.Failures[appointment.Id] = $"{error.Code}: {error.Message}";
+                            break;
+                    }
+                });
+            }
+
+            Interlocked.Increment(ref result.BatchRequests);
+            await batch.ExecuteAsync(ct);
+            pending = retry;
+        }
+
+        foreach (var appointment in pending)
+            result.Failures[appointment.Id] = "Cuota de Google Calendar agotada después de reintentar";
+    }
+
+    private static bool IsRateLimit(RequestError error) =>
+        error.Errors?.Any(e => e.Reason is "rateLimitExceeded" or "userRateLimitExceeded" or "quotaExceeded") == true;
+
+    public async Task<CalendarChanges> GetChangedEventsAsync(
+        long chatId,
+        string? syncToken,
+        CancellationToken ct)
+    {
+        return await ExecuteWithAuthRetryAsync(chatId, async calendarService =>
+        {
+            var changes = new CalendarChanges { FullSync = syncToken == null };
+            string? pageToken = null;
+            // while (true): al vencer el token se reinicia el listado completo desde la primera página
+            while (true)
+            {
+                var request = calendarService.Events.List("primary");
+                request.MaxResults = 2500;
+                request.ShowDeleted = true;
+                request.SyncToken = syncToken;
+                request.PageToken = pageToken;
+
+                Events page;
+                try
+                {
+                    page = await request.ExecuteAsync(ct);
+                }
+                catch (GoogleApiException ex) when (ex.HttpStatusCode == System.Net.HttpStatusCode.Gone && syncToken != null)
+                {
+                    // Token vencido: Google pide volver a listar todo
+                    Console.WriteLine($"[CALENDAR] Sync token expired for chat {chatId}, running full sync");
+                    syncToken = null;
+                    pageToken = null;
+                    changes = new CalendarChanges { FullSync = true };
+                    continue;
+                }
+
+                foreach (var item in page.Items ?? new List<Event>())
+                {
+                    // En incrementales, los borrados vienen solo con id y status
+                    if (!IsRegistroCxEvent(item))
+                        continue;
+                    changes.Changes.Add(new CalendarEventChange
+                    {
+                        EventId = item.Id,
+                        Cancelled = item.Status == "cancelled",
+                        Start = item.Start?.DateTimeDateTimeOffset?.DateTime
+                    });
+                }
+
+                pageToken = page.NextPageToken;
+                changes.NextSyncToken = page.NextSyncToken ?? changes.NextSyncToken;
+                if (pageToken == null)
+                    break;
+            }
+
+            return changes;
+        }, ct);
+    }
+
+    private static bool IsRegistroCxEvent(Event item) =>
+        item.Id?.StartsWith(EventIdPrefix, StringComparison.Ordinal) == true
+        || item.ExtendedProperties?.Private__?.ContainsKey(AppointmentIdProperty) == true
+        // Eventos creados antes de los IDs propios: los borrados no traen más datos, se filtran contra la base
+        || item.Status == "cancelled";
+
+    private Event BuildEvent(Appointment appointment, string userTimeZone)
+    {
+        return new Event
+        {
+            Summary = BuildEventTitle(appointment),
+            Description = BuildEventDescription(appointment),
+            Location = appointment.Lugar,
+            Start = new EventDateTime
+            {
+                DateTimeDateTimeOffset = CreateUserDateTime(appointment.FechaHora ?? DateTime.Now, userTimeZone),
+                TimeZone = userTimeZone
+            },
+            End = new EventDateTime
+            {
+                DateTimeDateTimeOffset = CreateUserDateTime(appointment.FechaHora?.AddHours(2) ?? DateTime.Now.AddHours(2), userTimeZone), // Duración estimada de 2 horas
+                TimeZone = userTimeZone
+            },
+            ExtendedProperties = appointment.Id > 0
+                ? new Event.ExtendedPropertiesData
+                {
+                    Private__ = new Dictionary<string, string> { [AppointmentIdProperty] = appointment.Id.ToString() }
+                }
+                : null,
+            Reminders = new Event.RemindersData
+            {
+                UseDefault = false,
+                Overrides = new List<EventReminder>
+                {
+                    new EventReminder
+                    {
+                        Method = "popup",
+                        Minutes = 24 * 60 // 24 horas antes
+                    },
+                    new EventReminder
+                    {
+                        Method = "email", 
+                        Minutes = 24 * 60 // 24 horas antes
+                    }
+                }
+            }
+        };
+    }
+
     private string BuildEventTitle(Appointment appointment)
     {
         // Formato: "2 CERS" o "1 Amigdalectomía" 
@@ -194,7 +400,8 @@ Evento creado automáticamente por RegistroCx Bot";
         return new CalendarService(new BaseClientService.Initializer()
         {
             HttpClientInitializer = credential,
-            ApplicationName = "RegistroCx Bot"
+            ApplicationName = "RegistroCx Bot",
+            BaseUri = _baseUri
         });
     }
 
@@ -277,7 +484,7 @@ Evento creado automáticamente por RegistroCx Bot";
         catch (TimeZoneNotFoundException)
         {
             // Si la zona horaria no es válida, usar Argentina como fallback
-            var fallbackTimeZone = TimeZoneInfo.FindSystemTimeZoneById("America/Argentina/Buenos_Aires");
+            var fallbackTimeZone = TimeZoneInfo.FindSystemTimeZoneById(DefaultTimeZone);
             return new DateTimeOffset(dateTime, fallbackTimeZone.GetUtcOffset(dateTime));
         }
     }
@@ -5,7 +5,7 @@ namespace RegistroCx.Services;
 
 public interface IAnesthesiologistSearchService
 {
-    Task<List<AnesthesiologistCandidate>> SearchByPartialNameAsync(string partialName, string teamEmail);
+    Task<List<AnesthesiologistCandidate>> SearchByPartialNameAsync(string partialName, string teamEmail, long chatId = 0);
 }
 
 public class AnesthesiologistCandidate
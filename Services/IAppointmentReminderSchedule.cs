@@ -0,0 +1,13 @@
+using System;
+
+namespace RegistroCx.Services;
+
+/// <summary>
+/// Índice de recordatorios pendientes. AppointmentRepository lo avisa al guardar,
+/// modificar y borrar appointments para que no haga falta volver a escanear la tabla.
+/// </summary>
+public interface IAppointmentReminderSchedule
+{
+    void Schedule(long appointmentId, DateTime? fechaHora);
+    void Cancel(long appointmentId);
+}
@@ -1,4 +1,5 @@
 using System;
+using System.Collections.Generic;
 using System.Threading;
 using System.Threading.Tasks;
 using RegistroCx.Models;
@@ -22,4 +23,20 @@ public interface IGoogleCalendarService
         string eventId, 
         long chatId, 
         CancellationToken ct);
+
+    /// <summary>
+    /// Crea o actualiza los eventos de varios appointments en lotes HTTP (batch) de Google Calendar.
+    /// </summary>
+    Task<CalendarSyncResult> SyncAppointmentEventsAsync(
+        IReadOnlyList<Appointment> appointments,
+        long chatId,
+        CancellationToken ct);
+
+    /// <summary>
+    /// Eventos de RegistroCx que cambiaron en el calendario desde syncToken (todos si es null).
+    /// </summary>
+    Task<CalendarChanges> GetChangedEventsAsync(
+        long chatId,
+        string? syncToken,
+        CancellationToken ct);
 }
\ No newline at end of file
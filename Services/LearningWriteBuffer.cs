@@ -0,0 +1,293 @@
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Threading;
+using System.Threading.Tasks;
+using Microsoft.Extensions.DependencyInjection;
+using Microsoft.Extensions.Hosting;
+using Microsoft.Extensions.Logging;
+using Npgsql;
+using RegistroCx.Domain;
+using RegistroCx.Services.Analytics;
+using RegistroCx.Services.Caching;
+using RegistroCx.Services.Extraction;
+using RegistroCx.Services.Repositories;
+
+namespace RegistroCx.Services;
+
+/// <summary>
+/// Escritura diferida del aprendizaje: UserLearningService anota cada uso de término o patrón en memoria
+/// (los repetidos se suman) y este servicio los baja a la base en un solo upsert por tabla, cada
+/// flushInterval o apenas se juntan flushThreshold filas. Al apagar el host se vacía lo pendiente.
+/// Si la base rechaza el lote (una fila inválida hace fallar la transacción) se parte en mitades hasta aislar
+/// las filas malas, que se descartan; si el error es transitorio el lote vuelve al buffer para el próximo ciclo.
+/// El buffer tiene un máximo de filas distintas: pasado ese límite las nuevas se descartan y se cuentan.
+/// </summary>
+public class LearningWriteBuffer : BackgroundService
+{
+    // Largos de user_custom_terms / user_communication_patterns (create_user_learning_tables.sql)
+    private const int MaxTermLength = 100;
+    private const int MaxTypeLength = 50;
+
+    private readonly IServiceScopeFactory _scopeFactory;
+    private readonly ILogger<LearningWriteBuffer> _logger;
+    private readonly TimeSpan _flushInterval;
+    private readonly int _flushThreshold;
+    private readonly int _maxPending;
+    private readonly LlmResponseCache? _responseCache;
+    private readonly NameIndexRegistry? _nameIndexes;
+
+    private readonly object _lock = new();
+    private Dictionary<(long ChatId, string UserTerm, string TermType), UserTermIncrement> _terms = new();
+    private Dictionary<(long ChatId, string PatternType, string PatternValue), UserPatternIncrement> _patterns = new();
+    private readonly SemaphoreSlim _flushSignal = new(0, 1);
+    private readonly SemaphoreSlim _flushLock = new(1, 1);
+
+    public LearningWriteBuffer(
+        IServiceScopeFactory scopeFactory,
+        ILogger<LearningWriteBuffer> logger,
+        TimeSpan flushInterval,
+        int flushThreshold,
+        int maxPending,
+        LlmResponseCache? responseCache = null,
+        NameIndexRegistry? nameIndexes = null)
+    {
+        _scopeFactory = scopeFactory;
+        _logger = logger;
+        _flushInterval = flushInterval;
+        _flushThreshold = Math.Max(1, flushThreshold);
+        _maxPending = Math.Max(_flushThreshold, maxPending);
+        _responseCache = responseCache;
+        _nameIndexes = nameIndexes;
+
+        BotMetrics.RegisterGauge("learning_buffer_pending", () => PendingCount);
+    }
+
+    public int PendingCount
+    {
+        get { lock (_lock) return _terms.Count + _patterns.Count; }
+    }
+
+    public void AddTerm(long chatId, string userTerm, string standardTerm, string termType, decimal initialConfidence)
+    {
+        // Mismos límites que user_custom_terms: una fila que no entra haría fallar el lote entero
+        if (userTerm.Length > MaxTermLength || standardTerm.Length > MaxTermLength ||
+            termType.Length > MaxTypeLength)
+        {
+            Reject($"term '{Preview(userTerm)}' -> '{Preview(standardTerm)}' ({termType})");
+            return;
+        }
+
+        var key = (chatId, userTerm.ToLowerInvariant(), termType);
+        lock (_lock)
+        {
+            if (_terms.TryGetValue(key, out var existing))
+                _terms[key] = existing with { Hits = existing.Hits + 1 };
+            else if (IsFull())
+                return;
+            else
+                _terms[key] = new UserTermIncrement(chatId, key.Item2, standardTerm, termType, 1, initialConfidence);
+        }
+        OnAdded();
+    }
+
+    public void AddPattern(long chatId, string patternType, string patternValue)
+    {
+        if (patternType.Length > MaxTypeLength)
+        {
+            Reject($"pattern {patternType}");
+            return;
+        }
+
+        var key = (chatId, patternType, patternValue);
+        lock (_lock)
+        {
+            if (_patterns.TryGetValue(key, out var existing))
+                _patterns[key] = existing with { Hits = existing.Hits + 1 };
+            else if (IsFull())
+                return;
+            else
+                _patterns[key] = new UserPatternIncrement(chatId, patternType, patternValue, 1);
+        }
+        OnAdded();
+    }
+
+    protected override async Task ExecuteAsync(CancellationToken stoppingToken)
+    {
+        _logger.LogInformation("[LEARNING-BUFFER] Flushing every {Interval}s or at {Threshold} pending rows",
+            _flushInterval.TotalSeconds, _flushThreshold);
+
+        while (!stoppingToken.IsCancellationRequested)
+        {
+            try
+            {
+                await _flushSignal.WaitAsync(_flushInterval, stoppingToken);
+                await FlushAsync(stoppingToken);
+            }
+            catch (OperationCanceledException) when (stoppingToken.IsCancellationRequested)
+            {
+                break;
+            }
+        }
+    }
+
+    public override async Task StopAsync(CancellationToken cancellationToken)
+    {
+        await base.StopAsync(cancellationToken);
+        // Lo que quedó en memoria se escribe antes de apagar
+        await FlushAsync(cancellationToken);
+    }
+
+    /// <summary>
+    /// Escribe lo pendiente en un solo lote. Devuelve cuántas filas (términos + patrones) se escribieron.
+    /// </summary>
+    public async Task<int> FlushAsync(CancellationToken ct = default)
+    {
+        await _flushLock.WaitAsync(ct);
+        try
+        {
+            Dictionary<(long, string, string), UserTermIncrement> terms;
+            Dictionary<(long, string, string), UserPatternIncrement> patterns;
+            lock (_lock)
+            {
+                if (_terms.Count == 0 && _patterns.Count == 0)
+                    return 0;
+                terms = _terms;
+                patterns = _patterns;
+                _terms = new();
+                _patterns = new();
+            }
+
+            using var timer = BotMetrics.Time(BotMetrics.LearningFlush);
+            using var scope = _scopeFactory.CreateScope();
+            var repository = scope.ServiceProvider.GetRequiredService<IUserLearningRepository>();
+            var writtenChats = new HashSet<long>();
+            var rows = await WriteAsync(repository, terms.Values.ToList(), patterns.Values.ToList(), writtenChats, ct);
+            if (rows == terms.Count + patterns.Count)
+                timer.Success();
+
+            BotMetrics.Increment("learning_flush_rows", rows);
+
+            // Recién ahora los términos nuevos están en la base: lo derivado de ellos se vuelve a leer
+            foreach (var chatId in writtenChats)
+            {
+                _responseCache?.RefreshSubstitutions(chatId);
+                _nameIndexes?.MarkLearnedStale(chatId);
+            }
+            return rows;
+        }
+        finally
+        {
+            _flushLock.Release();
+        }
+    }
+
+    /// <summary>
+    /// Escribe un lote en una transacción. Si la base lo rechaza se parte en mitades hasta aislar las filas
+    /// inválidas, que se descartan; ante un error transitorio (conexión, timeout) el lote vuelve al buffer.
+    /// Devuelve cuántas filas quedaron escritas.
+    /// </summary>
+    private async Task<int> WriteAsync(
+        IUserLearningRepository repository,
+        List<UserTermIncrement> terms,
+        List<UserPatternIncrement> patterns,
+        HashSet<long> writtenChats,
+        CancellationToken ct)
+    {
+        try
+        {
+            await repository.UpsertLearningBatchAsync(terms, patterns, ct);
+            foreach (var term in terms)
+                writtenChats.Add(term.ChatId);
+            return terms.Count + patterns.Count;
+        }
+        catch (PostgresException ex) when (!ex.IsTransient)
+        {
+            if (terms.Count + patterns.Count == 1)
+            {
+                _logger.LogError(ex, "[LEARNING-BUFFER] Dropping row rejected by the database: {Row}",
+                    terms.Count == 1 ? $"term '{Preview(terms[0].UserTerm)}' ({terms[0].TermType}) for chat {terms[0].ChatId}"
+                                     : $"pattern {patterns[0].PatternType} for chat {patterns[0].ChatId}");
+                BotMetrics.Increment("learning_rows_rejected");
+                return 0;
+            }
+
+            BotMetrics.Increment("learning_flush_split");
+            if (terms.Count > 0 && patterns.Count > 0)
+            {
+                return await WriteAsync(repository, terms, new List<UserPatternIncrement>(), writtenChats, ct)
+                     + await WriteAsync(repository, new List<UserTermIncrement>(), patterns, writtenChats, ct);
+            }
+
+            var termHalf = terms.Count / 2;
+            var patternHalf = patterns.Count / 2;
+            return await WriteAsync(repository, terms.Take(termHalf).ToList(), patterns.Take(patternHalf).ToList(), writtenChats, ct)
+                 + await WriteAsync(repository, terms.Skip(termHalf).ToList(), patterns.Skip(patternHalf).ToList(), writtenChats, ct);
+        }
+        catch (Exception ex)
+        {
+            _logger.LogError(ex, "[LEARNING-BUFFER] Error flushing {Terms} term(s) and {Patterns} pattern(s), will retry",
+                terms.Count, patterns.Count);
+            BotMetrics.Increment("learning_flush_failed");
+            Requeue(terms, patterns);
+            return 0;
+        }
+    }
+
+    // Con _lock tomado: una clave nueva no entra si el buffer ya llegó al máximo (por ejemplo, con la base caída)
+    private bool IsFull()
+    {
+        if (_terms.Count + _patterns.Count < _maxPending)
+            return false;
+        BotMetrics.Increment("learning_buffer_dropped");
+        return true;
+    }
+
+    private void Reject(string row)
+    {
+        _logger.LogWarning("[LEARNING-BUFFER] Ignoring {Row}: longer than the learning tables allow", row);
+        BotMetrics.Increment("learning_rows_rejected");
+    }
+
+    private static string Preview(string value) => value.Length <= 40 ? value : value[..40] + "…";
+
+    private void OnAdded()
+    {
+        BotMetrics.Increment("learning_updates_buffered");
+        if (PendingCount >= _flushThreshold && _flushSignal.CurrentCount == 0)
+        {
+            try
+            {
+                _flushSignal.Release();
+            }
+            catch (SemaphoreFullException)
+            {
+                // Otro hilo ya despertó el flush
+            }
+        }
+    }
+
+    // Un lote que no se pudo escribir vuelve sumándose a lo que llegó mientras tanto (sin pasar el máximo)
+    private void Requeue(List<UserTermIncrement> terms, List<UserPatternIncrement> patterns)
+    {
+        lock (_lock)
+        {
+            foreach (var increment in terms)
+            {
+                var key = (increment.ChatId, increment.UserTerm, increment.TermType);
+                if (_terms.TryGetValue(key, out var newer))
+                    _terms[key] = increment with { Hits = increment.Hits + newer.Hits };
+                else if (!IsFull())
+                    _terms[key] = increment;
+            }
+            foreach (var increment in patterns)
+            {
+                var key = (increment.ChatId, increment.PatternType, increment.PatternValue);
+                if (_patterns.TryGetValue(key, out var newer))
+                    _patterns[key] = increment with { Hits = increment.Hits + newer.Hits };
+                else if (!IsFull())
+                    _patterns[key] = increment;
+            }
+        }
+    }
+}
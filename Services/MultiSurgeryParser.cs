@@ -5,6 +5,7 @@ using System.Text;
 using System.Text.Json;
 using System.Text.RegularExpressions;
 using Microsoft.Extensions.Logging;
+using RegistroCx.Services.Analytics;
 using RegistroCx.Services.Extraction;
 
 namespace RegistroCx.Services;
@@ -15,12 +16,35 @@ public class MultiSurgeryParser
     private readonly LLMOpenAIAssistant _llm;
 
     private readonly UserLearningService? _learningService;
+    private readonly int _maxConcurrency;
 
-    public MultiSurgeryParser(ILogger<MultiSurgeryParser> logger, LLMOpenAIAssistant llm, UserLearningService? learningService = null)
+    public MultiSurgeryParser(ILogger<MultiSurgeryParser> logger, LLMOpenAIAssistant llm, UserLearningService? learningService = null, int maxConcurrency = 4)
     {
         _logger = logger;
         _llm = llm;
         _learningService = learningService;
+        _maxConcurrency = Math.Max(1, maxConcurrency);
+    }
+
+    /// <summary>
+    /// Procesa las cirugías de un mismo mensaje en paralelo, como mucho maxConcurrency a la vez
+    /// (MULTI_SURGERY_CONCURRENCY). Los resultados vuelven en el orden de las cirugías; cada
+    /// process maneja sus propios errores para que una cirugía que falla no corte a las demás.
+    /// </summary>
+    public async Task<T[]> ProcessEachAsync<T>(int count, Func<int, CancellationToken, Task<T>> process, CancellationToken ct)
+    {
+        var results = new T[count];
+        if (count == 0)
+            return results;
+
+        using var timer = BotMetrics.Time(BotMetrics.MultiSurgeryFanOut);
+        var options = new ParallelOptions { MaxDegreeOfParallelism = _maxConcurrency, CancellationToken = ct };
+        await Parallel.ForEachAsync(Enumerable.Range(0, count), options,
+            async (index, token) => results[index] = await process(index, token));
+
+        BotMetrics.Increment("multi_surgery_items", count);
+        timer.Success();
+        return results;
     }
 
     /// <summary>
@@ -118,16 +142,16 @@ public class MultiSurgeryParser
     {
         _logger.LogDebug("[MULTI-PARSER-LLM] Sending prompt to LLM with validation context");
         
-        // Construir input con contexto personalizado si está disponible
-        var enhancedInput = input;
+        // Contexto personalizado si está disponible: va en su bloque del prompt, así el mensaje del
+        // usuario queda solo en INPUT_CIRUGIA y el cache de respuestas lo normaliza sin el contexto
+        string? personalizedContext = null;
         if (_learningService != null && chatId != 0)
         {
             try
             {
-                var personalizedContext = await _learningService.BuildPersonalizedPromptContext(chatId);
+                personalizedContext = await _learningService.BuildPersonalizedPromptContext(chatId);
                 if (!string.IsNullOrEmpty(personalizedContext))
                 {
-                    enhancedInput = $"{personalizedContext}\n\n{input}";
                     _logger.LogDebug("[MULTI-PARSER-LLM] Enhanced input with personalized context for user {ChatId}", chatId);
                 }
             }
@@ -138,7 +162,7 @@ public class MultiSurgeryParser
         }
         
         // Usar el prompt específico para detección de múltiples cirugías con validaciones
-        var extractedData = await _llm.ExtractMultipleSurgeriesAsync(enhancedInput, referenceDate, listasObj);
+        var extractedData = await _llm.ExtractMultipleSurgeriesAsync(input, referenceDate, listasObj, personalizedContext, chatId);
         
         // Convertir el Dictionary a nuestro formato esperado
         var llmResponse = ConvertDictionaryToJson(extractedData);
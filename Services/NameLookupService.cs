@@ -0,0 +1,120 @@
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Threading;
+using System.Threading.Tasks;
+using RegistroCx.Domain;
+using RegistroCx.Services.Analytics;
+using RegistroCx.Services.Caching;
+using RegistroCx.Services.Repositories;
+
+namespace RegistroCx.Services;
+
+/// <summary>
+/// Búsqueda de nombres (anestesiólogos, cirujanos, lugares) contra el índice en memoria del equipo del usuario,
+/// sin pasar por el LLM. Cada origen del índice se carga en la búsqueda que lo encuentra vencido: la lista base,
+/// el plantel de anestesiólogos del equipo y los alias aprendidos del chat.
+/// </summary>
+public class NameLookupService
+{
+    private static readonly TimeSpan BaseMaxAge = TimeSpan.FromHours(2);      // Igual que las listas de MemoryCacheService
+    private static readonly TimeSpan RosterMaxAge = TimeSpan.FromMinutes(30);
+    private static readonly TimeSpan LearnedMaxAge = TimeSpan.FromMinutes(5);
+
+    private readonly NameIndexRegistry _registry;
+    private readonly ICacheService _cache;
+    private readonly IAnesthesiologistRepository _anesthesiologistRepo;
+    private readonly EquipoService _equipoService;
+    private readonly UserLearningService _learningService;
+
+    public NameLookupService(
+        NameIndexRegistry registry,
+        ICacheService cache,
+        IAnesthesiologistRepository anesthesiologistRepo,
+        EquipoService equipoService,
+        UserLearningService learningService)
+    {
+        _registry = registry;
+        _cache = cache;
+        _anesthesiologistRepo = anesthesiologistRepo;
+        _equipoService = equipoService;
+        _learningService = learningService;
+    }
+
+    /// <summary>
+    /// Coincidencias ordenadas por puntaje para lo que escribió el usuario. kind es un TermTypes de persona o lugar.
+    /// </summary>
+    public async Task<List<FuzzyNameIndex.NameMatch>> SearchAsync(string kind, string query, long chatId, CancellationToken ct = default)
+    {
+        using var timer = BotMetrics.Time(BotMetrics.NameLookup);
+
+        var index = await GetIndexAsync(kind, chatId, ct);
+        var matches = index.Search(query);
+
+        BotMetrics.Increment(matches.Count > 0 ? "name_lookup_match" : "name_lookup_no_match");
+        timer.Success();
+        return matches;
+    }
+
+    private async Task<FuzzyNameIndex> GetIndexAsync(string kind, long chatId, CancellationToken ct)
+    {
+        // El equipo del chat se cachea: sin esto cada búsqueda pagaría una consulta a la base
+        var team = await _cache.GetOrCreateAsync($"cache:name_index_team:{chatId}", async () =>
+        {
+            try
+            {
+                return new ChatTeam(await _equipoService.ObtenerPrimerEquipoIdPorChatIdAsync(chatId, ct));
+            }
+            catch (InvalidOperationException)
+            {
+                // Sin equipo: índice propio del chat, sin plantel
+                return new ChatTeam(null);
+            }
+        }, RosterMaxAge, ct);
+        var equipoId = team.EquipoId;
+
+        var scope = equipoId.HasValue ? NameIndexRegistry.TeamScope(equipoId.Value) : NameIndexRegistry.ChatScope(chatId);
+        var index = _registry.GetOrCreate(kind, scope);
+
+        if (!index.IsFresh(NameIndexRegistry.BaseSource, BaseMaxAge))
+        {
+            var names = await LoadBaseNamesAsync(kind, ct);
+            index.SyncSource(NameIndexRegistry.BaseSource, names.Select(n => new NameIndexEntry(n)));
+        }
+
+        if (kind == TermTypes.Anesthesiologist && equipoId.HasValue && !index.IsFresh(NameIndexRegistry.RosterSource, RosterMaxAge))
+        {
+            try
+            {
+                var roster = await _anesthesiologistRepo.GetRosterByEquipoAsync(equipoId.Value, ct);
+                var changed = index.SyncSource(NameIndexRegistry.RosterSource,
+                    roster.Select(a => new NameIndexEntry(a.Nombre, a.Email, a.Nicknames)));
+                Console.WriteLine($"[NAME-INDEX] Equipo {equipoId}: {roster.Count} anestesiólogos en el índice ({changed} cambiados)");
+            }
+            catch (Exception ex) when (ex is not OperationCanceledException)
+            {
+                // Se reintenta en la próxima búsqueda; mientras tanto quedan la lista base y los alias
+                Console.WriteLine($"[NAME-INDEX] No se pudo cargar el plantel del equipo {equipoId}: {ex.Message}");
+            }
+        }
+
+        var learnedSource = NameIndexRegistry.LearnedSource(chatId);
+        if (!index.IsFresh(learnedSource, LearnedMaxAge))
+        {
+            var aliases = await _learningService.GetLearnedAliasesAsync(chatId, kind, ct);
+            index.SyncSource(learnedSource, aliases.Select(a => new NameIndexEntry(a.Key, null, a.Value)));
+        }
+
+        return index;
+    }
+
+    private Task<List<string>> LoadBaseNamesAsync(string kind, CancellationToken ct) => kind switch
+    {
+        TermTypes.Anesthesiologist => _cache.GetAnesthesiologistNamesAsync(ct),
+        TermTypes.Surgeon => _cache.GetSurgeonNamesAsync(ct),
+        TermTypes.Place => _cache.GetLocationNamesAsync(ct),
+        _ => throw new ArgumentException($"Tipo de nombre no indexable: {kind}", nameof(kind))
+    };
+
+    private record ChatTeam(int? EquipoId);
+}
@@ -375,7 +375,7 @@ Después te voy a ayudar paso a paso con todo lo demás.";
                 ResizeKeyboard = true,
                 OneTimeKeyboard = true
             };
-            return bot.SendMessage(
+            return MessageSender.SendWithRetry(
                 chatId,
                 "Necesito tu teléfono.\n\n📱 Podés usar el botón \"📱 Compartir mi teléfono\" para compartirlo automáticamente o escribirlo manualmente.\n\n💡 <b>Ejemplo:</b> +5491160167172 (con código de país)",
                 replyMarkup: kb,
@@ -30,10 +30,17 @@ public class PdfGeneratorService
         QuestPDF.Settings.License = LicenseType.Community;
     }
 
+    public static string GetFileName(ReportData reportData) => reportData.Period.Type switch
+    {
+        ReportType.Weekly => $"ReporteSemanal_{DateTime.Now:yyyy-MM-dd_HHmm}.pdf",
+        ReportType.Monthly => $"ReporteMensual_{reportData.Period.DisplayName.Replace(" ", "-")}_{DateTime.Now:yyyy-MM-dd_HHmm}.pdf",
+        _ => $"ReporteAnual_{reportData.Period.DisplayName.Replace(" ", "-")}_{DateTime.Now:yyyy-MM-dd_HHmm}.pdf"
+    };
+
     public async Task<string> CreateWeeklyReportPdfAsync(ReportData reportData, CancellationToken ct = default)
     {
-        var fileName = $"ReporteSemanal_{DateTime.Now:yyyy-MM-dd_HHmm}.pdf";
-        var filePath = Path.Combine(_tempDirectory, fileName);
+        // Nombre único: varios workers de ReportRenderQueue pueden renderizar el mismo período a la vez
+        var filePath = Path.Combine(_tempDirectory, $"{Guid.NewGuid():N}_{GetFileName(reportData)}");
         
         await CreateReportPdfAsync(filePath, "Reporte Semanal", reportData, ct);
         
@@ -42,8 +49,7 @@ public class PdfGeneratorService
 
     public async Task<string> CreateMonthlyReportPdfAsync(ReportData reportData, CancellationToken ct = default)
     {
-        var fileName = $"ReporteMensual_{reportData.Period.DisplayName.Replace(" ", "-")}_{DateTime.Now:yyyy-MM-dd_HHmm}.pdf";
-        var filePath = Path.Combine(_tempDirectory, fileName);
+        var filePath = Path.Combine(_tempDirectory, $"{Guid.NewGuid():N}_{GetFileName(reportData)}");
         
         await CreateReportPdfAsync(filePath, "Reporte Mensual", reportData, ct);
         
@@ -52,8 +58,7 @@ public class PdfGeneratorService
 
     public async Task<string> CreateAnnualReportPdfAsync(ReportData reportData, CancellationToken ct = default)
     {
-        var fileName = $"ReporteAnual_{reportData.Period.DisplayName.Replace(" ", "-")}_{DateTime.Now:yyyy-MM-dd_HHmm}.pdf";
-        var filePath = Path.Combine(_tempDirectory, fileName);
+        var filePath = Path.Combine(_tempDirectory, $"{Guid.NewGuid():N}_{GetFileName(reportData)}");
         
         await CreateReportPdfAsync(filePath, "Reporte Anual", reportData, ct);
         
@@ -728,37 +733,4 @@ public class PdfGeneratorService
             _ => dayOfWeek.ToString()
         };
     }
-
-    public void CleanupOldReports(TimeSpan maxAge)
-    {
-        try
-        {
-            if (!Directory.Exists(_tempDirectory))
-                return;
-
-            var cutoffTime = DateTime.Now - maxAge;
-            var files = Directory.GetFiles(_tempDirectory, "*.pdf");
-
-            foreach (var file in files)
-            {
-                var fileInfo = new FileInfo(file);
-                if (fileInfo.CreationTime < cutoffTime)
-                {
-                    try
-                    {
-                        System.IO.File.Delete(file);
-                        Console.WriteLine($"[PDF] Cleaned up old report: {Path.GetFileName(file)}");
-                    }
-                    catch (Exception ex)
-                    {
-                        Console.WriteLine($"[PDF] Error deleting file {file}: {ex.Message}");
-                    }
-                }
-            }
-        }
-        catch (Exception ex)
-        {
-            Console.WriteLine($"[PDF] Error during cleanup: {ex.Message}");
-        }
-    }
-}
\ No newline at end of file
+}
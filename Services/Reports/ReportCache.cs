@@ -0,0 +1,158 @@
+using System;
+using System.Collections.Generic;
+using System.IO;
+using System.Linq;
+using System.Security.Cryptography;
+using System.Text;
+using System.Threading;
+using RegistroCx.Models.ReportModels;
+using RegistroCx.Services.Analytics;
+
+namespace RegistroCx.Services.Reports;
+
+/// <summary>
+/// PDFs ya generados, direccionados por el hash de lo que muestran (ReportDataService.FlattenNumbers
+/// + título y período). Si el mes no cambió, el reporte sale del disco sin volver a renderizar.
+/// Se expulsa por tamaño total, el menos usado primero.
+/// </summary>
+public class ReportCache
+{
+    // Subir cuando cambie el layout del PDF: invalida todo lo cacheado
+    private const string RenderVersion = "1";
+
+    private readonly string _directory;
+    private readonly long _maxBytes;
+    private readonly object _lock = new();
+    private readonly Dictionary<string, CacheEntry> _entries = new();
+    private long _totalBytes;
+
+    public ReportCache(string directory, long maxBytes)
+    {
+        _directory = directory;
+        _maxBytes = maxBytes;
+        Directory.CreateDirectory(_directory);
+
+        // Lo que quedó de una ejecución anterior sigue sirviendo; el orden LRU arranca por fecha de escritura
+        foreach (var file in new DirectoryInfo(_directory).GetFiles("*.pdf"))
+        {
+            _entries[Path.GetFileNameWithoutExtension(file.Name)] = new CacheEntry(file.FullName, file.Length, file.LastWriteTimeUtc);
+            _totalBytes += file.Length;
+        }
+
+        BotMetrics.RegisterGauge("report_cache_bytes", () => Interlocked.Read(ref _totalBytes));
+        BotMetrics.RegisterGauge("report_cache_files", () => { lock (_lock) return _entries.Count; });
+        Console.WriteLine($"[REPORT-CACHE] {_entries.Count} PDFs en cache ({_totalBytes / 1024} KB, máximo {_maxBytes / 1024 / 1024} MB)");
+        Evict();
+    }
+
+    public static string ComputeKey(string reportTitle, ReportData reportData)
+    {
+        var sb = new StringBuilder();
+        sb.Append(RenderVersion).Append('\n')
+          .Append(reportTitle).Append('\n')
+          .Append(reportData.Period.Type).Append('\n')
+          .Append(reportData.Period.DisplayName).Append('\n')
+          .Append(reportData.Period.StartDate.ToString("yyyy-MM-dd")).Append('\n')
+          .Append(reportData.Period.EndDate.ToString("yyyy-MM-dd")).Append('\n');
+
+        foreach (var (key, value) in ReportDataService.FlattenNumbers(reportData))
+            sb.Append(key).Append('=').Append(value.ToString(System.Globalization.CultureInfo.InvariantCulture)).Append('\n');
+
+        return Convert.ToHexString(SHA256.HashData(Encoding.UTF8.GetBytes(sb.ToString()))).ToLowerInvariant();
+    }
+
+    public bool TryGet(string key, out string path)
+    {
+        lock (_lock)
+        {
+            if (_entries.TryGetValue(key, out var entry) && File.Exists(entry.Path))
+            {
+                entry.LastUsed = DateTime.UtcNow;
+                path = entry.Path;
+                BotMetrics.Increment("report_cache_hit");
+                return true;
+            }
+
+            if (entry != null)
+            {
+                // Alguien borró el archivo por fuera
+                _entries.Remove(key);
+                _totalBytes -= entry.Size;
+            }
+        }
+
+        path = string.Empty;
+        BotMetrics.Increment("report_cache_miss");
+        return false;
+    }
+
+    /// <summary>
+    /// Mueve un PDF recién generado al cache y devuelve su nueva ruta.
+    /// </summary>
+    public string Store(string key, string renderedPath)
+    {
+        var cachedPath = Path.Combine(_directory, $"{key}.pdf");
+        File.Move(renderedPath, cachedPath, overwrite: true);
+        var size = new FileInfo(cachedPath).Length;
+
+        lock (_lock)
+        {
+            if (_entries.Remove(key, out var previous))
+                _totalBytes -= previous.Size;
+
+            _entries[key] = new CacheEntry(cachedPath, size, DateTime.UtcNow);
+            _totalBytes += size;
+        }
+
+        Evict(keep: key);
+        return cachedPath;
+    }
+
+    private void Evict(string? keep = null)
+    {
+        List<CacheEntry> evicted;
+        lock (_lock)
+        {
+            if (_totalBytes <= _maxBytes)
+                return;
+
+            evicted = new List<CacheEntry>();
+            foreach (var (key, entry) in _entries.Where(e => e.Key != keep).OrderBy(e => e.Value.LastUsed).ToList())
+            {
+                if (_totalBytes <= _maxBytes)
+                    break;
+                _entries.Remove(key);
+                _totalBytes -= entry.Size;
+                evicted.Add(entry);
+            }
+        }
+
+        // Fuera del lock: en Linux un envío en curso sigue leyendo el archivo aunque se borre
+        foreach (var entry in evicted)
+        {
+            try
+            {
+                File.Delete(entry.Path);
+                BotMetrics.Increment("report_cache_evicted");
+            }
+            catch (Exception ex)
+            {
+                Console.WriteLine($"[REPORT-CACHE] Error deleting {entry.Path}: {ex.Message}");
+            }
+        }
+    }
+
+    private class CacheEntry
+    {
+        public CacheEntry(string path, long size, DateTime lastUsed)
+        {
+            Path = path;
+            Size = size;
+            LastUsed = lastUsed;
+        }
+
+        public string Path { get; }
+        public long Size { get; }
+        public DateTime LastUsed { get; set; }
+    }
+}
@@ -3,6 +3,7 @@ using System.Collections.Generic;
 using System.Linq;
 using System.Threading;
 using System.Threading.Tasks;
+using Npgsql;
 using RegistroCx.Models;
 using RegistroCx.Models.ReportModels;
 using RegistroCx.Services.Repositories;
@@ -14,12 +15,14 @@ public class ReportDataService
     private readonly IAppointmentRepository _appointmentRepo;
     private readonly IUserProfileRepository _userRepo;
     private readonly EquipoService _equipoService;
+    private readonly bool _useRollups;
 
-    public ReportDataService(IAppointmentRepository appointmentRepo, IUserProfileRepository userRepo, EquipoService equipoService)
+    public ReportDataService(IAppointmentRepository appointmentRepo, IUserProfileRepository userRepo, EquipoService equipoService, bool useRollups = true)
     {
         _appointmentRepo = appointmentRepo;
         _userRepo = userRepo;
         _equipoService = equipoService;
+        _useRollups = useRollups;
     }
 
     public async Task<ReportData> GenerateWeeklyReportDataAsync(long chatId, CancellationToken ct = default)
@@ -42,38 +45,75 @@ public class ReportDataService
 
     public async Task<ReportData> GenerateMonthlyReportDataAsync(long chatId, int month, int year, CancellationToken ct = default)
     {
-        // Resolver chatId a equipoId para el nuevo sistema de equipos
-        var equipoId = await _equipoService.ObtenerPrimerEquipoIdPorChatIdAsync(chatId, ct);
-
-        var period = ReportPeriod.CreateMonthly(month, year);
-        var appointments = await _appointmentRepo.GetAppointmentsForMonthAsync(equipoId, month, year, ct);
-        
-        var reportData = await ProcessAppointmentsIntoReportData(appointments, period, chatId);
-        
-        // Agregar comparación con mes anterior
-        var previousMonth = month == 1 ? 12 : month - 1;
-        var previousYear = month == 1 ? year - 1 : year;
-        var previousMonthAppointments = await _appointmentRepo.GetAppointmentsForMonthAsync(equipoId, previousMonth, previousYear, ct);
-        reportData.PreviousPeriodTotal = previousMonthAppointments.Count;
-        
-        return reportData;
+        return await GenerateReportDataAsync(chatId, ReportPeriod.CreateMonthly(month, year), _useRollups, ct);
     }
 
     public async Task<ReportData> GenerateAnnualReportDataAsync(long chatId, int year, CancellationToken ct = default)
+    {
+        return await GenerateReportDataAsync(chatId, ReportPeriod.CreateAnnual(year), _useRollups, ct);
+    }
+
+    /// <summary>
+    /// Reporte mensual/anual armado desde appointment_rollups (fromRollups) o recorriendo los appointments.
+    /// El semanal es una ventana móvil de 7 días que no coincide con los buckets mensuales: siempre va por appointments.
+    /// </summary>
+    public async Task<ReportData> GenerateReportDataAsync(long chatId, ReportPeriod period, bool fromRollups, CancellationToken ct = default)
     {
         // Resolver chatId a equipoId para el nuevo sistema de equipos
         var equipoId = await _equipoService.ObtenerPrimerEquipoIdPorChatIdAsync(chatId, ct);
+        var previousPeriod = GetPreviousPeriod(period);
 
-        var period = ReportPeriod.CreateAnnual(year);
-        var appointments = await _appointmentRepo.GetAppointmentsForYearAsync(equipoId, year, ct);
-        
-        var reportData = await ProcessAppointmentsIntoReportData(appointments, period, chatId);
-        
-        // Agregar comparación con año anterior
-        var previousYearAppointments = await _appointmentRepo.GetAppointmentsForYearAsync(equipoId, year - 1, ct);
-        reportData.PreviousPeriodTotal = previousYearAppointments.Count;
-        
-        return reportData;
+        if (fromRollups && period.Type != ReportType.Weekly)
+        {
+            try
+            {
+                var rollups = await _appointmentRepo.GetReportRollupsAsync(equipoId, period.StartDate, period.EndDate, ct: ct);
+                var reportData = BuildReportDataFromRollups(rollups, period, chatId);
+
+                var previousTotals = await _appointmentRepo.GetReportRollupsAsync(equipoId, previousPeriod.StartDate, previousPeriod.EndDate, RollupDimensions.Total, ct);
+                reportData.PreviousPeriodTotal = previousTotals.Sum(r => r.Turnos);
+
+                return reportData;
+            }
+            catch (PostgresException ex) when (ex.SqlState == PostgresErrorCodes.UndefinedTable || ex.SqlState == PostgresErrorCodes.UndefinedFunction)
+            {
+                Console.WriteLine($"[REPORTS] ⚠️ appointment_rollups no disponible ({ex.MessageText}); ejecutar create_appointment_rollups.sql. Usando appointments.");
+            }
+        }
+
+        var appointments = await GetAppointmentsForPeriodAsync(equipoId, period, ct);
+        var rawReportData = await ProcessAppointmentsIntoReportData(appointments, period, chatId);
+
+        // Comparación con el período anterior
+        var previousAppointments = await GetAppointmentsForPeriodAsync(equipoId, previousPeriod, ct);
+        rawReportData.PreviousPeriodTotal = previousAppointments.Count;
+
+        return rawReportData;
+    }
+
+    private async Task<List<Appointment>> GetAppointmentsForPeriodAsync(int equipoId, ReportPeriod period, CancellationToken ct)
+    {
+        return period.Type switch
+        {
+            ReportType.Weekly => await _appointmentRepo.GetAppointmentsForWeekAsync(equipoId, period.StartDate, ct),
+            ReportType.Monthly => await _appointmentRepo.GetAppointmentsForMonthAsync(equipoId, period.StartDate.Month, period.StartDate.Year, ct),
+            _ => await _appointmentRepo.GetAppointmentsForYearAsync(equipoId, period.StartDate.Year, ct)
+        };
+    }
+
+    private static ReportPeriod GetPreviousPeriod(ReportPeriod period)
+    {
+        return period.Type switch
+        {
+            ReportType.Weekly => new ReportPeriod
+            {
+                Type = ReportType.Weekly,
+                StartDate = period.StartDate.AddDays(-7),
+                EndDate = period.EndDate.AddDays(-7)
+            },
+            ReportType.Monthly => ReportPeriod.CreateMonthly(period.StartDate.AddMonths(-1).Month, period.StartDate.AddMonths(-1).Year),
+            _ => ReportPeriod.CreateAnnual(period.StartDate.Year - 1)
+        };
     }
 
     private async Task<ReportData> ProcessAppointmentsIntoReportData(List<Appointment> appointments, ReportPeriod period, long chatId)
@@ -334,4 +374,167 @@ public class ReportDataService
                 .ToDictionary(g => g.Key, g => g.Sum(a => a.Cantidad ?? 1));
         }
     }
-}
\ No newline at end of file
+
+    #region Reportes desde appointment_rollups
+
+    private static ReportData BuildReportDataFromRollups(List<AppointmentRollup> rollups, ReportPeriod period, long chatId)
+    {
+        var byDimension = rollups.ToLookup(r => r.Dimension);
+        var totals = byDimension[RollupDimensions.Total].ToList();
+        var dayHour = byDimension[RollupDimensions.DiaHora].ToList();
+
+        var reportData = new ReportData
+        {
+            Period = period,
+            ChatId = chatId,
+            TotalSurgeries = totals.Sum(r => r.Turnos),
+            SurgeriesByType = SumBy(byDimension[RollupDimensions.Cirugia], r => r.Clave),
+            SurgeriesByCenter = SumBy(byDimension[RollupDimensions.Lugar], r => r.Clave),
+            SurgeriesByAnesthesiologist = SumBy(byDimension[RollupDimensions.Anestesiologo], r => r.Clave),
+            SurgeriesByDay = SumBy(dayHour, r => (DayOfWeek)int.Parse(r.Clave)),
+            SurgeriesByHour = SumBy(dayHour, r => int.Parse(r.Clave2)),
+            HeatmapData = dayHour
+                .GroupBy(r => (DayOfWeek)int.Parse(r.Clave))
+                .ToDictionary(g => g.Key, g => SumBy(g, r => int.Parse(r.Clave2))),
+            DailySurgeriesTimeline = SumBy(totals, r => r.Periodo.Date)
+        };
+
+        if (period.Type == ReportType.Annual)
+        {
+            reportData.MonthlySurgeriesTimeline = SumBy(totals, r => r.Periodo.Month);
+        }
+
+        // Cirujanos. PreferredTimes no se agrega (no se usa en el PDF y multiplicaría los buckets)
+        var surgeonTypes = byDimension[RollupDimensions.CirujanoCirugia].ToLookup(r => r.Clave);
+        var surgeonCenters = byDimension[RollupDimensions.CirujanoLugar].ToLookup(r => r.Clave);
+        var surgeonAnesthesiologists = byDimension[RollupDimensions.CirujanoAnestesiologo].ToLookup(r => r.Clave);
+        var surgeonDays = byDimension[RollupDimensions.CirujanoDiaSemana].ToLookup(r => r.Clave);
+
+        reportData.SurgeonStats = SumBy(byDimension[RollupDimensions.Cirujano], r => r.Clave)
+            .Select(kvp => new SurgeonStatistics
+            {
+                SurgeonName = kvp.Key,
+                TotalSurgeries = kvp.Value,
+                SurgeriesByType = SumBy(surgeonTypes[kvp.Key], r => r.Clave2),
+                PreferredCenters = ExpandByTurnos(surgeonCenters[kvp.Key]),
+                CollaboratingAnesthesiologists = ExpandByTurnos(surgeonAnesthesiologists[kvp.Key]),
+                PreferredDays = CountBy(surgeonDays[kvp.Key], r => (DayOfWeek)int.Parse(r.Clave2))
+            })
+            .OrderByDescending(s => s.TotalSurgeries)
+            .ToList();
+
+        reportData.SurgeonSpecializations = reportData.SurgeonStats.ToDictionary(
+            s => s.SurgeonName,
+            s => s.SurgeriesByType.OrderByDescending(kvp => kvp.Value).Take(3).Select(kvp => kvp.Key).ToList());
+
+        // Centros
+        var centerTypes = byDimension[RollupDimensions.LugarCirugia].ToLookup(r => r.Clave);
+        var centerSurgeons = byDimension[RollupDimensions.CirujanoLugar].ToLookup(r => r.Clave2);
+        var centerAnesthesiologists = byDimension[RollupDimensions.LugarAnestesiologo].ToLookup(r => r.Clave);
+
+        reportData.CenterStats = reportData.SurgeriesByCenter
+            .Select(kvp => new CenterStatistics
+            {
+                CenterName = kvp.Key,
+                TotalSurgeries = kvp.Value,
+                SurgeriesByType = SumBy(centerTypes[kvp.Key], r => r.Clave2),
+                ActiveSurgeons = ExpandByTurnos(centerSurgeons[kvp.Key], r => r.Clave),
+                ActiveAnesthesiologists = ExpandByTurnos(centerAnesthesiologists[kvp.Key])
+            })
+            .OrderByDescending(c => c.TotalSurgeries)
+            .ToList();
+
+        // Colaboraciones (sin SurgeryTypes/Centers por par: no se muestran en el PDF)
+        reportData.TopCollaborations = byDimension[RollupDimensions.CirujanoAnestesiologo]
+            .GroupBy(r => (Surgeon: r.Clave, Anesthesiologist: r.Clave2))
+            .Select(g => new CollaborationPair
+            {
+                SurgeonName = g.Key.Surgeon,
+                AnesthesiologistName = g.Key.Anesthesiologist,
+                CollaborationCount = g.Sum(r => r.Cantidad)
+            })
+            .OrderByDescending(c => c.CollaborationCount)
+            .ToList();
+
+        return reportData;
+    }
+
+    private static Dictionary<TKey, int> SumBy<TKey>(IEnumerable<AppointmentRollup> rollups, Func<AppointmentRollup, TKey> key) where TKey : notnull
+    {
+        return rollups.GroupBy(key).ToDictionary(g => g.Key, g => g.Sum(r => r.Cantidad));
+    }
+
+    private static Dictionary<TKey, int> CountBy<TKey>(IEnumerable<AppointmentRollup> rollups, Func<AppointmentRollup, TKey> key) where TKey : notnull
+    {
+        return rollups.GroupBy(key).ToDictionary(g => g.Key, g => g.Sum(r => r.Turnos));
+    }
+
+    /// <summary>
+    /// Reconstruye las listas con un nombre por appointment (PreferredCenters, ActiveSurgeons, ...):
+    /// PreferredCenter/TopSurgeon y los Unique* dan lo mismo que con el scan.
+    /// </summary>
+    private static List<string> ExpandByTurnos(IEnumerable<AppointmentRollup> rollups, Func<AppointmentRollup, string>? name = null)
+    {
+        name ??= r => r.Clave2;
+        return rollups
+            .GroupBy(name)
+            .OrderByDescending(g => g.Sum(r => r.Turnos))
+            .SelectMany(g => Enumerable.Repeat(g.Key, g.Sum(r => r.Turnos)))
+            .ToList();
+    }
+
+    /// <summary>
+    /// Valores numéricos que usa el PDF, aplanados por clave, para comparar el reporte
+    /// desde rollups contra el scan de appointments (/reports/compare).
+    /// </summary>
+    public static SortedDictionary<string, double> FlattenNumbers(ReportData data)
+    {
+        var values = new SortedDictionary<string, double>(StringComparer.Ordinal)
+        {
+            ["total"] = data.TotalSurgeries,
+            ["periodo_anterior"] = data.PreviousPeriodTotal ?? 0
+        };
+
+        void AddAll<TKey>(string prefix, Dictionary<TKey, int> source) where TKey : notnull
+        {
+            foreach (var (key, value) in source)
+                values[$"{prefix}[{key}]"] = value;
+        }
+
+        AddAll("por_tipo", data.SurgeriesByType);
+        AddAll("por_centro", data.SurgeriesByCenter);
+        AddAll("por_anestesiologo", data.SurgeriesByAnesthesiologist);
+        AddAll("por_dia", data.SurgeriesByDay);
+        AddAll("por_hora", data.SurgeriesByHour);
+        AddAll("diario", data.DailySurgeriesTimeline.ToDictionary(kvp => kvp.Key.ToString("yyyy-MM-dd"), kvp => kvp.Value));
+        AddAll("mensual", data.MonthlySurgeriesTimeline);
+        foreach (var (day, hours) in data.HeatmapData)
+            AddAll($"heatmap[{day}]", hours);
+
+        foreach (var surgeon in data.SurgeonStats)
+        {
+            var prefix = $"cirujano[{surgeon.SurgeonName}]";
+            values[$"{prefix}.total"] = surgeon.TotalSurgeries;
+            values[$"{prefix}.centros_unicos"] = surgeon.UniqueCenters;
+            values[$"{prefix}.anestesiologos_unicos"] = surgeon.UniqueAnesthesiologists;
+            AddAll($"{prefix}.por_tipo", surgeon.SurgeriesByType);
+            AddAll($"{prefix}.por_dia", surgeon.PreferredDays);
+        }
+
+        foreach (var center in data.CenterStats)
+        {
+            var prefix = $"centro[{center.CenterName}]";
+            values[$"{prefix}.total"] = center.TotalSurgeries;
+            values[$"{prefix}.cirujanos_unicos"] = center.UniqueSurgeons;
+            values[$"{prefix}.anestesiologos_unicos"] = center.UniqueAnesthesiologists;
+            AddAll($"{prefix}.por_tipo", center.SurgeriesByType);
+        }
+
+        foreach (var pair in data.TopCollaborations)
+            values[$"colaboracion[{pair.DisplayName}]"] = pair.CollaborationCount;
+
+        return values;
+    }
+
+    #endregion
+}
@@ -0,0 +1,239 @@
+using System;
+using System.Collections.Concurrent;
+using System.IO;
+using System.Linq;
+using System.Threading;
+using System.Threading.Channels;
+using System.Threading.Tasks;
+using Microsoft.Extensions.DependencyInjection;
+using Microsoft.Extensions.Hosting;
+using Microsoft.Extensions.Logging;
+using Telegram.Bot;
+using Telegram.Bot.Types;
+using RegistroCx.Models.ReportModels;
+using RegistroCx.ProgramServices.Services.Telegram;
+using RegistroCx.Services.Analytics;
+
+namespace RegistroCx.Services.Reports;
+
+public enum ReportEnqueueResult
+{
+    Queued,
+    AlreadyQueued,
+    QueueFull
+}
+
+/// <summary>
+/// Genera los PDFs fuera del manejo del update: ReportService encola y responde enseguida,
+/// un pool acotado de workers arma los datos, busca el PDF en ReportCache o lo renderiza, y lo envía.
+/// Un mismo chat no puede tener dos veces el mismo reporte en cola.
+/// </summary>
+public class ReportRenderQueue : BackgroundService
+{
+    private readonly IServiceScopeFactory _scopeFactory;
+    private readonly ReportCache _cache;
+    private readonly ILogger<ReportRenderQueue> _logger;
+    private readonly Channel<ReportJob> _channel;
+    private readonly ConcurrentDictionary<string, ReportJob> _pending = new();
+    private readonly int _workers;
+    private int _queued;
+    private int _rendering;
+    private int _peakQueued;
+
+    public ReportRenderQueue(IServiceScopeFactory scopeFactory, ReportCache cache, ILogger<ReportRenderQueue> logger, int workers, int capacity)
+    {
+        _scopeFactory = scopeFactory;
+        _cache = cache;
+        _logger = logger;
+        _workers = Math.Max(1, workers);
+        _channel = Channel.CreateBounded<ReportJob>(new BoundedChannelOptions(Math.Max(1, capacity))
+        {
+            FullMode = BoundedChannelFullMode.Wait
+        });
+
+        BotMetrics.RegisterGauge("report_queue_depth", () => Volatile.Read(ref _queued));
+        BotMetrics.RegisterGauge("report_queue_peak", () => Volatile.Read(ref _peakQueued));
+        BotMetrics.RegisterGauge("report_rendering", () => Volatile.Read(ref _rendering));
+        BotMetrics.RegisterGauge("report_workers", () => _workers);
+    }
+
+    public int QueueDepth => Volatile.Read(ref _queued);
+
+    public ReportEnqueueResult Enqueue(long chatId, ReportPeriod period)
+    {
+        var job = new ReportJob(chatId, period);
+        if (!_pending.TryAdd(job.Key, job))
+        {
+            BotMetrics.Increment("report_deduplicated");
+            return ReportEnqueueResult.AlreadyQueued;
+        }
+
+        // TryWrite no espera: con la cola llena se le avisa al usuario en lugar de bloquear su conversación
+        var depth = Interlocked.Increment(ref _queued);
+        if (!_channel.Writer.TryWrite(job))
+        {
+            Interlocked.Decrement(ref _queued);
+            _pending.TryRemove(job.Key, out _);
+            BotMetrics.Increment("report_queue_full");
+            return ReportEnqueueResult.QueueFull;
+        }
+
+        UpdatePeak(depth);
+        BotMetrics.Increment("report_enqueued");
+        return ReportEnqueueResult.Queued;
+    }
+
+    protected override Task ExecuteAsync(CancellationToken stoppingToken)
+    {
+        _logger.LogInformation("[REPORT-QUEUE] Starting {Workers} report workers", _workers);
+        return Task.WhenAll(Enumerable.Range(0, _workers).Select(_ => RunWorkerAsync(stoppingToken)));
+    }
+
+    private async Task RunWorkerAsync(CancellationToken stoppingToken)
+    {
+        try
+        {
+            await foreach (var job in _channel.Reader.ReadAllAsync(stoppingToken))
+            {
+                Interlocked.Decrement(ref _queued);
+                Interlocked.Increment(ref _rendering);
+                BotMetrics.Observe(BotMetrics.ReportQueueWait, DateTime.UtcNow - job.EnqueuedAt);
+                try
+                {
+                    await ProcessJobAsync(job, stoppingToken);
+                }
+                catch (Exception ex) when (!stoppingToken.IsCancellationRequested)
+                {
+                    _logger.LogError(ex, "[REPORT-QUEUE] Error generating {Type} report for chat {ChatId}", job.Period.Type, job.ChatId);
+                    BotMetrics.Increment("report_failed");
+                    await NotifyFailureAsync(job, stoppingToken);
+                }
+                finally
+                {
+                    Interlocked.Decrement(ref _rendering);
+                    _pending.TryRemove(job.Key, out _);
+                }
+            }
+        }
+        catch (OperationCanceledException) when (stoppingToken.IsCancellationRequested)
+        {
+            // Apagado del host: lo que quedó en cola se pierde, igual que los estados en memoria
+        }
+    }
+
+    private async Task ProcessJobAsync(ReportJob job, CancellationToken ct)
+    {
+        using var timer = BotMetrics.Time(BotMetrics.ReportRender);
+        using var scope = _scopeFactory.CreateScope();
+        var dataService = scope.ServiceProvider.GetRequiredService<ReportDataService>();
+        var pdfGenerator = scope.ServiceProvider.GetRequiredService<PdfGeneratorService>();
+
+        var reportData = job.Period.Type switch
+        {
+            ReportType.Weekly => await dataService.GenerateWeeklyReportDataAsync(job.ChatId, ct),
+            ReportType.Monthly => await dataService.GenerateMonthlyReportDataAsync(job.ChatId, job.Period.StartDate.Month, job.Period.StartDate.Year, ct),
+            _ => await dataService.GenerateAnnualReportDataAsync(job.ChatId, job.Period.StartDate.Year, ct)
+        };
+
+        var title = GetReportTitle(job.Period.Type);
+        var key = ReportCache.ComputeKey(title, reportData);
+        if (!_cache.TryGet(key, out var pdfPath))
+        {
+            var renderedPath = job.Period.Type switch
+            {
+                ReportType.Weekly => await pdfGenerator.CreateWeeklyReportPdfAsync(reportData, ct),
+                ReportType.Monthly => await pdfGenerator.CreateMonthlyReportPdfAsync(reportData, ct),
+                _ => await pdfGenerator.CreateAnnualReportPdfAsync(reportData, ct)
+            };
+            pdfPath = _cache.Store(key, renderedPath);
+        }
+
+        var reportName = job.Period.Type == ReportType.Weekly ? title : $"{title} - {reportData.Period.DisplayName}";
+        await SendPdfReport(job.ChatId, pdfPath, PdfGeneratorService.GetFileName(reportData), reportName, ct);
+        timer.Success();
+    }
+
+    private static async Task SendPdfReport(long chatId, string pdfPath, string fileName, string reportName, CancellationToken ct)
+    {
+        try
+        {
+            // El stream se abre cuando el despachador le da turno, no mientras espera en cola
+            await MessageSender.RunWithRetry(chatId, async (client, token) =>
+            {
+                await using var stream = new FileStream(pdfPath, FileMode.Open, FileAccess.Read, FileShare.Read | FileShare.Delete);
+
+                await client.SendDocument(
+                    chatId: chatId,
+                    document: InputFile.FromStream(stream, fileName),
+                    caption: $"✅ {reportName} generado exitosamente",
+                    cancellationToken: token
+                );
+            }, ct);
+
+            Console.WriteLine($"[REPORT] PDF sent successfully: {fileName}");
+        }
+        catch (Exception ex)
+        {
+            Console.WriteLine($"[REPORT] Error sending PDF: {ex}");
+            await MessageSender.SendWithRetry(chatId,
+                "✅ Reporte generado pero no se pudo enviar el archivo. Intenta nuevamente.",
+                cancellationToken: ct);
+        }
+    }
+
+    private static async Task NotifyFailureAsync(ReportJob job, CancellationToken ct)
+    {
+        var (name, command) = job.Period.Type switch
+        {
+            ReportType.Weekly => ("semanal", "/semanal"),
+            ReportType.Monthly => ("mensual", "/mensual"),
+            _ => ("anual", "/anual")
+        };
+
+        try
+        {
+            await MessageSender.SendWithRetry(job.ChatId,
+                $"❌ Error generando el reporte {name}. Intenta nuevamente con {command}.",
+                cancellationToken: ct);
+        }
+        catch (Exception ex)
+        {
+            Console.WriteLine($"[REPORT] Error notifying failure to chat {job.ChatId}: {ex.Message}");
+        }
+    }
+
+    private void UpdatePeak(int depth)
+    {
+        int peak;
+        while (depth > (peak = Volatile.Read(ref _peakQueued)))
+        {
+            if (Interlocked.CompareExchange(ref _peakQueued, depth, peak) == peak)
+                return;
+        }
+    }
+
+    private static string GetReportTitle(ReportType type) => type switch
+    {
+        ReportType.Weekly => "Reporte Semanal",
+        ReportType.Monthly => "Reporte Mensual",
+        _ => "Reporte Anual"
+    };
+
+    private sealed class ReportJob
+    {
+        public ReportJob(long chatId, ReportPeriod period)
+        {
+            ChatId = chatId;
+            Period = period;
+            // El semanal es siempre "los últimos 7 días": basta con el tipo
+            Key = period.Type == ReportType.Weekly
+                ? $"{chatId}:{period.Type}"
+                : $"{chatId}:{period.Type}:{period.StartDate:yyyy-MM}";
+        }
+
+        public long ChatId { get; }
+        public ReportPeriod Period { get; }
+        public string Key { get; }
+        public DateTime EnqueuedAt { get; } = DateTime.UtcNow;
+    }
+}
@@ -1,4 +1,5 @@
 using System;
+using System.Collections.Concurrent;
 using System.IO;
 using System.Text.RegularExpressions;
 using System.Threading;
@@ -14,15 +15,15 @@ namespace RegistroCx.Services.Reports;
 public class ReportService : IReportService
 {
     private readonly ReportDataService _dataService;
-    private readonly PdfGeneratorService _pdfGenerator;
+    private readonly ReportRenderQueue _renderQueue;
     
     // Estados para manejo de comandos con parámetros (compartido entre requests)
-    private readonly Dictionary<long, ReportCommandState> _commandStates;
+    private readonly ConcurrentDictionary<long, ReportCommandState> _commandStates;
 
-    public ReportService(ReportDataService dataService, PdfGeneratorService pdfGenerator, Dictionary<long, ReportCommandState> commandStates)
+    public ReportService(ReportDataService dataService, ReportRenderQueue renderQueue, ConcurrentDictionary<long, ReportCommandState> commandStates)
     {
         _dataService = dataService;
-        _pdfGenerator = pdfGenerator;
+        _renderQueue = renderQueue;
         _commandStates = commandStates;
     }
 
@@ -69,17 +70,8 @@ public class ReportService : IReportService
         {
             await MessageSender.SendWithRetry(chatId, "⏳ Procesando...", cancellationToken: ct);
             
-            await MessageSender.SendWithRetry(chatId, 
-                "📊 Generando reporte semanal (últimos 7 días)...", 
-                cancellationToken: ct);
-
-            var pdfPath = await GenerateWeeklyReportAsync(chatId, ct);
-            await SendPdfReport(bot, chatId, pdfPath, "Reporte Semanal", ct);
-            
-            // Limpiar archivo temporal
-            if (System.IO.File.Exists(pdfPath))
-                System.IO.File.Delete(pdfPath);
-                
+            await EnqueueReportAsync(chatId, ReportPeriod.CreateWeekly(),
+                "📊 Generando reporte semanal (últimos 7 días)...", ct);
         }
         catch (Exception ex)
         {
@@ -155,7 +147,7 @@ public class ReportService : IReportService
                 return await HandleYearInput(bot, chatId, input, ct);
                 
             default:
-                _commandStates.Remove(chatId);
+                _commandStates.TryRemove(chatId, out _);
                 return false;
         }
     }
@@ -196,20 +188,12 @@ public class ReportService : IReportService
         {
             await MessageSender.SendWithRetry(chatId, "⏳ Procesando...", cancellationToken: ct);
             
-            var monthName = ReportPeriod.CreateMonthly(month, year).DisplayName;
-            await MessageSender.SendWithRetry(chatId,
-                $"📊 Generando reporte mensual ({monthName})...",
-                cancellationToken: ct);
-
-            var pdfPath = await GenerateMonthlyReportAsync(chatId, month, year, ct);
-            await SendPdfReport(bot, chatId, pdfPath, $"Reporte Mensual - {monthName}", ct);
-            
-            // Limpiar archivo temporal
-            if (System.IO.File.Exists(pdfPath))
-                System.IO.File.Delete(pdfPath);
-                
-            // Reporte exitoso - limpiar estado
-            _commandStates.Remove(chatId);
+            var period = ReportPeriod.CreateMonthly(month, year);
+            if (await EnqueueReportAsync(chatId, period, $"📊 Generando reporte mensual ({period.DisplayName})...", ct))
+            {
+                // En cola - limpiar estado (si el worker falla, avisa que se repita /mensual)
+                _commandStates.TryRemove(chatId, out _);
+            }
         }
         catch (Exception ex)
         {
@@ -246,19 +230,11 @@ public class ReportService : IReportService
         {
             await MessageSender.SendWithRetry(chatId, "⏳ Procesando...", cancellationToken: ct);
             
-            await MessageSender.SendWithRetry(chatId,
-                $"📊 Generando reporte anual ({year})...",
-                cancellationToken: ct);
-
-            var pdfPath = await GenerateAnnualReportAsync(chatId, year, ct);
-            await SendPdfReport(bot, chatId, pdfPath, $"Reporte Anual - {year}", ct);
-            
-            // Limpiar archivo temporal
-            if (System.IO.File.Exists(pdfPath))
-                System.IO.File.Delete(pdfPath);
-                
-            // Reporte exitoso - limpiar estado
-            _commandStates.Remove(chatId);
+            if (await EnqueueReportAsync(chatId, ReportPeriod.CreateAnnual(year), $"📊 Generando reporte anual ({year})...", ct))
+            {
+                // En cola - limpiar estado (si el worker falla, avisa que se repita /anual)
+                _commandStates.TryRemove(chatId, out _);
+            }
         }
         catch (Exception ex)
         {
@@ -272,49 +248,33 @@ public class ReportService : IReportService
         return true;
     }
 
-    private async Task SendPdfReport(ITelegramBotClient bot, long chatId, string pdfPath, string reportName, CancellationToken ct)
+    /// <summary>
+    /// Encola el PDF en ReportRenderQueue: el worker lo envía cuando está listo y esta conversación queda libre.
+    /// Devuelve false si no se pudo encolar (cola llena); el estado se conserva para reintentar.
+    /// </summary>
+    private async Task<bool> EnqueueReportAsync(long chatId, ReportPeriod period, string generatingMessage, CancellationToken ct)
     {
-        try
+        switch (_renderQueue.Enqueue(chatId, period))
         {
-            var fileName = Path.GetFileName(pdfPath);
-            await using var stream = new FileStream(pdfPath, FileMode.Open, FileAccess.Read);
+            case ReportEnqueueResult.Queued:
+                await MessageSender.SendWithRetry(chatId, generatingMessage, cancellationToken: ct);
+                return true;
 
-            await bot.SendDocument(
-                chatId: chatId,
-                document: InputFile.FromStream(stream, fileName),
-                caption: $"✅ {reportName} generado exitosamente",
-                cancellationToken: ct
-            );
+            case ReportEnqueueResult.AlreadyQueued:
+                await MessageSender.SendWithRetry(chatId,
+                    "⏳ Ese reporte ya se está generando, te lo envío apenas esté listo.",
+                    cancellationToken: ct);
+                return true;
 
-            Console.WriteLine($"[REPORT] PDF sent successfully: {fileName}");
-        }
-        catch (Exception ex)
-        {
-            Console.WriteLine($"[REPORT] Error sending PDF: {ex}");
-            await MessageSender.SendWithRetry(chatId,
-                "✅ Reporte generado pero no se pudo enviar el archivo. Intenta nuevamente.",
-                cancellationToken: ct);
+            default:
+                Console.WriteLine($"[REPORT] Render queue full ({_renderQueue.QueueDepth}), rejecting report for chat {chatId}");
+                await MessageSender.SendWithRetry(chatId,
+                    "⚠️ Hay muchos reportes en proceso. Intenta nuevamente en unos minutos.",
+                    cancellationToken: ct);
+                return false;
         }
     }
 
-    public async Task<string> GenerateWeeklyReportAsync(long chatId, CancellationToken ct = default)
-    {
-        var reportData = await _dataService.GenerateWeeklyReportDataAsync(chatId, ct);
-        return await _pdfGenerator.CreateWeeklyReportPdfAsync(reportData, ct);
-    }
-
-    public async Task<string> GenerateMonthlyReportAsync(long chatId, int month, int year, CancellationToken ct = default)
-    {
-        var reportData = await _dataService.GenerateMonthlyReportDataAsync(chatId, month, year, ct);
-        return await _pdfGenerator.CreateMonthlyReportPdfAsync(reportData, ct);
-    }
-
-    public async Task<string> GenerateAnnualReportAsync(long chatId, int year, CancellationToken ct = default)
-    {
-        var reportData = await _dataService.GenerateAnnualReportDataAsync(chatId, year, ct);
-        return await _pdfGenerator.CreateAnnualReportPdfAsync(reportData, ct);
-    }
-
     public class ReportCommandState
     {
         public ReportType Type { get; set; }
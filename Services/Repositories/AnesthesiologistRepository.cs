@@ -116,4 +116,20 @@ public class AnesthesiologistRepository : IAnesthesiologistRepository
         
         return results.OrderBy(name => name, StringComparer.OrdinalIgnoreCase).ToList();
     }
+
+    public async Task<List<AnesthesiologistRosterEntry>> GetRosterByEquipoAsync(int equipoId, CancellationToken ct)
+    {
+        const string sql = @"
+            SELECT CONCAT(nombre, ' ', apellido) AS Nombre,
+                   email AS Email,
+                   COALESCE(nicknames, '{}') AS Nicknames
+            FROM anestesiologos 
+            WHERE equipo_id = @equipoId;";
+
+        await using var conn = await OpenAsync(ct);
+        var results = await conn.QueryAsync<AnesthesiologistRosterEntry>(
+            new CommandDefinition(sql, new { equipoId }, cancellationToken: ct));
+
+        return results.ToList();
+    }
 }
\ No newline at end of file
@@ -6,14 +6,36 @@ using Npgsql;
 using NpgsqlTypes;
 using RegistroCx.Models;
 using RegistroCx.models;
+using RegistroCx.Models.ReportModels;
+using RegistroCx.Services.Analytics;
 
 namespace RegistroCx.Services.Repositories;
 
 public class AppointmentRepository : IAppointmentRepository
 {
     private readonly string _connString;
+    private readonly IAppointmentReminderSchedule? _reminders;
+    private static int _rollupSchemaWarned;
+
+    // Columnas que definen los buckets de appointment_rollups
+    private const string RollupSourceColumns =
+        "equipo_id AS EquipoId, fecha_hora AS FechaHora, lugar AS Lugar, cirujano AS Cirujano, cirugia AS Cirugia, cantidad AS Cantidad, anestesiologo AS Anestesiologo";
+
+    // Recordatorios: el chat sale del user_profile que cargó la cirugía
+    private const string ReminderColumns =
+        "a.id AS Id, a.equipo_id AS EquipoId, a.user_profile_id AS UserProfileId, up.chat_id AS ChatId, a.google_email AS GoogleEmail, " +
+        "a.fecha_hora AS FechaHora, a.lugar AS Lugar, a.cirujano AS Cirujano, a.cirugia AS Cirugia, a.cantidad AS Cantidad, " +
+        "a.anestesiologo AS Anestesiologo, a.calendar_event_id AS CalendarEventId, a.calendar_synced_at AS CalendarSyncedAt, a.reminder_sent_at AS ReminderSentAt";
+
+    // Si la cirugía cambia de fecha, el recordatorio ya enviado era para la fecha vieja
+    private const string ReminderResetOnDateChange =
+        "reminder_sent_at = CASE WHEN fecha_hora IS DISTINCT FROM @fechaHora THEN NULL ELSE reminder_sent_at END";
     
-    public AppointmentRepository(string connString) => _connString = connString;
+    public AppointmentRepository(string connString, IAppointmentReminderSchedule? reminders = null)
+    {
+        _connString = connString;
+        _reminders = reminders;
+    }
 
     private async Task<NpgsqlConnection> OpenAsync(CancellationToken ct)
     {
@@ -73,12 +95,20 @@ public class AppointmentRepository : IAppointmentRepository
             ReminderSentAt = appointment.ReminderSentAt
         };
 
+        using var timer = BotMetrics.Time(BotMetrics.DbWrite);
         await using var conn = await OpenAsync(ct);
+        await using var tx = await conn.BeginTransactionAsync(ct);
         var id = await conn.QuerySingleAsync<long>(
-            new CommandDefinition(sql, parameters, cancellationToken: ct));
+            new CommandDefinition(sql, parameters, tx, cancellationToken: ct));
         
         appointment.Id = id;
         appointment.EquipoId = equipoId;
+        await ApplyRollupAsync(conn, tx, appointment, +1, ct);
+        await tx.CommitAsync(ct);
+        timer.Success();
+
+        if (appointment.ReminderSentAt == null)
+            _reminders?.Schedule(id, appointment.FechaHora);
         return id;
     }
 
@@ -126,11 +156,15 @@ public class AppointmentRepository : IAppointmentRepository
 
     public async Task DeleteAsync(long id, CancellationToken ct)
     {
-        const string sql = @"DELETE FROM appointments WHERE id = @id;";
+        var sql = $"DELETE FROM appointments WHERE id = @id RETURNING {RollupSourceColumns};";
 
         await using var conn = await OpenAsync(ct);
-        await conn.ExecuteAsync(
-            new CommandDefinition(sql, new { id }, cancellationToken: ct));
+        await using var tx = await conn.BeginTransactionAsync(ct);
+        var deleted = await conn.QuerySingleOrDefaultAsync<Appointment>(
+            new CommandDefinition(sql, new { id }, tx, cancellationToken: ct));
+        await ApplyRollupAsync(conn, tx, deleted, -1, ct);
+        await tx.CommitAsync(ct);
+        _reminders?.Cancel(id);
     }
 
     public async Task UpdateCalendarEventAsync(long appointmentId, string eventId, CancellationToken ct)
@@ -150,47 +184,76 @@ public class AppointmentRepository : IAppointmentRepository
 
     public async Task<List<Appointment>> GetAppointmentsNeedingRemindersAsync(CancellationToken ct)
     {
-        const string sql = @"
-            SELECT id, equipo_id, user_profile_id, google_email, fecha_hora, lugar, cirujano, cirugia, cantidad, anestesiologo, 
-                   calendar_event_id, calendar_synced_at, reminder_sent_at, created_at
-            FROM appointments 
-            WHERE reminder_sent_at IS NULL 
-              AND fecha_hora > now()
-              AND fecha_hora <= now() + interval '24 hours'
-            ORDER BY fecha_hora ASC;";
+        var sql = $@"
+            SELECT {ReminderColumns}
+            FROM appointments a
+            LEFT JOIN user_profiles up ON up.id = a.user_profile_id
+            WHERE a.reminder_sent_at IS NULL 
+              AND a.fecha_hora > now()
+              AND a.fecha_hora <= now() + interval '24 hours'
+            ORDER BY a.fecha_hora ASC;";
 
         await using var conn = await OpenAsync(ct);
-        var results = await conn.QueryAsync(
+        var results = await conn.QueryAsync<Appointment>(
             new CommandDefinition(sql, cancellationToken: ct));
 
-        return results.Select(result => new Appointment
-        {
-            Id = result.id,
-            EquipoId = result.equipo_id,
-            UserProfileId = result.user_profile_id,
-            GoogleEmail = result.google_email,
-            FechaHora = result.fecha_hora,
-            Lugar = result.lugar,
-            Cirujano = result.cirujano,
-            Cirugia = result.cirugia,
-            Cantidad = result.cantidad,
-            Anestesiologo = result.anestesiologo,
-            CalendarEventId = result.calendar_event_id,
-            CalendarSyncedAt = result.calendar_synced_at,
-            ReminderSentAt = result.reminder_sent_at
-        }).ToList();
+        return results.ToList();
+    }
+
+    public async Task<List<Appointment>> GetReminderScheduleAsync(DateTime from, DateTime to, CancellationToken ct)
+    {
+        // Solo id y fecha: el índice en memoria no necesita más. Usa idx_appointments_reminders
+        const string sql = @"
+            SELECT id AS Id, fecha_hora AS FechaHora
+            FROM appointments
+            WHERE reminder_sent_at IS NULL
+              AND fecha_hora > @from
+              AND fecha_hora <= @to;";
+
+        using var timer = BotMetrics.Time(BotMetrics.ReminderDb);
+        await using var conn = await OpenAsync(ct);
+        var results = await conn.QueryAsync<Appointment>(
+            new CommandDefinition(sql, new { from, to }, cancellationToken: ct));
+        timer.Success();
+        return results.ToList();
+    }
+
+    public async Task<List<Appointment>> GetRemindersDueAsync(IReadOnlyCollection<long> appointmentIds, CancellationToken ct)
+    {
+        // Releer al enviar: la base manda si el appointment se borró, cambió de fecha o ya tuvo recordatorio
+        var sql = $@"
+            SELECT {ReminderColumns}
+            FROM appointments a
+            LEFT JOIN user_profiles up ON up.id = a.user_profile_id
+            WHERE a.id = ANY(@ids)
+              AND a.reminder_sent_at IS NULL
+              AND a.fecha_hora > now();";
+
+        using var timer = BotMetrics.Time(BotMetrics.ReminderDb);
+        await using var conn = await OpenAsync(ct);
+        var results = await conn.QueryAsync<Appointment>(
+            new CommandDefinition(sql, new { ids = appointmentIds.ToArray() }, cancellationToken: ct));
+        timer.Success();
+        return results.ToList();
     }
 
     public async Task MarkReminderSentAsync(long appointmentId, CancellationToken ct)
+    {
+        await MarkRemindersSentAsync(new[] { appointmentId }, ct);
+    }
+
+    public async Task MarkRemindersSentAsync(IReadOnlyCollection<long> appointmentIds, CancellationToken ct)
     {
         const string sql = @"
             UPDATE appointments 
             SET reminder_sent_at = now() 
-            WHERE id = @appointmentId;";
+            WHERE id = ANY(@ids);";
 
+        using var timer = BotMetrics.Time(BotMetrics.ReminderDb);
         await using var conn = await OpenAsync(ct);
         await conn.ExecuteAsync(
-            new CommandDefinition(sql, new { appointmentId }, cancellationToken: ct));
+            new CommandDefinition(sql, new { ids = appointmentIds.ToArray() }, cancellationToken: ct));
+        timer.Success();
     }
 
     // Métodos movidos a sección de compatibilidad al final del archivo
@@ -203,11 +266,13 @@ public class AppointmentRepository : IAppointmentRepository
 
     public async Task UpdateAsync(long appointmentId, ModificationRequest changes, CancellationToken ct = default)
     {
-        using var conn = await OpenAsync(ct);
+        using var timer = BotMetrics.Time(BotMetrics.DbWrite);
+        await using var conn = await OpenAsync(ct);
         
         var updates = new List<string>();
         var parameters = new DynamicParameters();
         parameters.Add("id", appointmentId);
+        var dateChanged = false;
 
         if (changes.NewDate.HasValue || changes.NewTime.HasValue)
         {
@@ -220,7 +285,9 @@ public class AppointmentRepository : IAppointmentRepository
                 var newDateTime = newDate.Add(newTime.ToTimeSpan());
                 
                 updates.Add("fecha_hora = @fechaHora");
+                updates.Add(ReminderResetOnDateChange);
                 parameters.Add("fechaHora", newDateTime);
+                dateChanged = true;
             }
         }
 
@@ -257,14 +324,19 @@ public class AppointmentRepository : IAppointmentRepository
         if (updates.Any())
         {
             updates.Add("updated_at = now()");
-            var sql = $"UPDATE appointments SET {string.Join(", ", updates)} WHERE id = @id";
-            await conn.ExecuteAsync(sql, parameters);
+            var sql = $"UPDATE appointments SET {string.Join(", ", updates)} WHERE id = @id RETURNING {RollupSourceColumns}";
+            var after = await UpdateWithRollupsAsync(conn, appointmentId, sql, parameters, ct);
+            if (after != null && dateChanged)
+                _reminders?.Schedule(appointmentId, after.FechaHora);
         }
+
+        timer.Success();
     }
 
     public async Task UpdateDirectAsync(long appointmentId, Appointment modifiedAppointment, CancellationToken ct = default)
     {
-        using var conn = await OpenAsync(ct);
+        using var timer = BotMetrics.Time(BotMetrics.DbWrite);
+        await using var conn = await OpenAsync(ct);
         
         const string sql = @"
             UPDATE appointments 
@@ -275,8 +347,10 @@ public class AppointmentRepository : IAppointmentRepository
                 cantidad = @cantidad,
                 anestesiologo = @anestesiologo,
                 notas = @notas,
+                " + ReminderResetOnDateChange + @",
                 updated_at = now()
-            WHERE id = @id";
+            WHERE id = @id
+            RETURNING " + RollupSourceColumns;
 
         var parameters = new DynamicParameters();
         parameters.Add("id", appointmentId);
@@ -288,9 +362,135 @@ public class AppointmentRepository : IAppointmentRepository
         parameters.Add("anestesiologo", modifiedAppointment.Anestesiologo);
         parameters.Add("notas", modifiedAppointment.Notas);
 
-        await conn.ExecuteAsync(sql, parameters);
+        var after = await UpdateWithRollupsAsync(conn, appointmentId, sql, parameters, ct);
+        timer.Success();
+
+        if (after != null)
+            _reminders?.Schedule(appointmentId, after.FechaHora);
+    }
+
+    #region Agregados para reportes (appointment_rollups)
+
+    public async Task<List<AppointmentRollup>> GetReportRollupsAsync(int equipoId, DateTime startDate, DateTime endDate, string? dimension = null, CancellationToken ct = default)
+    {
+        // startDate/endDate son días completos (inclusive); los buckets mensuales empiezan el día 1
+        const string sql = @"
+            SELECT periodo AS Periodo, dimension AS Dimension, clave AS Clave, clave2 AS Clave2, cantidad AS Cantidad, turnos AS Turnos
+            FROM appointment_rollups
+            WHERE equipo_id = @equipoId
+              AND periodo >= @startDate
+              AND periodo <= @endDate
+              AND (@dimension::text IS NULL OR dimension = @dimension)";
+
+        await using var conn = await OpenAsync(ct);
+        var rollups = await conn.QueryAsync<AppointmentRollup>(
+            new CommandDefinition(sql, new { equipoId, startDate = startDate.Date, endDate = endDate.Date, dimension }, cancellationToken: ct));
+        return rollups.ToList();
     }
 
+    public async Task<int> RebuildReportRollupsAsync(int equipoId, CancellationToken ct = default)
+    {
+        await using var conn = await OpenAsync(ct);
+        return await conn.ExecuteScalarAsync<int>(
+            new CommandDefinition("SELECT rebuild_appointment_rollups(@equipoId)", new { equipoId }, cancellationToken: ct));
+    }
+
+    /// <summary>
+    /// Suma (sign = +1) o resta (sign = -1) un appointment de sus buckets, en la misma transacción que la escritura.
+    /// Las claves salen de appointment_rollup_keys(), igual que en el rebuild.
+    /// </summary>
+    private static async Task ApplyRollupAsync(NpgsqlConnection conn, NpgsqlTransaction tx, Appointment? appointment, int sign, CancellationToken ct)
+    {
+        if (appointment?.EquipoId == null || appointment.FechaHora == null)
+            return;
+
+        // El SAVEPOINT va en el mismo comando: sin create_appointment_rollups.sql aplicado se vuelve a él
+        // y el appointment se guarda igual (los reportes caen al scan de appointments)
+        const string sql = @"
+            SAVEPOINT rollup;
+
+            INSERT INTO appointment_rollups (equipo_id, periodo, dimension, clave, clave2, cantidad, turnos)
+            SELECT @equipoId, k.periodo, k.dimension, k.clave, k.clave2, @cantidad, @turnos
+            FROM appointment_rollup_keys(@fechaHora, @lugar, @cirujano, @cirugia, @anestesiologo) k
+            ON CONFLICT (equipo_id, periodo, dimension, clave, clave2) DO UPDATE
+            SET cantidad = appointment_rollups.cantidad + EXCLUDED.cantidad,
+                turnos = appointment_rollups.turnos + EXCLUDED.turnos;
+
+            DELETE FROM appointment_rollups
+            WHERE equipo_id = @equipoId
+              AND periodo IN (@fechaHora::date, date_trunc('month', @fechaHora)::date)
+              AND turnos <= 0;
+
+            RELEASE SAVEPOINT rollup;";
+
+        try
+        {
+            await conn.ExecuteAsync(new CommandDefinition(sql, new
+            {
+                equipoId = appointment.EquipoId.Value,
+                fechaHora = appointment.FechaHora.Value,
+                lugar = appointment.Lugar,
+                cirujano = appointment.Cirujano,
+                cirugia = appointment.Cirugia,
+                anestesiologo = appointment.Anestesiologo,
+                cantidad = sign * (appointment.Cantidad ?? 1),
+                turnos = sign
+            }, tx, cancellationToken: ct));
+        }
+        catch (PostgresException ex) when (IsMissingRollupSchema(ex))
+        {
+            await tx.RollbackAsync("rollup", ct);
+            WarnMissingRollupSchema(ex);
+        }
+    }
+
+    /// <summary>
+    /// Recalcula los rollups de un equipo dentro de la transacción recibida; sin el esquema de rollups no hace nada.
+    /// </summary>
+    private static async Task RebuildRollupsInTransactionAsync(NpgsqlConnection conn, NpgsqlTransaction tx, int equipoId, CancellationToken ct)
+    {
+        await tx.SaveAsync("rollup", ct);
+        try
+        {
+            await conn.ExecuteScalarAsync<int>(
+                new CommandDefinition("SELECT rebuild_appointment_rollups(@equipoId)", new { equipoId }, tx, cancellationToken: ct));
+            await tx.ReleaseAsync("rollup", ct);
+        }
+        catch (PostgresException ex) when (IsMissingRollupSchema(ex))
+        {
+            await tx.RollbackAsync("rollup", ct);
+            WarnMissingRollupSchema(ex);
+        }
+    }
+
+    private static bool IsMissingRollupSchema(PostgresException ex) =>
+        ex.SqlState == PostgresErrorCodes.UndefinedTable || ex.SqlState == PostgresErrorCodes.UndefinedFunction;
+
+    private static void WarnMissingRollupSchema(PostgresException ex)
+    {
+        BotMetrics.Increment("rollup_schema_missing");
+        if (Interlocked.Exchange(ref _rollupSchemaWarned, 1) == 0)
+            Console.WriteLine($"[REPORTS] ⚠️ appointment_rollups no disponible ({ex.MessageText}); ejecutar create_appointment_rollups.sql. Los appointments se guardan sin rollups.");
+    }
+
+    private static async Task<Appointment?> UpdateWithRollupsAsync(NpgsqlConnection conn, long appointmentId, string updateSql, DynamicParameters parameters, CancellationToken ct)
+    {
+        await using var tx = await conn.BeginTransactionAsync(ct);
+
+        // FOR UPDATE: otra modificación concurrente no puede restar la misma versión dos veces
+        var before = await conn.QuerySingleOrDefaultAsync<Appointment>(new CommandDefinition(
+            $"SELECT {RollupSourceColumns} FROM appointments WHERE id = @id FOR UPDATE", new { id = appointmentId }, tx, cancellationToken: ct));
+        var after = await conn.QuerySingleOrDefaultAsync<Appointment>(
+            new CommandDefinition(updateSql, parameters, tx, cancellationToken: ct));
+
+        await ApplyRollupAsync(conn, tx, before, -1, ct);
+        await ApplyRollupAsync(conn, tx, after, +1, ct);
+        await tx.CommitAsync(ct);
+        return after;
+    }
+
+    #endregion
+
     #region Métodos con equipo_id
 
     public async Task<List<Appointment>> GetPendingCalendarSyncAsync(int equipoId, CancellationToken ct)
@@ -298,7 +498,10 @@ public class AppointmentRepository : IAppointmentRepository
         const string sql = @"
             SELECT id, equipo_id, user_profile_id, google_email, fecha_hora, lugar, cirujano, cirugia, cantidad, anestesiologo, calendar_event_id, calendar_synced_at, reminder_sent_at, created_at
             FROM appointments 
-            WHERE equipo_id = @equipoId AND calendar_event_id IS NULL
+            WHERE equipo_id = @equipoId
+              AND (calendar_event_id IS NULL
+                   OR calendar_synced_at IS NULL
+                   OR updated_at > calendar_synced_at)
             ORDER BY fecha_hora";
 
         await using var conn = await OpenAsync(ct);
@@ -322,6 +525,55 @@ public class AppointmentRepository : IAppointmentRepository
         }).ToList();
     }
 
+    public async Task UpdateCalendarEventsAsync(IReadOnlyDictionary<long, string> eventIds, CancellationToken ct)
+    {
+        if (eventIds.Count == 0)
+            return;
+
+        // Un solo UPDATE por sync en lugar de uno por appointment
+        const string sql = @"
+            UPDATE appointments a
+            SET calendar_event_id = v.event_id,
+                calendar_synced_at = now()
+            FROM unnest(@ids, @eventIds) AS v(id, event_id)
+            WHERE a.id = v.id;";
+
+        var pairs = eventIds.ToArray();
+        using var timer = BotMetrics.Time(BotMetrics.DbWrite);
+        await using var conn = await OpenAsync(ct);
+        await conn.ExecuteAsync(new CommandDefinition(sql, new
+        {
+            ids = pairs.Select(p => p.Key).ToArray(),
+            eventIds = pairs.Select(p => p.Value).ToArray()
+        }, cancellationToken: ct));
+        timer.Success();
+    }
+
+    public async Task<int> MarkCalendarChangesAsync(int equipoId, IReadOnlyList<CalendarEventChange> changes, CancellationToken ct)
+    {
+        if (changes.Count == 0)
+            return 0;
+
+        // Borrado o movido en Calendar: la base manda, queda pendiente para volver a empujarlo
+        const string sql = @"
+            UPDATE appointments a
+            SET calendar_synced_at = NULL
+            FROM unnest(@eventIds, @cancelled, @starts) AS c(event_id, cancelled, start_local)
+            WHERE a.equipo_id = @equipoId
+              AND a.calendar_event_id = c.event_id
+              AND a.calendar_synced_at IS NOT NULL
+              AND (c.cancelled OR c.start_local IS DISTINCT FROM a.fecha_hora);";
+
+        await using var conn = await OpenAsync(ct);
+        return await conn.ExecuteAsync(new CommandDefinition(sql, new
+        {
+            equipoId,
+            eventIds = changes.Select(c => c.EventId).ToArray(),
+            cancelled = changes.Select(c => c.Cancelled).ToArray(),
+            starts = changes.Select(c => c.Start ?? DateTime.MinValue).ToArray()
+        }, cancellationToken: ct));
+    }
+
     public async Task<List<Appointment>> GetByEquipoAndDateRangeAsync(int equipoId, DateTime startDate, DateTime endDate, CancellationToken ct = default)
     {
         const string sql = @"
@@ -360,21 +612,22 @@ public class AppointmentRepository : IAppointmentRepository
 
     public async Task<List<Appointment>> GetAppointmentsForWeekAsync(int equipoId, DateTime weekStartDate, CancellationToken ct)
     {
-        var endDate = weekStartDate.AddDays(7);
+        // Días completos: hasta el último instante del séptimo día
+        var endDate = weekStartDate.AddDays(7).AddTicks(-1);
         return await GetByEquipoAndDateRangeAsync(equipoId, weekStartDate, endDate, ct);
     }
 
     public async Task<List<Appointment>> GetAppointmentsForMonthAsync(int equipoId, int month, int year, CancellationToken ct)
     {
         var startDate = new DateTime(year, month, 1);
-        var endDate = startDate.AddMonths(1).AddDays(-1);
+        var endDate = startDate.AddMonths(1).AddTicks(-1); // Incluye todo el último día del mes
         return await GetByEquipoAndDateRangeAsync(equipoId, startDate, endDate, ct);
     }
 
     public async Task<List<Appointment>> GetAppointmentsForYearAsync(int equipoId, int year, CancellationToken ct)
     {
         var startDate = new DateTime(year, 1, 1);
-        var endDate = new DateTime(year, 12, 31);
+        var endDate = startDate.AddYears(1).AddTicks(-1); // Incluye todo el 31/12
         return await GetByEquipoAndDateRangeAsync(equipoId, startDate, endDate, ct);
     }
 
@@ -432,7 +685,13 @@ public class AppointmentRepository : IAppointmentRepository
             WHERE user_profile_id = (SELECT id FROM user_profiles WHERE chat_id = @chatId) AND equipo_id IS NULL";
 
         await using var conn = await OpenAsync(ct);
-        await conn.ExecuteAsync(sql, new { chatId, equipoId });
+        await using var tx = await conn.BeginTransactionAsync(ct);
+        var migrated = await conn.ExecuteAsync(new CommandDefinition(sql, new { chatId, equipoId }, tx, cancellationToken: ct));
+
+        // Los appointments sin equipo no tenían rollups: recalcular los del equipo destino
+        if (migrated > 0)
+            await RebuildRollupsInTransactionAsync(conn, tx, equipoId, ct);
+        await tx.CommitAsync(ct);
     }
 
     public async Task<List<Appointment>> GetAppointmentsWithoutEquipoAsync(CancellationToken ct = default)
@@ -1,3 +1,4 @@
+using System;
 using System.Collections.Generic;
 using System.Threading;
 using System.Threading.Tasks;
@@ -11,4 +12,12 @@ public interface IAnesthesiologistRepository
     Task SaveAsync(string nombre, string apellido, string email, CancellationToken ct);
     Task AddNicknameAsync(long anesthesiologistId, string nickname, CancellationToken ct);
     Task<List<string>> GetNamesByEquipoAsync(int equipoId, CancellationToken ct);
+    Task<List<AnesthesiologistRosterEntry>> GetRosterByEquipoAsync(int equipoId, CancellationToken ct);
+}
+
+public class AnesthesiologistRosterEntry
+{
+    public string Nombre { get; set; } = string.Empty;
+    public string? Email { get; set; }
+    public string[] Nicknames { get; set; } = Array.Empty<string>();
 }
\ No newline at end of file
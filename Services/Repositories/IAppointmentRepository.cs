@@ -3,6 +3,7 @@ using System.Threading;
 using System.Threading.Tasks;
 using RegistroCx.Models;
 using RegistroCx.models;
+using RegistroCx.Models.ReportModels;
 
 namespace RegistroCx.Services.Repositories;
 
@@ -14,6 +15,8 @@ public interface IAppointmentRepository
     Task<Appointment?> GetByIdAsync(long id, CancellationToken ct);
     Task DeleteAsync(long id, CancellationToken ct);
     Task UpdateCalendarEventAsync(long appointmentId, string eventId, CancellationToken ct);
+    Task UpdateCalendarEventsAsync(IReadOnlyDictionary<long, string> eventIds, CancellationToken ct);
+    Task<int> MarkCalendarChangesAsync(int equipoId, IReadOnlyList<CalendarEventChange> changes, CancellationToken ct);
     Task UpdateAsync(long appointmentId, ModificationRequest changes, CancellationToken ct = default);
     Task UpdateDirectAsync(long appointmentId, Appointment modifiedAppointment, CancellationToken ct = default);
     
@@ -25,9 +28,16 @@ public interface IAppointmentRepository
     Task<List<Appointment>> GetAppointmentsForMonthAsync(int equipoId, int month, int year, CancellationToken ct);
     Task<List<Appointment>> GetAppointmentsForYearAsync(int equipoId, int year, CancellationToken ct);
     
+    // Agregados precalculados para reportes (appointment_rollups)
+    Task<List<AppointmentRollup>> GetReportRollupsAsync(int equipoId, DateTime startDate, DateTime endDate, string? dimension = null, CancellationToken ct = default);
+    Task<int> RebuildReportRollupsAsync(int equipoId, CancellationToken ct = default);
+    
     // Métodos para recordatorios
     Task<List<Appointment>> GetAppointmentsNeedingRemindersAsync(CancellationToken ct);
     Task MarkReminderSentAsync(long appointmentId, CancellationToken ct);
+    Task<List<Appointment>> GetReminderScheduleAsync(DateTime from, DateTime to, CancellationToken ct);
+    Task<List<Appointment>> GetRemindersDueAsync(IReadOnlyCollection<long> appointmentIds, CancellationToken ct);
+    Task MarkRemindersSentAsync(IReadOnlyCollection<long> appointmentIds, CancellationToken ct);
     
     // Métodos de compatibilidad temporal (mantener durante migración)
     Task<List<Appointment>> GetPendingCalendarSyncAsync(long chatId, CancellationToken ct);
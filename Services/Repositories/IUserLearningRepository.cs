@@ -22,6 +22,9 @@ public interface IUserLearningRepository
     Task<long> SaveUserPatternAsync(UserCommunicationPattern pattern, CancellationToken ct = default);
     Task UpdatePatternFrequencyAsync(long chatId, string patternType, string patternValue, CancellationToken ct = default);
 
+    // Escritura por lotes (LearningWriteBuffer): un upsert de varias filas por tabla
+    Task UpsertLearningBatchAsync(IReadOnlyList<UserTermIncrement> terms, IReadOnlyList<UserPatternIncrement> patterns, CancellationToken ct = default);
+
     // Métodos de análisis
     Task<Dictionary<string, int>> GetMostUsedTermsByTypeAsync(long chatId, string termType, int limit = 10, CancellationToken ct = default);
     Task<List<UserCustomTerm>> GetHighConfidenceTermsAsync(long chatId, decimal minConfidence = 0.7m, CancellationToken ct = default);
@@ -14,6 +14,10 @@ public interface IUserProfileRepository
 
     Task StoreOAuthStateAsync(long chatId, string nonce, CancellationToken ct);
     Task UpdateTokensAsync(long chatId, string access, string? refresh, DateTime? expiry, CancellationToken ct);
+
+    // Sync incremental de Google Calendar (nextSyncToken de events.list)
+    Task<string?> GetCalendarSyncTokenAsync(long chatId, CancellationToken ct);
+    Task UpdateCalendarSyncTokenAsync(long chatId, string? syncToken, CancellationToken ct);
     
     // Métodos para vinculación de perfiles existentes
     Task<UserProfile?> FindByPhoneAsync(string phone, CancellationToken ct = default);
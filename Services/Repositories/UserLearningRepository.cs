@@ -1,5 +1,6 @@
 using System;
 using System.Collections.Generic;
+using System.Linq;
 using System.Threading;
 using System.Threading.Tasks;
 using Dapper;
@@ -14,6 +15,7 @@ public class UserLearningRepository : IUserLearningRepository
 {
     private readonly ILogger<UserLearningRepository> _logger;
     private readonly string _connectionString;
+    private readonly NpgsqlDataSource? _dataSource;
 
     public UserLearningRepository(ILogger<UserLearningRepository> logger, string connectionString)
     {
@@ -21,14 +23,27 @@ public class UserLearningRepository : IUserLearningRepository
         _connectionString = connectionString;
     }
 
-    private async Task<NpgsqlConnection> OpenAsync(CancellationToken ct = default)
+    /// <summary>
+    /// Con un NpgsqlDataSource compartido las conexiones salen de su pool sin volver a armar la cadena de conexión.
+    /// </summary>
+    public UserLearningRepository(ILogger<UserLearningRepository> logger, NpgsqlDataSource dataSource)
+    {
+        _logger = logger;
+        _connectionString = string.Empty;
+        _dataSource = dataSource;
+    }
+
+    /// <summary>
+    /// Cadena clave=valor de Npgsql a partir de una URI postgresql:// o de una cadena que ya viene en ese formato.
+    /// </summary>
+    public static string BuildConnectionString(string connectionString)
     {
         var csb = new NpgsqlConnectionStringBuilder();
 
-        if (_connectionString.StartsWith("postgresql://", StringComparison.OrdinalIgnoreCase))
+        if (connectionString.StartsWith("postgresql://", StringComparison.OrdinalIgnoreCase))
         {
             // Parsear URI
-            var uri = new Uri(_connectionString);
+            var uri = new Uri(connectionString);
             var userInfo = uri.UserInfo.Split(':', 2);
             csb.Host = uri.Host;
             if (uri.Port > 0)
@@ -45,10 +60,18 @@ public class UserLearningRepository : IUserLearningRepository
         else
         {
             // asume ya viene en formato clave=valor
-            csb.ConnectionString = _connectionString;
+            csb.ConnectionString = connectionString;
         }
 
-        var conn = new NpgsqlConnection(csb.ConnectionString);
+        return csb.ConnectionString;
+    }
+
+    private async Task<NpgsqlConnection> OpenAsync(CancellationToken ct = default)
+    {
+        if (_dataSource != null)
+            return await _dataSource.OpenConnectionAsync(ct);
+
+        var conn = new NpgsqlConnection(BuildConnectionString(_connectionString));
         await conn.OpenAsync(ct);
         return conn;
     }
@@ -231,6 +254,70 @@ public class UserLearningRepository : IUserLearningRepository
         });
     }
 
+    public async Task UpsertLearningBatchAsync(IReadOnlyList<UserTermIncrement> terms, IReadOnlyList<UserPatternIncrement> patterns, CancellationToken ct = default)
+    {
+        // Mismo resultado que aplicar cada uso por separado: un término nuevo arranca con su confianza inicial
+        // y cada uso siguiente suma 1 a la frecuencia y 0.05 a la confianza
+        const string termsSql = @"
+            INSERT INTO user_custom_terms (chat_id, user_term, standard_term, term_type, frequency, confidence, first_seen, last_used, created_at, updated_at)
+            SELECT t.chat_id, t.user_term, t.standard_term, t.term_type, t.hits,
+                   LEAST(1.0, t.initial_confidence + 0.05 * (t.hits - 1)), NOW(), NOW(), NOW(), NOW()
+            FROM unnest(@ChatIds, @UserTerms, @StandardTerms, @TermTypes, @Hits, @InitialConfidences)
+                 AS t(chat_id, user_term, standard_term, term_type, hits, initial_confidence)
+            ON CONFLICT (chat_id, user_term, term_type)
+            DO UPDATE SET
+                frequency = user_custom_terms.frequency + EXCLUDED.frequency,
+                confidence = LEAST(1.0, user_custom_terms.confidence + 0.05 * EXCLUDED.frequency),
+                last_used = NOW(),
+                updated_at = NOW()";
+
+        const string patternsSql = @"
+            INSERT INTO user_communication_patterns (chat_id, pattern_type, pattern_value, frequency, confidence, last_used, created_at, updated_at)
+            SELECT p.chat_id, p.pattern_type, p.pattern_value, p.hits,
+                   LEAST(1.0, 0.6 + 0.05 * (p.hits - 1)), NOW(), NOW(), NOW()
+            FROM unnest(@ChatIds, @PatternTypes, @PatternValues, @Hits)
+                 AS p(chat_id, pattern_type, pattern_value, hits)
+            ON CONFLICT (chat_id, pattern_type, pattern_value)
+            DO UPDATE SET
+                frequency = user_communication_patterns.frequency + EXCLUDED.frequency,
+                confidence = LEAST(1.0, user_communication_patterns.confidence + 0.05 * EXCLUDED.frequency),
+                last_used = NOW(),
+                updated_at = NOW()";
+
+        await using var connection = await OpenAsync(ct);
+        // Todo o nada: si falla, el buffer aísla las filas inválidas o reencola el lote sin contar usos dos veces
+        await using var transaction = await connection.BeginTransactionAsync(ct);
+
+        if (terms.Count > 0)
+        {
+            await connection.ExecuteAsync(new CommandDefinition(termsSql, new
+            {
+                ChatIds = terms.Select(t => t.ChatId).ToArray(),
+                UserTerms = terms.Select(t => t.UserTerm.ToLowerInvariant()).ToArray(),
+                StandardTerms = terms.Select(t => t.StandardTerm).ToArray(),
+                TermTypes = terms.Select(t => t.TermType).ToArray(),
+                Hits = terms.Select(t => t.Hits).ToArray(),
+                InitialConfidences = terms.Select(t => t.InitialConfidence).ToArray()
+            }, transaction, cancellationToken: ct));
+        }
+
+        if (patterns.Count > 0)
+        {
+            await connection.ExecuteAsync(new CommandDefinition(patternsSql, new
+            {
+                ChatIds = patterns.Select(p => p.ChatId).ToArray(),
+                PatternTypes = patterns.Select(p => p.PatternType).ToArray(),
+                PatternValues = patterns.Select(p => p.PatternValue).ToArray(),
+                Hits = patterns.Select(p => p.Hits).ToArray()
+            }, transaction, cancellationToken: ct));
+        }
+
+        await transaction.CommitAsync(ct);
+
+        _logger.LogInformation("[USER-LEARNING] Flushed {Terms} term(s) and {Patterns} pattern(s) in one batch",
+            terms.Count, patterns.Count);
+    }
+
     public async Task<Dictionary<string, int>> GetMostUsedTermsByTypeAsync(long chatId, string termType, int limit = 10, CancellationToken ct = default)
     {
         await using var connection = await OpenAsync(ct);
@@ -285,6 +285,20 @@ public class UserProfileRepository : IUserProfileRepository
         Console.WriteLine($"[OAuth] ✅ Updated tokens for {rowsUpdated} team members with email {userEmail}");
     }
 
+    public async Task<string?> GetCalendarSyncTokenAsync(long chatId, CancellationToken ct)
+    {
+        const string sql = @"SELECT google_calendar_sync_token FROM user_profiles WHERE chat_id=@chatId";
+        await using var conn = await OpenAsync(ct);
+        return await conn.QuerySingleOrDefaultAsync<string?>(new CommandDefinition(sql, new { chatId }, cancellationToken: ct));
+    }
+
+    public async Task UpdateCalendarSyncTokenAsync(long chatId, string? syncToken, CancellationToken ct)
+    {
+        const string sql = @"UPDATE user_profiles SET google_calendar_sync_token=@syncToken, updated_at=now() WHERE chat_id=@chatId";
+        await using var conn = await OpenAsync(ct);
+        await conn.ExecuteAsync(new CommandDefinition(sql, new { chatId, syncToken }, cancellationToken: ct));
+    }
+
     #region Métodos de Telegram (migrados desde UsuarioTelegramRepository)
 
     public async Task<UserProfile?> GetByTelegramIdAsync(long telegramId, CancellationToken ct = default)
@@ -0,0 +1,124 @@
+using System;
+using System.Collections.Concurrent;
+using System.Threading;
+using System.Threading.Tasks;
+using Microsoft.Extensions.Caching.Memory;
+using Microsoft.Extensions.DependencyInjection;
+using Microsoft.Extensions.Logging;
+using RegistroCx.Services.Analytics;
+
+namespace RegistroCx.Services;
+
+/// <summary>
+/// Transcripciones de voz/audio fuera del loop de updates: hasta N llamadas a Whisper en paralelo
+/// (VOICE_TRANSCRIPTION_CONCURRENCY) y cache por file_unique_id, así un audio reenviado
+/// o repetido no se vuelve a descargar ni a transcribir. La llamada compartida corre con el token
+/// de vida del pool (apagado del host), no con el del primer update: cada pedido deja de esperar con el suyo.
+/// </summary>
+public class TranscriptionPool
+{
+    private static readonly TimeSpan CacheExpiration = TimeSpan.FromHours(24);
+
+    private readonly IServiceScopeFactory _scopeFactory;
+    private readonly IMemoryCache _cache;
+    private readonly ILogger<TranscriptionPool> _logger;
+    private readonly SemaphoreSlim _slots;
+    private readonly ConcurrentDictionary<string, Lazy<Task<string?>>> _inFlight = new();
+    private readonly int _concurrency;
+    private readonly CancellationToken _stopping;
+    private int _waiting;
+    private int _running;
+
+    public TranscriptionPool(IServiceScopeFactory scopeFactory, IMemoryCache cache, ILogger<TranscriptionPool> logger, int concurrency,
+        CancellationToken stopping = default)
+    {
+        _scopeFactory = scopeFactory;
+        _cache = cache;
+        _logger = logger;
+        _concurrency = Math.Max(1, concurrency);
+        _slots = new SemaphoreSlim(_concurrency, _concurrency);
+        _stopping = stopping;
+
+        BotMetrics.RegisterGauge("transcription_waiting", () => Volatile.Read(ref _waiting));
+        BotMetrics.RegisterGauge("transcription_running", () => Volatile.Read(ref _running));
+        BotMetrics.RegisterGauge("transcription_slots", () => _concurrency);
+    }
+
+    /// <summary>
+    /// Devuelve la transcripción del archivo; null si no se pudo entender.
+    /// Dos pedidos del mismo archivo en vuelo comparten la misma llamada.
+    /// </summary>
+    public Task<string?> TranscribeAsync(
+        string fileUniqueId,
+        Func<AudioTranscriptionService, CancellationToken, Task<string?>> transcribe,
+        CancellationToken ct)
+    {
+        var cacheKey = $"transcription:{fileUniqueId}";
+        if (_cache.TryGetValue(cacheKey, out string? cached) && !string.IsNullOrWhiteSpace(cached))
+        {
+            BotMetrics.Increment("transcription_cache_hit");
+            return Task.FromResult<string?>(cached);
+        }
+
+        var created = false;
+        var lazy = _inFlight.GetOrAdd(fileUniqueId, _ =>
+        {
+            created = true;
+            return new Lazy<Task<string?>>(() => RunAsync(fileUniqueId, cacheKey, transcribe, _stopping));
+        });
+
+        BotMetrics.Increment(created ? "transcription_cache_miss" : "transcription_deduplicated");
+        // Cancelar un update deja de esperar la transcripción, no la corta para los demás que la comparten
+        return lazy.Value.WaitAsync(ct);
+    }
+
+    private async Task<string?> RunAsync(
+        string fileUniqueId,
+        string cacheKey,
+        Func<AudioTranscriptionService, CancellationToken, Task<string?>> transcribe,
+        CancellationToken ct)
+    {
+        Interlocked.Increment(ref _waiting);
+        var acquired = false;
+        try
+        {
+            await _slots.WaitAsync(ct);
+            acquired = true;
+            Interlocked.Decrement(ref _waiting);
+            Interlocked.Increment(ref _running);
+
+            using var timer = BotMetrics.Time(BotMetrics.VoiceTranscription);
+            using var scope = _scopeFactory.CreateScope();
+            var audioService = scope.ServiceProvider.GetRequiredService<AudioTranscriptionService>();
+
+            var text = await transcribe(audioService, ct);
+            if (!string.IsNullOrWhiteSpace(text))
+            {
+                // Solo se cachea lo que se entendió: un fallo de Whisper se reintenta con el próximo envío
+                _cache.Set(cacheKey, text, CacheExpiration);
+                timer.Success();
+            }
+
+            return text;
+        }
+        catch (Exception ex) when (ex is not OperationCanceledException)
+        {
+            _logger.LogError(ex, "[TRANSCRIPTION] Error transcribing {FileUniqueId}", fileUniqueId);
+            return null;
+        }
+        finally
+        {
+            if (acquired)
+            {
+                Interlocked.Decrement(ref _running);
+                _slots.Release();
+            }
+            else
+            {
+                Interlocked.Decrement(ref _waiting);
+            }
+
+            _inFlight.TryRemove(fileUniqueId, out _);
+        }
+    }
+}
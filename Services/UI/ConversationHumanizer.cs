@@ -230,7 +230,7 @@ namespace RegistroCx.Services.UI
             httpClient.DefaultRequestHeaders.Authorization = new System.Net.Http.Headers.AuthenticationHeaderValue("Bearer", GetOpenAIApiKey());
             
             var content = new StringContent(jsonBody, System.Text.Encoding.UTF8, "application/json");
-            var response = await httpClient.PostAsync("https://api.openai.com/v1/responses", content, ct);
+            var response = await httpClient.PostAsync(RegistroCx.Helpers.OpenAI.OpenAIEndpoints.Responses, content, ct);
             
             if (!response.IsSuccessStatusCode)
             {
@@ -1,4 +1,5 @@
 using System;
+using System.Collections.Concurrent;
 using System.Collections.Generic;
 using System.Linq;
 using System.Threading;
@@ -20,13 +21,16 @@ namespace RegistroCx.Services.UI
         private readonly ICacheService _cacheService;
         private readonly ILogger<QuickEditService> _logger;
         private readonly AppointmentConfirmationService? _confirmationService;
-        private readonly Dictionary<long, Appointment>? _pendingAppointments;
+        private readonly ConcurrentDictionary<long, Appointment>? _pendingAppointments;
         private readonly IAnesthesiologistRepository _anesthesiologistRepo;
         private readonly ISurgeonRepository _surgeonRepo;
         private readonly EquipoService _equipoService;
         
         // Dictionary to track pending edit states for "other" options
-        private static readonly Dictionary<long, (string action, long appointmentId)> _pendingEdits = new();
+        private static readonly ConcurrentDictionary<long, (string action, long appointmentId)> _pendingEdits = new();
+
+        // Ediciones "otro..." sin completar (expuesto en /health/memory)
+        public static int PendingEditCount => _pendingEdits.Count;
         
         // Callback data prefixes
         private const string CONFIRM_PREFIX = "confirm_";
@@ -45,7 +49,7 @@ namespace RegistroCx.Services.UI
             ISurgeonRepository surgeonRepo,
             EquipoService equipoService,
             AppointmentConfirmationService? confirmationService = null, 
-            Dictionary<long, Appointment>? pendingAppointments = null)
+            ConcurrentDictionary<long, Appointment>? pendingAppointments = null)
         {
             _cacheService = cacheService;
             _logger = logger;
@@ -526,7 +530,7 @@ namespace RegistroCx.Services.UI
         {
             try
             {
-                await bot.EditMessageReplyMarkup(
+                await MessageSender.EditReplyMarkupWithRetry(
                     chatId: chatId,
                     messageId: messageId,
                     replyMarkup: newKeyboard,
@@ -553,7 +557,7 @@ namespace RegistroCx.Services.UI
                         await _confirmationService.ProcessConfirmationAsync(bot, appointment, chatId, ct);
                         
                         // Clear from pending after successful confirmation
-                        _pendingAppointments.Remove(chatId);
+                        _pendingAppointments.TryRemove(chatId, out _);
                     }
                     else
                     {
@@ -1170,7 +1174,7 @@ namespace RegistroCx.Services.UI
             }
 
             // Remove the pending state
-            _pendingEdits.Remove(chatId);
+            _pendingEdits.TryRemove(chatId, out _);
 
             try
             {
@@ -7,6 +7,8 @@ using System.Threading;
 using System.Threading.Tasks;
 using Microsoft.Extensions.Logging;
 using RegistroCx.Domain;
+using RegistroCx.Helpers;
+using RegistroCx.Services.Extraction;
 using RegistroCx.Services.Repositories;
 
 namespace RegistroCx.Services;
@@ -15,11 +17,20 @@ public class UserLearningService
 {
     private readonly IUserLearningRepository _learningRepo;
     private readonly ILogger<UserLearningService> _logger;
+    private readonly LlmResponseCache? _responseCache;
+    private readonly LearningWriteBuffer? _writeBuffer;
 
-    public UserLearningService(IUserLearningRepository learningRepo, ILogger<UserLearningService> logger)
+    // Términos que la normalización del cache de respuestas trata como equivalentes a su forma estándar
+    private const decimal MinSubstitutionConfidence = 0.7m;
+    private const int MinSubstitutionFrequency = 2;
+
+    public UserLearningService(IUserLearningRepository learningRepo, ILogger<UserLearningService> logger,
+        LlmResponseCache? responseCache = null, LearningWriteBuffer? writeBuffer = null)
     {
         _learningRepo = learningRepo;
         _logger = logger;
+        _responseCache = responseCache;
+        _writeBuffer = writeBuffer;
     }
 
     /// <summary>
@@ -57,6 +68,11 @@ public class UserLearningService
 
             // Aprender patrones de comunicación
             await LearnCommunicationPatterns(chatId, extractedData, ct);
+
+            // Los términos cambiaron: la tabla de reemplazos del cache de respuestas se vuelve a leer.
+            // Con el buffer de escritura esto pasa cuando el lote llega a la base (LearningWriteBuffer.FlushAsync)
+            if (_writeBuffer == null)
+                _responseCache?.RefreshSubstitutions(chatId);
         }
         catch (Exception ex)
         {
@@ -146,6 +162,59 @@ public class UserLearningService
         }
     }
 
+    /// <summary>
+    /// Términos aprendidos (término del usuario -> forma estándar) seguros para tratar como sinónimos al
+    /// normalizar el input del LLM. Los de personas solo si el término es parte del nombre estándar
+    /// ("quiroga" -> "Dr. Andrea Quiroga"): LearnSurgeonTerms guarda cualquier palabra con mayúscula.
+    /// Un término con más de una forma estándar se descarta.
+    /// </summary>
+    public async Task<Dictionary<string, string>> GetTermSubstitutionsAsync(long chatId, CancellationToken ct = default)
+    {
+        try
+        {
+            var terms = await _learningRepo.GetHighConfidenceTermsAsync(chatId, MinSubstitutionConfidence, ct);
+
+            return terms
+                .Where(IsReliableSubstitution)
+                .GroupBy(t => t.UserTerm.ToLowerInvariant())
+                .Where(g => g.Select(t => t.StandardTerm.ToLowerInvariant()).Distinct().Count() == 1)
+                .ToDictionary(g => g.Key, g => g.First().StandardTerm);
+        }
+        catch (Exception ex)
+        {
+            _logger.LogError(ex, "[USER-LEARNING] Error loading term substitutions for user {ChatId}", chatId);
+            return new Dictionary<string, string>();
+        }
+    }
+
+    /// <summary>
+    /// Alias aprendidos de un tipo de término agrupados por forma estándar ("Dr. Andrea Quiroga" -> ["quiroga"]),
+    /// con el mismo filtro que GetTermSubstitutionsAsync. Alimentan el índice de nombres (NameLookupService).
+    /// </summary>
+    public async Task<Dictionary<string, List<string>>> GetLearnedAliasesAsync(long chatId, string termType, CancellationToken ct = default)
+    {
+        try
+        {
+            var terms = await _learningRepo.GetHighConfidenceTermsAsync(chatId, MinSubstitutionConfidence, ct);
+
+            return terms
+                .Where(t => t.TermType == termType)
+                .Where(IsReliableSubstitution)
+                .GroupBy(t => t.StandardTerm)
+                .ToDictionary(g => g.Key, g => g.Select(t => t.UserTerm).Distinct().ToList());
+        }
+        catch (Exception ex)
+        {
+            _logger.LogError(ex, "[USER-LEARNING] Error loading learned aliases for user {ChatId}", chatId);
+            return new Dictionary<string, List<string>>();
+        }
+    }
+
+    private static bool IsReliableSubstitution(UserCustomTerm term) =>
+        term.Frequency >= MinSubstitutionFrequency &&
+        (term.TermType is TermTypes.Surgery or TermTypes.Place ||
+         Regex.IsMatch(TextoHelper.Normalizar(term.StandardTerm), $@"\b{Regex.Escape(TextoHelper.Normalizar(term.UserTerm))}\b"));
+
     /// <summary>
     /// Obtiene sugerencias inteligentes basadas en el historial del usuario
     /// </summary>
@@ -184,30 +253,7 @@ public class UserLearningService
             // Solo aprender si la palabra no es exactamente igual al término estándar
             if (!string.Equals(word, extractedSurgery, StringComparison.OrdinalIgnoreCase))
             {
-                var existingTerm = await _learningRepo.GetUserCustomTermAsync(chatId, word, TermTypes.Surgery, ct);
-                
-                if (existingTerm != null)
-                {
-                    // Incrementar frecuencia del término existente
-                    await _learningRepo.UpdateTermFrequencyAsync(chatId, word, TermTypes.Surgery, ct);
-                }
-                else
-                {
-                    // Crear nuevo término personalizado
-                    var newTerm = new UserCustomTerm
-                    {
-                        ChatId = chatId,
-                        UserTerm = word,
-                        StandardTerm = extractedSurgery,
-                        TermType = TermTypes.Surgery,
-                        Frequency = 1,
-                        Confidence = 0.7m, // Confianza inicial moderada
-                        FirstSeen = DateTime.UtcNow,
-                        LastUsed = DateTime.UtcNow
-                    };
-
-                    await _learningRepo.SaveUserCustomTermAsync(newTerm, ct);
-                }
+                await RecordTermUse(chatId, word, extractedSurgery, TermTypes.Surgery, 0.7m, ct); // Confianza inicial moderada
 
                 _logger.LogInformation("[USER-LEARNING] Learned surgery term: '{UserTerm}' -> '{StandardTerm}' for user {ChatId}", 
                     word, extractedSurgery, chatId);
@@ -226,28 +272,7 @@ public class UserLearningService
         {
             if (!string.Equals(word, extractedSurgeon, StringComparison.OrdinalIgnoreCase))
             {
-                var existingTerm = await _learningRepo.GetUserCustomTermAsync(chatId, word, TermTypes.Surgeon, ct);
-                
-                if (existingTerm != null)
-                {
-                    await _learningRepo.UpdateTermFrequencyAsync(chatId, word, TermTypes.Surgeon, ct);
-                }
-                else
-                {
-                    var newTerm = new UserCustomTerm
-                    {
-                        ChatId = chatId,
-                        UserTerm = word,
-                        StandardTerm = extractedSurgeon,
-                        TermType = TermTypes.Surgeon,
-                        Frequency = 1,
-                        Confidence = 0.8m, // Nombres suelen ser más específicos
-                        FirstSeen = DateTime.UtcNow,
-                        LastUsed = DateTime.UtcNow
-                    };
-
-                    await _learningRepo.SaveUserCustomTermAsync(newTerm, ct);
-                }
+                await RecordTermUse(chatId, word, extractedSurgeon, TermTypes.Surgeon, 0.8m, ct); // Nombres suelen ser más específicos
 
                 _logger.LogInformation("[USER-LEARNING] Learned surgeon term: '{UserTerm}' -> '{StandardTerm}' for user {ChatId}", 
                     word, extractedSurgeon, chatId);
@@ -265,28 +290,7 @@ public class UserLearningService
         {
             if (!string.Equals(word, extractedPlace, StringComparison.OrdinalIgnoreCase))
             {
-                var existingTerm = await _learningRepo.GetUserCustomTermAsync(chatId, word, TermTypes.Place, ct);
-                
-                if (existingTerm != null)
-                {
-                    await _learningRepo.UpdateTermFrequencyAsync(chatId, word, TermTypes.Place, ct);
-                }
-                else
-                {
-                    var newTerm = new UserCustomTerm
-                    {
-                        ChatId = chatId,
-                        UserTerm = word,
-                        StandardTerm = extractedPlace,
-                        TermType = TermTypes.Place,
-                        Frequency = 1,
-                        Confidence = 0.8m,
-                        FirstSeen = DateTime.UtcNow,
-                        LastUsed = DateTime.UtcNow
-                    };
-
-                    await _learningRepo.SaveUserCustomTermAsync(newTerm, ct);
-                }
+                await RecordTermUse(chatId, word, extractedPlace, TermTypes.Place, 0.8m, ct);
 
                 _logger.LogInformation("[USER-LEARNING] Learned place term: '{UserTerm}' -> '{StandardTerm}' for user {ChatId}", 
                     word, extractedPlace, chatId);
@@ -304,28 +308,7 @@ public class UserLearningService
         {
             if (!string.Equals(word, extractedAnesthesiologist, StringComparison.OrdinalIgnoreCase))
             {
-                var existingTerm = await _learningRepo.GetUserCustomTermAsync(chatId, word, TermTypes.Anesthesiologist, ct);
-                
-                if (existingTerm != null)
-                {
-                    await _learningRepo.UpdateTermFrequencyAsync(chatId, word, TermTypes.Anesthesiologist, ct);
-                }
-                else
-                {
-                    var newTerm = new UserCustomTerm
-                    {
-                        ChatId = chatId,
-                        UserTerm = word,
-                        StandardTerm = extractedAnesthesiologist,
-                        TermType = TermTypes.Anesthesiologist,
-                        Frequency = 1,
-                        Confidence = 0.8m,
-                        FirstSeen = DateTime.UtcNow,
-                        LastUsed = DateTime.UtcNow
-                    };
-
-                    await _learningRepo.SaveUserCustomTermAsync(newTerm, ct);
-                }
+                await RecordTermUse(chatId, word, extractedAnesthesiologist, TermTypes.Anesthesiologist, 0.8m, ct);
             }
         }
     }
@@ -339,8 +322,52 @@ public class UserLearningService
         }
     }
 
+    /// <summary>
+    /// Un uso de un término del usuario. Con el buffer de escritura queda en memoria y se escribe en lote;
+    /// sin él, lectura y update/insert en el momento.
+    /// </summary>
+    private async Task RecordTermUse(long chatId, string userTerm, string standardTerm, string termType, decimal initialConfidence, CancellationToken ct)
+    {
+        if (_writeBuffer != null)
+        {
+            _writeBuffer.AddTerm(chatId, userTerm, standardTerm, termType, initialConfidence);
+            return;
+        }
+
+        var existingTerm = await _learningRepo.GetUserCustomTermAsync(chatId, userTerm, termType, ct);
+        
+        if (existingTerm != null)
+        {
+            // Incrementar frecuencia del término existente
+            await _learningRepo.UpdateTermFrequencyAsync(chatId, userTerm, termType, ct);
+        }
+        else
+        {
+            // Crear nuevo término personalizado
+            var newTerm = new UserCustomTerm
+            {
+                ChatId = chatId,
+                UserTerm = userTerm,
+                StandardTerm = standardTerm,
+                TermType = termType,
+                Frequency = 1,
+                Confidence = initialConfidence,
+                FirstSeen = DateTime.UtcNow,
+                LastUsed = DateTime.UtcNow
+            };
+
+            await _learningRepo.SaveUserCustomTermAsync(newTerm, ct);
+        }
+    }
+
     private async Task SaveFrequentPattern(long chatId, string patternType, string patternValue, CancellationToken ct)
     {
+        if (_writeBuffer != null)
+        {
+            _writeBuffer.AddPattern(chatId, patternType, patternValue);
+            return;
+        }
+
         var existingPattern = await _learningRepo.GetUserPatternAsync(chatId, patternType, ct);
         
         if (existingPattern != null && existingPattern.PatternValue == patternValue)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Lectura de /metrics del bot (formato de texto Prometheus) desde el harness
+
+El bot expone por etapa del hot path (update_receive, intent_classification,
+llm_extraction, db_write, calendar_sync, reply_send) un histograma de duración
+acumulado desde que arrancó. El harness toma un snapshot antes y otro después de
+la corrida y reporta la diferencia: así la tabla del servidor cubre exactamente
+el tráfico que generó el harness y se puede poner al lado de la latencia que vio
+el cliente.
+
+Los gauges (registrocx_gauge: profundidad de la cola de reportes, bytes en cache)
+son instantáneos; GaugePeak los muestrea durante la corrida para tener el máximo.
+
+Uso:
+    python3 bot_metrics.py --metrics-url http://127.0.0.1:8080/metrics
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+DEFAULT_METRICS_URL = "http://127.0.0.1:8080/metrics"
+STAGE_METRIC = "registrocx_stage_duration_seconds"
+ERRORS_METRIC = "registrocx_stage_errors_total"
+EVENTS_METRIC = "registrocx_events_total"
+GAUGE_METRIC = "registrocx_gauge"
+STAGE_ORDER = ["update_queue_wait", "update_receive", "intent_classification", "context_classification",
+               "context_relevance_llm", "fast_path_extraction", "name_lookup", "llm_extraction", "db_write",
+               "calendar_sync", "multi_surgery_fanout", "reply_send", "outbound_queue_wait", "report_queue_wait", "report_render",
+               "voice_transcription", "reminder_delay", "reminder_db", "learning_flush"]
+
+_SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_prometheus(text: str) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+    """{(nombre, ((label, valor), ...)): valor} de un texto de exposición Prometheus"""
+    samples = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE_RE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        try:
+            number = float(value)
+        except ValueError:
+            continue
+        samples[(name, tuple(sorted(_LABEL_RE.findall(labels or ""))))] = number
+    return samples
+
+
+class MetricsSnapshot:
+    """Histogramas por etapa y contadores de eventos de un scrape"""
+
+    def __init__(self, samples: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.events: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        for (name, labels), value in samples.items():
+            label_map = dict(labels)
+            if name == EVENTS_METRIC:
+                self.events[label_map.get("event", "")] = value
+                continue
+            if name == GAUGE_METRIC:
+                self.gauges[label_map.get("gauge", "")] = value
+                continue
+            stage = label_map.get("stage")
+            if stage is None:
+                continue
+            entry = self.stages.setdefault(stage, {"buckets": {}, "count": 0.0, "sum": 0.0, "errors": 0.0})
+            if name == f"{STAGE_METRIC}_bucket":
+                entry["buckets"][parse_bound(label_map["le"])] = value
+            elif name == f"{STAGE_METRIC}_count":
+                entry["count"] = value
+            elif name == f"{STAGE_METRIC}_sum":
+                entry["sum"] = value
+            elif name == ERRORS_METRIC:
+                entry["errors"] = value
+
+    @classmethod
+    def from_text(cls, text: str) -> "MetricsSnapshot":
+        return cls(parse_prometheus(text))
+
+    @classmethod
+    def empty(cls) -> "MetricsSnapshot":
+        return cls({})
+
+    def diff(self, before: "MetricsSnapshot") -> "MetricsSnapshot":
+        """Lo acumulado entre before y este snapshot (los contadores solo crecen)"""
+        result = MetricsSnapshot.empty()
+        for stage, entry in self.stages.items():
+            previous = before.stages.get(stage, {"buckets": {}, "count": 0.0, "sum": 0.0, "errors": 0.0})
+            result.stages[stage] = {
+                "buckets": {le: value - previous["buckets"].get(le, 0.0) for le, value in entry["buckets"].items()},
+                "count": entry["count"] - previous["count"],
+                "sum": entry["sum"] - previous["sum"],
+                "errors": entry["errors"] - previous["errors"]
+            }
+        result.events = {event: value - before.events.get(event, 0.0) for event, value in self.events.items()}
+        result.gauges = dict(self.gauges)  # Instantáneos: queda el valor del último scrape
+        return result
+
+    def report_cache_hit_rate(self) -> Optional[float]:
+        """Fracción de reportes servidos desde ReportCache; None si no se pidió ninguno"""
+        return self._hit_rate("report_cache")
+
+    def llm_cache_hit_rate(self) -> Optional[float]:
+        """Fracción de extracciones respondidas por LlmResponseCache; None si no hubo ninguna"""
+        return self._hit_rate("llm_cache")
+
+    def _hit_rate(self, prefix: str) -> Optional[float]:
+        hits = self.events.get(f"{prefix}_hit", 0.0)
+        lookups = hits + self.events.get(f"{prefix}_miss", 0.0)
+        return hits / lookups if lookups else None
+
+    def stage_rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for stage in sorted(self.stages, key=stage_sort_key):
+            entry = self.stages[stage]
+            count = entry["count"]
+            if count <= 0:
+                continue
+            rows.append({
+                "stage": stage,
+                "count": int(count),
+                "errors": int(entry["errors"]),
+                "mean_ms": entry["sum"] / count * 1000,
+                "p50_ms": bucket_quantile(0.50, entry["buckets"]) * 1000,
+                "p95_ms": bucket_quantile(0.95, entry["buckets"]) * 1000,
+                "p99_ms": bucket_quantile(0.99, entry["buckets"]) * 1000
+            })
+        return rows
+
+    def print_report(self, title: str = "ETAPAS EN EL SERVIDOR (/metrics)"):
+        rows = self.stage_rows()
+        print("\n" + "=" * 78)
+        print(f"🛠️  {title}")
+        print("=" * 78)
+        if not rows:
+            print("Sin observaciones nuevas en /metrics durante la corrida")
+        else:
+            print(f"{'Etapa':<24} {'n':>8} {'errores':>8} {'media ms':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+            for row in rows:
+                print(f"{row['stage']:<24} {row['count']:>8} {row['errors']:>8} {row['mean_ms']:>10.1f} "
+                      f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+        events = {event: value for event, value in self.events.items() if value}
+        if events:
+            print("Eventos: " + ", ".join(f"{event}={int(value)}" for event, value in sorted(events.items())))
+        if self.gauges:
+            print("Gauges: " + ", ".join(f"{gauge}={value:g}" for gauge, value in sorted(self.gauges.items())))
+        hit_rate = self.report_cache_hit_rate()
+        if hit_rate is not None:
+            print(f"Cache de reportes: {hit_rate * 100:.0f}% hits")
+        llm_hit_rate = self.llm_cache_hit_rate()
+        if llm_hit_rate is not None:
+            print(f"Cache de respuestas LLM: {llm_hit_rate * 100:.0f}% hits")
+        print("=" * 78)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"stages": self.stage_rows(), "events": self.events, "gauges": self.gauges,
+                "report_cache_hit_rate": self.report_cache_hit_rate(), "llm_cache_hit_rate": self.llm_cache_hit_rate()}
+
+
+def parse_bound(value: str) -> float:
+    return math.inf if value == "+Inf" else float(value)
+
+
+def stage_sort_key(stage: str) -> Tuple[int, str]:
+    return (STAGE_ORDER.index(stage) if stage in STAGE_ORDER else len(STAGE_ORDER), stage)
+
+
+def bucket_quantile(q: float, buckets: Dict[float, float]) -> float:
+    """Igual que histogram_quantile de Prometheus: interpolación lineal dentro del bucket"""
+    bounds = sorted(buckets)
+    if not bounds:
+        return 0.0
+    total = buckets[bounds[-1]]
+    if total <= 0:
+        return 0.0
+    rank = q * total
+    previous_bound, previous_count = 0.0, 0.0
+    for bound in bounds:
+        count = buckets[bound]
+        if count >= rank:
+            if math.isinf(bound):
+                return previous_bound  # Cae por encima del último límite finito
+            if count == previous_count:
+                return bound
+            return previous_bound + (bound - previous_bound) * (rank - previous_count) / (count - previous_count)
+        previous_bound, previous_count = bound, count
+    return previous_bound
+
+
+async def scrape(metrics_url: str, session: Optional[aiohttp.ClientSession] = None) -> Optional[MetricsSnapshot]:
+    """Snapshot de /metrics; None si el bot no responde (la corrida sigue sin tabla de servidor)"""
+    try:
+        if session is None:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as own_session:
+                return await scrape(metrics_url, own_session)
+        async with session.get(metrics_url) as response:
+            if response.status != 200:
+                print(f"⚠️  {metrics_url} devolvió HTTP {response.status}")
+                return None
+            return MetricsSnapshot.from_text(await response.text())
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"⚠️  No se pudo leer {metrics_url}: {e}")
+        return None
+
+
+class GaugePeak:
+    """Máximo de cada gauge de /metrics mientras corre la carga (la profundidad de cola sube y baja entre scrapes)"""
+
+    def __init__(self, metrics_url: str, interval: float = 1.0):
+        self.metrics_url = metrics_url
+        self.interval = interval
+        self.peaks: Dict[str, float] = {}
+
+    async def run(self, session: aiohttp.ClientSession):
+        while True:
+            try:
+                async with session.get(self.metrics_url) as response:
+                    snapshot = MetricsSnapshot.from_text(await response.text())
+                for gauge, value in snapshot.gauges.items():
+                    self.peaks[gauge] = max(self.peaks.get(gauge, value), value)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+            await asyncio.sleep(self.interval)
+
+
+def check_report_thresholds(server: MetricsSnapshot, peaks: Dict[str, float],
+                            max_queue_depth: Optional[int] = None,
+                            min_cache_hit_rate: Optional[float] = None) -> List[str]:
+    """Umbrales sobre la cola y el cache de reportes; devuelve los que no se cumplieron"""
+    failures = []
+    if max_queue_depth is not None:
+        depth = peaks.get("report_queue_depth", server.gauges.get("report_queue_depth", 0.0))
+        if depth > max_queue_depth:
+            failures.append(f"cola de reportes llegó a {depth:g} (máximo {max_queue_depth})")
+    if min_cache_hit_rate is not None:
+        hit_rate = server.report_cache_hit_rate()
+        if hit_rate is None:
+            failures.append("no hubo pedidos de reportes para medir el cache")
+        elif hit_rate < min_cache_hit_rate:
+            failures.append(f"cache de reportes {hit_rate * 100:.0f}% hits (mínimo {min_cache_hit_rate * 100:.0f}%)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Muestra los histogramas por etapa de /metrics del bot")
+    parser.add_argument("--metrics-url", default=os.getenv("BOT_METRICS_URL", DEFAULT_METRICS_URL))
+    parser.add_argument("--interval", type=float, help="Mostrar el delta cada N segundos en lugar del acumulado")
+    args = parser.parse_args()
+
+    async def run():
+        previous = await scrape(args.metrics_url) if args.interval else MetricsSnapshot.empty()
+        if previous is None:
+            return
+        while True:
+            if args.interval:
+                await asyncio.sleep(args.interval)
+            current = await scrape(args.metrics_url)
+            if current is None:
+                return
+            current.diff(previous).print_report()
+            if not args.interval:
+                return
+            previous = current
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+Clasificador local de relevancia en conversaciones activas (LocalRelevanceClassifier)
+
+train: entrena offline el modelo liviano que usa el bot cuando las reglas de
+       LocalRelevanceClassifier no alcanzan: naive Bayes sobre las palabras normalizadas del
+       mensaje, su forma (<fecha>, <hora>, <num>), el contexto activo y el campo que se espera.
+       El corpus sale de plantillas de respuestas dentro de cada contexto, de los TEST_CASES
+       (mensajes de cirugía completa = nueva cirugía) y de los escenarios grabados. Escribe
+       Services/Context/context_relevance_model.json (recurso embebido del bot) y reporta la
+       exactitud y la cobertura sobre una partición separada para el umbral --min-confidence.
+run:   manda conversaciones (cada TEST_CASE de texto libre seguido de la respuesta que pide el
+       bot, más los flujos grabados) contra fake_telegram_api.py, cada una en un chat nuevo, y con
+       /_stats de fake_openai_api.py cuenta las llamadas al LLM de cada mensaje, separando las de
+       relevancia de contexto y detección de nueva cirugía. Con --baseline (corrida con
+       CONTEXT_LOCAL_CLASSIFIER=false) reporta por conversación las llamadas evitadas y la
+       latencia ahorrada.
+
+Uso:
+    python3 context_relevance_benchmark.py train
+    # Bot con CONTEXT_LOCAL_CLASSIFIER=false
+    python3 context_relevance_benchmark.py run --llm-url http://127.0.0.1:8082 --output context_off.json
+    # Bot con el clasificador local (default)
+    python3 context_relevance_benchmark.py run --llm-url http://127.0.0.1:8082 --baseline context_off.json \\
+        --metrics-url http://127.0.0.1:8080/metrics
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import unicodedata
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from test_bot_automated import TEST_CASES
+
+CHAT_ID_BASE = 875_000_000  # Rango reservado para chats sintéticos del clasificador de contexto
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Services", "Context",
+                          "context_relevance_model.json")
+CLASSES = ["relevant", "new_surgery", "unrelated"]
+SMOOTHING = 1.0
+MIN_FEATURE_COUNT = 1
+
+# Prompts de ConversationContextManager: lo que el clasificador local evita
+CONTEXT_PROMPTS = {
+    "pmpt_68a10cd97c48819685ba35869b43c3ec031d14b92f3fc512": "relevancia",
+    "pmpt_68b8b7467b648195bc54e2e1a6e9ce6707afad5c6e5dca0c": "nueva_cirugia",
+}
+INTENT_PROMPT = "pmpt_68a0f4164bbc81909e7066dd9486ccf30687ba563fc8837c"
+
+# ----------------------------------------------------------------------
+# Features (mismas que LocalRelevanceClassifier.Features)
+# ----------------------------------------------------------------------
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9/:\-]*")
+DATE_RE = re.compile(r"^\d{1,2}[/\-]\d{1,2}(?:[/\-]\d{2,4})?$")
+HOUR_RE = re.compile(r"^(?:\d{1,2}(?::\d{2})?(?:hs|h|hrs)|\d{1,2}:\d{2})$")
+NUMBER_RE = re.compile(r"^\d+$")
+
+
+def normalize(text: str) -> str:
+    """Como TextoHelper.Normalizar: minúsculas y sin acentos"""
+    decomposed = unicodedata.normalize("NFD", text.lower())
+    return unicodedata.normalize("NFC", "".join(c for c in decomposed if unicodedata.category(c) != "Mn"))
+
+
+def tokens(message: str) -> List[str]:
+    result = []
+    for token in TOKEN_RE.findall(normalize(message)):
+        if DATE_RE.match(token):
+            result.append("<fecha>")
+        elif HOUR_RE.match(token):
+            result.append("<hora>")
+        elif NUMBER_RE.match(token):
+            result.append("<num>")
+        else:
+            result.append(token)
+    return result
+
+
+def length_bucket(count: int) -> str:
+    if count <= 1:
+        return "len:1"
+    if count <= 3:
+        return "len:2-3"
+    if count <= 6:
+        return "len:4-6"
+    return "len:7+"
+
+
+def features(message: str, context_type: str, field: str = "") -> List[str]:
+    """Palabras distintas del mensaje + contexto activo + campo esperado + largo"""
+    words = tokens(message)
+    result = sorted(set(words))
+    result.append(f"ctx:{context_type.lower()}")
+    if field:
+        result.append(f"campo:{field.lower()}")
+    result.append(length_bucket(len(words)))
+    return result
+
+
+# ----------------------------------------------------------------------
+# Corpus
+# ----------------------------------------------------------------------
+
+# Respuestas dentro de un contexto: (tipo de contexto, campo esperado) -> mensajes
+RELEVANT_REPLIES: Dict[Tuple[str, str], List[str]] = {
+    ("FieldWizard", "FechaHora"): [
+        "14hs", "mañana", "mañana 14hs", "15/08", "15/08 16:30", "a las 10", "pasado mañana", "hoy 8hs",
+        "el lunes", "16:30", "el martes a las 9", "el 20/09 a las 8hs", "mañana a la tarde", "a las 7:30",
+        "pasado mañana 10hs", "el jueves", "hoy a las 18", "08/08", "el viernes 15hs", "mañana temprano",
+    ],
+    ("FieldWizard", "Lugar"): [
+        "Hospital Italiano", "Sanatorio Anchorena", "en el Alemán", "clínica santa isabel", "Finochietto",
+        "Italiano", "en el Otamendi", "Clínica Bazterrica", "en la Trinidad", "sanatorio de la trinidad",
+        "hospital alemán", "es en el Italiano", "Mater Dei", "en los Arcos",
+    ],
+    ("FieldWizard", "Cirujano"): [
+        "Dr. García", "García", "Dra. López", "el doctor Quiroga", "martinez", "con Fernández",
+        "el cirujano es Rodríguez", "Dr Sanchez", "es con la dra gomez", "quiroga",
+    ],
+    ("FieldWizard", "Cirugia"): [
+        "CERS", "adenoides", "faco", "apendicectomía", "cers", "amigdalas", "MLD", "colecistectomía",
+        "es una hernioplastia", "artroscopia de rodilla", "cataratas", "septoplastia",
+    ],
+    ("FieldWizard", "Cantidad"): [
+        "2", "tres", "una sola", "3 cirugías", "son 2", "una", "4", "dos",
+    ],
+    ("FieldWizard", "Anestesiologo"): [
+        "Dr. Mendez", "nadie", "ninguno", "sin anestesiólogo", "uri", "no", "Castro", "con Silva",
+        "no hay anestesiólogo", "la dra jimenez", "herrera",
+    ],
+    ("Confirming", ""): [
+        "sí", "si", "ok", "dale", "confirmo", "perfecto", "no", "cambiar la hora", "el lugar está mal",
+        "está bien", "correcto", "cambiá el lugar", "cambiar lugar Hospital Alemán", "la hora es 15hs",
+        "cirujano Garcia", "todo bien", "de una", "listo", "no, es a las 16", "el cirujano es López",
+        "corregir fecha", "sí confirmo", "ok dale", "falta el anestesiólogo", "son 3 no 2",
+    ],
+    ("RegisteringSurgery", ""): [
+        "y el cirujano es García", "a las 14", "en el Italiano", "mañana", "son 2", "con el Dr. López",
+        "anestesiólogo Mendez", "a las 8hs en el Alemán", "es CERS", "la fecha es el 15/08",
+    ],
+    ("ModifyingSurgery", "Lugar"): [
+        "Hospital Alemán", "al Italiano", "pasala al Otamendi", "en la Trinidad", "sanatorio anchorena",
+    ],
+    ("ModifyingSurgery", "FechaHora"): [
+        "a las 16", "pasala a mañana", "el 20/08", "16:30", "el lunes a las 9",
+    ],
+}
+
+NEW_SURGERY_MESSAGES = [
+    "1 faco mañana 9hs Hospital Alemán Dr. Quiroga",
+    "tengo otra: 2 cers el viernes 10hs Sanatorio Anchorena Dra. López",
+    "otra cirugía: adenoides 20/08 8:30 Clínica Santa Isabel Dr. Martínez",
+    "agendame 3 MLD el lunes 14hs en el Italiano con García",
+    "nueva: amigdalectomía pasado mañana 11hs Finochietto Dr. Rodríguez",
+    "y también 1 colecistectomía el 25/09 a las 7hs en el Otamendi con Fernández",
+    "mañana tengo 2 faco en el Alemán a las 15hs con Quiroga",
+    "apendicectomía hoy 22hs Hospital Italiano Dr. Sánchez",
+    "el jueves 4 cers en Bazterrica 9hs Dr. García",
+    "otra más: hernioplastia 12/10 13hs Trinidad Dra. Gómez",
+]
+
+UNRELATED_MESSAGES = [
+    "qué lindo día", "cómo salió river", "jajaja", "gracias por todo", "mi perro está enfermo",
+    "¿me recomendás una película?", "hola", "qué tal", "buenas", "estoy cansado", "la comida estuvo rica",
+    "vamos a la playa", "me compré un auto verde", "cuánto sale el dólar", "contame un chiste",
+    "hace calor", "llueve mucho", "feliz cumpleaños", "nos vemos", "qué hora es en japón",
+    "el gato se subió a la mesa", "partido de fútbol", "escuchaste la música nueva", "abrazo",
+]
+
+
+def recorded_flow_messages() -> List[str]:
+    """Primer mensaje de cada escenario grabado que carga una cirugía completa (el bot pide confirmarla)"""
+    try:
+        from scenario_runner import load_scenarios
+        scenarios = load_scenarios([os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios")])
+    except ImportError:
+        return []
+    return [step["send"] for scenario in scenarios for step in scenario["steps"][:1]
+            if "send" in step and "confirmás" in str(step.get("expect", ""))]
+
+
+def full_surgery_cases() -> List[str]:
+    """TEST_CASES que el bot resuelve de una (piden confirmación): en medio de otra conversación son una cirugía nueva"""
+    return [case["input"] for case in TEST_CASES
+            if not case["input"].startswith("/") and "confirmás" in case.get("expected", "")]
+
+
+def build_corpus() -> List[Tuple[List[str], str, str]]:
+    """(features, clase, mensaje) para cada ejemplo"""
+    corpus = []
+    for (context_type, field), messages in RELEVANT_REPLIES.items():
+        for message in messages:
+            corpus.append((features(message, context_type, field), "relevant", message))
+
+    # Nueva cirugía y mensajes ajenos pueden llegar en cualquier contexto
+    contexts = sorted(RELEVANT_REPLIES)
+    new_surgery = NEW_SURGERY_MESSAGES + full_surgery_cases() + recorded_flow_messages()
+    for context_type, field in contexts:
+        for message in new_surgery:
+            corpus.append((features(message, context_type, field), "new_surgery", message))
+        for message in UNRELATED_MESSAGES:
+            corpus.append((features(message, context_type, field), "unrelated", message))
+    return corpus
+
+
+# ----------------------------------------------------------------------
+# Naive Bayes
+# ----------------------------------------------------------------------
+
+def fit(corpus: List[Tuple[List[str], str, str]]) -> Dict[str, Any]:
+    """
+    Bernoulli naive Bayes. Lo que aporta cada feature ausente se suma de antemano en bias, así el bot
+    solo recorre las features presentes: puntaje(c) = bias[c] + suma de weights[f][c].
+    """
+    class_counts = {c: 0 for c in CLASSES}
+    feature_counts: Dict[str, Dict[str, int]] = {}
+    for feats, label, _ in corpus:
+        class_counts[label] += 1
+        for feature in feats:
+            feature_counts.setdefault(feature, {c: 0 for c in CLASSES})[label] += 1
+
+    # Priors uniformes: las plantillas no reflejan la proporción real de cada clase
+    bias = [math.log(1 / len(CLASSES))] * len(CLASSES)
+    weights = {}
+    for feature, counts in sorted(feature_counts.items()):
+        if sum(counts.values()) < MIN_FEATURE_COUNT:
+            continue
+        row = []
+        for i, c in enumerate(CLASSES):
+            p = (counts[c] + SMOOTHING) / (class_counts[c] + 2 * SMOOTHING)
+            bias[i] += math.log(1 - p)
+            row.append(round(math.log(p) - math.log(1 - p), 5))
+        weights[feature] = row
+
+    return {
+        "version": 1,
+        "trained_at": datetime.now().isoformat(timespec="seconds"),
+        "classes": CLASSES,
+        "samples": sum(class_counts.values()),
+        "bias": [round(b, 5) for b in bias],
+        "features": weights,
+    }
+
+
+def predict(model: Dict[str, Any], feats: List[str]) -> Tuple[str, float]:
+    """Clase y probabilidad; las features que el modelo no vio no suman (como en el bot)"""
+    scores = list(model["bias"])
+    known = 0
+    for feature in feats:
+        weights = model["features"].get(feature)
+        if weights:
+            scores = [s + w for s, w in zip(scores, weights)]
+            known += ":" not in feature
+    # Sin ninguna palabra conocida el bot no arriesga: va al LLM
+    if known == 0:
+        return "", 0.0
+    top = max(scores)
+    exp = [math.exp(s - top) for s in scores]
+    best = max(range(len(scores)), key=lambda i: scores[i])
+    return model["classes"][best], exp[best] / sum(exp)
+
+
+def train(args):
+    corpus = build_corpus()
+    # Partición separada: uno de cada --holdout ejemplos queda afuera del entrenamiento
+    held_out = [row for i, row in enumerate(corpus) if i % args.holdout == 0]
+    training = [row for i, row in enumerate(corpus) if i % args.holdout != 0]
+
+    evaluation_model = fit(training)
+    confident = correct = 0
+    errors = []
+    by_class = {c: [0, 0] for c in CLASSES}
+    for feats, label, message in held_out:
+        predicted, confidence = predict(evaluation_model, feats)
+        if confidence < args.min_confidence:
+            continue
+        confident += 1
+        by_class[label][0] += 1
+        if predicted == label:
+            correct += 1
+            by_class[label][1] += 1
+        else:
+            context = next(f for f in feats if f.startswith("ctx:"))
+            errors.append((message, context, label, predicted, confidence))
+
+    print("=" * 80)
+    print("🧪 CLASIFICADOR DE RELEVANCIA: PARTICIÓN SEPARADA")
+    print("=" * 80)
+    print(f"Ejemplos: {len(corpus)}  entrenamiento: {len(training)}  evaluación: {len(held_out)}")
+    coverage = confident / len(held_out) * 100 if held_out else 0.0
+    accuracy = correct / confident * 100 if confident else 0.0
+    print(f"Umbral {args.min_confidence}: cobertura {confident}/{len(held_out)} ({coverage:.1f}%)  "
+          f"exactitud {correct}/{confident} ({accuracy:.1f}%)")
+    for label, (seen, ok) in by_class.items():
+        print(f"  {label:<12} {ok:>4}/{seen:<4}")
+    for message, feature, label, predicted, confidence in errors[:10]:
+        print(f"  ❌ '{message[:40]}' ({feature}) esperado {label}, dio {predicted} ({confidence:.2f})")
+
+    # El modelo que se publica usa todos los ejemplos
+    model = fit(corpus)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(model, f, ensure_ascii=False, indent=1, sort_keys=False)
+        f.write("\n")
+    print(f"💾 Modelo con {len(model['features'])} features guardado en {args.output}")
+
+
+# ----------------------------------------------------------------------
+# Conversaciones contra el bot
+# ----------------------------------------------------------------------
+
+# Respuesta del usuario según lo que pidió el bot al primer mensaje de cada TEST_CASE
+FOLLOW_UPS = [
+    ("confirmás", "sí"),
+    ("tipo de cirugía", "CERS"),
+    ("más específica", "CERS en el Italiano mañana 14hs con García"),
+    ("cantidad", "2"),
+    ("fecha", "mañana 14hs"),
+]
+
+# Flujos grabados de varias vueltas: carga incompleta y respuestas al wizard o a la confirmación
+RECORDED_FLOWS = [
+    ("wizard_completo", ["CERS mañana", "Hospital Italiano", "14hs", "Dr. García", "sí"]),
+    ("cambio_en_confirmacion", ["2 CERS mañana 14hs Hospital Italiano Dr. García", "cambiá el lugar",
+                                "Sanatorio Anchorena", "sí"]),
+    ("edicion_directa", ["1 adenoides pasado mañana 8hs Sanatorio Anchorena Dr. López", "lugar Hospital Alemán", "ok"]),
+    ("nueva_en_medio", ["2 cirugías mañana", "1 faco el viernes 9hs Hospital Alemán Dr. Quiroga", "dale"]),
+    ("desvio", ["CERS Hospital", "qué lindo día", "mañana 10hs"]),
+]
+
+
+def conversations() -> List[Dict[str, Any]]:
+    result = []
+    for case in TEST_CASES:
+        if case["input"].startswith("/"):
+            continue
+        steps = [case["input"]]
+        expected = case.get("expected", "").lower()
+        follow_up = next((reply for marker, reply in FOLLOW_UPS if marker in expected), None)
+        if follow_up:
+            steps.append(follow_up)
+        result.append({"id": case["id"], "steps": steps})
+
+    for name, steps in RECORDED_FLOWS:
+        result.append({"id": name, "steps": steps})
+    result.extend(recorded_scenarios())
+    return result
+
+
+def recorded_scenarios() -> List[Dict[str, Any]]:
+    """Escenarios de scenarios/ que son solo mensajes de texto (los que tocan botones quedan afuera)"""
+    try:
+        from scenario_runner import load_scenarios
+        scenarios = load_scenarios([os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios")])
+    except ImportError:
+        return []
+    result = []
+    for scenario in scenarios:
+        steps = scenario["steps"]
+        if all("send" in step for step in steps) and len(steps) > 1:
+            result.append({"id": scenario["name"], "steps": [step["send"] for step in steps]})
+    return result
+
+
+def prompt_calls(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, int]:
+    previous = before.get("by_prompt", {})
+    return {label: count - previous.get(label, 0) for label, count in after.get("by_prompt", {}).items()
+            if count - previous.get(label, 0) > 0}
+
+
+def context_calls(calls: Dict[str, int]) -> int:
+    return sum(count for label, count in calls.items() if label.split("@")[0] in CONTEXT_PROMPTS)
+
+
+async def run_conversation(harness, conversation: Dict[str, Any], chat_id: int, args) -> Dict[str, Any]:
+    from fast_path_benchmark import send_and_measure
+    from load_test_bot import llm_stub_request
+
+    messages = []
+    for index, text in enumerate(conversation["steps"]):
+        before = await llm_stub_request(args.llm_url, "GET", "/_stats")
+        step = {"id": f"{conversation['id']}#{index}", "name": conversation["id"], "input": text}
+        result = await send_and_measure(harness, chat_id, step, args.llm_url, args.timeout)
+        # Lo que el bot sigue haciendo después de la primera respuesta (humanizador, etc.) cuenta para el mensaje
+        await asyncio.sleep(args.settle)
+        after = await llm_stub_request(args.llm_url, "GET", "/_stats")
+        calls = prompt_calls(before, after)
+        messages.append({
+            "input": text,
+            "llm_calls": after["requests"] - before["requests"],
+            "context_calls": context_calls(calls),
+            "intent_calls": sum(n for label, n in calls.items() if label.split("@")[0] == INTENT_PROMPT),
+            "by_prompt": calls,
+            "answer_ms": result["answer_ms"],
+            "answer": result["answer"],
+        })
+
+    return {
+        "id": conversation["id"],
+        "chat_id": chat_id,
+        "messages": messages,
+        "llm_calls": sum(m["llm_calls"] for m in messages),
+        "context_calls": sum(m["context_calls"] for m in messages),
+        "total_ms": sum(m["answer_ms"] for m in messages if m["answer_ms"] is not None),
+        "timeouts": sum(1 for m in messages if m["answer_ms"] is None),
+    }
+
+
+async def run_async(args) -> Dict[str, Any]:
+    from bot_metrics import scrape
+    from fake_telegram_api import HarnessClient
+
+    server_before = await scrape(args.metrics_url) if args.metrics_url else None
+    results = []
+    async with HarnessClient(args.api_url) as harness:
+        for iteration in range(args.iterations):
+            for index, conversation in enumerate(conversations()):
+                chat_id = args.chat_id_base + iteration * 1000 + index
+                result = await run_conversation(harness, conversation, chat_id, args)
+                result["iteration"] = iteration
+                results.append(result)
+                print(f"💬 {result['id']:<24} LLM x{result['llm_calls']:<3} contexto x{result['context_calls']:<3} "
+                      f"{result['total_ms']:>8.0f} ms  ({len(result['messages'])} mensajes)")
+
+    server = None
+    if args.metrics_url:
+        server_after = await scrape(args.metrics_url)
+        if server_before and server_after:
+            server = server_after.diff(server_before)
+
+    return {"timestamp": datetime.now().isoformat(), "iterations": args.iterations, "results": results,
+            "server_events": {k: v for k, v in server.events.items() if k.startswith("context_")} if server else None,
+            "server_stages": server.stage_rows() if server else None}
+
+
+def per_conversation(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Promedios por conversación entre iteraciones"""
+    rows: Dict[str, Dict[str, float]] = {}
+    for result in results:
+        row = rows.setdefault(result["id"], {"runs": 0, "llm_calls": 0, "context_calls": 0, "total_ms": 0, "messages": 0})
+        row["runs"] += 1
+        row["llm_calls"] += result["llm_calls"]
+        row["context_calls"] += result["context_calls"]
+        row["total_ms"] += result["total_ms"]
+        row["messages"] = len(result["messages"])
+    for row in rows.values():
+        for key in ("llm_calls", "context_calls", "total_ms"):
+            row[key] /= row["runs"]
+    return rows
+
+
+def print_report(run_data: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    rows = per_conversation(run_data["results"])
+    base_rows = per_conversation(baseline["results"]) if baseline else {}
+
+    print("\n" + "=" * 100)
+    print("🧭 RELEVANCIA DE CONTEXTO: LLAMADAS AL LLM EVITADAS POR CONVERSACIÓN")
+    print("=" * 100)
+    header = f"{'Conversación':<24} {'msgs':>5} {'LLM':>6} {'ctx':>6} {'ms total':>10}"
+    if baseline:
+        header += f" {'LLM base':>9} {'evitadas':>9} {'ahorro ms':>10}"
+    print(header)
+
+    avoided_total = saved_total = 0.0
+    for conversation_id, row in rows.items():
+        line = (f"{conversation_id:<24} {row['messages']:>5} {row['llm_calls']:>6.1f} {row['context_calls']:>6.1f} "
+                f"{row['total_ms']:>10.0f}")
+        base = base_rows.get(conversation_id)
+        if base:
+            avoided = base["llm_calls"] - row["llm_calls"]
+            saved = base["total_ms"] - row["total_ms"]
+            avoided_total += avoided
+            saved_total += saved
+            line += f" {base['llm_calls']:>9.1f} {avoided:>+9.1f} {saved:>+10.0f}"
+        elif baseline:
+            line += f" {'-':>9} {'-':>9} {'-':>10}"
+        print(line)
+
+    total_llm = sum(r["llm_calls"] for r in rows.values())
+    total_context = sum(r["context_calls"] for r in rows.values())
+    print(f"\nLlamadas al LLM por pasada: {total_llm:.1f}  (relevancia / nueva cirugía: {total_context:.1f})")
+    if baseline:
+        base_llm = sum(r["llm_calls"] for r in base_rows.values())
+        print(f"Sin clasificador local: {base_llm:.1f}  evitadas: {avoided_total:.1f}"
+              + (f" ({avoided_total / base_llm * 100:.1f}%)" if base_llm else "")
+              + f"  latencia ahorrada: {saved_total:.0f} ms por pasada")
+
+    events = run_data.get("server_events")
+    if events:
+        rules = events.get("context_local_rules", 0.0)
+        model = events.get("context_local_model", 0.0)
+        unsure = events.get("context_local_unsure", 0.0)
+        decided = rules + model + unsure
+        print(f"\nServidor (/metrics): reglas {int(rules)}  modelo {int(model)}  al LLM {int(unsure)}"
+              + (f"  resueltos localmente {(rules + model) / decided * 100:.1f}%" if decided else ""))
+    print("=" * 100)
+
+
+async def run_main(args):
+    run_data = await run_async(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(run_data, baseline)
+
+    output = args.output or f"context_relevance_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(run_data, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultados guardados en {output}")
+
+
+def run(args):
+    if not args.llm_url:
+        raise SystemExit("--llm-url (o OPENAI_BASE_URL) es necesario para contar las llamadas al LLM")
+    import aiohttp
+    try:
+        asyncio.run(run_main(args))
+    except (KeyboardInterrupt, aiohttp.ClientError) as e:
+        print(f"\n⏹️  Benchmark interrumpido: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clasificador local de relevancia de contexto: entrenamiento y benchmark")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="Entrena el modelo y lo guarda como recurso del bot")
+    train_parser.add_argument("--output", default=MODEL_PATH)
+    train_parser.add_argument("--holdout", type=int, default=5, help="Uno de cada N ejemplos queda para evaluar")
+    train_parser.add_argument("--min-confidence", type=float, default=0.9,
+                              help="Mismo umbral que CONTEXT_CLASSIFIER_MIN_CONFIDENCE")
+
+    run_parser = subparsers.add_parser("run", help="Cuenta las llamadas al LLM por conversación contra el bot")
+    run_parser.add_argument("--api-url", default=os.getenv("TELEGRAM_API_URL", "http://127.0.0.1:8081"))
+    run_parser.add_argument("--llm-url", default=os.getenv("OPENAI_BASE_URL"),
+                            help="URL de fake_openai_api.py: /_stats cuenta las llamadas por prompt")
+    run_parser.add_argument("--metrics-url", default=os.getenv("BOT_METRICS_URL"),
+                            help="URL de /metrics del bot: agrega los contadores context_local_*")
+    run_parser.add_argument("--iterations", type=int, default=1)
+    run_parser.add_argument("--timeout", type=float, default=60, help="Timeout por respuesta en segundos")
+    run_parser.add_argument("--settle", type=float, default=1.0, help="Espera tras cada respuesta antes de contar")
+    run_parser.add_argument("--chat-id-base", type=int, default=CHAT_ID_BASE)
+    run_parser.add_argument("--baseline", help="JSON de una corrida con CONTEXT_LOCAL_CLASSIFIER=false")
+    run_parser.add_argument("--output", help="Archivo JSON de resultados (default: context_relevance_results_<timestamp>.json)")
+
+    args = parser.parse_args()
+    {"train": train, "run": run}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+-- ===================================================================
+-- AGREGADOS PRECALCULADOS PARA REPORTES (appointment_rollups)
+-- ===================================================================
+-- ReportDataService arma los reportes mensuales y anuales desde esta tabla
+-- en lugar de recorrer todos los appointments del período.
+-- AppointmentRepository la mantiene al guardar, modificar y borrar appointments.
+--
+-- Granularidad:
+--   total                -> por día (timeline diario y total del período anterior)
+--   resto de dimensiones -> por mes (periodo = primer día del mes)
+--
+-- Ejecutar una vez; el backfill del final recalcula todos los equipos.
+-- Después de cargas masivas por fuera del bot (COPY, scripts) volver a ejecutar:
+--   SELECT rebuild_appointment_rollups(<equipo_id>);
+-- ===================================================================
+
+CREATE TABLE IF NOT EXISTS appointment_rollups (
+    equipo_id INTEGER NOT NULL REFERENCES equipos(id) ON DELETE CASCADE,
+    periodo DATE NOT NULL,
+    dimension VARCHAR(30) NOT NULL,
+    clave TEXT NOT NULL,
+    clave2 TEXT NOT NULL DEFAULT '',
+    cantidad INTEGER NOT NULL DEFAULT 0,   -- SUM(COALESCE(cantidad, 1)), como los reportes
+    turnos INTEGER NOT NULL DEFAULT 0,     -- COUNT(*) de appointments
+    PRIMARY KEY (equipo_id, periodo, dimension, clave, clave2)
+);
+
+-- Claves de rollup de un appointment. Es la única definición del mapeo: la usan
+-- tanto el mantenimiento incremental (AppointmentRepository) como el rebuild.
+-- Los filtros replican los de ReportDataService (string.IsNullOrWhiteSpace, ToUpperInvariant).
+CREATE OR REPLACE FUNCTION appointment_rollup_keys(
+    p_fecha_hora TIMESTAMP,
+    p_lugar TEXT,
+    p_cirujano TEXT,
+    p_cirugia TEXT,
+    p_anestesiologo TEXT)
+RETURNS TABLE (periodo DATE, dimension TEXT, clave TEXT, clave2 TEXT)
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE WHEN k.dimension = 'total' THEN p_fecha_hora::date
+                ELSE date_trunc('month', p_fecha_hora)::date END,
+           k.dimension, k.clave, k.clave2
+    FROM (VALUES
+        ('total', '', '', TRUE),
+        ('dia_hora', EXTRACT(DOW FROM p_fecha_hora)::int::text, EXTRACT(HOUR FROM p_fecha_hora)::int::text, TRUE),
+        ('cirugia', UPPER(p_cirugia), '', p_cirugia ~ '\S'),
+        ('lugar', p_lugar, '', p_lugar ~ '\S'),
+        ('anestesiologo', p_anestesiologo, '', p_anestesiologo ~ '\S'),
+        ('cirujano', p_cirujano, '', p_cirujano ~ '\S'),
+        ('cirujano_dia_semana', p_cirujano, EXTRACT(DOW FROM p_fecha_hora)::int::text, p_cirujano ~ '\S'),
+        ('cirujano_cirugia', p_cirujano, UPPER(p_cirugia), p_cirujano ~ '\S' AND p_cirugia ~ '\S'),
+        ('cirujano_lugar', p_cirujano, p_lugar, p_cirujano ~ '\S' AND p_lugar ~ '\S'),
+        ('cirujano_anestesiologo', p_cirujano, p_anestesiologo, p_cirujano ~ '\S' AND p_anestesiologo ~ '\S'),
+        ('lugar_cirugia', p_lugar, UPPER(p_cirugia), p_lugar ~ '\S' AND p_cirugia ~ '\S'),
+        ('lugar_anestesiologo', p_lugar, p_anestesiologo, p_lugar ~ '\S' AND p_anestesiologo ~ '\S')
+    ) AS k(dimension, clave, clave2, incluir)
+    WHERE p_fecha_hora IS NOT NULL AND COALESCE(k.incluir, FALSE)
+$$;
+
+-- Recalcula desde cero los rollups de un equipo; devuelve cuántos buckets quedaron
+CREATE OR REPLACE FUNCTION rebuild_appointment_rollups(p_equipo_id INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    buckets INTEGER;
+BEGIN
+    DELETE FROM appointment_rollups WHERE equipo_id = p_equipo_id;
+
+    INSERT INTO appointment_rollups (equipo_id, periodo, dimension, clave, clave2, cantidad, turnos)
+    SELECT a.equipo_id, k.periodo, k.dimension, k.clave, k.clave2, SUM(COALESCE(a.cantidad, 1)), COUNT(*)
+    FROM appointments a
+    CROSS JOIN LATERAL appointment_rollup_keys(a.fecha_hora, a.lugar, a.cirujano, a.cirugia, a.anestesiologo) k
+    WHERE a.equipo_id = p_equipo_id
+    GROUP BY a.equipo_id, k.periodo, k.dimension, k.clave, k.clave2;
+
+    GET DIAGNOSTICS buckets = ROW_COUNT;
+    RETURN buckets;
+END;
+$$;
+
+-- ===================================================================
+-- BACKFILL
+-- ===================================================================
+SELECT e.id AS equipo_id, rebuild_appointment_rollups(e.id) AS buckets
+FROM equipos e
+ORDER BY e.id;
+
+ANALYZE appointment_rollups;
+
+-- ===================================================================
+-- VERIFICACIÓN
+-- ===================================================================
+/*
+-- Totales de rollups vs scan directo, por equipo (deben coincidir)
+SELECT r.equipo_id, r.turnos, a.turnos
+FROM (SELECT equipo_id, SUM(turnos) AS turnos FROM appointment_rollups WHERE dimension = 'total' GROUP BY equipo_id) r
+FULL JOIN (SELECT equipo_id, COUNT(*) AS turnos FROM appointments WHERE fecha_hora IS NOT NULL AND equipo_id IS NOT NULL GROUP BY equipo_id) a
+    ON a.equipo_id = r.equipo_id
+WHERE r.turnos IS DISTINCT FROM a.turnos;
+*/
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Stand-in local de Google Calendar v3 para testing offline y de carga de RegistroCx.
+
+Atiende lo que usa GoogleCalendarService sobre el calendario "primary":
+    POST   /calendar/v3/calendars/{cal}/events            insert (respeta el id del cliente; 409 si ya existe)
+    GET    /calendar/v3/calendars/{cal}/events            list con syncToken/pageToken/maxResults/showDeleted
+    GET    /calendar/v3/calendars/{cal}/events/{id}       get
+    PUT    /calendar/v3/calendars/{cal}/events/{id}       update (404 si no existe)
+    DELETE /calendar/v3/calendars/{cal}/events/{id}       delete (queda como cancelled para los sync tokens)
+    POST   /batch/calendar/v3                              lote multipart/mixed de cualquiera de los anteriores
+
+Cada access token (Authorization: Bearer ...) es un usuario con su propio calendario.
+La cuota es por request individual, también dentro de un lote, como en Google:
+    --user-rate 10 --user-burst 20     requests por segundo por usuario (403 userRateLimitExceeded)
+    --global-rate 500                  requests por segundo en total (403 rateLimitExceeded)
+Latencia (deterministas con --seed):
+    --latency fixed:80                 por request HTTP (un lote cuenta una vez)
+    --item-latency uniform:5:20        por request individual, sumada dentro de un lote
+
+El bot se apunta con GOOGLE_CALENDAR_API_URL=http://localhost:8083.
+
+Harness:
+    GET  /harness/stats                contadores
+    POST /harness/reset                borra calendarios, cuotas y contadores
+    GET  /harness/events?token=...     eventos de un usuario (incluye cancelados)
+    POST /harness/mutate               {"token", "eventId", "action": "delete"|"move", "minutes"}
+                                       simula al usuario borrando o moviendo un evento en Calendar
+    POST /harness/expire-sync-tokens   {"token"} (sin token: todos los usuarios)
+                                       vence los sync tokens emitidos: el próximo incremental da 410
+
+Uso:
+    python3 fake_calendar_api.py
+    python3 fake_calendar_api.py --user-rate 10 --user-burst 20 --item-latency uniform:5:20
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from aiohttp import web
+
+from fake_openai_api import LatencyModel
+from fake_telegram_api import TokenBucket
+
+EVENTS_PATH = re.compile(r"^/calendar/v3/calendars/(?P<calendar>[^/]+)/events(?:/(?P<event_id>[^/]+))?$")
+# Igual que Google: base32hex (0-9, a-v), entre 5 y 1024 caracteres
+EVENT_ID = re.compile(r"^[0-9a-v]{5,1024}$")
+MAX_BATCH_SIZE = 1000
+DEFAULT_PAGE_SIZE = 250
+MAX_PAGE_SIZE = 2500
+
+HTTP_REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+                404: "Not Found", 409: "Conflict", 410: "Gone"}
+
+
+def google_error(status: int, reason: str, message: str, domain: str = "global") -> Tuple[int, Dict[str, Any]]:
+    """Cuerpo de error con la forma que GoogleApiException/RequestError deserializa"""
+    return status, {"error": {
+        "errors": [{"domain": domain, "reason": reason, "message": message}],
+        "code": status,
+        "message": message
+    }}
+
+
+class UserCalendar:
+    """Calendario de un usuario. Cada cambio avanza seq; un sync token es el seq del listado"""
+
+    def __init__(self, token: str):
+        self.token = token
+        self.events: Dict[str, Dict[str, Any]] = {}
+        self.changed_at: Dict[str, int] = {}
+        self.seq = 0
+        self.token_epoch = uuid.uuid4().hex[:8]  # Cambia en reset: los tokens viejos dan 410
+
+    def touch(self, event: Dict[str, Any]):
+        self.seq += 1
+        event["updated"] = datetime.utcnow().isoformat(timespec="milliseconds") + "Z"
+        event["sequence"] = event.get("sequence", -1) + 1
+        self.events[event["id"]] = event
+        self.changed_at[event["id"]] = self.seq
+
+    def expire_sync_tokens(self):
+        """Como cuando Google invalida los tokens: los eventos quedan, los tokens emitidos dan 410"""
+        self.token_epoch = uuid.uuid4().hex[:8]
+
+    def sync_token(self, seq: int) -> str:
+        return f"{self.token_epoch}-{seq}"
+
+    def parse_sync_token(self, token: str) -> Optional[int]:
+        epoch, _, seq = token.partition("-")
+        if epoch != self.token_epoch or not seq.isdigit() or int(seq) > self.seq:
+            return None
+        return int(seq)
+
+
+class FakeCalendarServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8083, latency: str = "none",
+                 item_latency: str = "none", user_rate: float = 0.0, user_burst: float = 0.0,
+                 global_rate: float = 0.0, seed: int = 42):
+        self.host = host
+        self.port = port
+        self.rng = random.Random(seed)
+        self.latency = LatencyModel(latency, self.rng)
+        self.item_latency = LatencyModel(item_latency, self.rng)
+        self.user_rate = user_rate
+        self.user_burst = user_burst or max(user_rate, 1)
+        self.global_rate = global_rate
+        self.calendars: Dict[str, UserCalendar] = {}
+        self._user_buckets: Dict[str, TokenBucket] = {}
+        self._global_bucket: Optional[TokenBucket] = None
+        self.in_flight = 0
+        self.stats: Dict[str, Any] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self.reset()
+
+    def reset(self):
+        self.calendars.clear()
+        self._user_buckets.clear()
+        self._global_bucket = TokenBucket(self.global_rate, self.global_rate) if self.global_rate else None
+        self.stats = {
+            "http_requests": 0, "batch_requests": 0, "batch_items": 0, "max_batch_size": 0,
+            "inserts": 0, "updates": 0, "gets": 0, "deletes": 0, "lists": 0,
+            "conflicts": 0, "not_found": 0, "rate_limited": 0, "full_syncs": 0, "sync_token_expired": 0,
+            "max_in_flight": 0
+        }
+
+    def build_app(self) -> web.Application:
+        app = web.Application(client_max_size=32 * 1024 * 1024)
+        app.router.add_post("/batch/calendar/v3", self._handle_batch)
+        app.router.add_route("*", "/calendar/v3/calendars/{calendar}/events", self._handle_single)
+        app.router.add_route("*", "/calendar/v3/calendars/{calendar}/events/{event_id}", self._handle_single)
+        app.router.add_get("/harness/stats", self._harness_stats)
+        app.router.add_post("/harness/reset", self._harness_reset)
+        app.router.add_get("/harness/events", self._harness_events)
+        app.router.add_post("/harness/mutate", self._harness_mutate)
+        app.router.add_post("/harness/expire-sync-tokens", self._harness_expire_sync_tokens)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    async def _handle_single(self, request: web.Request) -> web.Response:
+        token = self._bearer(request.headers)
+        if token is None:
+            return web.json_response(google_error(401, "authError", "Invalid Credentials")[1], status=401)
+        body = await request.read()
+        async with self._in_flight():
+            await self._sleep(self.latency.sample_ms() + self.item_latency.sample_ms())
+            status, payload = self.execute(token, request.method, request.path, request.query_string, body)
+        if status == 204:
+            return web.Response(status=204)
+        return web.json_response(payload, status=status)
+
+    async def _handle_batch(self, request: web.Request) -> web.Response:
+        token = self._bearer(request.headers)
+        if token is None:
+            return web.json_response(google_error(401, "authError", "Invalid Credentials")[1], status=401)
+        try:
+            parts = self._parse_batch(request.headers.get("Content-Type", ""), await request.read())
+        except ValueError as ex:
+            return web.json_response(google_error(400, "badRequest", str(ex))[1], status=400)
+        if len(parts) > MAX_BATCH_SIZE:
+            return web.json_response(google_error(400, "badRequest",
+                                                  f"Batch con más de {MAX_BATCH_SIZE} requests")[1], status=400)
+
+        self.stats["batch_requests"] += 1
+        self.stats["batch_items"] += len(parts)
+        self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(parts))
+
+        async with self._in_flight():
+            delay = self.latency.sample_ms() + sum(self.item_latency.sample_ms() for _ in parts)
+            await self._sleep(delay)
+            responses = []
+            for content_id, method, target, headers, body in parts:
+                url = urlsplit(target)
+                status, payload = self.execute(self._bearer(headers) or token, method, url.path, url.query, body)
+                responses.append((content_id, status, payload))
+
+        boundary = f"batch_{uuid.uuid4().hex}"
+        return web.Response(body=self._render_batch(boundary, responses),
+                            headers={"Content-Type": f"multipart/mixed; boundary={boundary}"})
+
+    @staticmethod
+    def _bearer(headers) -> Optional[str]:
+        value = headers.get("Authorization", "")
+        return value[7:].strip() if value.startswith("Bearer ") and value[7:].strip() else None
+
+    @staticmethod
+    def _parse_batch(content_type: str, payload: bytes) -> List[Tuple[Optional[str], str, str, Dict[str, str], bytes]]:
+        """Partes application/http de un multipart/mixed: (Content-ID, método, URL, headers, cuerpo)"""
+        if not content_type.startswith("multipart/mixed"):
+            raise ValueError("El lote tiene que ser multipart/mixed")
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("ascii") + payload)
+        parts = []
+        for part in message.iter_parts():
+            content_id = part.get("Content-ID")
+            raw = part.get_payload(decode=True) or b""
+            head, _, body = raw.replace(b"\r\n", b"\n").partition(b"\n\n")
+            lines = head.decode("utf-8").split("\n")
+            request_line = lines[0].split(" ")
+            if len(request_line) < 2:
+                raise ValueError(f"Request inválido en el lote: {lines[0]!r}")
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                headers[name.strip().title()] = value.strip()
+            parts.append((content_id, request_line[0].upper(), request_line[1], headers, body.strip()))
+        return parts
+
+    @staticmethod
+    def _render_batch(boundary: str, responses: List[Tuple[Optional[str], int, Optional[Dict[str, Any]]]]) -> bytes:
+        chunks = []
+        for content_id, status, payload in responses:
+            body = json.dumps(payload, ensure_ascii=False) if payload is not None else ""
+            chunks.append(f"--{boundary}\r\nContent-Type: application/http\r\n")
+            if content_id:
+                chunks.append(f"Content-ID: {content_id.replace('<', '<response-', 1)}\r\n")
+            chunks.append(f"\r\nHTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n")
+            if payload is not None:
+                chunks.append(f"Content-Type: application/json; charset=UTF-8\r\n"
+                              f"Content-Length: {len(body.encode('utf-8'))}\r\n\r\n{body}\r\n")
+            else:
+                chunks.append("\r\n")
+        chunks.append(f"--{boundary}--\r\n")
+        return "".join(chunks).encode("utf-8")
+
+    # ------------------------------------------------------------------
+    # Calendar
+    # ------------------------------------------------------------------
+
+    def execute(self, token: str, method: str, path: str, query: str,
+                body: bytes) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Un request de la API, suelto o dentro de un lote"""
+        self.stats["http_requests"] += 1
+        match = EVENTS_PATH.match(path)
+        if not match:
+            return google_error(404, "notFound", f"Ruta no soportada: {path}")
+        if match["calendar"] != "primary":
+            return google_error(404, "notFound", "Solo se simula el calendario primary")
+
+        limited = self._check_quota(token)
+        if limited:
+            return limited
+
+        calendar = self.calendars.setdefault(token, UserCalendar(token))
+        event_id = match["event_id"]
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        try:
+            data = json.loads(body) if body else {}
+        except json.JSONDecodeError:
+            return google_error(400, "parseError", "Parse Error")
+
+        if event_id is None and method == "POST":
+            return self._insert(calendar, data)
+        if event_id is None and method == "GET":
+            return self._list(calendar, params)
+        if event_id is not None and method == "GET":
+            self.stats["gets"] += 1
+            event = calendar.events.get(event_id)
+            return (200, event) if event else self._not_found(event_id)
+        if event_id is not None and method in ("PUT", "PATCH"):
+            return self._update(calendar, event_id, data, patch=method == "PATCH")
+        if event_id is not None and method == "DELETE":
+            return self._delete(calendar, event_id)
+        return google_error(405, "methodNotAllowed", f"{method} no soportado en {path}")
+
+    def _insert(self, calendar: UserCalendar, data: Dict[str, Any]) -> Tuple[int, Optional[Dict[str, Any]]]:
+        event_id = data.get("id") or uuid.uuid4().hex
+        if not EVENT_ID.match(event_id):
+            return google_error(400, "invalid", "Invalid resource id value.")
+        if event_id in calendar.events:
+            # Google también da 409 si el evento fue borrado: hay que restaurarlo con update
+            self.stats["conflicts"] += 1
+            return google_error(409, "duplicate", "The requested identifier already exists.")
+        self.stats["inserts"] += 1
+        event = {**data, "kind": "calendar#event", "id": event_id, "status": data.get("status") or "confirmed",
+                 "created": datetime.utcnow().isoformat(timespec="milliseconds") + "Z"}
+        calendar.touch(event)
+        return 200, event
+
+    def _update(self, calendar: UserCalendar, event_id: str, data: Dict[str, Any],
+                patch: bool) -> Tuple[int, Optional[Dict[str, Any]]]:
+        existing = calendar.events.get(event_id)
+        if existing is None:
+            return self._not_found(event_id)
+        self.stats["updates"] += 1
+        base = existing if patch else {key: existing[key] for key in ("kind", "id", "created", "sequence")}
+        event = {**base, **data, "id": event_id, "status": data.get("status") or existing["status"]}
+        calendar.touch(event)
+        return 200, event
+
+    def _delete(self, calendar: UserCalendar, event_id: str) -> Tuple[int, Optional[Dict[str, Any]]]:
+        existing = calendar.events.get(event_id)
+        if existing is None or existing["status"] == "cancelled":
+            # Google responde 410 al borrar dos veces
+            return self._not_found(event_id) if existing is None else google_error(410, "deleted", "Resource has been deleted")
+        self.stats["deletes"] += 1
+        calendar.touch({**existing, "status": "cancelled"})
+        return 204, None
+
+    def _list(self, calendar: UserCalendar, params: Dict[str, str]) -> Tuple[int, Optional[Dict[str, Any]]]:
+        self.stats["lists"] += 1
+        sync_token = params.get("syncToken")
+        page_token = params.get("pageToken")
+        page_size = min(int(params.get("maxResults", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+
+        # pageToken = "<seq del listado>:<desde seq>:<offset>"; el token de sync sale en la última página
+        if page_token:
+            listing_seq, since, offset = (int(value) for value in page_token.split(":"))
+        else:
+            listing_seq, offset = calendar.seq, 0
+            if sync_token:
+                since = calendar.parse_sync_token(sync_token)
+                if since is None:
+                    self.stats["sync_token_expired"] += 1
+                    return google_error(410, "fullSyncRequired", "Sync token is no longer valid, a full sync is required.")
+            else:
+                since = -1
+                self.stats["full_syncs"] += 1
+
+        incremental = since >= 0
+        # Un incremental trae los cancelados aunque no pidan showDeleted, como Google
+        show_deleted = incremental or params.get("showDeleted", "false").lower() == "true"
+        ids = sorted((event_id for event_id, seq in calendar.changed_at.items() if since < seq <= listing_seq),
+                     key=lambda event_id: calendar.changed_at[event_id])
+        items = []
+        for event_id in ids:
+            event = calendar.events[event_id]
+            if event["status"] == "cancelled" and not show_deleted:
+                continue
+            items.append({"kind": "calendar#event", "id": event_id, "status": "cancelled"}
+                         if event["status"] == "cancelled" and incremental else event)
+
+        page = items[offset:offset + page_size]
+        response: Dict[str, Any] = {"kind": "calendar#events", "summary": calendar.token, "items": page}
+        if offset + page_size < len(items):
+            response["nextPageToken"] = f"{listing_seq}:{since}:{offset + page_size}"
+        else:
+            response["nextSyncToken"] = calendar.sync_token(listing_seq)
+        return 200, response
+
+    def _not_found(self, event_id: str) -> Tuple[int, Optional[Dict[str, Any]]]:
+        self.stats["not_found"] += 1
+        return google_error(404, "notFound", f"Not Found: {event_id}")
+
+    def _check_quota(self, token: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        if self.user_rate:
+            bucket = self._user_buckets.get(token)
+            if bucket is None:
+                bucket = self._user_buckets[token] = TokenBucket(self.user_rate, self.user_burst)
+            if bucket.take():
+                self.stats["rate_limited"] += 1
+                return google_error(403, "userRateLimitExceeded", "User Rate Limit Exceeded", "usageLimits")
+        if self._global_bucket and self._global_bucket.take():
+            self.stats["rate_limited"] += 1
+            return google_error(403, "rateLimitExceeded", "Rate Limit Exceeded", "usageLimits")
+        return None
+
+    @asynccontextmanager
+    async def _in_flight(self):
+        self.in_flight += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.in_flight)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    @staticmethod
+    async def _sleep(delay_ms: float):
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+    # ------------------------------------------------------------------
+    # Harness
+    # ------------------------------------------------------------------
+
+    async def _harness_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"ok": True, "result": {
+            **self.stats,
+            "users": len(self.calendars),
+            "events": sum(len(calendar.events) for calendar in self.calendars.values()),
+            "limits": {"user_rate": self.user_rate, "user_burst": self.user_burst, "global_rate": self.global_rate}
+        }})
+
+    async def _harness_reset(self, request: web.Request) -> web.Response:
+        self.reset()
+        return web.json_response({"ok": True, "result": True})
+
+    async def _harness_events(self, request: web.Request) -> web.Response:
+        calendar = self.calendars.get(request.query.get("token", ""))
+        events = list(calendar.events.values()) if calendar else []
+        return web.json_response({"ok": True, "result": events})
+
+    async def _harness_mutate(self, request: web.Request) -> web.Response:
+        """Cambios hechos "por el usuario" en Calendar, que el próximo sync incremental tiene que ver"""
+        data = await request.json()
+        calendar = self.calendars.get(data.get("token", ""))
+        event = calendar.events.get(data.get("eventId", "")) if calendar else None
+        if event is None:
+            return web.json_response({"ok": False, "description": "Evento no encontrado"}, status=404)
+
+        if data.get("action") == "delete":
+            calendar.touch({**event, "status": "cancelled"})
+        elif data.get("action") == "move":
+            delta = timedelta(minutes=float(data.get("minutes", 60)))
+            moved = {**event}
+            for field in ("start", "end"):
+                if moved.get(field, {}).get("dateTime"):
+                    when = datetime.fromisoformat(moved[field]["dateTime"].replace("Z", "+00:00")) + delta
+                    moved[field] = {**moved[field], "dateTime": when.isoformat()}
+            calendar.touch(moved)
+        else:
+            return web.json_response({"ok": False, "description": "action tiene que ser delete o move"}, status=400)
+        return web.json_response({"ok": True, "result": calendar.events[event["id"]]})
+
+    async def _harness_expire_sync_tokens(self, request: web.Request) -> web.Response:
+        data = await request.json() if request.can_read_body else {}
+        token = data.get("token")
+        calendars = [self.calendars[token]] if token in self.calendars else [] if token else list(self.calendars.values())
+        for calendar in calendars:
+            calendar.expire_sync_tokens()
+        return web.json_response({"ok": True, "result": {"expired": len(calendars)}})
+
+
+async def serve(args):
+    server = FakeCalendarServer(
+        host=args.host, port=args.port, latency=args.latency, item_latency=args.item_latency,
+        user_rate=args.user_rate, user_burst=args.user_burst, global_rate=args.global_rate, seed=args.seed
+    )
+    await server.start()
+    print(f"📅 Fake Google Calendar v3 en {server.url}")
+    print(f"   Cuota: {args.user_rate or '∞'} req/s por usuario, {args.global_rate or '∞'} req/s en total")
+    print(f"   Configurá el bot con GOOGLE_CALENDAR_API_URL={server.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Google Calendar v3 con lotes, sync tokens y cuotas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8083)
+    parser.add_argument("--latency", default="none", help="Por request HTTP: fixed:MS | uniform:A:B | normal:MEAN:STD | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--item-latency", default="none", help="Por request individual (sumada dentro de un lote), mismo formato")
+    parser.add_argument("--user-rate", type=float, default=0.0, help="Requests por segundo por usuario (0 = sin límite)")
+    parser.add_argument("--user-burst", type=float, default=0.0, help="Ráfaga por usuario (default: --user-rate)")
+    parser.add_argument("--global-rate", type=float, default=0.0, help="Requests por segundo en total (0 = sin límite)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\n⏹️  Servidor detenido")
+
+
+if __name__ == "__main__":
+    main()
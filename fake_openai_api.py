@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Stand-in local de OpenAI /v1/responses para testing offline y de carga de RegistroCx.
+También atiende /v1/audio/transcriptions (Whisper) para clips de synthetic_audio.py:
+devuelve el texto embebido en el clip, con su propia latencia (--transcription-latency).
+
+Modos:
+    replay - responde desde un cassette grabado, buscando por hash de prompt + input
+    record - reenvía a OpenAI real, devuelve la respuesta y la agrega al cassette
+
+Inyección de fallas (deterministas con --seed):
+    --latency fixed:800 | uniform:300:2500 | normal:1200:400 | lognormal:1200:0.5 | recorded
+    --rate-429 0.05         fracción de requests que responden 429 con Retry-After
+    --timeout-rate 0.01     fracción de requests que cuelgan --timeout-seconds y devuelven 504
+    --max-concurrency 20    requests en vuelo por encima de este valor reciben 429 (backpressure)
+
+El bot se apunta con OPENAI_BASE_URL=http://localhost:8082.
+
+Uso:
+    python3 fake_openai_api.py --mode record --cassette openai_cassette.jsonl.gz
+    python3 fake_openai_api.py --cassette openai_cassette.jsonl.gz --latency lognormal:1500:0.6
+    python3 fake_openai_api.py --cassette openai_cassette.jsonl.gz --transcription-latency lognormal:3000:0.4
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import random
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+from aiohttp import web
+
+from synthetic_audio import read_transcript
+
+OPENAI_API_URL = "https://api.openai.com"
+# Campos del request que no cambian la respuesta y no deben alterar la clave del cassette
+IGNORED_REQUEST_FIELDS = {"stream", "metadata", "user", "store"}
+
+
+def request_key(body: Dict[str, Any]) -> str:
+    """Hash estable del prompt (id/version) + input + resto de parámetros relevantes"""
+    relevant = {k: v for k, v in body.items() if k not in IGNORED_REQUEST_FIELDS}
+    canonical = json.dumps(relevant, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:24]
+
+
+def prompt_label(body: Dict[str, Any]) -> str:
+    prompt = body.get("prompt") or {}
+    if isinstance(prompt, dict) and prompt.get("id"):
+        return f"{prompt['id']}@{prompt.get('version', '')}"
+    return body.get("model", "unknown")
+
+
+def extract_output_text(response: Dict[str, Any]) -> Optional[str]:
+    """Mismo recorrido que LLMOpenAIAssistant: output[] -> message -> output_text"""
+    for item in response.get("output", []):
+        if item.get("type") != "message":
+            continue
+        for part in item.get("content", []):
+            if part.get("type") == "output_text":
+                return part.get("text")
+    return None
+
+
+def build_response(text: str, key: str) -> Dict[str, Any]:
+    """Respuesta mínima con la forma de /v1/responses que consume el bot"""
+    return {
+        "id": f"resp_{key}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "output": [{
+            "id": f"msg_{key}",
+            "type": "message",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}]
+        }]
+    }
+
+
+class Cassette:
+    """Archivo JSONL (opcionalmente .gz) con una entrada compacta por request grabado"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            self._load()
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _load(self):
+        with self._open("r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(key)
+
+    def add(self, key: str, body: Dict[str, Any], text: str, latency_ms: float):
+        entry = {
+            "key": key,
+            "prompt": prompt_label(body),
+            "input_preview": str(body.get("input", ""))[:120],
+            "text": text,
+            "latency_ms": round(latency_ms, 1)
+        }
+        self.entries[key] = entry
+        # gzip en modo append agrega un nuevo miembro; gzip.open los lee todos en secuencia
+        with self._open("a") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class LatencyModel:
+    """Distribución de latencia inyectada: fixed/uniform/normal/lognormal/recorded"""
+
+    def __init__(self, spec: str, rng: random.Random):
+        self.spec = spec
+        self.rng = rng
+        parts = spec.split(":")
+        self.kind = parts[0]
+        self.params = [float(p) for p in parts[1:]]
+        if self.kind not in ("none", "fixed", "uniform", "normal", "lognormal", "recorded"):
+            raise ValueError(f"Distribución de latencia desconocida: {spec}")
+
+    def sample_ms(self, recorded_ms: Optional[float] = None) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(self.params[0], self.params[1])
+        if self.kind == "normal":
+            return max(self.rng.gauss(self.params[0], self.params[1]), 0)
+        if self.kind == "lognormal":
+            # params: mediana (ms), sigma
+            return self.rng.lognormvariate(0, self.params[1]) * self.params[0]
+        if self.kind == "recorded":
+            return recorded_ms or 0
+        return 0
+
+
+class FakeOpenAIServer:
+    def __init__(self, cassette_path: str, mode: str = "replay", host: str = "127.0.0.1", port: int = 8082,
+                 latency: str = "none", rate_429: float = 0.0, timeout_rate: float = 0.0,
+                 timeout_seconds: float = 120, max_concurrency: int = 0, default_text: Optional[str] = None,
+                 upstream_url: str = OPENAI_API_URL, seed: int = 42, transcription_latency: str = "none"):
+        self.cassette = Cassette(cassette_path)
+        self.mode = mode
+        self.host = host
+        self.port = port
+        self.rng = random.Random(seed)
+        self.latency = LatencyModel(latency, self.rng)
+        self.transcription_latency = LatencyModel(transcription_latency, self.rng)
+        self.rate_429 = rate_429
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.max_concurrency = max_concurrency
+        self.default_text = default_text
+        self.upstream_url = upstream_url.rstrip("/")
+        self.in_flight = 0
+        self.stats = {
+            "requests": 0, "hits": 0, "misses": 0, "recorded": 0,
+            "rate_limited": 0, "overloaded": 0, "timeouts": 0, "max_in_flight": 0,
+            "transcriptions": 0, "transcription_misses": 0,
+            "by_prompt": {}  # prompt id@version (o modelo) -> requests
+        }
+        self._runner: Optional[web.AppRunner] = None
+        self._upstream: Optional[aiohttp.ClientSession] = None
+
+    def build_app(self) -> web.Application:
+        app = web.Application(client_max_size=10 * 1024 * 1024)
+        app.router.add_post("/v1/responses", self._handle_responses)
+        app.router.add_post("/v1/audio/transcriptions", self._handle_transcriptions)
+        app.router.add_get("/_stats", self._handle_stats)
+        app.router.add_post("/_config", self._handle_config)
+        return app
+
+    async def start(self):
+        if self.mode == "record":
+            self._upstream = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout_seconds))
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._upstream:
+            await self._upstream.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # ------------------------------------------------------------------
+    # /v1/responses
+    # ------------------------------------------------------------------
+
+    async def _handle_responses(self, request: web.Request) -> web.Response:
+        self.stats["requests"] += 1
+        if self.max_concurrency and self.in_flight >= self.max_concurrency:
+            self.stats["overloaded"] += 1
+            return self._rate_limited("Too many concurrent requests")
+
+        self.in_flight += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.in_flight)
+        try:
+            body = await request.json()
+            label = prompt_label(body)
+            self.stats["by_prompt"][label] = self.stats["by_prompt"].get(label, 0) + 1
+            if self.mode == "record":
+                return await self._record(request, body)
+            return await self._replay(body)
+        finally:
+            self.in_flight -= 1
+
+    async def _replay(self, body: Dict[str, Any]) -> web.Response:
+        key = request_key(body)
+        entry = self.cassette.get(key)
+
+        # Fallas inyectadas antes de la latencia, como haría un gateway sobrecargado
+        roll = self.rng.random()
+        if roll < self.rate_429:
+            self.stats["rate_limited"] += 1
+            return self._rate_limited("Rate limit reached for requests")
+        if roll < self.rate_429 + self.timeout_rate:
+            self.stats["timeouts"] += 1
+            await asyncio.sleep(self.timeout_seconds)
+            return web.json_response({"error": {"message": "Gateway timeout", "type": "timeout"}}, status=504)
+
+        await asyncio.sleep(self.latency.sample_ms(entry["latency_ms"] if entry else None) / 1000)
+
+        if entry is not None:
+            self.stats["hits"] += 1
+            return web.json_response(build_response(entry["text"], key))
+
+        self.stats["misses"] += 1
+        if self.default_text is not None:
+            return web.json_response(build_response(self.default_text, key))
+        return web.json_response({"error": {
+            "message": f"No recorded response for {prompt_label(body)} (key {key})",
+            "type": "invalid_request_error",
+            "code": "cassette_miss"
+        }}, status=404)
+
+    # ------------------------------------------------------------------
+    # /v1/audio/transcriptions
+    # ------------------------------------------------------------------
+
+    async def _handle_transcriptions(self, request: web.Request) -> web.Response:
+        """Whisper con response_format=text: el texto sale del clip, no de un modelo"""
+        self.stats["requests"] += 1
+        if self.max_concurrency and self.in_flight >= self.max_concurrency:
+            self.stats["overloaded"] += 1
+            return self._rate_limited("Too many concurrent requests")
+
+        self.in_flight += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.in_flight)
+        try:
+            form = await request.post()
+            upload = form.get("file")
+            audio = upload.file.read() if isinstance(upload, web.FileField) else b""
+
+            roll = self.rng.random()
+            if roll < self.rate_429:
+                self.stats["rate_limited"] += 1
+                return self._rate_limited("Rate limit reached for requests")
+            if roll < self.rate_429 + self.timeout_rate:
+                self.stats["timeouts"] += 1
+                await asyncio.sleep(self.timeout_seconds)
+                return web.json_response({"error": {"message": "Gateway timeout", "type": "timeout"}}, status=504)
+
+            await asyncio.sleep(self.transcription_latency.sample_ms() / 1000)
+
+            self.stats["transcriptions"] += 1
+            text = read_transcript(audio)
+            if text is None:
+                self.stats["transcription_misses"] += 1
+                text = self.default_text
+            if text is None:
+                return web.json_response({"error": {
+                    "message": "Audio without embedded transcript (use synthetic_audio.py clips)",
+                    "type": "invalid_request_error",
+                    "code": "transcript_missing"
+                }}, status=400)
+            return web.Response(text=text + "\n", content_type="text/plain")
+        finally:
+            self.in_flight -= 1
+
+    async def _record(self, request: web.Request, body: Dict[str, Any]) -> web.Response:
+        key = request_key(body)
+        headers = {"Content-Type": "application/json"}
+        if "Authorization" in request.headers:
+            headers["Authorization"] = request.headers["Authorization"]
+
+        started = time.perf_counter()
+        async with self._upstream.post(f"{self.upstream_url}/v1/responses", json=body, headers=headers) as upstream:
+            raw = await upstream.read()
+            status = upstream.status
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        if status == 200:
+            text = extract_output_text(json.loads(raw))
+            if text is not None:
+                self.cassette.add(key, body, text, latency_ms)
+                self.stats["recorded"] += 1
+        return web.Response(body=raw, status=status, content_type="application/json")
+
+    # ------------------------------------------------------------------
+    # Control
+    # ------------------------------------------------------------------
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            **self.stats,
+            "in_flight": self.in_flight,
+            "cassette_entries": len(self.cassette.entries),
+            "config": self.config()
+        })
+
+    async def _handle_config(self, request: web.Request) -> web.Response:
+        """Permite cambiar latencia y fallas en caliente para barridos de carga"""
+        body = await request.json()
+        if "latency" in body:
+            self.latency = LatencyModel(body["latency"], self.rng)
+        if "transcription_latency" in body:
+            self.transcription_latency = LatencyModel(body["transcription_latency"], self.rng)
+        for field in ("rate_429", "timeout_rate", "timeout_seconds"):
+            if field in body:
+                setattr(self, field, float(body[field]))
+        if "max_concurrency" in body:
+            self.max_concurrency = int(body["max_concurrency"])
+        return web.json_response(self.config())
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "latency": self.latency.spec,
+            "transcription_latency": self.transcription_latency.spec,
+            "rate_429": self.rate_429,
+            "timeout_rate": self.timeout_rate,
+            "timeout_seconds": self.timeout_seconds,
+            "max_concurrency": self.max_concurrency
+        }
+
+    @staticmethod
+    def _rate_limited(message: str) -> web.Response:
+        return web.json_response(
+            {"error": {"message": message, "type": "requests", "code": "rate_limit_exceeded"}},
+            status=429,
+            headers={"Retry-After": "1"}
+        )
+
+
+async def serve(args):
+    server = FakeOpenAIServer(
+        cassette_path=args.cassette, mode=args.mode, host=args.host, port=args.port,
+        latency=args.latency, rate_429=args.rate_429, timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds, max_concurrency=args.max_concurrency,
+        default_text=args.default_text, upstream_url=args.upstream_url, seed=args.seed,
+        transcription_latency=args.transcription_latency
+    )
+    await server.start()
+    print(f"🧠 Fake OpenAI /v1/responses ({args.mode}) en {server.url}")
+    print(f"   Cassette: {args.cassette} ({len(server.cassette.entries)} entradas)")
+    print(f"   Configurá el bot con OPENAI_BASE_URL={server.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI Responses API con record/replay")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--mode", choices=["replay", "record"], default="replay")
+    parser.add_argument("--cassette", default="openai_cassette.jsonl.gz")
+    parser.add_argument("--latency", default="none", help="fixed:MS | uniform:A:B | normal:MEAN:STD | lognormal:MEDIAN:SIGMA | recorded")
+    parser.add_argument("--transcription-latency", default="none",
+                        help="Latencia de /v1/audio/transcriptions, mismo formato que --latency (sin recorded)")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-seconds", type=float, default=120)
+    parser.add_argument("--max-concurrency", type=int, default=0, help="0 = sin límite")
+    parser.add_argument("--default-text", help="Texto a devolver cuando no hay grabación (default: 404)")
+    parser.add_argument("--upstream-url", default=OPENAI_API_URL)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\n⏹️  Servidor detenido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,703 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita la Bot API de Telegram para testing offline de RegistroCx.
+
+El bot (C#) se apunta a este servidor con TELEGRAM_API_URL=http://localhost:8081
+y el harness inyecta mensajes de usuario y recibe las respuestas del bot apenas
+se envían, sin depender de getUpdates reales ni de polling cada 1 segundo.
+También sirve notas de voz/audio (inject_voice + getFile + /file/bot<token>/...)
+con clips de synthetic_audio.py para la carga del camino de transcripción.
+
+Con --global-rate/--chat-rate aplica flood limits como Telegram: los envíos y ediciones
+por encima del límite reciben 429 con retry_after. /harness/stats cuenta enviados y 429s.
+
+Si el bot registra un webhook (TELEGRAM_UPDATE_MODE=webhook, setWebhook), los updates
+inyectados se le entregan por POST como hace Telegram, en orden dentro de cada chat,
+y getUpdates responde 409.
+
+Uso:
+    python3 fake_telegram_api.py --port 8081
+    python3 fake_telegram_api.py --port 8081 --telegram-limits
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+from synthetic_audio import estimate_duration, opus_clip
+
+BOT_ID = 7000000001
+BOT_USERNAME = "RegistroCxTestBot"
+MAX_LONG_POLL_SECONDS = 25  # Menor que el timeout del HttpClient del bot
+WEBHOOK_MAX_ATTEMPTS = 5     # Telegram reintenta bastante más; alcanza para un 503 por cola llena
+# Métodos que cuentan para los flood limits de Telegram
+RATE_LIMITED_METHODS = {"sendmessage", "editmessagetext", "editmessagereplymarkup", "senddocument"}
+# Límites aproximados de Telegram; una ficha más de ráfaga que el default del bot absorbe el jitter de red
+TELEGRAM_LIMITS = {"global_rate": 30.0, "chat_rate": 1.0, "chat_burst": 4}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Consume una ficha; si no hay, devuelve los segundos hasta la próxima (sin consumir)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class ChatState:
+    """Estado de un chat simulado: respuestas del bot y último mensaje del usuario"""
+
+    def __init__(self, chat_id: int):
+        self.chat_id = chat_id
+        self.replies: List[Dict[str, Any]] = []
+        self.last_user_message_id: Optional[int] = None
+        self.last_update_id: Optional[int] = None
+        self.changed = asyncio.Condition()
+
+
+class ConflictError(Exception):
+    """getUpdates con un webhook activo (409 en Telegram)"""
+
+
+class FakeTelegramServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8081,
+                 bot_id: int = BOT_ID, bot_username: str = BOT_USERNAME,
+                 global_rate: float = 0, chat_rate: float = 0, chat_burst: int = 1):
+        self.host = host
+        self.port = port
+        # 0 = sin límite
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = max(1, chat_burst)
+        self._global_bucket = TokenBucket(global_rate, max(1.0, global_rate)) if global_rate else None
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self.stats = {"sent": 0, "rate_limited": 0, "max_per_second": 0,
+                      "webhook_delivered": 0, "webhook_retries": 0, "webhook_failed": 0}
+        self._current_second = 0
+        self._sent_this_second = 0
+        self.bot_user = {
+            "id": bot_id,
+            "is_bot": True,
+            "first_name": "RegistroCx",
+            "username": bot_username
+        }
+        self.updates: List[Dict[str, Any]] = []
+        self.chats: Dict[int, ChatState] = {}
+        self.messages: Dict[tuple, Dict[str, Any]] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._next_update_id = 1
+        self._next_message_id = 1
+        self._next_callback_id = 1
+        self._next_file_id = 1
+        self.webhook: Optional[Dict[str, Any]] = None
+        self._webhook_session: Optional[aiohttp.ClientSession] = None
+        self._webhook_connections: Optional[asyncio.Semaphore] = None
+        self._webhook_chat_locks: Dict[int, asyncio.Lock] = {}
+        self._webhook_tasks: set = set()
+        self._updates_changed = asyncio.Condition()
+        self._runner: Optional[web.AppRunner] = None
+
+        self.bot_methods: Dict[str, Callable] = {
+            "getme": self._get_me,
+            "getupdates": self._get_updates,
+            "setwebhook": self._set_webhook,
+            "deletewebhook": self._delete_webhook,
+            "getwebhookinfo": self._get_webhook_info,
+            "sendmessage": self._send_message,
+            "editmessagetext": self._edit_message_text,
+            "editmessagereplymarkup": self._edit_message_reply_markup,
+            "answercallbackquery": self._answer_callback_query,
+            "senddocument": self._send_document,
+            "getfile": self._get_file,
+        }
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def build_app(self) -> web.Application:
+        app = web.Application(client_max_size=50 * 1024 * 1024)
+        app.router.add_route("*", "/bot{token}/{method}", self._handle_bot_method)
+        app.router.add_get("/file/bot{token}/{path:.*}", self._download_file)
+        app.router.add_post("/harness/sendMessage", self._harness_send_message)
+        app.router.add_post("/harness/sendVoice", self._harness_send_voice)
+        app.router.add_post("/harness/sendCallback", self._harness_send_callback)
+        app.router.add_post("/harness/waitForReply", self._harness_wait_for_reply)
+        app.router.add_get("/harness/replies", self._harness_replies)
+        app.router.add_get("/harness/stats", self._harness_stats)
+        app.router.add_post("/harness/reset", self._harness_reset)
+        return app
+
+    async def start(self):
+        """Levanta el servidor HTTP en host:port"""
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+
+    async def stop(self):
+        for task in list(self._webhook_tasks):
+            task.cancel()
+        if self._webhook_session:
+            await self._webhook_session.close()
+            self._webhook_session = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # ------------------------------------------------------------------
+    # API de inyección (usable in-process o vía /harness/*)
+    # ------------------------------------------------------------------
+
+    def chat(self, chat_id: int) -> ChatState:
+        if chat_id not in self.chats:
+            self.chats[chat_id] = ChatState(chat_id)
+        return self.chats[chat_id]
+
+    async def inject_message(self, chat_id: int, text: str, first_name: str = "Tester",
+                             username: Optional[str] = None) -> Dict[str, Any]:
+        """Encola un mensaje de usuario como update y devuelve su message_id y cursor de respuestas"""
+        return await self._inject_user_message(chat_id, first_name, username, {"text": text})
+
+    async def inject_voice(self, chat_id: int, audio: Any, duration: Optional[int] = None,
+                           kind: str = "voice", first_name: str = "Tester",
+                           username: Optional[str] = None, forwarded: bool = False) -> Dict[str, Any]:
+        """
+        Encola una nota de voz (kind="voice") o archivo de audio (kind="audio").
+        audio son los bytes OGG/Opus o un texto, que se convierte en clip sintético.
+        Con forwarded=True el mismo texto genera siempre el mismo archivo (audio reenviado).
+        """
+        if kind not in ("voice", "audio"):
+            raise ValueError(f"Tipo de audio desconocido: {kind}")
+        file_number = self._next_file_id
+        self._next_file_id += 1
+        if isinstance(audio, str):
+            duration = duration or estimate_duration(audio)
+            # Cada grabación nueva es un archivo distinto aunque diga lo mismo
+            audio = opus_clip(audio, duration) if forwarded else opus_clip(audio, duration, serial=file_number)
+        duration = duration or 1
+
+        # Como Telegram: file_id cambia en cada envío, file_unique_id identifica el contenido
+        file_id = f"{kind}-{file_number}"
+        file_unique_id = hashlib.sha256(audio).hexdigest()[:16]
+        self.files[file_id] = {
+            "file_id": file_id,
+            "file_unique_id": file_unique_id,
+            "file_size": len(audio),
+            "file_path": f"{kind}/{file_id}.ogg",
+            "content": audio
+        }
+
+        attachment = {
+            "file_id": file_id,
+            "file_unique_id": file_unique_id,
+            "duration": duration,
+            "mime_type": "audio/ogg",
+            "file_size": len(audio)
+        }
+        if kind == "audio":
+            attachment["file_name"] = f"{file_id}.ogg"
+        return await self._inject_user_message(chat_id, first_name, username, {kind: attachment})
+
+    async def _inject_user_message(self, chat_id: int, first_name: str, username: Optional[str],
+                                   content: Dict[str, Any]) -> Dict[str, Any]:
+        chat = self.chat(chat_id)
+        user = self._user(chat_id, first_name, username)
+        message = {
+            "message_id": self._new_message_id(),
+            "from": user,
+            "chat": {"id": chat_id, "type": "private", "first_name": first_name},
+            "date": int(time.time()),
+            **content
+        }
+        chat.last_user_message_id = message["message_id"]
+        update_id = await self._enqueue_update({"message": message})
+        chat.last_update_id = update_id
+        return {
+            "update_id": update_id,
+            "message_id": message["message_id"],
+            "reply_cursor": len(chat.replies)
+        }
+
+    async def inject_callback(self, chat_id: int, message_id: int, data: str,
+                              first_name: str = "Tester") -> Dict[str, Any]:
+        """Simula que el usuario toca un botón inline de un mensaje del bot"""
+        chat = self.chat(chat_id)
+        bot_message = self.messages.get((chat_id, message_id))
+        if bot_message is None:
+            raise KeyError(f"Mensaje {message_id} inexistente en chat {chat_id}")
+
+        callback_id = str(self._next_callback_id)
+        self._next_callback_id += 1
+        callback = {
+            "id": callback_id,
+            "from": self._user(chat_id, first_name, None),
+            "message": bot_message,
+            "chat_instance": str(chat_id),
+            "data": data
+        }
+        update_id = await self._enqueue_update({"callback_query": callback})
+        chat.last_update_id = update_id
+        return {
+            "update_id": update_id,
+            "callback_query_id": callback_id,
+            "reply_cursor": len(chat.replies)
+        }
+
+    async def wait_for_replies(self, chat_id: int, after: int = 0,
+                               timeout: float = 30) -> List[Dict[str, Any]]:
+        """Espera hasta que el bot responda en el chat (respuestas con seq > after)"""
+        chat = self.chat(chat_id)
+        predicate = lambda: len(chat.replies) > after
+        await self._wait(chat.changed, predicate, timeout)
+        return chat.replies[after:]
+
+    def reset(self):
+        self.updates.clear()
+        self.chats.clear()
+        self.messages.clear()
+        self.files.clear()
+
+    # ------------------------------------------------------------------
+    # Bot API
+    # ------------------------------------------------------------------
+
+    async def _handle_bot_method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        handler = self.bot_methods.get(method)
+        if handler is None:
+            return self._error(404, "Not Found: method not found")
+
+        params = await self._read_params(request)
+        if method in RATE_LIMITED_METHODS:
+            retry_after = self._check_flood_limit(params)
+            if retry_after:
+                return self._too_many_requests(retry_after)
+        try:
+            result = await handler(params)
+        except KeyError as e:
+            return self._error(400, f"Bad Request: {e}")
+        except ConflictError as e:
+            return self._error(409, str(e))
+        return web.json_response({"ok": True, "result": result})
+
+    async def _get_me(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self.bot_user
+
+    async def _set_webhook(self, params: Dict[str, Any]) -> bool:
+        self.webhook = {
+            "url": params["url"],
+            "secret_token": params.get("secret_token"),
+            "max_connections": int(params.get("max_connections") or 40)
+        }
+        self._webhook_connections = asyncio.Semaphore(self.webhook["max_connections"])
+        if self._webhook_session is None:
+            self._webhook_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+        # Lo que estaba esperando un getUpdates pasa a entregarse por webhook
+        pending, self.updates = self.updates, []
+        for update in pending:
+            self._deliver(update, self.webhook)
+        return True
+
+    async def _delete_webhook(self, params: Dict[str, Any]) -> bool:
+        self.webhook = None
+        return True
+
+    async def _get_webhook_info(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "url": self.webhook["url"] if self.webhook else "",
+            "has_custom_certificate": False,
+            "pending_update_count": len(self._webhook_tasks) if self.webhook else len(self.updates),
+            "max_connections": self.webhook["max_connections"] if self.webhook else 0
+        }
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if self.webhook:
+            raise ConflictError("Conflict: can't use getUpdates method while webhook is active; use deleteWebhook to delete the webhook first")
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = min(float(params.get("timeout") or 0), MAX_LONG_POLL_SECONDS)
+
+        # offset confirma todos los updates anteriores, igual que Telegram
+        if offset:
+            self.updates = [u for u in self.updates if u["update_id"] >= offset]
+
+        if not self.updates and timeout > 0:
+            await self._wait(self._updates_changed, lambda: bool(self.updates), timeout)
+
+        return self.updates[:limit]
+
+    async def _send_message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = int(params["chat_id"])
+        message = self._bot_message(chat_id, text=params.get("text", ""),
+                                    reply_markup=self._json_param(params.get("reply_markup")))
+        await self._record_reply(chat_id, "sendMessage", message)
+        return message
+
+    async def _edit_message_text(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = int(params["chat_id"])
+        message = self.messages[(chat_id, int(params["message_id"]))]
+        message["text"] = params.get("text", "")
+        message["edit_date"] = int(time.time())
+        if "reply_markup" in params:
+            message["reply_markup"] = self._json_param(params["reply_markup"])
+        else:
+            message.pop("reply_markup", None)
+        await self._record_reply(chat_id, "editMessageText", message)
+        return message
+
+    async def _edit_message_reply_markup(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = int(params["chat_id"])
+        message = self.messages[(chat_id, int(params["message_id"]))]
+        message["reply_markup"] = self._json_param(params.get("reply_markup"))
+        message["edit_date"] = int(time.time())
+        await self._record_reply(chat_id, "editMessageReplyMarkup", message)
+        return message
+
+    async def _answer_callback_query(self, params: Dict[str, Any]) -> bool:
+        return True
+
+    async def _send_document(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = int(params["chat_id"])
+        document = params.get("document")
+        if isinstance(document, web.FileField):
+            content = document.file.read()
+            file_name = document.filename
+        else:
+            content = b""
+            file_name = str(document)
+
+        message = self._bot_message(chat_id, caption=params.get("caption", ""))
+        message["document"] = {
+            "file_id": f"doc-{message['message_id']}",
+            "file_unique_id": f"doc-{message['message_id']}",
+            "file_name": file_name,
+            "file_size": len(content)
+        }
+        await self._record_reply(chat_id, "sendDocument", message)
+        return message
+
+    async def _get_file(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        stored = self.files[params["file_id"]]
+        return {k: v for k, v in stored.items() if k != "content"}
+
+    async def _download_file(self, request: web.Request) -> web.Response:
+        file_path = request.match_info["path"]
+        for stored in self.files.values():
+            if stored["file_path"] == file_path:
+                return web.Response(body=stored["content"], content_type="audio/ogg")
+        return self._error(404, "Not Found: file not found")
+
+    # ------------------------------------------------------------------
+    # Endpoints /harness/*
+    # ------------------------------------------------------------------
+
+    async def _harness_send_message(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        result = await self.inject_message(int(body["chat_id"]), body["text"],
+                                           body.get("first_name", "Tester"), body.get("username"))
+        return web.json_response({"ok": True, "result": result})
+
+    async def _harness_send_voice(self, request: web.Request) -> web.Response:
+        """Acepta "text" (se genera el clip) o "audio_b64" con un OGG/Opus propio"""
+        body = await request.json()
+        audio = base64.b64decode(body["audio_b64"]) if body.get("audio_b64") else body.get("text")
+        if audio is None:
+            return self._error(400, "Bad Request: text or audio_b64 is required")
+        try:
+            result = await self.inject_voice(int(body["chat_id"]), audio, body.get("duration"),
+                                             body.get("kind", "voice"), body.get("first_name", "Tester"),
+                                             body.get("username"), bool(body.get("forwarded", False)))
+        except ValueError as e:
+            return self._error(400, f"Bad Request: {e}")
+        return web.json_response({"ok": True, "result": result})
+
+    async def _harness_send_callback(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        try:
+            result = await self.inject_callback(int(body["chat_id"]), int(body["message_id"]), body["data"])
+        except KeyError as e:
+            return self._error(400, f"Bad Request: {e}")
+        return web.json_response({"ok": True, "result": result})
+
+    async def _harness_wait_for_reply(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        replies = await self.wait_for_replies(int(body["chat_id"]), int(body.get("after", 0)),
+                                              float(body.get("timeout", 30)))
+        return web.json_response({"ok": True, "result": replies})
+
+    async def _harness_replies(self, request: web.Request) -> web.Response:
+        chat_id = int(request.query["chat_id"])
+        return web.json_response({"ok": True, "result": self.chat(chat_id).replies})
+
+    async def _harness_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"ok": True, "result": {
+            **self.stats,
+            "limits": {"global_rate": self.global_rate, "chat_rate": self.chat_rate, "chat_burst": self.chat_burst}
+        }})
+
+    async def _harness_reset(self, request: web.Request) -> web.Response:
+        self.reset()
+        return web.json_response({"ok": True, "result": True})
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _check_flood_limit(self, params: Dict[str, Any]) -> int:
+        """Segundos de retry_after si el envío supera los límites, 0 si pasa"""
+        wait = 0.0
+        chat_bucket = None
+        if self.chat_rate and "chat_id" in params:
+            chat_id = int(params["chat_id"])
+            chat_bucket = self._chat_buckets.get(chat_id)
+            if chat_bucket is None:
+                chat_bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            wait = chat_bucket.take()
+        if not wait and self._global_bucket:
+            wait = self._global_bucket.take()
+            if wait and chat_bucket:
+                chat_bucket.tokens += 1  # El envío no salió: se devuelve la ficha del chat
+
+        if wait:
+            self.stats["rate_limited"] += 1
+            return max(1, math.ceil(wait))
+
+        self.stats["sent"] += 1
+        second = int(time.time())
+        if second != self._current_second:
+            self._current_second, self._sent_this_second = second, 0
+        self._sent_this_second += 1
+        self.stats["max_per_second"] = max(self.stats["max_per_second"], self._sent_this_second)
+        return 0
+
+    async def _enqueue_update(self, payload: Dict[str, Any]) -> int:
+        update_id = self._next_update_id
+        self._next_update_id += 1
+        if self.webhook:
+            self._deliver({"update_id": update_id, **payload}, self.webhook)
+            return update_id
+        async with self._updates_changed:
+            self.updates.append({"update_id": update_id, **payload})
+            self._updates_changed.notify_all()
+        return update_id
+
+    def _deliver(self, update: Dict[str, Any], webhook: Dict[str, Any]):
+        # El webhook y su límite de conexiones se fijan acá: un deleteWebhook/setWebhook posterior no afecta esta entrega
+        task = asyncio.create_task(self._post_webhook(update, webhook, self._webhook_connections))
+        self._webhook_tasks.add(task)
+        task.add_done_callback(self._webhook_tasks.discard)
+
+    async def _post_webhook(self, update: Dict[str, Any], webhook: Dict[str, Any], connections: asyncio.Semaphore):
+        """Entrega un update al webhook; un chat a la vez para no desordenar sus mensajes"""
+        chat_id = self._update_chat_id(update)
+        lock = self._webhook_chat_locks.setdefault(chat_id, asyncio.Lock())
+        headers = {"X-Telegram-Bot-Api-Secret-Token": webhook["secret_token"]} if webhook.get("secret_token") else {}
+
+        async with lock:
+            for attempt in range(WEBHOOK_MAX_ATTEMPTS):
+                try:
+                    async with connections:
+                        async with self._webhook_session.post(webhook["url"], json=update, headers=headers) as response:
+                            if response.status == 200:
+                                self.stats["webhook_delivered"] += 1
+                                return
+                except aiohttp.ClientError:
+                    pass
+                self.stats["webhook_retries"] += 1
+                await asyncio.sleep(min(2 ** attempt * 0.25, 5))
+            self.stats["webhook_failed"] += 1
+
+    @staticmethod
+    def _update_chat_id(update: Dict[str, Any]) -> int:
+        message = update.get("message") or (update.get("callback_query") or {}).get("message") or {}
+        return message.get("chat", {}).get("id", 0)
+
+    async def _record_reply(self, chat_id: int, method: str, message: Dict[str, Any]):
+        chat = self.chat(chat_id)
+        async with chat.changed:
+            chat.replies.append({
+                "seq": len(chat.replies) + 1,
+                "method": method,
+                "chat_id": chat_id,
+                "message_id": message["message_id"],
+                "in_reply_to": chat.last_user_message_id,
+                "update_id": chat.last_update_id,
+                "text": message.get("text") or message.get("caption", ""),
+                "reply_markup": message.get("reply_markup"),
+                "document": message.get("document"),
+                "timestamp": time.time()
+            })
+            chat.changed.notify_all()
+
+    def _bot_message(self, chat_id: int, text: Optional[str] = None, caption: Optional[str] = None,
+                     reply_markup: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        message = {
+            "message_id": self._new_message_id(),
+            "from": self.bot_user,
+            "chat": {"id": chat_id, "type": "private"},
+            "date": int(time.time())
+        }
+        if text is not None:
+            message["text"] = text
+        if caption:
+            message["caption"] = caption
+        if reply_markup:
+            message["reply_markup"] = reply_markup
+        self.messages[(chat_id, message["message_id"])] = message
+        return message
+
+    def _new_message_id(self) -> int:
+        message_id = self._next_message_id
+        self._next_message_id += 1
+        return message_id
+
+    @staticmethod
+    def _user(chat_id: int, first_name: str, username: Optional[str]) -> Dict[str, Any]:
+        user = {"id": chat_id, "is_bot": False, "first_name": first_name, "language_code": "es"}
+        if username:
+            user["username"] = username
+        return user
+
+    @staticmethod
+    async def _wait(condition: asyncio.Condition, predicate: Callable[[], bool], timeout: float) -> bool:
+        async with condition:
+            try:
+                await asyncio.wait_for(condition.wait_for(predicate), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return predicate()
+
+    @staticmethod
+    async def _read_params(request: web.Request) -> Dict[str, Any]:
+        """Lee parámetros de query, JSON o form (multipart/urlencoded) como hace Telegram"""
+        params: Dict[str, Any] = dict(request.query)
+        if request.method == "POST" and request.can_read_body:
+            if request.content_type == "application/json":
+                params.update(await request.json())
+            else:
+                params.update(await request.post())
+        return params
+
+    @staticmethod
+    def _json_param(value: Any) -> Any:
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return value
+        return value
+
+    @staticmethod
+    def _too_many_requests(retry_after: int) -> web.Response:
+        return web.json_response({
+            "ok": False,
+            "error_code": 429,
+            "description": f"Too Many Requests: retry after {retry_after}",
+            "parameters": {"retry_after": retry_after}
+        }, status=429)
+
+    @staticmethod
+    def _error(code: int, description: str) -> web.Response:
+        return web.json_response({"ok": False, "error_code": code, "description": description}, status=code)
+
+
+class HarnessClient:
+    """Cliente async de los endpoints /harness/* (load test, escenarios, replay)"""
+
+    def __init__(self, api_url: str):
+        self.harness_url = f"{api_url.rstrip('/')}/harness"
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        # Sin límite de conexiones: cada chat mantiene un long-poll abierto mientras espera
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    async def send_message(self, chat_id: int, text: str) -> Dict[str, Any]:
+        return await self._post("sendMessage", {"chat_id": chat_id, "text": text})
+
+    async def send_voice(self, chat_id: int, text: str, kind: str = "voice", forwarded: bool = False) -> Dict[str, Any]:
+        return await self._post("sendVoice", {"chat_id": chat_id, "text": text, "kind": kind, "forwarded": forwarded})
+
+    async def send_callback(self, chat_id: int, message_id: int, data: str) -> Dict[str, Any]:
+        return await self._post("sendCallback", {"chat_id": chat_id, "message_id": message_id, "data": data})
+
+    async def wait_for_replies(self, chat_id: int, after: int, timeout: float) -> List[Dict[str, Any]]:
+        return await self._post("waitForReply", {"chat_id": chat_id, "after": after, "timeout": max(timeout, 0)})
+
+    async def stats(self) -> Dict[str, Any]:
+        async with self._session.get(f"{self.harness_url}/stats") as response:
+            body = await response.json()
+            return body["result"]
+
+    async def _post(self, method: str, data: Dict[str, Any]) -> Any:
+        async with self._session.post(f"{self.harness_url}/{method}", json=data) as response:
+            body = await response.json()
+            if not body.get("ok"):
+                raise RuntimeError(body.get("description", "harness error"))
+            return body["result"]
+
+
+async def serve(args):
+    limits = TELEGRAM_LIMITS if args.telegram_limits else {}
+    server = FakeTelegramServer(args.host, args.port,
+                                global_rate=args.global_rate if args.global_rate is not None else limits.get("global_rate", 0),
+                                chat_rate=args.chat_rate if args.chat_rate is not None else limits.get("chat_rate", 0),
+                                chat_burst=args.chat_burst if args.chat_burst is not None else limits.get("chat_burst", 1))
+    await server.start()
+    print(f"🤖 Fake Telegram Bot API escuchando en {server.url}")
+    if server.global_rate or server.chat_rate:
+        print(f"   Flood limits: {server.global_rate or '∞'} msg/s global, "
+              f"{server.chat_rate or '∞'} msg/s por chat (ráfaga {server.chat_burst})")
+    print(f"   Configurá el bot con TELEGRAM_API_URL={server.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Telegram Bot API para testing offline")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--telegram-limits", action="store_true",
+                        help="Aplicar los límites aproximados de Telegram (30 msg/s global, 1 msg/s por chat)")
+    parser.add_argument("--global-rate", type=float, help="Envíos por segundo en total (0 = sin límite)")
+    parser.add_argument("--chat-rate", type=float, help="Envíos por segundo por chat (0 = sin límite)")
+    parser.add_argument("--chat-burst", type=int, help="Ráfaga permitida por chat")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\n⏹️  Servidor detenido")
+
+
+if __name__ == "__main__":
+    main()
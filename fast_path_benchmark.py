@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Benchmark del fast path local de extracción (LocalFastPathExtractor)
+
+Manda de a uno los TEST_CASES de texto libre (los comandos "/..." no pasan por la
+extracción), cada uno en un chat sintético nuevo, contra fake_telegram_api.py. Con
+/_stats de fake_openai_api.py cuenta cuántas llamadas al LLM generó cada mensaje: los
+que no generaron ninguna se resolvieron por el fast path. Reporta la tasa de mensajes
+que saltearon el LLM y la latencia hasta la respuesta (lo que sigue al "⏳ Procesando...")
+de los que lo saltearon contra los que no.
+
+Con --baseline compara caso por caso contra una corrida anterior guardada con el bot
+levantado con LLM_FAST_PATH=false.
+
+Uso:
+    # Bot con LLM_FAST_PATH=false
+    python3 fast_path_benchmark.py --llm-url http://127.0.0.1:8082 --output fast_path_off.json
+    # Bot con el fast path activo (default)
+    python3 fast_path_benchmark.py --llm-url http://127.0.0.1:8082 --baseline fast_path_off.json \\
+        --metrics-url http://127.0.0.1:8080/metrics
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from bot_metrics import scrape
+from fake_telegram_api import HarnessClient
+from latency_stats import LatencyHistogram
+from load_test_bot import DEFAULT_API_URL, llm_stub_request
+from test_bot_automated import TEST_CASES
+
+CHAT_ID_BASE = 890_000_000  # Rango reservado para chats sintéticos del fast path
+PROCESSING_PREFIX = "⏳ Procesando"
+
+
+def free_text_cases() -> List[Dict[str, Any]]:
+    return [case for case in TEST_CASES if not case["input"].startswith("/")]
+
+
+async def send_and_measure(harness: HarnessClient, chat_id: int, case: Dict[str, Any], llm_url: str,
+                           timeout: float) -> Dict[str, Any]:
+    """Manda el caso y espera la primera respuesta que no sea el aviso de "Procesando..." """
+    before = await llm_stub_request(llm_url, "GET", "/_stats")
+    sent_at = time.time()
+    injected = await harness.send_message(chat_id, case["input"])
+
+    cursor = injected["reply_cursor"]
+    answer = None
+    deadline = sent_at + timeout
+    while answer is None and time.time() < deadline:
+        for reply in await harness.wait_for_replies(chat_id, cursor, deadline - time.time()):
+            cursor = reply["seq"]
+            if reply["in_reply_to"] == injected["message_id"] and not reply["text"].startswith(PROCESSING_PREFIX):
+                answer = reply
+                break
+
+    after = await llm_stub_request(llm_url, "GET", "/_stats")
+    llm_calls = after["requests"] - before["requests"]
+    return {
+        "test_id": case["id"],
+        "name": case["name"],
+        "chat_id": chat_id,
+        "input": case["input"],
+        "llm_calls": llm_calls,
+        "skipped_llm": answer is not None and llm_calls == 0,
+        "answer_ms": (answer["timestamp"] - sent_at) * 1000 if answer else None,
+        "answer": answer["text"] if answer else "TIMEOUT - No response received"
+    }
+
+
+async def run(args) -> Dict[str, Any]:
+    cases = free_text_cases()
+    server_before = await scrape(args.metrics_url) if args.metrics_url else None
+
+    results: List[Dict[str, Any]] = []
+    async with HarnessClient(args.api_url) as harness:
+        for iteration in range(args.iterations):
+            for index, case in enumerate(cases):
+                # Chat nuevo por mensaje: sin contexto previo, que es cuando el fast path aplica
+                chat_id = args.chat_id_base + iteration * len(cases) + index
+                result = await send_and_measure(harness, chat_id, case, args.llm_url, args.timeout)
+                result["iteration"] = iteration
+                results.append(result)
+                marker = "⚡" if result["skipped_llm"] else "🧠"
+                latency = f"{result['answer_ms']:.0f} ms" if result["answer_ms"] is not None else "timeout"
+                print(f"{marker} {case['id']:<10} LLM x{result['llm_calls']}  {latency:>10}  {case['input'][:50]}")
+
+    server = None
+    if args.metrics_url:
+        server_after = await scrape(args.metrics_url)
+        if server_before and server_after:
+            server = server_after.diff(server_before)
+
+    return {"timestamp": datetime.now().isoformat(), "iterations": args.iterations, "results": results,
+            "server_events": {k: v for k, v in server.events.items() if k.startswith("llm_fast_path")} if server else None,
+            "server_stages": server.stage_rows() if server else None}
+
+
+def per_case(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Latencia media y llamadas al LLM por caso (promedio de las iteraciones)"""
+    rows: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        row = rows.setdefault(result["test_id"], {"input": result["input"], "runs": 0, "skipped": 0,
+                                                  "llm_calls": 0, "latency": LatencyHistogram()})
+        row["runs"] += 1
+        row["skipped"] += int(result["skipped_llm"])
+        row["llm_calls"] += result["llm_calls"]
+        if result["answer_ms"] is not None:
+            row["latency"].record(result["answer_ms"])
+    return rows
+
+
+def print_report(run_data: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    results = run_data["results"]
+    answered = [r for r in results if r["answer_ms"] is not None]
+    skipped = LatencyHistogram()
+    with_llm = LatencyHistogram()
+    for result in answered:
+        (skipped if result["skipped_llm"] else with_llm).record(result["answer_ms"])
+
+    print("\n" + "=" * 90)
+    print("⚡ FAST PATH LOCAL vs LLM")
+    print("=" * 90)
+    total = len(results)
+    rate = skipped.count / total * 100 if total else 0.0
+    print(f"Mensajes: {total}  respondidos: {len(answered)}  sin LLM: {skipped.count} ({rate:.1f}%)")
+    print(f"Llamadas al LLM: {sum(r['llm_calls'] for r in results)}")
+    print(f"\n{'Camino':<12} {'n':>5} {'p50 ms':>10} {'p90 ms':>10} {'media ms':>10}")
+    for label, histogram in (("sin LLM", skipped), ("con LLM", with_llm)):
+        print(f"{label:<12} {histogram.count:>5} {histogram.percentile(50):>10.0f} "
+              f"{histogram.percentile(90):>10.0f} {histogram.mean:>10.0f}")
+
+    events = run_data.get("server_events")
+    if events:
+        hits = events.get("llm_fast_path_hit", 0.0)
+        misses = events.get("llm_fast_path_miss", 0.0)
+        attempts = hits + misses
+        print(f"\nServidor (/metrics): {int(hits)} hits / {int(attempts)} intentos del fast path"
+              + (f" ({hits / attempts * 100:.1f}%)" if attempts else ""))
+
+    rows = per_case(results)
+    baseline_rows = per_case(baseline["results"]) if baseline else {}
+    print(f"\n{'Caso':<11} {'sin LLM':>8} {'LLM/msg':>8} {'media ms':>10}"
+          + (f" {'base ms':>10} {'Δ ms':>10}" if baseline else "") + "  Input")
+    for test_id, row in rows.items():
+        line = (f"{test_id:<11} {row['skipped']:>4}/{row['runs']:<3} {row['llm_calls'] / row['runs']:>8.1f} "
+                f"{row['latency'].mean:>10.0f}")
+        if baseline:
+            base = baseline_rows.get(test_id)
+            if base and base["latency"].count and row["latency"].count:
+                line += f" {base['latency'].mean:>10.0f} {row['latency'].mean - base['latency'].mean:>+10.0f}"
+            else:
+                line += f" {'-':>10} {'-':>10}"
+        print(f"{line}  {row['input'][:40]}")
+    print("=" * 90)
+
+
+async def main_async(args):
+    run_data = await run(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(run_data, baseline)
+
+    output = args.output or f"fast_path_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(run_data, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultados guardados en {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del fast path local de extracción")
+    parser.add_argument("--api-url", default=os.getenv("TELEGRAM_API_URL", DEFAULT_API_URL))
+    parser.add_argument("--llm-url", default=os.getenv("OPENAI_BASE_URL"),
+                        help="URL de fake_openai_api.py: /_stats cuenta las llamadas al LLM por mensaje")
+    parser.add_argument("--metrics-url", default=os.getenv("BOT_METRICS_URL"),
+                        help="URL de /metrics del bot: agrega los contadores llm_fast_path_hit/miss")
+    parser.add_argument("--iterations", type=int, default=3, help="Pasadas de los casos de texto libre")
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout por respuesta en segundos")
+    parser.add_argument("--chat-id-base", type=int, default=CHAT_ID_BASE)
+    parser.add_argument("--baseline", help="JSON de una corrida con LLM_FAST_PATH=false para comparar por caso")
+    parser.add_argument("--output", help="Archivo JSON de resultados (default: fast_path_results_<timestamp>.json)")
+    args = parser.parse_args()
+
+    if not args.llm_url:
+        parser.error("--llm-url (o OPENAI_BASE_URL) es necesario para contar las llamadas al LLM")
+
+    try:
+        asyncio.run(main_async(args))
+    except (KeyboardInterrupt, aiohttp.ClientError) as e:
+        print(f"\n⏹️  Benchmark interrumpido: {e}")
+
+
+if __name__ == "__main__":
+    main()
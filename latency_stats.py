@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Histogramas de latencia estilo HDR y reporte de percentiles por categoría de test
+
+Los valores se guardan en microsegundos en buckets log-lineales (~0.8% de error
+relativo), así que memoria y costo de percentiles no dependen de la cantidad de
+mensajes registrados.
+"""
+
+import csv
+import json
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS  # 128 sub-buckets por potencia de 2
+CONFIRMATION_MARKER = "confirmás estos datos"
+# Respuestas de TelegramBotService a notas de voz/audio antes de procesar el texto
+TRANSCRIPTION_ECHO_PREFIXES = ("🎤➡️📝", "🎵➡️📝")
+VOICE_PROGRESS_PREFIXES = ("🎤 Procesando", "🎵 Procesando") + TRANSCRIPTION_ECHO_PREFIXES
+METRICS = ["first_reply_ms", "confirmation_ms", "transcription_ms"]
+PERCENTILES = [50, 90, 99]
+
+
+class LatencyHistogram:
+    """Histograma log-lineal con conteos dispersos, mergeable entre corridas"""
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+
+    def record(self, value_ms: float):
+        value_us = max(int(round(value_ms * 1000)), 0)
+        index = self._index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total_us += value_us
+        self.max_us = max(self.max_us, value_us)
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+
+    def merge(self, other: "LatencyHistogram"):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total_us += other.total_us
+        self.max_us = max(self.max_us, other.max_us)
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+
+    def percentile(self, p: float) -> float:
+        """Valor (ms) bajo el cual cae el p% de las muestras"""
+        if self.count == 0:
+            return 0.0
+        target = max(math.ceil(p / 100 * self.count), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max_us) / 1000
+        return self.max_us / 1000
+
+    @property
+    def mean(self) -> float:
+        return self.total_us / self.count / 1000 if self.count else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        result = {
+            "count": self.count,
+            "min": (self.min_us or 0) / 1000,
+            "mean": round(self.mean, 3)
+        }
+        for p in PERCENTILES:
+            result[f"p{p}"] = self.percentile(p)
+        result["max"] = self.max_us / 1000
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_us": self.total_us,
+            "min_us": self.min_us,
+            "max_us": self.max_us,
+            "buckets": {str(index): count for index, count in sorted(self.counts.items())}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        histogram = cls()
+        histogram.counts = {int(index): count for index, count in data["buckets"].items()}
+        histogram.count = data["count"]
+        histogram.total_us = data["total_us"]
+        histogram.min_us = data["min_us"]
+        histogram.max_us = data["max_us"]
+        return histogram
+
+    @staticmethod
+    def _index(value_us: int) -> int:
+        # Rango lineal exacto hasta 2*SUB_BUCKET_COUNT; después, SUB_BUCKET_COUNT buckets por potencia de 2
+        if value_us < 2 * SUB_BUCKET_COUNT:
+            return value_us
+        shift = value_us.bit_length() - (SUB_BUCKET_BITS + 1)
+        top = value_us >> shift
+        return 2 * SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_COUNT + (top - SUB_BUCKET_COUNT)
+
+    @staticmethod
+    def _highest_equivalent(index: int) -> int:
+        if index < 2 * SUB_BUCKET_COUNT:
+            return index
+        offset = index - 2 * SUB_BUCKET_COUNT
+        shift = offset // SUB_BUCKET_COUNT + 1
+        top = SUB_BUCKET_COUNT + offset % SUB_BUCKET_COUNT
+        return ((top + 1) << shift) - 1
+
+
+class LatencyReport:
+    """Histogramas por (categoría, métrica); la categoría es el prefijo TC-XXX del test_id"""
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    @staticmethod
+    def category_of(test_id: str) -> str:
+        return "-".join(test_id.split("-")[:2])
+
+    def record(self, test_id: str, metric: str, value_ms: Optional[float]):
+        if value_ms is None:
+            return
+        for category in (self.category_of(test_id), "ALL"):
+            key = (category, metric)
+            if key not in self.histograms:
+                self.histograms[key] = LatencyHistogram()
+            self.histograms[key].record(value_ms)
+
+    def record_result(self, result: Dict[str, Any]):
+        for metric in METRICS:
+            self.record(result["test_id"], metric, result.get(metric))
+
+    def merge(self, other: "LatencyReport"):
+        for key, histogram in other.histograms.items():
+            if key not in self.histograms:
+                self.histograms[key] = LatencyHistogram()
+            self.histograms[key].merge(histogram)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for category, metric in sorted(self.histograms, key=self._sort_key):
+            rows.append({"category": category, "metric": metric,
+                         **self.histograms[(category, metric)].summary()})
+        return rows
+
+    @staticmethod
+    def _sort_key(key: Tuple[str, str]):
+        # Categorías en orden, "ALL" al final
+        category, metric = key
+        return (category == "ALL", category, METRICS.index(metric) if metric in METRICS else len(METRICS), metric)
+
+    def print_report(self):
+        rows = self.rows()
+        if not rows:
+            print("No latency data available")
+            return
+
+        print("\n" + "=" * 78)
+        print("⏱️  LATENCY (ms)")
+        print("=" * 78)
+        print(f"{'Categoría':<10} {'Métrica':<16} {'n':>6} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+        for row in rows:
+            print(f"{row['category']:<10} {row['metric']:<16} {row['count']:>6} "
+                  f"{row['p50']:>9.1f} {row['p90']:>9.1f} {row['p99']:>9.1f} {row['max']:>9.1f}")
+        print("=" * 78)
+
+    def save_csv(self, filename: str):
+        rows = self.rows()
+        fieldnames = ["category", "metric", "count", "min", "mean"] + [f"p{p}" for p in PERCENTILES] + ["max"]
+        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def save_json(self, filename: str):
+        data = {
+            "summary": self.rows(),
+            "histograms": [
+                {"category": category, "metric": metric, **histogram.to_dict()}
+                for (category, metric), histogram in sorted(self.histograms.items())
+            ]
+        }
+        with open(filename, 'w', encoding='utf-8') as jsonfile:
+            json.dump(data, jsonfile, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load_json(cls, filename: str) -> "LatencyReport":
+        with open(filename, encoding='utf-8') as jsonfile:
+            data = json.load(jsonfile)
+        report = cls()
+        for item in data["histograms"]:
+            report.histograms[(item["category"], item["metric"])] = LatencyHistogram.from_dict(item)
+        return report
+
+
+def is_confirmation(text: str) -> bool:
+    return CONFIRMATION_MARKER in (text or "").lower()
+
+
+def is_voice_progress(text: str) -> bool:
+    """Avisos del bot mientras transcribe un audio ("Procesando...", "Entendí: ..."): no son la respuesta"""
+    return (text or "").startswith(VOICE_PROGRESS_PREFIXES)
+
+
+def is_transcription_echo(text: str) -> bool:
+    return (text or "").startswith(TRANSCRIPTION_ECHO_PREFIXES)
+
+
+def expects_confirmation(expected: str) -> bool:
+    """Casos cuyo resultado esperado es el resumen de confirmación del bot"""
+    return "confirmás" in (expected or "").lower()
+
+
+def latency_filenames(results_filename: str) -> Tuple[str, str]:
+    """test_results_X.csv -> (test_results_X_latency.csv, test_results_X_latency.json)"""
+    base = results_filename[:-4] if results_filename.endswith(".csv") else results_filename
+    return f"{base}_latency.csv", f"{base}_latency.json"
+
+
+def build_report(results: Iterable[Dict[str, Any]]) -> LatencyReport:
+    report = LatencyReport()
+    for result in results:
+        report.record_result(result)
+    return report
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Benchmark del cache de respuestas de extracción (LlmResponseCache)
+
+Cada TEST_CASE de texto libre se manda --repeats veces seguidas en el mismo chat sintético,
+como el usuario que reenvía el mismo mensaje: el primer envío va al LLM y los siguientes
+deberían salir del cache (la clave es por chat). Compara la latencia hasta la respuesta y
+las llamadas a fake_openai_api.py del primer envío contra las repeticiones, y con
+--metrics-url agrega la tasa de hits del cache según /metrics (llm_cache_hit/miss).
+
+Con --confirm, cada envío que termina en el resumen de confirmación se confirma con "si" y se
+espera --confirm-wait segundos (más que LEARNING_FLUSH_INTERVAL_MS) antes de reenviar: la
+confirmación corre el aprendizaje del usuario, y el reenvío casi idéntico igual tiene que salir
+del cache.
+
+Para una referencia sin cache, correr con el bot levantado con LLM_RESPONSE_CACHE=false.
+
+Uso:
+    python3 llm_cache_benchmark.py --llm-url http://127.0.0.1:8082 --metrics-url http://127.0.0.1:8080/metrics
+    python3 llm_cache_benchmark.py --llm-url http://127.0.0.1:8082 --repeats 5 --output llm_cache.json
+    python3 llm_cache_benchmark.py --llm-url http://127.0.0.1:8082 --confirm
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from bot_metrics import scrape
+from fake_telegram_api import HarnessClient
+from fast_path_benchmark import free_text_cases, send_and_measure
+from latency_stats import LatencyHistogram, is_confirmation
+from load_test_bot import DEFAULT_API_URL
+from multi_surgery_benchmark import FlowRunner
+
+CHAT_ID_BASE = 895_000_000  # Rango reservado para chats sintéticos del cache de respuestas LLM
+
+
+async def confirm(harness: HarnessClient, chat_id: int, timeout: float, settle: float) -> bool:
+    """Confirma la cirugía del resumen y deja que el aprendizaje llegue a la base antes del reenvío"""
+    runner = FlowRunner(harness, chat_id, timeout)
+    await runner.send("si")
+    confirmed = await runner.wait_for(lambda text: "confirmado" in text.lower()) is not None
+    await asyncio.sleep(settle)
+    return confirmed
+
+
+async def run(args) -> Dict[str, Any]:
+    cases = free_text_cases()
+    server_before = await scrape(args.metrics_url) if args.metrics_url else None
+
+    results: List[Dict[str, Any]] = []
+    async with HarnessClient(args.api_url) as harness:
+        for index, case in enumerate(cases):
+            chat_id = args.chat_id_base + index
+            for attempt in range(args.repeats):
+                result = await send_and_measure(harness, chat_id, case, args.llm_url, args.timeout)
+                result["attempt"] = attempt
+                if args.confirm and is_confirmation(result["answer"]):
+                    result["confirmed"] = await confirm(harness, chat_id, args.timeout, args.confirm_wait)
+                results.append(result)
+                latency = f"{result['answer_ms']:.0f} ms" if result["answer_ms"] is not None else "timeout"
+                label = "frío" if attempt == 0 else f"rep {attempt}"
+                confirmed = {True: " ✔ confirmada", False: " ✘ sin confirmar"}.get(result.get("confirmed"), "")
+                print(f"{case['id']:<10} {label:<6} LLM x{result['llm_calls']}  {latency:>10}  {case['input'][:50]}{confirmed}")
+
+    server = None
+    if args.metrics_url:
+        server_after = await scrape(args.metrics_url)
+        if server_before and server_after:
+            server = server_after.diff(server_before)
+
+    return {"timestamp": datetime.now().isoformat(), "repeats": args.repeats, "confirm": args.confirm, "results": results,
+            "server": server.to_dict() if server else None}
+
+
+def format_ms(value: Optional[float], spec: str = ".0f") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def print_report(run_data: Dict[str, Any]):
+    results = run_data["results"]
+    cold = LatencyHistogram()
+    warm = LatencyHistogram()
+    for result in results:
+        if result["answer_ms"] is not None:
+            (cold if result["attempt"] == 0 else warm).record(result["answer_ms"])
+
+    print("\n" + "=" * 90)
+    print("🗃️  CACHE DE RESPUESTAS LLM: PRIMER ENVÍO vs REPETICIONES")
+    print("=" * 90)
+    print(f"{'Envío':<14} {'n':>5} {'p50 ms':>10} {'p90 ms':>10} {'media ms':>10} {'LLM/msg':>9}")
+    for label, histogram, attempts in (("primero", cold, [r for r in results if r["attempt"] == 0]),
+                                       ("repetición", warm, [r for r in results if r["attempt"] > 0])):
+        calls = sum(r["llm_calls"] for r in attempts) / len(attempts) if attempts else 0.0
+        print(f"{label:<14} {histogram.count:>5} {histogram.percentile(50):>10.0f} {histogram.percentile(90):>10.0f} "
+              f"{histogram.mean:>10.0f} {calls:>9.1f}")
+
+    server = run_data.get("server")
+    if server:
+        events = server["events"]
+        hits = int(events.get("llm_cache_hit", 0))
+        misses = int(events.get("llm_cache_miss", 0))
+        rate = server.get("llm_cache_hit_rate")
+        print(f"\nServidor (/metrics): {hits} hits, {misses} misses"
+              + (f" ({rate * 100:.1f}% hits)" if rate is not None else "")
+              + f", {int(server['gauges'].get('llm_cache_entries', 0))} respuestas en cache")
+
+    if run_data.get("confirm"):
+        confirmed = [r for r in results if r.get("confirmed")]
+        after = [r for r in results if r["attempt"] > 0 and any(
+            c["test_id"] == r["test_id"] and c["attempt"] == r["attempt"] - 1 for c in confirmed)]
+        hits = sum(1 for r in after if r["llm_calls"] == 0)
+        print(f"\nReenvíos después de confirmar: {hits}/{len(after)} sin llamar al LLM "
+              f"({len(confirmed)} confirmaciones)")
+
+    print(f"\n{'Caso':<11} {'1º ms':>9} {'rep. ms':>9} {'Δ ms':>9} {'LLM 1º':>7} {'LLM rep':>8}  Input")
+    by_case: Dict[str, List[Dict[str, Any]]] = {}
+    for result in results:
+        by_case.setdefault(result["test_id"], []).append(result)
+    for test_id, attempts in by_case.items():
+        first = attempts[0]
+        repeats = [r for r in attempts[1:] if r["answer_ms"] is not None]
+        repeat_ms = sum(r["answer_ms"] for r in repeats) / len(repeats) if repeats else None
+        repeat_calls = sum(r["llm_calls"] for r in attempts[1:]) / max(len(attempts) - 1, 1)
+        first_ms = first["answer_ms"]
+        delta = repeat_ms - first_ms if first_ms is not None and repeat_ms is not None else None
+        print(f"{test_id:<11} {format_ms(first_ms):>9} {format_ms(repeat_ms):>9} {format_ms(delta, '+.0f'):>9} "
+              f"{first['llm_calls']:>7} {repeat_calls:>8.1f}  {first['input'][:40]}")
+    print("=" * 90)
+
+
+async def main_async(args):
+    run_data = await run(args)
+    print_report(run_data)
+
+    output = args.output or f"llm_cache_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(run_data, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultados guardados en {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del cache de respuestas de extracción del LLM")
+    parser.add_argument("--api-url", default=os.getenv("TELEGRAM_API_URL", DEFAULT_API_URL))
+    parser.add_argument("--llm-url", default=os.getenv("OPENAI_BASE_URL"),
+                        help="URL de fake_openai_api.py: /_stats cuenta las llamadas al LLM por mensaje")
+    parser.add_argument("--metrics-url", default=os.getenv("BOT_METRICS_URL"),
+                        help="URL de /metrics del bot: agrega hits/misses de llm_cache")
+    parser.add_argument("--repeats", type=int, default=3, help="Envíos del mismo input por chat (el primero es en frío)")
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout por respuesta en segundos")
+    parser.add_argument("--confirm", action="store_true",
+                        help="Confirmar con \"si\" cada resumen antes del reenvío (corre el aprendizaje del usuario)")
+    parser.add_argument("--confirm-wait", type=float, default=3.0,
+                        help="Segundos después de confirmar, para que el lote de aprendizaje llegue a la base")
+    parser.add_argument("--chat-id-base", type=int, default=CHAT_ID_BASE)
+    parser.add_argument("--output", help="Archivo JSON de resultados (default: llm_cache_results_<timestamp>.json)")
+    args = parser.parse_args()
+
+    if not args.llm_url:
+        parser.error("--llm-url (o OPENAI_BASE_URL) es necesario para contar las llamadas al LLM")
+    if args.repeats < 2:
+        parser.error("--repeats debe ser al menos 2 (primer envío + repeticiones)")
+
+    try:
+        asyncio.run(main_async(args))
+    except (KeyboardInterrupt, aiohttp.ClientError) as e:
+        print(f"\n⏹️  Benchmark interrumpido: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Generador de carga asíncrono para RegistroCx Bot
+Simula N chats sintéticos enviando TEST_CASES en paralelo contra fake_telegram_api.py
+
+Modos:
+    concurrency - cada chat envía un mensaje, espera la respuesta y sigue (N en vuelo)
+    rate        - se envían mensajes a tasa fija (msg/s) repartidos entre chats libres
+
+--voice-ratio manda esa fracción de los inputs como notas de voz sintéticas (synthetic_audio.py);
+el bot las transcribe contra /v1/audio/transcriptions de fake_openai_api.py.
+
+Uso:
+    python3 load_test_bot.py --chats 500 --mode concurrency --iterations 2
+    python3 load_test_bot.py --chats 1000 --mode rate --rate 50 --duration 120
+    python3 load_test_bot.py --chats 200 --metrics-url http://127.0.0.1:8080/metrics
+    python3 load_test_bot.py --chats 200 --voice-ratio 0.5
+    python3 load_test_bot.py --chats 500 --max-telegram-429 0   # fake_telegram_api.py --telegram-limits
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from bot_metrics import GaugePeak, check_report_thresholds, scrape
+from fake_telegram_api import HarnessClient
+from latency_stats import (expects_confirmation, is_confirmation, is_transcription_echo, is_voice_progress,
+                           latency_filenames)
+from response_matchers import DEFAULT_EVALUATOR
+from result_sink import STATUSES, ResultSink
+from test_bot_automated import CONFIRMATION_SETTLE_SECONDS, TEST_CASES
+
+DEFAULT_API_URL = "http://127.0.0.1:8081"
+CHAT_ID_BASE = 900_000_000  # Rango reservado para chats sintéticos
+RESULT_FIELDNAMES = ['test_id', 'name', 'kind', 'chat_id', 'message_id', 'input', 'expected', 'actual', 'status',
+                     'matcher', 'match_score', 'scheduled_at', 'sent_at', 'first_reply_ms', 'confirmation_ms',
+                     'transcription_ms', 'timestamp']
+
+
+class LoadGenerator:
+    def __init__(self, api_url: str, chats: int, timeout: float = 60,
+                 chat_id_base: int = CHAT_ID_BASE, test_cases: Optional[List[Dict[str, Any]]] = None,
+                 results_file: Optional[str] = None, voice_ratio: float = 0.0):
+        self.harness = HarnessClient(api_url)
+        self.chat_ids = [chat_id_base + i for i in range(chats)]
+        self.timeout = timeout
+        self.test_cases = test_cases or TEST_CASES
+        self.voice_ratio = voice_ratio
+        self._sent = 0
+        # Resultados a disco a medida que terminan: la memoria no crece con la duración de la corrida
+        self.sink = ResultSink(results_file or f"load_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+        self.started_at = 0.0
+        self.finished_at = 0.0
+
+    async def __aenter__(self):
+        await self.harness.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.harness.__aexit__(*exc)
+
+    # ------------------------------------------------------------------
+    # Modos de carga
+    # ------------------------------------------------------------------
+
+    async def run_fixed_concurrency(self, iterations: int = 1, duration: Optional[float] = None):
+        """Cada chat recorre TEST_CASES en loop cerrado: un mensaje en vuelo por chat"""
+        self.started_at = time.time()
+        deadline = self.started_at + duration if duration else None
+
+        async def chat_worker(index: int, chat_id: int):
+            sent = 0
+            total = iterations * len(self.test_cases)
+            while (deadline and time.time() < deadline) or (not deadline and sent < total):
+                # Desfasar el caso inicial para que los chats no envíen todos el mismo texto
+                test_case = self.test_cases[(index + sent) % len(self.test_cases)]
+                await self.send_and_wait(chat_id, test_case)
+                sent += 1
+
+        await asyncio.gather(*(chat_worker(i, chat_id) for i, chat_id in enumerate(self.chat_ids)))
+        self.finished_at = time.time()
+
+    async def run_fixed_rate(self, rate: float, duration: float):
+        """Loop abierto: agenda envíos a `rate` msg/s aunque el bot se atrase"""
+        self.started_at = time.time()
+        idle_chats: asyncio.Queue = asyncio.Queue()
+        for chat_id in self.chat_ids:
+            idle_chats.put_nowait(chat_id)
+
+        async def fire(chat_id: int, test_case: Dict[str, Any], scheduled_at: float):
+            try:
+                await self.send_and_wait(chat_id, test_case, scheduled_at)
+            finally:
+                idle_chats.put_nowait(chat_id)
+
+        tasks = set()
+        total = int(rate * duration)
+        for k in range(total):
+            scheduled_at = self.started_at + k / rate
+            delay = scheduled_at - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Si no hay chats libres el envío se atrasa; la latencia se mide desde scheduled_at
+            chat_id = await idle_chats.get()
+            test_case = self.test_cases[k % len(self.test_cases)]
+            task = asyncio.create_task(fire(chat_id, test_case, scheduled_at))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        await asyncio.gather(*tasks)
+        self.finished_at = time.time()
+
+    # ------------------------------------------------------------------
+    # Envío y correlación de respuestas
+    # ------------------------------------------------------------------
+
+    async def send_and_wait(self, chat_id: int, test_case: Dict[str, Any],
+                            scheduled_at: Optional[float] = None) -> Dict[str, Any]:
+        sent_at = time.time()
+        kind = self.next_kind()
+        result = {
+            "test_id": test_case["id"],
+            "name": test_case["name"],
+            "kind": kind,
+            "chat_id": chat_id,
+            "message_id": None,
+            "input": test_case["input"],
+            "expected": test_case["expected"],
+            "actual": "",
+            "status": "",
+            "scheduled_at": scheduled_at or sent_at,
+            "sent_at": sent_at,
+            "first_reply_ms": None,
+            "confirmation_ms": None,
+            "transcription_ms": None,
+            "timestamp": datetime.now().isoformat()
+        }
+
+        try:
+            if kind == "text":
+                injected = await self.harness.send_message(chat_id, test_case["input"])
+            else:
+                injected = await self.harness.send_voice(chat_id, test_case["input"])
+            result["message_id"] = injected["message_id"]
+            replies = await self.wait_for_replies(chat_id, injected["message_id"], injected["reply_cursor"],
+                                                  expects_confirmation(test_case["expected"]))
+        except Exception as e:
+            result["actual"] = f"ERROR: {e}"
+            result["status"] = "FAIL"
+            self.sink.write(result)
+            return result
+
+        echo = next((r for r in replies if is_transcription_echo(r["text"])), None)
+        if echo:
+            result["transcription_ms"] = (echo["timestamp"] - result["scheduled_at"]) * 1000
+        # En notas de voz la respuesta es lo que sigue al "Procesando..." y al "Entendí: ..."
+        replies = [r for r in replies if not is_voice_progress(r["text"])]
+
+        if not replies:
+            result["actual"] = "TIMEOUT - No response received"
+        else:
+            # Latencias medidas desde scheduled_at para no ocultar el atraso del generador
+            result["actual"] = replies[0]["text"]
+            result["first_reply_ms"] = (replies[0]["timestamp"] - result["scheduled_at"]) * 1000
+            confirmation = next((r for r in replies if is_confirmation(r["text"])), None)
+            if confirmation:
+                result["actual"] = confirmation["text"]
+                result["confirmation_ms"] = (confirmation["timestamp"] - result["scheduled_at"]) * 1000
+
+        evaluation = DEFAULT_EVALUATOR.evaluate(test_case, result["actual"])
+        result["status"] = evaluation["status"]
+        result["matcher"] = evaluation["matcher"]
+        result["match_score"] = evaluation["score"]
+        self.sink.write(result)
+        return result
+
+    def next_kind(self) -> str:
+        """Reparte las notas de voz de forma pareja según voice_ratio (sin azar, reproducible)"""
+        n = self._sent
+        self._sent += 1
+        return "voice" if int((n + 1) * self.voice_ratio) > int(n * self.voice_ratio) else "text"
+
+    async def wait_for_replies(self, chat_id: int, message_id: int, cursor: int,
+                               until_confirmation: bool = False) -> List[Dict[str, Any]]:
+        """Respuestas del bot en el chat que corresponden a message_id (hasta la confirmación si se pide)"""
+        deadline = time.time() + self.timeout
+        matched: List[Dict[str, Any]] = []
+        answered: List[Dict[str, Any]] = []
+        while time.time() < deadline:
+            wait = deadline - time.time()
+            # Mientras se transcribe solo hubo avisos de progreso: se sigue esperando la respuesta
+            if answered:
+                wait = min(wait, CONFIRMATION_SETTLE_SECONDS)
+            replies = await self.harness.wait_for_replies(chat_id, cursor, wait)
+            if not replies and answered:
+                break
+            for reply in replies:
+                cursor = reply["seq"]
+                # Respuestas tardías a un mensaje anterior (ej. tras un timeout) se descartan
+                if reply["in_reply_to"] == message_id:
+                    matched.append(reply)
+                    if not is_voice_progress(reply["text"]):
+                        answered.append(reply)
+            if answered and (not until_confirmation or any(is_confirmation(r["text"]) for r in answered)):
+                break
+        return matched
+
+    # ------------------------------------------------------------------
+    # Resumen
+    # ------------------------------------------------------------------
+
+    @property
+    def elapsed(self) -> float:
+        # En medio de la corrida finished_at todavía es 0
+        return max((self.finished_at or time.time()) - self.started_at, 1e-9)
+
+    def print_summary(self):
+        summary = self.sink.summary
+        total = summary.total
+        if total == 0:
+            print("No load results available")
+            return
+
+        elapsed = self.elapsed
+        replied = summary.replied
+
+        print("\n" + "=" * 50)
+        print("🚀 LOAD TEST SUMMARY")
+        print("=" * 50)
+        print(f"Chats:       {len(self.chat_ids)}")
+        print(f"Mensajes:    {total} en {elapsed:.1f}s ({total / elapsed:.1f} msg/s)")
+        print(f"Respuestas:  {replied} ({replied / elapsed:.1f} resp/s)")
+        for status in STATUSES:
+            count = summary.count(status)
+            print(f"  {status:<8} {count} ({count / total * 100:.1f}%)")
+        print("=" * 50)
+
+        summary.latency.print_report()
+
+    async def live_summary(self, interval: float):
+        """Imprime el resumen incremental cada `interval` segundos hasta que se cancela"""
+        while True:
+            await asyncio.sleep(interval)
+            self.print_summary()
+
+    def save_results(self, filename: Optional[str] = None, export_csv: bool = True):
+        """Cierra el JSONL y exporta CSV por mensaje y percentiles de latencia en CSV y JSON"""
+        self.sink.close()
+        if not filename:
+            filename = f"{self.sink.base}.csv"
+
+        if export_csv:
+            self.sink.export_csv(filename, RESULT_FIELDNAMES)
+        latency_csv, latency_json = latency_filenames(filename)
+        report = self.sink.summary.latency
+        report.save_csv(latency_csv)
+        report.save_json(latency_json)
+        print(f"📊 Results saved to: {', '.join(self.sink.paths)}" + (f" + {filename}" if export_csv else ""))
+        print(f"⏱️  Latency saved to: {latency_csv}, {latency_json}")
+
+
+async def run_load(args, output: Optional[str] = None) -> LoadGenerator:
+    results_file = f"{output[:-4]}.jsonl" if output and output.endswith(".csv") else None
+    metrics_before = await scrape(args.metrics_url) if args.metrics_url else None
+    gauge_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) if metrics_before else None
+    gauges = GaugePeak(args.metrics_url) if metrics_before else None
+    gauge_sampler = asyncio.create_task(gauges.run(gauge_session)) if gauges else None
+    async with LoadGenerator(args.api_url, args.chats, args.timeout, args.chat_id_base,
+                             results_file=results_file, voice_ratio=args.voice_ratio) as generator:
+        print(f"🎯 Modo {args.mode} con {args.chats} chats contra {args.api_url}")
+        if args.voice_ratio:
+            print(f"🎤 {args.voice_ratio:.0%} de los mensajes como notas de voz")
+        print(f"💾 Resultados en streaming: {generator.sink.base}.*.jsonl")
+        telegram_before = await generator.harness.stats()
+        live = asyncio.create_task(generator.live_summary(args.summary_interval)) if args.summary_interval else None
+        try:
+            if args.mode == "rate":
+                await generator.run_fixed_rate(args.rate, args.duration or 60)
+            else:
+                await generator.run_fixed_concurrency(args.iterations, args.duration)
+        finally:
+            if live:
+                live.cancel()
+            # También con Ctrl-C: lo ya escrito queda en disco con su resumen
+            generator.save_results(output, export_csv=not args.no_csv)
+        generator.print_summary()
+        telegram_after = await generator.harness.stats()
+
+    failures: List[str] = []
+    sent = telegram_after["sent"] - telegram_before["sent"]
+    rate_limited = telegram_after["rate_limited"] - telegram_before["rate_limited"]
+    print(f"📨 Telegram: {sent} envíos ({sent / generator.elapsed:.1f}/s, pico {telegram_after['max_per_second']}/s), "
+          f"{rate_limited} respuestas 429")
+    if args.max_telegram_429 is not None and rate_limited > args.max_telegram_429:
+        failures.append(f"{rate_limited} respuestas 429 de Telegram (máximo {args.max_telegram_429})")
+
+    if metrics_before is not None:
+        gauge_sampler.cancel()
+        await gauge_session.close()
+        # Lado servidor de la misma corrida: en qué etapa se fue el tiempo que midió el cliente
+        metrics_after = await scrape(args.metrics_url)
+        if metrics_after is not None:
+            server = metrics_after.diff(metrics_before)
+            server.print_report()
+            server_dict = server.to_dict()
+            server_dict["gauge_peaks"] = gauges.peaks
+            with open(f"{generator.sink.base}_server_metrics.json", 'w', encoding='utf-8') as f:
+                json.dump(server_dict, f, ensure_ascii=False, indent=2)
+
+            failures += check_report_thresholds(server, gauges.peaks, args.max_report_queue_depth,
+                                                args.min_report_cache_hit_rate)
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        raise SystemExit(1)
+    return generator
+
+
+async def llm_stub_request(llm_url: str, method: str, path: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Lee o cambia la configuración de fake_openai_api.py (/_stats, /_config)"""
+    async with aiohttp.ClientSession() as session:
+        async with session.request(method, f"{llm_url.rstrip('/')}{path}", json=data) as response:
+            return await response.json()
+
+
+async def run_llm_latency_sweep(args):
+    """Repite la carga con distintas latencias del stub de OpenAI y compara throughput"""
+    rows = []
+    for spec in args.llm_latency_sweep.split(","):
+        await llm_stub_request(args.llm_url, "POST", "/_config", {"latency": spec})
+        print(f"\n🧠 Latencia LLM: {spec}")
+        output = f"{args.output[:-4]}_{spec.replace(':', '-')}.csv" if args.output else None
+        before = await llm_stub_request(args.llm_url, "GET", "/_stats")
+        generator = await run_load(args, output)
+        after = await llm_stub_request(args.llm_url, "GET", "/_stats")
+
+        elapsed = generator.elapsed
+        replied = generator.sink.summary.replied
+        latency = generator.sink.summary.latency.histograms.get(("ALL", "first_reply_ms"))
+        rows.append({
+            "latency": spec,
+            "throughput": replied / elapsed,
+            "p50": latency.percentile(50) if latency else 0.0,
+            "p99": latency.percentile(99) if latency else 0.0,
+            "rate_limited": (after["rate_limited"] + after["overloaded"]) - (before["rate_limited"] + before["overloaded"]),
+            "max_in_flight": after["max_in_flight"]
+        })
+
+    print("\n" + "=" * 78)
+    print("🧠 THROUGHPUT vs LATENCIA LLM")
+    print("=" * 78)
+    print(f"{'Latencia':<22} {'resp/s':>9} {'p50 ms':>10} {'p99 ms':>10} {'429s':>8} {'max LLM en vuelo (acum.)':>25}")
+    for row in rows:
+        print(f"{row['latency']:<22} {row['throughput']:>9.1f} {row['p50']:>10.0f} {row['p99']:>10.0f} "
+              f"{row['rate_limited']:>8} {row['max_in_flight']:>25}")
+    print("=" * 78)
+
+
+async def run(args):
+    if args.llm_latency_sweep:
+        await run_llm_latency_sweep(args)
+        return
+
+    await run_load(args, args.output)
+    if args.llm_url:
+        stats = await llm_stub_request(args.llm_url, "GET", "/_stats")
+        print(f"🧠 Stub OpenAI: {json.dumps(stats, ensure_ascii=False)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga para RegistroCx Bot")
+    parser.add_argument("--api-url", default=os.getenv("TELEGRAM_API_URL", DEFAULT_API_URL))
+    parser.add_argument("--chats", type=int, default=100, help="Cantidad de chats sintéticos")
+    parser.add_argument("--mode", choices=["concurrency", "rate"], default="concurrency")
+    parser.add_argument("--rate", type=float, default=10, help="Mensajes por segundo (modo rate)")
+    parser.add_argument("--duration", type=float, help="Duración en segundos")
+    parser.add_argument("--iterations", type=int, default=1, help="Pasadas de TEST_CASES por chat (modo concurrency)")
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout por respuesta en segundos")
+    parser.add_argument("--chat-id-base", type=int, default=CHAT_ID_BASE)
+    parser.add_argument("--output", help="Archivo CSV de resultados (default: load_results_<timestamp>.csv)")
+    parser.add_argument("--summary-interval", type=float, help="Imprimir resumen parcial cada N segundos")
+    parser.add_argument("--no-csv", action="store_true", help="Solo JSONL: no exportar CSV al final (corridas largas)")
+    parser.add_argument("--voice-ratio", type=float, default=0.0,
+                        help="Fracción de mensajes enviados como nota de voz sintética, 0-1")
+    parser.add_argument("--llm-url", default=os.getenv("OPENAI_BASE_URL"), help="URL de fake_openai_api.py para leer /_stats")
+    parser.add_argument("--metrics-url", default=os.getenv("BOT_METRICS_URL"),
+                        help="URL de /metrics del bot: agrega la tabla de etapas del servidor al reporte")
+    parser.add_argument("--max-report-queue-depth", type=int,
+                        help="Falla (exit 1) si la cola de reportes del bot supera este largo (requiere --metrics-url)")
+    parser.add_argument("--min-report-cache-hit-rate", type=float,
+                        help="Falla (exit 1) si el cache de reportes tuvo menos hits que esto, 0-1 (requiere --metrics-url)")
+    parser.add_argument("--max-telegram-429", type=int,
+                        help="Falla (exit 1) si fake_telegram_api.py devolvió más 429 que esto (ver --telegram-limits)")
+    parser.add_argument("--llm-latency-sweep", help="Latencias a barrer separadas por coma, ej. fixed:0,fixed:1000,lognormal:2000:0.5")
+    args = parser.parse_args()
+
+    if (args.max_report_queue_depth is not None or args.min_report_cache_hit_rate is not None) and not args.metrics_url:
+        parser.error("--max-report-queue-depth y --min-report-cache-hit-rate requieren --metrics-url (o BOT_METRICS_URL)")
+    if not 0 <= args.voice_ratio <= 1:
+        parser.error("--voice-ratio debe estar entre 0 y 1")
+    if args.llm_latency_sweep and not args.llm_url:
+        parser.error("--llm-latency-sweep requiere --llm-url (o OPENAI_BASE_URL)")
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\n⏹️  Carga interrumpida por usuario")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+-- ===================================================================
+-- SYNC INCREMENTAL Y POR LOTES CON GOOGLE CALENDAR
+-- ===================================================================
+-- CalendarSyncService guarda por usuario el nextSyncToken de events.list:
+-- en cada sync solo se piden los eventos que cambiaron desde el anterior.
+-- Los appointments pendientes son los que no tienen evento, los que se
+-- marcaron para re-sincronizar (calendar_synced_at NULL) y los modificados
+-- después del último sync (updated_at > calendar_synced_at).
+--
+-- Ejecutar una vez; es idempotente.
+-- ===================================================================
+
+ALTER TABLE user_profiles
+ADD COLUMN IF NOT EXISTS google_calendar_sync_token TEXT;
+
+COMMENT ON COLUMN user_profiles.google_calendar_sync_token IS 'nextSyncToken de Google Calendar events.list; NULL = próximo sync completo';
+
+-- Las modificaciones ya escriben updated_at; en bases viejas puede faltar
+ALTER TABLE appointments
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+
+-- Pendientes de sincronizar por equipo (GetPendingCalendarSyncAsync)
+CREATE INDEX IF NOT EXISTS idx_appointments_calendar_pending
+ON appointments(equipo_id)
+WHERE calendar_event_id IS NULL OR calendar_synced_at IS NULL;
+
+-- Reconciliación de cambios: appointments por evento de calendario dentro del equipo
+CREATE INDEX IF NOT EXISTS idx_appointments_equipo_calendar_event
+ON appointments(equipo_id, calendar_event_id)
+WHERE calendar_event_id IS NOT NULL;
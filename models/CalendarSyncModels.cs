@@ -0,0 +1,34 @@
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+
+namespace RegistroCx.Models
+{
+    /// <summary>
+    /// Resultado de sincronizar un lote de appointments con Google Calendar.
+    /// Concurrente: los lotes de un mismo usuario se ejecutan en paralelo.
+    /// </summary>
+    public class CalendarSyncResult
+    {
+        public ConcurrentDictionary<long, string> EventIds { get; } = new();   // appointment id -> event id
+        public ConcurrentDictionary<long, string> Failures { get; } = new();   // appointment id -> motivo
+        public int BatchRequests;
+    }
+
+    /// <summary>
+    /// Evento que cambió en Calendar desde el último sync token.
+    /// </summary>
+    public class CalendarEventChange
+    {
+        public string EventId { get; set; } = "";
+        public bool Cancelled { get; set; }
+        public DateTime? Start { get; set; }   // Hora local del evento, comparable con fecha_hora
+    }
+
+    public class CalendarChanges
+    {
+        public List<CalendarEventChange> Changes { get; set; } = new();
+        public string? NextSyncToken { get; set; }
+        public bool FullSync { get; set; }       // Sin token previo o el token expiró (410)
+    }
+}
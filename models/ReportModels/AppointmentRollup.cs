@@ -0,0 +1,33 @@
+using System;
+
+namespace RegistroCx.Models.ReportModels;
+
+/// <summary>
+/// Bucket de appointment_rollups (ver create_appointment_rollups.sql).
+/// "total" es diario; el resto de las dimensiones es mensual (Periodo = primer día del mes).
+/// </summary>
+public class AppointmentRollup
+{
+    public DateTime Periodo { get; set; }
+    public string Dimension { get; set; } = string.Empty;
+    public string Clave { get; set; } = string.Empty;
+    public string Clave2 { get; set; } = string.Empty;
+    public int Cantidad { get; set; }
+    public int Turnos { get; set; }
+}
+
+public static class RollupDimensions
+{
+    public const string Total = "total";
+    public const string DiaHora = "dia_hora";                       // Clave = día de la semana (0 = domingo), Clave2 = hora
+    public const string Cirugia = "cirugia";
+    public const string Lugar = "lugar";
+    public const string Anestesiologo = "anestesiologo";
+    public const string Cirujano = "cirujano";
+    public const string CirujanoDiaSemana = "cirujano_dia_semana";
+    public const string CirujanoCirugia = "cirujano_cirugia";
+    public const string CirujanoLugar = "cirujano_lugar";
+    public const string CirujanoAnestesiologo = "cirujano_anestesiologo";
+    public const string LugarCirugia = "lugar_cirugia";
+    public const string LugarAnestesiologo = "lugar_anestesiologo";
+}
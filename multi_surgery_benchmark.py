@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Benchmark de mensajes con varias cirugías (MultiSurgeryParser)
+
+Genera mensajes con 1 a 10 cirugías ("2 CERS, 3 adenoides y 1 faco mañana 14hs ...")
+y recorre el flujo completo de cada uno en un chat sintético nuevo contra
+fake_telegram_api.py: resumen de confirmación -> "si" -> resumen de todas las cirugías
+-> "si" -> confirmación consolidada. Mide cada tramo y el total de punta a punta (el
+harness contesta al instante, así que el total es todo tiempo del bot) y lo grafica
+contra la cantidad de cirugías del mensaje.
+
+Con --baseline compara contra una corrida anterior, por ejemplo con el bot levantado
+con MULTI_SURGERY_CONCURRENCY=1 (cirugías de a una, como antes).
+
+El stand-in de OpenAI tiene que tener grabadas las respuestas de estos mensajes
+(fake_openai_api.py --mode record una vez con la API real).
+
+Uso:
+    # Bot con MULTI_SURGERY_CONCURRENCY=1
+    python3 multi_surgery_benchmark.py --output multi_secuencial.json
+    # Bot con el default (4 en paralelo)
+    python3 multi_surgery_benchmark.py --baseline multi_secuencial.json --plot multi_surgery.png
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from fake_telegram_api import HarnessClient
+from latency_stats import LatencyHistogram, is_confirmation
+from load_test_bot import DEFAULT_API_URL
+
+CHAT_ID_BASE = 930_000_000  # Rango reservado para chats sintéticos del benchmark multi-cirugía
+MAX_SURGERIES = 10
+
+SURGERIES = ["CERS", "adenoides", "faco", "HAVA", "MLD", "septoplastia", "amigdalectomía",
+             "timpanoplastia", "turbinoplastia", "adenoamigdalectomía"]
+PLACES = ["Sanatorio Anchorena", "Hospital Italiano", "Clínica Santa Isabel"]
+SURGEONS = ["Dr. García", "Dr. López", "Dr. Martínez"]
+DAYS = ["mañana", "el viernes", "15/08"]
+
+SUMMARY_MARKER = "resumen final de cirugías"
+CONFIRMED_MARKER = "cirugías confirmadas"
+STEPS = ["to_confirmation_ms", "to_summary_ms", "to_confirmed_ms"]
+
+
+def multi_surgery_cases(max_surgeries: int = MAX_SURGERIES, variants: int = 3) -> List[Dict[str, Any]]:
+    """`variants` mensajes por cada cantidad de cirugías, de 1 a max_surgeries"""
+    cases = []
+    for count in range(1, max_surgeries + 1):
+        for variant in range(variants):
+            surgeries = [f"{(count + i + variant) % 3 + 1} {SURGERIES[(i + variant) % len(SURGERIES)]}" for i in range(count)]
+            listed = surgeries[0] if count == 1 else ", ".join(surgeries[:-1]) + " y " + surgeries[-1]
+            cases.append({
+                "id": f"MULTI-{count:02d}-{variant + 1}",
+                "surgeries": count,
+                "input": f"{listed} {DAYS[variant % len(DAYS)]} 14hs {PLACES[variant % len(PLACES)]} "
+                         f"{SURGEONS[(count + variant) % len(SURGEONS)]} anestesista Pérez"
+            })
+    return cases
+
+
+class FlowRunner:
+    """Recorre el flujo de un chat: manda, espera el hito siguiente y contesta "si" cuando corresponde"""
+
+    def __init__(self, harness: HarnessClient, chat_id: int, timeout: float):
+        self.harness = harness
+        self.chat_id = chat_id
+        self.timeout = timeout
+        self.cursor = 0
+        self.last_text = ""
+
+    async def send(self, text: str) -> float:
+        injected = await self.harness.send_message(self.chat_id, text)
+        self.cursor = injected["reply_cursor"]
+        return time.time()
+
+    async def wait_for(self, predicate) -> Optional[float]:
+        deadline = time.time() + self.timeout
+        while time.time() < deadline:
+            for reply in await self.harness.wait_for_replies(self.chat_id, self.cursor, deadline - time.time()):
+                self.cursor = reply["seq"]
+                self.last_text = reply["text"]
+                if predicate(reply["text"]):
+                    return time.time()
+        return None
+
+
+async def run_case(harness: HarnessClient, chat_id: int, case: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    runner = FlowRunner(harness, chat_id, timeout)
+    result = {"test_id": case["id"], "surgeries": case["surgeries"], "chat_id": chat_id, "input": case["input"],
+              "status": "TIMEOUT", "replies": 0, **{step: None for step in STEPS}, "end_to_end_ms": None}
+
+    steps = [
+        (case["input"], is_confirmation, "to_confirmation_ms"),
+        ("si", lambda text: SUMMARY_MARKER in text.lower(), "to_summary_ms"),
+        ("si", lambda text: CONFIRMED_MARKER in text.lower(), "to_confirmed_ms"),
+    ]
+    # Con una sola cirugía el primer "si" ya confirma: no hay resumen múltiple
+    if case["surgeries"] == 1:
+        steps = [steps[0], ("si", lambda text: "confirmado" in text.lower(), "to_confirmed_ms")]
+
+    total_ms = 0.0
+    for text, predicate, step in steps:
+        sent_at = await runner.send(text)
+        reached_at = await runner.wait_for(predicate)
+        if reached_at is None:
+            result["stuck_at"] = step
+            result["last_reply"] = runner.last_text[:200]
+            return result
+        result[step] = (reached_at - sent_at) * 1000
+        total_ms += result[step]
+
+    result["status"] = "PASS"
+    result["end_to_end_ms"] = total_ms
+    return result
+
+
+async def run(args) -> Dict[str, Any]:
+    cases = multi_surgery_cases(args.max_surgeries, args.variants)
+    results: List[Dict[str, Any]] = []
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+
+    async with HarnessClient(args.api_url) as harness:
+        async def measure(index: int, case: Dict[str, Any]):
+            async with semaphore:
+                # Chat nuevo por caso: sin contexto previo
+                result = await run_case(harness, args.chat_id_base + index, case, args.timeout)
+                results.append(result)
+                latency = f"{result['end_to_end_ms']:.0f} ms" if result["end_to_end_ms"] is not None \
+                    else f"{result['status']} en {result.get('stuck_at')}"
+                print(f"{'✅' if result['status'] == 'PASS' else '⏱️'} {case['id']:<12} {case['surgeries']:>2} cx  "
+                      f"{latency:>22}  {case['input'][:60]}")
+
+        await asyncio.gather(*(measure(i, case) for i, case in enumerate(cases)))
+
+    results.sort(key=lambda r: r["test_id"])
+    return {"timestamp": datetime.now().isoformat(), "variants": args.variants, "results": results}
+
+
+def by_surgery_count(results: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """Histogramas por cantidad de cirugías: total de punta a punta y cada tramo"""
+    rows: Dict[int, Dict[str, Any]] = {}
+    for result in results:
+        row = rows.setdefault(result["surgeries"], {"runs": 0, "passed": 0,
+                                                    **{key: LatencyHistogram() for key in STEPS + ["end_to_end_ms"]}})
+        row["runs"] += 1
+        if result["status"] == "PASS":
+            row["passed"] += 1
+        for key in STEPS + ["end_to_end_ms"]:
+            if result.get(key) is not None:
+                row[key].record(result[key])
+    return dict(sorted(rows.items()))
+
+
+def print_report(run_data: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    rows = by_surgery_count(run_data["results"])
+    baseline_rows = by_surgery_count(baseline["results"]) if baseline else {}
+
+    print("\n" + "=" * 96)
+    print("🩺 MENSAJES CON VARIAS CIRUGÍAS - LATENCIA vs CANTIDAD")
+    print("=" * 96)
+    print(f"{'Cx':>3} {'ok':>7} {'confirmación':>13} {'resumen':>10} {'confirmadas':>12} {'total p50':>10} {'total p90':>10}"
+          + (f" {'base p50':>10} {'Δ p50':>9}" if baseline else ""))
+    for count, row in rows.items():
+        line = (f"{count:>3} {row['passed']:>3}/{row['runs']:<3} {row['to_confirmation_ms'].percentile(50):>11.0f}ms "
+                f"{row['to_summary_ms'].percentile(50):>8.0f}ms {row['to_confirmed_ms'].percentile(50):>10.0f}ms "
+                f"{row['end_to_end_ms'].percentile(50):>8.0f}ms {row['end_to_end_ms'].percentile(90):>8.0f}ms")
+        if baseline:
+            base = baseline_rows.get(count)
+            if base and base["end_to_end_ms"].count and row["end_to_end_ms"].count:
+                base_p50 = base["end_to_end_ms"].percentile(50)
+                line += f" {base_p50:>8.0f}ms {row['end_to_end_ms'].percentile(50) - base_p50:>+7.0f}ms"
+            else:
+                line += f" {'-':>10} {'-':>9}"
+        print(line)
+
+    # Pendiente de la recta total ~ cantidad: cuánto suma cada cirugía extra al mensaje
+    points = [(count, row["end_to_end_ms"].percentile(50)) for count, row in rows.items() if row["end_to_end_ms"].count]
+    if len(points) > 1:
+        mean_x = sum(x for x, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / sum((x - mean_x) ** 2 for x, _ in points)
+        print(f"\nCada cirugía extra suma ~{slope:.0f} ms al total (p50, ajuste lineal)")
+    print("=" * 96)
+
+
+def plot_latency(run_data: Dict[str, Any], baseline: Optional[Dict[str, Any]], filename: str) -> bool:
+    """Total de punta a punta (p50 y p90) contra cantidad de cirugías, en PNG si matplotlib está disponible"""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return False
+
+    fig, axis = plt.subplots(figsize=(9, 5))
+    for label, data, style in (("actual", run_data, "-"), ("baseline", baseline, "--")):
+        if not data:
+            continue
+        rows = [(count, row["end_to_end_ms"]) for count, row in by_surgery_count(data["results"]).items()
+                if row["end_to_end_ms"].count]
+        counts = [count for count, _ in rows]
+        axis.plot(counts, [h.percentile(50) / 1000 for _, h in rows], style, marker="o", label=f"{label} p50")
+        axis.plot(counts, [h.percentile(90) / 1000 for _, h in rows], style, marker="x", alpha=0.6, label=f"{label} p90")
+    axis.set_xlabel("cirugías en el mensaje")
+    axis.set_ylabel("punta a punta (s)")
+    axis.set_xticks(range(1, MAX_SURGERIES + 1))
+    axis.grid(alpha=0.3)
+    axis.legend()
+    fig.tight_layout()
+    fig.savefig(filename, dpi=100)
+    plt.close(fig)
+    return True
+
+
+async def main_async(args):
+    run_data = await run(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(run_data, baseline)
+
+    output = args.output or f"multi_surgery_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(run_data, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultados guardados en {output}")
+
+    plot = args.plot or f"{os.path.splitext(output)[0]}.png"
+    if plot_latency(run_data, baseline, plot):
+        print(f"📊 Latencia vs cantidad de cirugías en {plot}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de mensajes con varias cirugías")
+    parser.add_argument("--api-url", default=os.getenv("TELEGRAM_API_URL", DEFAULT_API_URL))
+    parser.add_argument("--max-surgeries", type=int, default=MAX_SURGERIES, help="Cirugías por mensaje, de 1 a N")
+    parser.add_argument("--variants", type=int, default=3, help="Mensajes distintos por cantidad de cirugías")
+    parser.add_argument("--concurrency", type=int, default=1, help="Chats corriendo a la vez (1 = latencia sin carga)")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout por tramo en segundos")
+    parser.add_argument("--chat-id-base", type=int, default=CHAT_ID_BASE)
+    parser.add_argument("--baseline", help="JSON de una corrida anterior (ej. MULTI_SURGERY_CONCURRENCY=1) para comparar")
+    parser.add_argument("--output", help="Archivo JSON de resultados (default: multi_surgery_results_<timestamp>.json)")
+    parser.add_argument("--plot", help="PNG del gráfico (default: junto al JSON)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main_async(args))
+    except (KeyboardInterrupt, aiohttp.ClientError) as e:
+        print(f"\n⏹️  Benchmark interrumpido: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del índice de nombres en memoria (FuzzyNameIndex / NameLookupService)
+
+Manda un corpus de nombres mal escritos ("Garsia", "Itlaiano", "Mendes"...) a GET /names/search
+del bot (solo en Development) y mide si el nombre esperado sale primero (recall@1) o entre los
+devueltos (recall@k), el tiempo de búsqueda medido por el servidor (µs) y el ida y vuelta HTTP.
+El corpus usa las listas base de MemoryCacheService, así que alcanza con un chat sin equipo.
+
+Cada consulta se repite --repeats veces; la primera de cada tipo carga el índice y queda afuera
+de la latencia (--warmup).
+
+Uso:
+    python3 name_index_benchmark.py --bot-url http://127.0.0.1:8080
+    python3 name_index_benchmark.py --bot-url http://127.0.0.1:8080 --repeats 50 --output name_index.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+import unicodedata
+from datetime import datetime
+from typing import Any, Dict, List
+
+import aiohttp
+
+from latency_stats import LatencyHistogram
+
+CHAT_ID_BASE = 885_000_000  # Rango reservado para chats sintéticos del índice de nombres
+
+# (tipo, lo que escribe el usuario, nombre esperado)
+CORPUS = [
+    ("surgeon", "Garsia", "Dr. García"),
+    ("surgeon", "garcia", "Dr. García"),
+    ("surgeon", "Dr Quirgoa", "Dr. Quiroga"),
+    ("surgeon", "quiroga", "Dr. Quiroga"),
+    ("surgeon", "Fernandes", "Dr. Fernández"),
+    ("surgeon", "Gonzales", "Dr. González"),
+    ("surgeon", "Rodrigez", "Dr. Rodríguez"),
+    ("surgeon", "Lopes", "Dr. López"),
+    ("surgeon", "martin", "Dr. Martín"),
+    ("surgeon", "Sanches", "Dr. Sánchez"),
+    ("anesthesiologist", "Mendes", "Dr. Mendez"),
+    ("anesthesiologist", "mendez", "Dr. Mendez"),
+    ("anesthesiologist", "uri", "Dr. URI"),
+    ("anesthesiologist", "Castor", "Dr. Castro"),
+    ("anesthesiologist", "Slva", "Dr. Silva"),
+    ("anesthesiologist", "Moralez", "Dr. Morales"),
+    ("anesthesiologist", "Herera", "Dr. Herrera"),
+    ("anesthesiologist", "Jimenes", "Dr. Jiménez"),
+    ("anesthesiologist", "Dra. Jimenez", "Dr. Jiménez"),
+    ("place", "Itlaiano", "Hospital Italiano"),
+    ("place", "hospital italiano", "Hospital Italiano"),
+    ("place", "aleman", "Hospital Alemán"),
+    ("place", "Finochieto", "Sanatorio Finochietto"),
+    ("place", "Bazterica", "Clínica Bazterrica"),
+    ("place", "santa isabel", "Clínica Santa Isabel"),
+    ("place", "Sanatorio Ancho", "Sanatorio Ancho"),
+]
+
+
+def normalize(name: str) -> str:
+    """Como FuzzyNameIndex.NormalizeName: sin acentos, sin títulos, minúsculas"""
+    text = unicodedata.normalize("NFD", name.lower())
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+    text = re.sub(r"\b(dra?|doctora?|anest)\b\.?", " ", text)
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", text).split())
+
+
+async def search(session: aiohttp.ClientSession, bot_url: str, kind: str, query: str, chat_id: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    async with session.get(f"{bot_url}/names/search", params={"kind": kind, "q": query, "chatId": chat_id}) as resp:
+        resp.raise_for_status()
+        data = await resp.json()
+    data["round_trip_ms"] = (time.perf_counter() - started) * 1000
+    return data
+
+
+async def run(args) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    server_us = LatencyHistogram()
+    round_trip = LatencyHistogram()
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=args.timeout)) as session:
+        # La primera búsqueda de cada tipo carga el índice (listas base, alias aprendidos)
+        for kind in sorted({kind for kind, _, _ in CORPUS}):
+            for _ in range(args.warmup):
+                await search(session, args.bot_url, kind, "warmup", args.chat_id)
+
+        for kind, query, expected in CORPUS:
+            names: List[str] = []
+            for _ in range(args.repeats):
+                data = await search(session, args.bot_url, kind, query, args.chat_id)
+                server_us.record(data["elapsedUs"])
+                round_trip.record(data["round_trip_ms"])
+                names = [m["name"] for m in data["matches"]]
+
+            rank = next((i + 1 for i, name in enumerate(names) if normalize(name) == normalize(expected)), None)
+            results.append({"kind": kind, "query": query, "expected": expected, "matches": names, "rank": rank})
+            marker = "✅" if rank == 1 else ("🟡" if rank else "❌")
+            print(f"{marker} {kind:<17} {query:<20} -> {', '.join(names) or '(nada)'}")
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "repeats": args.repeats,
+        "results": results,
+        "server_us": {"p50": server_us.percentile(50), "p90": server_us.percentile(90),
+                      "p99": server_us.percentile(99), "mean": server_us.mean, "count": server_us.count},
+        "round_trip_ms": {"p50": round_trip.percentile(50), "p90": round_trip.percentile(90),
+                          "p99": round_trip.percentile(99), "mean": round_trip.mean, "count": round_trip.count},
+    }
+
+
+def print_report(run_data: Dict[str, Any]):
+    results = run_data["results"]
+    total = len(results)
+    at_1 = sum(1 for r in results if r["rank"] == 1)
+    at_k = sum(1 for r in results if r["rank"])
+
+    print("\n" + "=" * 80)
+    print("🔎 ÍNDICE DE NOMBRES: RECALL Y LATENCIA")
+    print("=" * 80)
+    print(f"Consultas: {total}  recall@1: {at_1}/{total} ({at_1 / total * 100:.1f}%)  "
+          f"recall@k: {at_k}/{total} ({at_k / total * 100:.1f}%)")
+
+    print(f"\n{'Tipo':<18} {'n':>4} {'@1':>5} {'@k':>5}")
+    for kind in sorted({r["kind"] for r in results}):
+        rows = [r for r in results if r["kind"] == kind]
+        print(f"{kind:<18} {len(rows):>4} {sum(1 for r in rows if r['rank'] == 1):>5} {sum(1 for r in rows if r['rank']):>5}")
+
+    server = run_data["server_us"]
+    trip = run_data["round_trip_ms"]
+    print(f"\n{'Medición':<22} {'n':>6} {'p50':>10} {'p90':>10} {'p99':>10} {'media':>10}")
+    print(f"{'búsqueda servidor µs':<22} {server['count']:>6} {server['p50']:>10.1f} {server['p90']:>10.1f} "
+          f"{server['p99']:>10.1f} {server['mean']:>10.1f}")
+    print(f"{'ida y vuelta ms':<22} {trip['count']:>6} {trip['p50']:>10.2f} {trip['p90']:>10.2f} "
+          f"{trip['p99']:>10.2f} {trip['mean']:>10.2f}")
+
+    misses = [r for r in results if r["rank"] != 1]
+    if misses:
+        print("\nSin el esperado primero:")
+        for r in misses:
+            print(f"  {r['kind']:<17} {r['query']:<20} esperado {r['expected']}, devolvió {r['matches'] or '(nada)'}")
+    print("=" * 80)
+
+
+async def main_async(args):
+    run_data = await run(args)
+    print_report(run_data)
+
+    output = args.output or f"name_index_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(run_data, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultados guardados en {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark del índice de nombres (recall y latencia)")
+    parser.add_argument("--bot-url", default=os.getenv("BOT_URL", "http://127.0.0.1:8080"))
+    parser.add_argument("--chat-id", type=int, default=CHAT_ID_BASE, help="Chat sintético (sin equipo) para las búsquedas")
+    parser.add_argument("--repeats", type=int, default=20, help="Repeticiones de cada consulta para la latencia")
+    parser.add_argument("--warmup", type=int, default=1, help="Búsquedas por tipo antes de medir")
+    parser.add_argument("--timeout", type=float, default=30, help="Timeout por request en segundos")
+    parser.add_argument("--output", help="Archivo JSON de resultados (default: name_index_results_<timestamp>.json)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main_async(args))
+    except (KeyboardInterrupt, aiohttp.ClientError) as e:
+        print(f"\n⏹️  Benchmark interrumpido: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Evaluación de respuestas del bot con matchers encadenados
+
+Cada matcher devuelve un veredicto o se abstiene (None) y pasa al siguiente:
+    errors      - TIMEOUT / ERROR del harness
+    regex       - test_case["expected_regex"]
+    fields      - test_case["expected_fields"] contra el resumen "¿Confirmás estos datos?"
+    normalized  - expected contenido en la respuesta, sin acentos ni mayúsculas
+    fuzzy       - similitud por tokens (trigramas) contra las formulaciones de expected
+    keywords    - palabras de error del bot -> WARNING
+Si nadie decide, UNKNOWN.
+
+evaluate_batch() normaliza y tokeniza cada texto distinto una sola vez y compila
+las formulaciones esperadas al construir el evaluador, así que re-evaluar decenas
+de miles de respuestas de una corrida de carga toma segundos:
+
+    python3 response_matchers.py load_results_X.000.jsonl --output rescored.jsonl
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+CONFIRMATION_FIELDS = {
+    "fecha y hora": "fecha_hora",
+    "lugar": "lugar",
+    "cirujano": "cirujano",
+    "cirugia": "cirugia",
+    "cantidad": "cantidad",
+    "anestesiologo": "anestesiologo"
+}
+WARNING_KEYWORDS = ["error", "no entend", "formato", "invalido"]
+FUZZY_THRESHOLD = 0.8       # Fracción de tokens de la formulación presentes en la respuesta
+TOKEN_SIMILARITY = 0.6      # Jaccard de trigramas para considerar iguales dos palabras ("itlaiano" ~ "italiano")
+FIELD_THRESHOLD = 0.75
+
+# Otras formas en que el bot dice lo mismo que un expected de TEST_CASES (claves normalizadas)
+PHRASINGS = {
+    "tipo de cirugia": ["me falta el tipo de cirugia", "que cirugia", "cual es la cirugia"],
+    "fecha": ["fecha y hora", "a que hora", "me falta la fecha"],
+    "cantidad": ["cuantas cirugias", "me falta la cantidad"],
+    "confirmas estos datos": ["confirmas los datos"],
+    "que mes queres": ["de que mes queres el reporte"],
+    "mas especifica": ["mas especifico", "necesito mas datos"]
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9ñ]+")
+
+
+@lru_cache(maxsize=100_000)
+def normalize(text: str) -> str:
+    """Minúsculas y sin acentos (la ñ se conserva)"""
+    text = (text or "").lower().replace("ñ", "\0")
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).replace("\0", "ñ")
+
+
+@lru_cache(maxsize=100_000)
+def tokens(text: str) -> Tuple[str, ...]:
+    return tuple(_TOKEN_RE.findall(normalize(text)))
+
+
+@lru_cache(maxsize=100_000)
+def trigrams(token: str) -> FrozenSet[str]:
+    padded = f" {token} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+@lru_cache(maxsize=500_000)
+def token_similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    ta, tb = trigrams(a), trigrams(b)
+    return len(ta & tb) / len(ta | tb)
+
+
+def phrase_coverage(phrase: Sequence[str], reply: Sequence[str], reply_set: FrozenSet[str]) -> float:
+    """Fracción de tokens de phrase que aparecen (exactos o parecidos) en reply"""
+    if not phrase:
+        return 0.0
+    hits = 0.0
+    for token in phrase:
+        if token in reply_set:
+            hits += 1
+        else:
+            hits += max((token_similarity(token, other) for other in reply if abs(len(other) - len(token)) <= 3),
+                        default=0.0) >= TOKEN_SIMILARITY
+    return hits / len(phrase)
+
+
+@lru_cache(maxsize=100_000)
+def parse_confirmation(text: str) -> Dict[str, str]:
+    """Campos del resumen de FlowValidationHelper.BuildConfirmationSummary ("• Lugar: X")"""
+    fields = {}
+    for line in (text or "").splitlines():
+        line = line.strip().lstrip("•").strip()
+        if ":" not in line:
+            continue
+        label, value = line.split(":", 1)
+        key = CONFIRMATION_FIELDS.get(normalize(label.strip()))
+        if key:
+            fields[key] = value.strip()
+    return fields
+
+
+def verdict(status: str, matcher: str, score: float = 1.0, detail: str = "") -> Dict[str, Any]:
+    return {"status": status, "matcher": matcher, "score": round(score, 3), "detail": detail}
+
+
+class ErrorMatcher:
+    name = "errors"
+
+    def evaluate(self, case: Dict[str, Any], actual: str) -> Optional[Dict[str, Any]]:
+        if "TIMEOUT" in actual:
+            return verdict("TIMEOUT", self.name, 0.0)
+        if "ERROR" in actual:
+            return verdict("FAIL", self.name, 0.0, actual[:80])
+        return None
+
+
+class RegexMatcher:
+    name = "regex"
+
+    def evaluate(self, case: Dict[str, Any], actual: str) -> Optional[Dict[str, Any]]:
+        pattern = case.get("expected_regex")
+        if not pattern:
+            return None
+        if compile_regex(pattern).search(actual):
+            return verdict("PASS", self.name)
+        return verdict("FAIL", self.name, 0.0, f"no coincide /{pattern}/")
+
+
+@lru_cache(maxsize=1000)
+def compile_regex(pattern: str):
+    return re.compile(pattern, re.IGNORECASE)
+
+
+class FieldMatcher:
+    """Compara campos esperados contra el resumen de confirmación: 'García' coincide con 'Dr. García'"""
+    name = "fields"
+
+    def __init__(self, threshold: float = FIELD_THRESHOLD):
+        self.threshold = threshold
+
+    def evaluate(self, case: Dict[str, Any], actual: str) -> Optional[Dict[str, Any]]:
+        expected_fields = case.get("expected_fields")
+        if not expected_fields:
+            return None
+        fields = parse_confirmation(actual)
+        if not fields:
+            return None  # No es un resumen: que decida otro matcher
+
+        scores = []
+        mismatches = []
+        for key, expected in expected_fields.items():
+            value_tokens = tokens(fields.get(key, ""))
+            score = phrase_coverage(tokens(str(expected)), value_tokens, frozenset(value_tokens))
+            scores.append(score)
+            if score < self.threshold:
+                mismatches.append(f"{key}={fields.get(key, '(falta)')!r} esperado {expected!r}")
+
+        score = sum(scores) / len(scores)
+        if mismatches:
+            return verdict("FAIL", self.name, score, "; ".join(mismatches))
+        return verdict("PASS", self.name, score)
+
+
+class NormalizedMatcher:
+    name = "normalized"
+
+    def evaluate(self, case: Dict[str, Any], actual: str) -> Optional[Dict[str, Any]]:
+        if normalize(case["expected"]) in normalize(actual):
+            return verdict("PASS", self.name)
+        return None
+
+
+class FuzzyMatcher:
+    """Similitud por tokens contra un índice precompilado de formulaciones por expected"""
+    name = "fuzzy"
+
+    def __init__(self, threshold: float = FUZZY_THRESHOLD, phrasings: Optional[Dict[str, List[str]]] = None):
+        self.threshold = threshold
+        self.index: Dict[str, List[Tuple[str, ...]]] = {}
+        for expected, alternatives in (phrasings or PHRASINGS).items():
+            self.add(expected, alternatives)
+
+    def add(self, expected: str, alternatives: Sequence[str] = ()):
+        phrases = self.index.setdefault(normalize(expected), [tokens(expected)])
+        for alternative in alternatives:
+            compiled = tokens(alternative)
+            if compiled not in phrases:
+                phrases.append(compiled)
+
+    def evaluate(self, case: Dict[str, Any], actual: str) -> Optional[Dict[str, Any]]:
+        key = normalize(case["expected"])
+        if key not in self.index or case.get("expected_alternatives"):
+            self.add(case["expected"], case.get("expected_alternatives", []))
+
+        reply = tokens(actual)
+        reply_set = frozenset(reply)
+        best = max(phrase_coverage(phrase, reply, reply_set) for phrase in self.index[key])
+        if best >= self.threshold:
+            return verdict("PASS", self.name, best)
+        return None
+
+
+class KeywordMatcher:
+    name = "keywords"
+
+    def evaluate(self, case: Dict[str, Any], actual: str) -> Optional[Dict[str, Any]]:
+        normalized = normalize(actual)
+        keyword = next((k for k in WARNING_KEYWORDS if k in normalized), None)
+        if keyword:
+            return verdict("WARNING", self.name, 0.0, keyword)
+        return None
+
+
+class ResponseEvaluator:
+    def __init__(self, matchers: Optional[List[Any]] = None):
+        self.matchers = matchers if matchers is not None else default_matchers()
+
+    def evaluate(self, case: Dict[str, Any], actual: str) -> Dict[str, Any]:
+        actual = actual or ""
+        for matcher in self.matchers:
+            result = matcher.evaluate(case, actual)
+            if result:
+                return result
+        return verdict("UNKNOWN", "none", 0.0)
+
+    def evaluate_batch(self, cases: Sequence[Dict[str, Any]], replies: Sequence[str]) -> List[Dict[str, Any]]:
+        """Evalúa en lote; pares (expected, respuesta) repetidos se resuelven una sola vez"""
+        cache: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        results = []
+        for case, actual in zip(cases, replies):
+            key = (case.get("expected"), case.get("expected_regex"),
+                   json.dumps(case.get("expected_fields"), sort_keys=True) if case.get("expected_fields") else None,
+                   tuple(case.get("expected_alternatives", ())), actual)
+            if key not in cache:
+                cache[key] = self.evaluate(case, actual)
+            results.append(cache[key])
+        return results
+
+
+def default_matchers() -> List[Any]:
+    return [ErrorMatcher(), RegexMatcher(), FieldMatcher(), NormalizedMatcher(), FuzzyMatcher(), KeywordMatcher()]
+
+
+DEFAULT_EVALUATOR = ResponseEvaluator()
+
+
+def rescore(paths: List[str], output: Optional[str] = None):
+    """Re-evalúa resultados JSONL de una corrida con los matchers actuales"""
+    from result_sink import iter_results, RunningSummary
+    from test_bot_automated import TEST_CASES
+
+    cases_by_id = {case["id"]: case for case in TEST_CASES}
+    results = list(iter_results(paths))
+    cases = [{**cases_by_id.get(r.get("test_id"), {}), "expected": r.get("expected", "")} for r in results]
+
+    started = time.time()
+    verdicts = DEFAULT_EVALUATOR.evaluate_batch(cases, [r.get("actual", "") for r in results])
+    elapsed = time.time() - started
+
+    changes: Dict[Tuple[str, str], int] = {}
+    summary = RunningSummary()
+    for result, new in zip(results, verdicts):
+        transition = (result.get("status", ""), new["status"])
+        changes[transition] = changes.get(transition, 0) + 1
+        result.update(status=new["status"], matcher=new["matcher"], match_score=new["score"], match_detail=new["detail"])
+        summary.add(result)
+
+    print(f"⚡ {len(results)} respuestas evaluadas en {elapsed:.2f}s ({len(results) / max(elapsed, 1e-9):.0f}/s)")
+    for (before, after), count in sorted(changes.items(), key=lambda c: -c[1]):
+        print(f"   {before or '?':<8} -> {after:<8} {count}")
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        print(f"📊 Results saved to: {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-evalúa resultados JSONL con los matchers de respuestas")
+    parser.add_argument("paths", nargs="+", help="Archivos JSONL de resultados (<base>.000.jsonl ...)")
+    parser.add_argument("--output", help="JSONL con status y matcher actualizados")
+    args = parser.parse_args()
+    rescore(args.paths, args.output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
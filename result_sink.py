@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Escritura incremental de resultados para corridas largas del harness
+
+Cada resultado se agrega como una línea JSON (append-only, line-buffered) en
+archivos que rotan cada N líneas; cada fsync_interval segundos se fuerza a disco y
+se reescribe un snapshot del resumen. Un crash o Ctrl-C pierde como mucho los
+últimos segundos, y la memoria no crece con la cantidad de mensajes: el resumen
+se calcula al vuelo (contadores + histogramas de latency_stats).
+"""
+
+import csv
+import glob
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from latency_stats import LatencyReport
+
+STATUSES = ["PASS", "FAIL", "WARNING", "TIMEOUT", "UNKNOWN"]
+DEFAULT_MAX_LINES = 100_000
+DEFAULT_FSYNC_INTERVAL = 5.0
+
+
+class RunningSummary:
+    """Contadores por status y latencias por categoría, sin guardar los resultados"""
+
+    def __init__(self):
+        self.total = 0
+        self.replied = 0
+        self.status_counts: Dict[str, int] = {}
+        self.latency = LatencyReport()
+        self.first_sent_at: Optional[float] = None
+        self.last_sent_at: Optional[float] = None
+
+    def add(self, result: Dict[str, Any]):
+        self.total += 1
+        status = result.get("status") or "UNKNOWN"
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if result.get("first_reply_ms") is not None:
+            self.replied += 1
+        self.latency.record_result(result)
+
+        sent_at = result.get("sent_at")
+        if sent_at:
+            self.first_sent_at = sent_at if self.first_sent_at is None else min(self.first_sent_at, sent_at)
+            self.last_sent_at = sent_at if self.last_sent_at is None else max(self.last_sent_at, sent_at)
+
+    def count(self, status: str) -> int:
+        return self.status_counts.get(status, 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "replied": self.replied,
+            "status": {status: self.count(status) for status in STATUSES},
+            "first_sent_at": self.first_sent_at,
+            "last_sent_at": self.last_sent_at,
+            "latency": self.latency.rows()
+        }
+
+
+class ResultSink:
+    """JSONL append-only con rotación (<base>.000.jsonl, <base>.001.jsonl, ...) y fsync periódico"""
+
+    def __init__(self, path: str, max_lines: int = DEFAULT_MAX_LINES,
+                 fsync_interval: float = DEFAULT_FSYNC_INTERVAL):
+        self.base = path[:-6] if path.endswith(".jsonl") else path
+        self.max_lines = max_lines
+        self.fsync_interval = fsync_interval
+        self.summary = RunningSummary()
+        self.paths: List[str] = []
+        self._file = None
+        self._lines = 0
+        self._last_sync = time.time()
+
+    @property
+    def summary_path(self) -> str:
+        return f"{self.base}_summary.json"
+
+    def write(self, result: Dict[str, Any]):
+        if self._file is None or self._lines >= self.max_lines:
+            self._roll()
+        self._file.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+        self._lines += 1
+        self.summary.add(result)
+
+        if time.time() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        """Fuerza a disco el archivo actual y reescribe el snapshot del resumen"""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._write_summary()
+        self._last_sync = time.time()
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def export_csv(self, filename: str, fieldnames: List[str]):
+        """Reconstruye el CSV clásico leyendo los JSONL en streaming"""
+        if self._file is not None:
+            self._file.flush()
+        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+            writer.writeheader()
+            for result in iter_results(self.paths):
+                writer.writerow(result)
+
+    def _roll(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+        path = f"{self.base}.{len(self.paths):03d}.jsonl"
+        self._file = open(path, 'w', buffering=1, encoding='utf-8')
+        self.paths.append(path)
+        self._lines = 0
+
+    def _write_summary(self):
+        # Escritura atómica: nunca queda un resumen a medio escribir
+        temp_path = f"{self.summary_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.summary_path)
+
+
+def result_files(base: str) -> List[str]:
+    """Archivos rotados de una corrida, en orden"""
+    base = base[:-6] if base.endswith(".jsonl") else base
+    return sorted(glob.glob(f"{glob.escape(base)}.[0-9][0-9][0-9].jsonl"))
+
+
+def iter_results(paths: List[str]) -> Iterator[Dict[str, Any]]:
+    """Lee resultados de los JSONL; una última línea truncada por un crash se ignora"""
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def summarize(paths: List[str]) -> RunningSummary:
+    summary = RunningSummary()
+    for result in iter_results(paths):
+        summary.add(result)
+    return summary
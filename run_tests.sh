@@ -12,7 +12,7 @@ fi
 
 # Instalar dependencias si no existen
 echo "📦 Instalando dependencias..."
-pip3 install requests --quiet
+pip3 install requests aiohttp pyyaml --quiet
 
 # Verificar variables de entorno
 if [ -z "$TELEGRAM_BOT_TOKEN" ] || [ -z "$TEST_CHAT_ID" ]; then
@@ -29,8 +29,10 @@ fi
 echo "🚀 Selecciona tipo de testing:"
 echo "1) Manual - Envía mensajes y documenta manualmente"
 echo "2) Automatizado - Intenta detectar respuestas (puede fallar)"
+echo "3) Carga - Chats concurrentes contra fake Bot API (requiere TELEGRAM_API_URL)"
+echo "4) Escenarios - Conversaciones multi-paso de scenarios/ (requiere TELEGRAM_API_URL)"
 echo ""
-read -p "Selecciona (1 o 2): " choice
+read -p "Selecciona (1, 2, 3 o 4): " choice
 
 case $choice in
     1)
@@ -42,6 +44,16 @@ case $choice in
         echo "⚠️  NOTA: Puede dar timeouts si no detecta respuestas del bot"
         python3 test_bot_automated.py
         ;;
+    3)
+        echo "🚀 Ejecutando test de carga..."
+        read -p "Cantidad de chats concurrentes [100]: " chats
+        python3 load_test_bot.py --chats "${chats:-100}"
+        ;;
+    4)
+        echo "🎬 Ejecutando escenarios..."
+        read -p "Escenarios en paralelo [100]: " parallel
+        python3 scenario_runner.py scenarios --parallel "${parallel:-100}"
+        ;;
     *)
         echo "❌ Opción inválida. Usando testing manual por defecto."
         python3 test_manual_simple.py
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Motor de escenarios conversacionales para RegistroCx Bot
+
+Cada escenario (YAML o JSON en scenarios/) es una lista de pasos que envían un
+mensaje o tocan un botón inline y verifican la respuesta del bot. Cada ejecución
+usa su propio chat sintético, así que cientos de escenarios corren en paralelo
+contra fake_telegram_api.py.
+
+Formato de un paso:
+    - send: "2 CERS mañana 14hs Hospital Italiano Dr. García"
+      expect: "confirmás estos datos"          # texto (o lista: todos deben aparecer)
+      expect_any: ["Confirmado", "guardado"]   # al menos uno
+      expect_regex: "Lugar: .+"                 # regex sobre la respuesta
+      reject: ["error"]                         # no debe aparecer
+      expect_keyboard: true                     # la respuesta trae botones inline
+      timeout: 60
+    - tap: "✏️ Editar"                          # texto del botón del último teclado
+    - callback: "setlocation_"                  # callback_data exacto o prefijo (termina en _)
+    - tap_index: 0                              # n-ésimo botón del último teclado
+
+Uso:
+    python3 scenario_runner.py scenarios/ --parallel 200 --repeat 5
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fake_telegram_api import HarnessClient
+from latency_stats import LatencyHistogram
+from response_matchers import normalize
+
+DEFAULT_API_URL = "http://127.0.0.1:8081"
+CHAT_ID_BASE = 910_000_000  # Separado del rango de load_test_bot.py
+DEFAULT_STEP_TIMEOUT = 60
+SETTLE_SECONDS = 3  # Sin expectativas: cuánto esperar más respuestas tras la primera
+
+
+def load_scenarios(paths: List[str]) -> List[Dict[str, Any]]:
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.y*ml")) + glob.glob(os.path.join(path, "*.json"))))
+        else:
+            files.append(path)
+
+    scenarios = []
+    for file in files:
+        with open(file, encoding="utf-8") as f:
+            if file.endswith(".json"):
+                data = json.load(f)
+            else:
+                import yaml  # Solo necesario para escenarios YAML
+                data = yaml.safe_load(f)
+        # Un archivo puede tener un escenario o una lista
+        for scenario in data if isinstance(data, list) else [data]:
+            scenario.setdefault("name", os.path.splitext(os.path.basename(file))[0])
+            scenario["file"] = file
+            scenarios.append(scenario)
+    return scenarios
+
+
+class StepFailure(Exception):
+    pass
+
+
+class ScenarioSession:
+    """Una ejecución de un escenario en un chat sintético"""
+
+    def __init__(self, harness: HarnessClient, scenario: Dict[str, Any], chat_id: int):
+        self.harness = harness
+        self.scenario = scenario
+        self.chat_id = chat_id
+        self.cursor = 0
+        self.last_update_id: Optional[int] = None
+        self.keyboard_message: Optional[Dict[str, Any]] = None
+
+    async def run(self) -> Dict[str, Any]:
+        started = time.time()
+        steps = []
+        status = "PASS"
+        for index, step in enumerate(self.scenario["steps"]):
+            result = await self.run_step(index, step)
+            steps.append(result)
+            if not result["ok"]:
+                status = "FAIL"
+                break
+
+        return {
+            "scenario": self.scenario["name"],
+            "chat_id": self.chat_id,
+            "status": status,
+            "duration_ms": (time.time() - started) * 1000,
+            "steps": steps
+        }
+
+    async def run_step(self, index: int, step: Dict[str, Any]) -> Dict[str, Any]:
+        result = {
+            "index": index,
+            "action": self.describe(step),
+            "ok": False,
+            "error": None,
+            "first_reply_ms": None,
+            "match_ms": None,
+            "replies": []
+        }
+        sent_at = time.time()
+        try:
+            injected = await self.perform(step)
+            replies = await self.collect(step, injected, sent_at)
+            result["replies"] = [r["text"] for r in replies]
+            if replies:
+                result["first_reply_ms"] = (replies[0]["timestamp"] - sent_at) * 1000
+                result["match_ms"] = (replies[-1]["timestamp"] - sent_at) * 1000
+            self.check(step, replies)
+            result["ok"] = True
+        except StepFailure as e:
+            result["error"] = str(e)
+        except Exception as e:
+            result["error"] = f"ERROR: {e}"
+        return result
+
+    async def perform(self, step: Dict[str, Any]) -> Dict[str, Any]:
+        if "send" in step:
+            return await self.harness.send_message(self.chat_id, step["send"])
+
+        data = await self.wait_for_button(step)
+        return await self.harness.send_callback(self.chat_id, self.keyboard_message["message_id"], data)
+
+    async def wait_for_button(self, step: Dict[str, Any]) -> str:
+        """El bot suele mandar el texto y después el teclado: espera un poco si el botón todavía no llegó"""
+        deadline = time.time() + SETTLE_SECONDS
+        while True:
+            try:
+                return self.find_callback(step)
+            except StepFailure:
+                if time.time() >= deadline:
+                    raise
+            replies = await self.harness.wait_for_replies(self.chat_id, self.cursor, deadline - time.time())
+            if replies:
+                self.cursor = replies[-1]["seq"]
+            for reply in replies:
+                if reply.get("update_id") == self.last_update_id and (reply.get("reply_markup") or {}).get("inline_keyboard"):
+                    self.keyboard_message = reply
+
+    def find_callback(self, step: Dict[str, Any]) -> str:
+        if self.keyboard_message is None:
+            raise StepFailure("No hay teclado inline en las respuestas anteriores")
+        buttons = [b for row in self.keyboard_message["reply_markup"].get("inline_keyboard", []) for b in row]
+        if "tap_index" in step:
+            if step["tap_index"] >= len(buttons):
+                raise StepFailure(f"El teclado tiene {len(buttons)} botones")
+            return buttons[step["tap_index"]]["callback_data"]
+
+        for button in buttons:
+            if "tap" in step and normalize(step["tap"]) in normalize(button.get("text", "")):
+                return button["callback_data"]
+            if "callback" in step:
+                data = button.get("callback_data", "")
+                wanted = step["callback"]
+                if data == wanted or (wanted.endswith("_") and data.startswith(wanted)):
+                    return data
+
+        available = ", ".join(b.get("text", "") for b in buttons)
+        raise StepFailure(f"Botón no encontrado: {step.get('tap') or step.get('callback')} (hay: {available})")
+
+    async def collect(self, step: Dict[str, Any], injected: Dict[str, Any], sent_at: float) -> List[Dict[str, Any]]:
+        """Junta respuestas del paso hasta cumplir las expectativas o agotar el timeout"""
+        self.cursor = injected["reply_cursor"]
+        self.last_update_id = injected["update_id"]
+        deadline = sent_at + step.get("timeout", self.scenario.get("timeout", DEFAULT_STEP_TIMEOUT))
+        has_expectations = any(k in step for k in ("expect", "expect_any", "expect_regex", "expect_keyboard"))
+        collected: List[Dict[str, Any]] = []
+
+        while time.time() < deadline:
+            wait = deadline - time.time()
+            if collected and not has_expectations:
+                wait = min(wait, SETTLE_SECONDS)
+            replies = await self.harness.wait_for_replies(self.chat_id, self.cursor, wait)
+            if not replies:
+                break
+
+            self.cursor = replies[-1]["seq"]
+            for reply in replies:
+                # Respuestas tardías del paso anterior no cuentan para este
+                if reply.get("update_id") != injected["update_id"]:
+                    continue
+                collected.append(reply)
+                if (reply.get("reply_markup") or {}).get("inline_keyboard"):
+                    self.keyboard_message = reply
+
+            if has_expectations and collected and self.matches(step, collected):
+                break
+
+        return collected
+
+    def matches(self, step: Dict[str, Any], replies: List[Dict[str, Any]]) -> bool:
+        try:
+            self.check(step, replies)
+            return True
+        except StepFailure:
+            return False
+
+    def check(self, step: Dict[str, Any], replies: List[Dict[str, Any]]):
+        if not replies:
+            raise StepFailure("TIMEOUT - No response received")
+
+        text = "\n".join(r["text"] for r in replies)
+        normalized = normalize(text)
+
+        expected = step.get("expect", [])
+        for phrase in expected if isinstance(expected, list) else [expected]:
+            if normalize(phrase) not in normalized:
+                raise StepFailure(f"Falta '{phrase}' en: {text[:120]}")
+
+        if "expect_any" in step and not any(normalize(p) in normalized for p in step["expect_any"]):
+            raise StepFailure(f"Ninguno de {step['expect_any']} en: {text[:120]}")
+
+        if "expect_regex" in step and not re.search(step["expect_regex"], text, re.IGNORECASE):
+            raise StepFailure(f"Regex '{step['expect_regex']}' no coincide con: {text[:120]}")
+
+        for phrase in step.get("reject", []):
+            if normalize(phrase) in normalized:
+                raise StepFailure(f"Aparece '{phrase}' en: {text[:120]}")
+
+        if step.get("expect_keyboard") and not any((r.get("reply_markup") or {}).get("inline_keyboard") for r in replies):
+            raise StepFailure("La respuesta no trae teclado inline")
+
+    @staticmethod
+    def describe(step: Dict[str, Any]) -> str:
+        for key in ("send", "tap", "callback", "tap_index"):
+            if key in step:
+                return f"{key}: {step[key]}"
+        return "?"
+
+
+class ScenarioRunner:
+    def __init__(self, api_url: str, scenarios: List[Dict[str, Any]], parallel: int = 100,
+                 repeat: int = 1, chat_id_base: int = CHAT_ID_BASE):
+        self.api_url = api_url
+        self.scenarios = scenarios
+        self.parallel = parallel
+        self.repeat = repeat
+        self.chat_id_base = chat_id_base
+        self.results: List[Dict[str, Any]] = []
+        self.elapsed = 0.0
+
+    async def run(self):
+        semaphore = asyncio.Semaphore(self.parallel)
+        started = time.time()
+
+        async with HarnessClient(self.api_url) as harness:
+            async def run_one(chat_id: int, scenario: Dict[str, Any]):
+                async with semaphore:
+                    self.results.append(await ScenarioSession(harness, scenario, chat_id).run())
+
+            jobs = [(scenario, r) for r in range(self.repeat) for scenario in self.scenarios]
+            await asyncio.gather(*(run_one(self.chat_id_base + i, scenario) for i, (scenario, _) in enumerate(jobs)))
+
+        self.elapsed = time.time() - started
+
+    def report(self) -> Dict[str, Any]:
+        """Resumen por escenario y por paso: pass rate y percentiles de latencia"""
+        summary = []
+        for scenario in self.scenarios:
+            runs = [r for r in self.results if r["scenario"] == scenario["name"]]
+            steps = []
+            for index, step in enumerate(scenario["steps"]):
+                step_results = [s for r in runs for s in r["steps"] if s["index"] == index]
+                histogram = LatencyHistogram()
+                for s in step_results:
+                    if s["match_ms"] is not None:
+                        histogram.record(s["match_ms"])
+                errors: Dict[str, int] = {}
+                for s in step_results:
+                    if s["error"]:
+                        errors[s["error"][:80]] = errors.get(s["error"][:80], 0) + 1
+                steps.append({
+                    "index": index,
+                    "action": ScenarioSession.describe(step),
+                    "runs": len(step_results),
+                    "passed": len([s for s in step_results if s["ok"]]),
+                    "latency_ms": histogram.summary(),
+                    "top_errors": sorted(errors.items(), key=lambda e: -e[1])[:3]
+                })
+            summary.append({
+                "scenario": scenario["name"],
+                "file": scenario["file"],
+                "runs": len(runs),
+                "passed": len([r for r in runs if r["status"] == "PASS"]),
+                "steps": steps
+            })
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "elapsed_s": round(self.elapsed, 2),
+            "parallel": self.parallel,
+            "scenarios": summary,
+            "runs": self.results
+        }
+
+    def print_summary(self, report: Dict[str, Any]):
+        print("\n" + "=" * 78)
+        print(f"🎬 SCENARIO SUMMARY ({len(self.results)} ejecuciones en {report['elapsed_s']}s)")
+        print("=" * 78)
+        for scenario in report["scenarios"]:
+            icon = "✅" if scenario["passed"] == scenario["runs"] else "❌"
+            print(f"{icon} {scenario['scenario']}: {scenario['passed']}/{scenario['runs']}")
+            for step in scenario["steps"]:
+                latency = step["latency_ms"]
+                print(f"   {step['index'] + 1}. {step['action'][:40]:<40} {step['passed']:>5}/{step['runs']:<5} "
+                      f"p50 {latency['p50']:>7.0f} ms  p99 {latency['p99']:>7.0f} ms")
+                for error, count in step["top_errors"]:
+                    print(f"      ⚠️  {count}x {error}")
+        print("=" * 78)
+
+    @staticmethod
+    def save_report(report: Dict[str, Any], filename: Optional[str] = None) -> str:
+        if not filename:
+            filename = f"scenario_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📊 Report saved to: {filename}")
+        return filename
+
+
+async def run(args):
+    scenarios = load_scenarios(args.paths)
+    if args.only:
+        scenarios = [s for s in scenarios if args.only in s["name"]]
+    if not scenarios:
+        print("❌ No se encontraron escenarios")
+        return
+
+    print(f"🎬 {len(scenarios)} escenarios x {args.repeat} repeticiones, {args.parallel} en paralelo")
+    runner = ScenarioRunner(args.api_url, scenarios, args.parallel, args.repeat, args.chat_id_base)
+    await runner.run()
+    report = runner.report()
+    runner.print_summary(report)
+    runner.save_report(report, args.output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Motor de escenarios conversacionales para RegistroCx Bot")
+    parser.add_argument("paths", nargs="*", default=["scenarios"], help="Archivos o directorios de escenarios")
+    parser.add_argument("--api-url", default=os.getenv("TELEGRAM_API_URL", DEFAULT_API_URL))
+    parser.add_argument("--parallel", type=int, default=100, help="Escenarios simultáneos")
+    parser.add_argument("--repeat", type=int, default=1, help="Ejecuciones por escenario")
+    parser.add_argument("--only", help="Filtrar escenarios por nombre")
+    parser.add_argument("--chat-id-base", type=int, default=CHAT_ID_BASE)
+    parser.add_argument("--output", help="Archivo JSON del reporte")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\n⏹️  Escenarios interrumpidos por usuario")
+
+
+if __name__ == "__main__":
+    main()
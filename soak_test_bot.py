@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Soak test de RegistroCx Bot: tráfico sostenido durante horas y seguimiento de memoria
+
+Mientras load_test_bot.py manda mensajes a tasa fija desde muchos chats, se muestrea
+/health/memory del bot (RSS, heap del GC tras un GC completo, tamaño de diccionarios
+y cachés) y, opcionalmente, VmRSS de /proc/<pid>. Al final se ajusta la pendiente de
+cada métrica en la primera y la segunda mitad (tras el warmup): si en la segunda
+mitad sigue creciendo por encima del umbral y no se desaceleró, la corrida falla.
+
+Uso:
+    python3 soak_test_bot.py --hours 4 --rate 5 --chats 2000 --bot-url http://localhost:8080
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from load_test_bot import CHAT_ID_BASE, DEFAULT_API_URL, LoadGenerator
+
+DEFAULT_BOT_URL = "http://127.0.0.1:8080"
+MB = 1024 * 1024
+
+# Métrica -> (ruta en /health/memory, umbral de crecimiento por hora en la segunda mitad)
+MEMORY_METRICS = {
+    "rss_mb": (("process", "workingSetBytes"), 20.0),
+    "gc_heap_mb": (("gc", "totalMemoryBytes"), 5.0),
+    "pending_appointments": (("state", "pendingAppointments"), 50.0),
+    "report_command_states": (("state", "reportCommandStates"), 50.0),
+    "quick_edit_pending": (("state", "quickEditPendingEdits"), 50.0),
+    "memory_cache_entries": (("state", "memoryCacheEntries"), 100.0),
+    "threads": (("process", "threads"), 10.0)
+}
+DECELERATION_RATIO = 0.5  # Segunda mitad con menos de la mitad de pendiente = se está estabilizando
+
+
+class MemorySampler:
+    """Muestrea /health y /health/memory del bot cada `interval` segundos"""
+
+    def __init__(self, bot_url: str, interval: float, output: str, pid: Optional[int] = None,
+                 collect: bool = True):
+        self.bot_url = bot_url.rstrip("/")
+        self.interval = interval
+        self.output = output
+        self.pid = pid
+        self.collect = collect
+        self.samples: List[Dict[str, Any]] = []
+        self.errors = 0
+
+    async def run(self):
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+            with open(self.output, 'w', buffering=1, encoding='utf-8') as f:
+                while True:
+                    sample = await self.sample(session)
+                    if sample:
+                        self.samples.append(sample)
+                        f.write(json.dumps(sample) + "\n")
+                        print(f"🧪 {sample['elapsed_s'] / 60:6.1f} min  RSS {sample.get('rss_mb', 0):7.1f} MB  "
+                              f"heap {sample.get('gc_heap_mb', 0):7.1f} MB  pending {sample.get('pending_appointments', 0)}")
+                    await asyncio.sleep(self.interval)
+
+    async def sample(self, session: aiohttp.ClientSession) -> Optional[Dict[str, Any]]:
+        sample: Dict[str, Any] = {"timestamp": time.time()}
+        sample["elapsed_s"] = sample["timestamp"] - (self.samples[0]["timestamp"] if self.samples else sample["timestamp"])
+        try:
+            async with session.get(f"{self.bot_url}/health") as response:
+                sample["healthy"] = response.status == 200
+            params = {"collect": "true"} if self.collect else {}
+            async with session.get(f"{self.bot_url}/health/memory", params=params) as response:
+                if response.status == 200:
+                    memory = await response.json()
+                    for metric, (path, _) in MEMORY_METRICS.items():
+                        value = memory
+                        for key in path:
+                            value = value.get(key, {}) if isinstance(value, dict) else None
+                        if isinstance(value, (int, float)):
+                            sample[metric] = value / MB if metric.endswith("_mb") else value
+                    sample["gen2_collections"] = memory.get("gc", {}).get("gen2Collections")
+        except Exception as e:
+            self.errors += 1
+            sample["healthy"] = False
+            sample["error"] = str(e)
+
+        if self.pid:
+            rss = read_proc_rss_mb(self.pid)
+            if rss is not None:
+                sample["rss_mb"] = rss
+        return sample
+
+
+def read_proc_rss_mb(pid: int) -> Optional[float]:
+    """VmRSS de /proc (Linux) para bots sin /health/memory"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def slope_per_hour(points: List[Tuple[float, float]]) -> float:
+    """Pendiente por mínimos cuadrados, en unidades por hora"""
+    if len(points) < 2:
+        return 0.0
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return 0.0
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    return covariance / variance * 3600
+
+
+def analyze_growth(samples: List[Dict[str, Any]], warmup_s: float,
+                   thresholds: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Compara la pendiente de la primera y segunda mitad post-warmup de cada métrica"""
+    findings = []
+    for metric, threshold in thresholds.items():
+        points = [(s["elapsed_s"], s[metric]) for s in samples if metric in s and s["elapsed_s"] >= warmup_s]
+        if len(points) < 6:
+            continue
+        middle = len(points) // 2
+        first, second = slope_per_hour(points[:middle]), slope_per_hour(points[middle:])
+        leaking = second > threshold and second >= first * DECELERATION_RATIO
+        findings.append({
+            "metric": metric,
+            "start": points[0][1],
+            "end": points[-1][1],
+            "first_half_per_hour": first,
+            "second_half_per_hour": second,
+            "threshold_per_hour": threshold,
+            "leaking": leaking
+        })
+    return findings
+
+
+def sparkline(values: List[float], width: int = 40) -> str:
+    if not values:
+        return ""
+    blocks = "▁▂▃▄▅▆▇█"
+    step = max(len(values) / width, 1)
+    picked = [values[int(i * step)] for i in range(min(width, len(values)))]
+    low, high = min(picked), max(picked)
+    span = (high - low) or 1
+    return "".join(blocks[int((v - low) / span * (len(blocks) - 1))] for v in picked)
+
+
+def plot_growth(samples: List[Dict[str, Any]], filename: str) -> bool:
+    """Curvas de crecimiento en PNG si matplotlib está disponible"""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return False
+
+    metrics = [m for m in MEMORY_METRICS if any(m in s for s in samples)]
+    fig, axes = plt.subplots(len(metrics), 1, figsize=(10, 2.2 * len(metrics)), sharex=True, squeeze=False)
+    for axis, metric in zip(axes[:, 0], metrics):
+        points = [(s["elapsed_s"] / 3600, s[metric]) for s in samples if metric in s]
+        axis.plot([x for x, _ in points], [y for _, y in points])
+        axis.set_ylabel(metric, fontsize=8)
+        axis.grid(alpha=0.3)
+    axes[-1, 0].set_xlabel("horas")
+    fig.tight_layout()
+    fig.savefig(filename, dpi=100)
+    plt.close(fig)
+    return True
+
+
+def print_report(samples: List[Dict[str, Any]], findings: List[Dict[str, Any]], sampler_errors: int):
+    print("\n" + "=" * 78)
+    print("🧪 SOAK TEST - CRECIMIENTO DE MEMORIA")
+    print("=" * 78)
+    unhealthy = len([s for s in samples if not s.get("healthy")])
+    print(f"Muestras: {len(samples)}  (no saludables: {unhealthy}, errores de muestreo: {sampler_errors})")
+    print(f"{'Métrica':<22} {'inicio':>10} {'fin':>10} {'1ª mitad/h':>11} {'2ª mitad/h':>11}  curva")
+    for finding in findings:
+        values = [s[finding["metric"]] for s in samples if finding["metric"] in s]
+        icon = "❌" if finding["leaking"] else "✅"
+        print(f"{icon} {finding['metric']:<20} {finding['start']:>10.1f} {finding['end']:>10.1f} "
+              f"{finding['first_half_per_hour']:>11.2f} {finding['second_half_per_hour']:>11.2f}  {sparkline(values)}")
+    print("=" * 78)
+
+
+async def run(args) -> int:
+    base = args.output or f"soak_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    duration = args.hours * 3600
+    sampler = MemorySampler(args.bot_url, args.sample_interval, f"{base}_memory.jsonl", args.pid,
+                            collect=not args.no_collect)
+    sampler_task = asyncio.create_task(sampler.run())
+
+    print(f"🧪 Soak test: {args.hours}h a {args.rate} msg/s desde {args.chats} chats")
+    print(f"📈 Memoria cada {args.sample_interval}s en {base}_memory.jsonl")
+    async with LoadGenerator(args.api_url, args.chats, args.timeout, args.chat_id_base,
+                             results_file=f"{base}.jsonl") as generator:
+        live = asyncio.create_task(generator.live_summary(args.summary_interval))
+        try:
+            await generator.run_fixed_rate(args.rate, duration)
+        finally:
+            live.cancel()
+            # Una última muestra con el tráfico ya drenado
+            await asyncio.sleep(min(args.sample_interval, 30))
+            sampler_task.cancel()
+            generator.save_results(f"{base}.csv", export_csv=False)
+        generator.print_summary()
+
+    thresholds = {metric: threshold for metric, (_, threshold) in MEMORY_METRICS.items()}
+    if args.max_heap_growth is not None:
+        thresholds["gc_heap_mb"] = args.max_heap_growth
+    if args.max_rss_growth is not None:
+        thresholds["rss_mb"] = args.max_rss_growth
+
+    findings = analyze_growth(sampler.samples, duration * args.warmup, thresholds)
+    print_report(sampler.samples, findings, sampler.errors)
+    with open(f"{base}_growth.json", 'w', encoding='utf-8') as f:
+        json.dump({"findings": findings, "samples": len(sampler.samples)}, f, indent=2)
+    if plot_growth(sampler.samples, f"{base}_memory.png"):
+        print(f"📊 Curvas en {base}_memory.png")
+
+    leaking = [f["metric"] for f in findings if f["leaking"]]
+    if leaking:
+        print(f"❌ La memoria no se estabiliza: {', '.join(leaking)}")
+        return 1
+    if not findings:
+        print("⚠️  Muestras insuficientes para evaluar crecimiento")
+        return 2
+    print("✅ Memoria estable")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test de memoria para RegistroCx Bot")
+    parser.add_argument("--api-url", default=os.getenv("TELEGRAM_API_URL", DEFAULT_API_URL))
+    parser.add_argument("--bot-url", default=os.getenv("BOT_URL", DEFAULT_BOT_URL), help="URL HTTP del bot (/health)")
+    parser.add_argument("--hours", type=float, default=2)
+    parser.add_argument("--rate", type=float, default=5, help="Mensajes por segundo")
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--chat-id-base", type=int, default=CHAT_ID_BASE)
+    parser.add_argument("--sample-interval", type=float, default=30, help="Segundos entre muestras de memoria")
+    parser.add_argument("--summary-interval", type=float, default=300, help="Segundos entre resúmenes de tráfico")
+    parser.add_argument("--warmup", type=float, default=0.1, help="Fracción inicial ignorada en el análisis")
+    parser.add_argument("--pid", type=int, help="PID local del bot para leer VmRSS de /proc")
+    parser.add_argument("--no-collect", action="store_true", help="No forzar GC antes de cada muestra")
+    parser.add_argument("--max-heap-growth", type=float, help="MB/h tolerados de heap en la segunda mitad")
+    parser.add_argument("--max-rss-growth", type=float, help="MB/h tolerados de RSS en la segunda mitad")
+    parser.add_argument("--output", help="Prefijo de archivos de salida")
+    args = parser.parse_args()
+
+    try:
+        sys.exit(asyncio.run(run(args)))
+    except KeyboardInterrupt:
+        print("\n⏹️  Soak test interrumpido por usuario")
+
+
+if __name__ == "__main__":
+    main()
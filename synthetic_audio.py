@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Clips OGG/Opus sintéticos para la carga de mensajes de voz.
+
+No hay TTS: cada clip es un stream Ogg/Opus válido (OpusHead + OpusTags + frames de silencio
+de 20 ms) con el texto esperado en el comentario REGISTROCX_TRANSCRIPT de OpusTags.
+fake_openai_api.py lo lee en /v1/audio/transcriptions y devuelve ese texto, así el bot
+recorre el camino completo (getFile, descarga, multipart a Whisper) con la entrada de un TC.
+
+Uso:
+    python3 synthetic_audio.py --text "mañana cataratas con Pérez" --out voz.ogg
+    python3 synthetic_audio.py --test-cases audios/      # un clip por TC de test_bot_automated
+    python3 synthetic_audio.py --read voz.ogg
+"""
+
+import argparse
+import os
+import struct
+import sys
+from typing import List, Optional
+
+TRANSCRIPT_TAG = "REGISTROCX_TRANSCRIPT"
+SAMPLE_RATE = 48000
+PRE_SKIP = 312
+FRAME_SAMPLES = 960          # 20 ms a 48 kHz
+SILENCE_FRAME = b"\xF8\xFF\xFE"  # TOC config 31 (CELT FB 20 ms) mono, frame vacío = silencio
+FRAMES_PER_PAGE = 50         # 1 s de audio por página
+WORDS_PER_SECOND = 2.5       # ritmo de dictado para estimar la duración
+
+
+def _crc_table() -> List[int]:
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else (crc << 1)
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+CRC_TABLE = _crc_table()
+
+
+def ogg_crc(data: bytes) -> int:
+    """CRC-32 de Ogg: polinomio 0x04C11DB7, sin reflejar, valor inicial 0"""
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ CRC_TABLE[((crc >> 24) & 0xFF) ^ byte]
+    return crc
+
+
+def ogg_page(packets: List[bytes], granule: int, serial: int, sequence: int, header_type: int = 0) -> bytes:
+    lacing = bytearray()
+    for packet in packets:
+        lacing.extend([255] * (len(packet) // 255))
+        lacing.append(len(packet) % 255)
+    if len(lacing) > 255:
+        raise ValueError("Demasiados segmentos para una página Ogg")
+
+    header = struct.pack("<4sBBqIIIB", b"OggS", 0, header_type, granule, serial, sequence, 0, len(lacing))
+    page = bytearray(header + bytes(lacing) + b"".join(packets))
+    struct.pack_into("<I", page, 22, ogg_crc(bytes(page)))
+    return bytes(page)
+
+
+def estimate_duration(text: str) -> int:
+    """Segundos que tardaría alguien en dictar el texto (mínimo 1)"""
+    return max(1, round(len(text.split()) / WORDS_PER_SECOND))
+
+
+def opus_clip(text: str, duration: Optional[int] = None, serial: int = 0x52435831) -> bytes:
+    """Stream Ogg/Opus mono de `duration` segundos de silencio con el texto embebido"""
+    duration = duration or estimate_duration(text)
+    head = struct.pack("<8sBBHIhB", b"OpusHead", 1, 1, PRE_SKIP, SAMPLE_RATE, 0, 0)
+    vendor = b"registrocx-synthetic"
+    comments = [f"{TRANSCRIPT_TAG}={text}".encode("utf-8")]
+    tags = b"OpusTags" + struct.pack("<I", len(vendor)) + vendor + struct.pack("<I", len(comments))
+    for comment in comments:
+        tags += struct.pack("<I", len(comment)) + comment
+
+    pages = [
+        ogg_page([head], 0, serial, 0, header_type=0x02),
+        ogg_page([tags], 0, serial, 1),
+    ]
+    total_frames = duration * SAMPLE_RATE // FRAME_SAMPLES
+    written = 0
+    while written < total_frames:
+        count = min(FRAMES_PER_PAGE, total_frames - written)
+        written += count
+        last = written == total_frames
+        pages.append(ogg_page([SILENCE_FRAME] * count, PRE_SKIP + written * FRAME_SAMPLES, serial,
+                              len(pages), header_type=0x04 if last else 0))
+    return b"".join(pages)
+
+
+def ogg_packets(data: bytes) -> List[bytes]:
+    """Reensambla los paquetes de un stream Ogg de un solo serial"""
+    packets: List[bytes] = []
+    current = bytearray()
+    offset = 0
+    while offset + 27 <= len(data):
+        if data[offset:offset + 4] != b"OggS":
+            raise ValueError(f"Página Ogg inválida en el byte {offset}")
+        segments = data[offset + 26]
+        lacing = data[offset + 27:offset + 27 + segments]
+        offset += 27 + segments
+        for size in lacing:
+            current.extend(data[offset:offset + size])
+            offset += size
+            if size < 255:
+                packets.append(bytes(current))
+                current = bytearray()
+    return packets
+
+
+def read_transcript(data: bytes) -> Optional[str]:
+    """Texto embebido en OpusTags, o None si el audio no es un clip sintético"""
+    try:
+        packets = ogg_packets(data)
+    except ValueError:
+        return None
+
+    for packet in packets[:2]:
+        if not packet.startswith(b"OpusTags"):
+            continue
+        offset = 8
+        vendor_length = struct.unpack_from("<I", packet, offset)[0]
+        offset += 4 + vendor_length
+        count = struct.unpack_from("<I", packet, offset)[0]
+        offset += 4
+        for _ in range(count):
+            length = struct.unpack_from("<I", packet, offset)[0]
+            offset += 4
+            comment = packet[offset:offset + length].decode("utf-8", errors="replace")
+            offset += length
+            key, _, value = comment.partition("=")
+            if key.upper() == TRANSCRIPT_TAG:
+                return value
+    return None
+
+
+def write_test_case_clips(directory: str) -> int:
+    from test_bot_automated import TEST_CASES
+
+    os.makedirs(directory, exist_ok=True)
+    for test in TEST_CASES:
+        with open(os.path.join(directory, f"{test['id']}.ogg"), "wb") as f:
+            f.write(opus_clip(test["input"]))
+    return len(TEST_CASES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clips OGG/Opus sintéticos con transcripción embebida")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--text", help="Texto del clip (requiere --out)")
+    group.add_argument("--test-cases", metavar="DIR", help="Genera un clip por TC en DIR")
+    group.add_argument("--read", metavar="FILE", help="Muestra la transcripción embebida de un clip")
+    parser.add_argument("--out", help="Archivo de salida para --text")
+    parser.add_argument("--duration", type=int, help="Segundos de audio (default: según cantidad de palabras)")
+    args = parser.parse_args()
+
+    if args.text is not None:
+        if not args.out:
+            parser.error("--text requiere --out")
+        data = opus_clip(args.text, args.duration)
+        with open(args.out, "wb") as f:
+            f.write(data)
+        print(f"🎤 {args.out}: {len(data)} bytes, {args.duration or estimate_duration(args.text)}s")
+    elif args.test_cases:
+        count = write_test_case_clips(args.test_cases)
+        print(f"🎤 {count} clips generados en {args.test_cases}")
+    else:
+        with open(args.read, "rb") as f:
+            transcript = read_transcript(f.read())
+        if transcript is None:
+            print("❌ El archivo no tiene transcripción embebida")
+            sys.exit(1)
+        print(transcript)
+
+
+if __name__ == "__main__":
+    main()
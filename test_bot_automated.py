@@ -7,20 +7,39 @@ Envía múltiples casos de prueba y documenta resultados
 import requests
 import json
 import time
-import csv
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import os
 
+from latency_stats import expects_confirmation, is_confirmation, latency_filenames
+from response_matchers import DEFAULT_EVALUATOR
+from result_sink import ResultSink
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+CONFIRMATION_SETTLE_SECONDS = 15  # Espera máxima entre respuestas mientras se busca la confirmación
+RESULT_FIELDNAMES = ['test_id', 'name', 'input', 'expected', 'actual', 'status', 'matcher', 'match_score',
+                     'timestamp', 'sent_at', 'first_reply_ms', 'confirmation_ms']
+
 class BotTester:
-    def __init__(self, bot_token: str, chat_id: str):
+    def __init__(self, bot_token: str, chat_id: str, api_url: str = TELEGRAM_API_URL,
+                 results_file: Optional[str] = None):
         self.bot_token = bot_token
         self.chat_id = chat_id
-        self.base_url = f"https://api.telegram.org/bot{bot_token}"
-        self.results = []
+        self.api_url = api_url.rstrip("/")
+        self.base_url = f"{self.api_url}/bot{bot_token}"
+        # Con fake_telegram_api.py los mensajes se inyectan como usuario y las respuestas llegan al instante
+        self.use_fake_api = self.api_url != TELEGRAM_API_URL
+        self.harness_url = f"{self.api_url}/harness"
+        self.reply_cursor = 0
+        self.last_message_id = None
+        # Resultados a disco a medida que terminan; en memoria solo queda el resumen incremental
+        self.sink = ResultSink(results_file or f"test_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
         
     def send_message(self, text: str) -> Dict[Any, Any]:
         """Envía mensaje al bot y retorna respuesta"""
+        if self.use_fake_api:
+            return self.inject_user_message(text)
+
         url = f"{self.base_url}/sendMessage"
         data = {
             "chat_id": self.chat_id,
@@ -33,6 +52,19 @@ class BotTester:
         except Exception as e:
             return {"error": str(e)}
     
+    def inject_user_message(self, text: str) -> Dict[Any, Any]:
+        """Inyecta el mensaje como si lo escribiera el usuario (solo fake API)"""
+        url = f"{self.harness_url}/sendMessage"
+        try:
+            response = requests.post(url, json={"chat_id": int(self.chat_id), "text": text})
+            result = response.json()
+            if result.get("ok"):
+                self.reply_cursor = result["result"]["reply_cursor"]
+                self.last_message_id = result["result"]["message_id"]
+            return result
+        except Exception as e:
+            return {"error": str(e)}
+
     def get_updates(self) -> Dict[Any, Any]:
         """Obtiene últimas actualizaciones del bot"""
         url = f"{self.base_url}/getUpdates"
@@ -44,6 +76,9 @@ class BotTester:
     
     def wait_for_response(self, timeout: int = 30) -> str:
         """Espera respuesta del bot por un tiempo determinado"""
+        if self.use_fake_api:
+            return self.wait_for_fake_reply(timeout)
+
         start_time = time.time()
         last_update_id = 0
         
@@ -67,31 +102,94 @@ class BotTester:
             time.sleep(1)
         
         return "TIMEOUT - No response received"
+
+    def wait_for_fake_reply(self, timeout: int = 30) -> str:
+        """Long-poll al fake API: retorna apenas el bot responde en el chat"""
+        try:
+            replies = self.wait_for_fake_replies(timeout)
+        except Exception as e:
+            return f"ERROR: {e}"
+
+        if not replies:
+            return "TIMEOUT - No response received"
+        return replies[0]["text"]
+
+    def wait_for_fake_replies(self, timeout: int = 30, until_confirmation: bool = False) -> List[Dict[str, Any]]:
+        """Respuestas del bot con timestamp; con until_confirmation sigue hasta el resumen de confirmación"""
+        url = f"{self.harness_url}/waitForReply"
+        deadline = time.time() + timeout
+        collected = []
+
+        while time.time() < deadline:
+            wait = deadline - time.time()
+            if collected:
+                wait = min(wait, CONFIRMATION_SETTLE_SECONDS)
+            data = {"chat_id": int(self.chat_id), "after": self.reply_cursor, "timeout": wait}
+            response = requests.post(url, json=data, timeout=wait + 5)
+            replies = response.json().get("result", [])
+            if not replies and collected:
+                break
+
+            if replies:
+                self.reply_cursor = replies[-1]["seq"]
+            # Respuestas tardías al caso anterior no cuentan para este
+            collected.extend(r for r in replies if r["in_reply_to"] == self.last_message_id)
+            if collected and (not until_confirmation or any(is_confirmation(r["text"]) for r in collected)):
+                break
+
+        return collected
     
     def run_test_case(self, test_case: Dict[str, Any]) -> Dict[str, Any]:
         """Ejecuta un caso de prueba específico"""
         print(f"🧪 Running test: {test_case['name']}")
         
         # Enviar mensaje
+        sent_at = time.time()
         send_result = self.send_message(test_case['input'])
         
         if "error" in send_result:
-            return {
+            result = {
                 "test_id": test_case['id'],
                 "name": test_case['name'],
                 "input": test_case['input'],
                 "expected": test_case['expected'],
                 "actual": f"ERROR: {send_result['error']}",
                 "status": "FAIL",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": datetime.now().isoformat(),
+                "sent_at": sent_at
             }
+            self.sink.write(result)
+            return result
         
         # Esperar respuesta
-        time.sleep(2)  # Dar tiempo al bot para procesar
-        response = self.wait_for_response()
+        first_reply_at = None
+        confirmation_at = None
+        if self.use_fake_api:
+            try:
+                replies = self.wait_for_fake_replies(until_confirmation=expects_confirmation(test_case['expected']))
+            except Exception as e:
+                replies = []
+                response = f"ERROR: {e}"
+            else:
+                response = replies[0]["text"] if replies else "TIMEOUT - No response received"
+            if replies:
+                first_reply_at = replies[0]["timestamp"]
+                confirmation = next((r for r in replies if is_confirmation(r["text"])), None)
+                if confirmation:
+                    confirmation_at = confirmation["timestamp"]
+                    response = confirmation["text"]
+        else:
+            time.sleep(2)  # Dar tiempo al bot para procesar
+            response = self.wait_for_response()
+            # Con la API real solo se detecta la respuesta por polling: la precisión es ~1s
+            if "TIMEOUT" not in response:
+                first_reply_at = time.time()
+                if is_confirmation(response):
+                    confirmation_at = first_reply_at
         
         # Evaluar resultado
-        status = self.evaluate_result(test_case['expected'], response)
+        evaluation = DEFAULT_EVALUATOR.evaluate(test_case, response)
+        status = evaluation['status']
         
         result = {
             "test_id": test_case['id'],
@@ -100,54 +198,52 @@ class BotTester:
             "expected": test_case['expected'],
             "actual": response,
             "status": status,
-            "timestamp": datetime.now().isoformat()
+            "matcher": evaluation['matcher'],
+            "match_score": evaluation['score'],
+            "timestamp": datetime.now().isoformat(),
+            "sent_at": sent_at,
+            "first_reply_ms": (first_reply_at - sent_at) * 1000 if first_reply_at else None,
+            "confirmation_ms": (confirmation_at - sent_at) * 1000 if confirmation_at else None
         }
         
-        self.results.append(result)
+        self.sink.write(result)
         print(f"   {status}: {response[:50]}...")
         return result
     
-    def evaluate_result(self, expected: str, actual: str) -> str:
-        """Evalúa si el resultado es correcto"""
-        if "TIMEOUT" in actual:
-            return "TIMEOUT"
-        elif "ERROR" in actual:
-            return "FAIL"
-        elif expected.lower() in actual.lower():
-            return "PASS"
-        elif any(keyword in actual.lower() for keyword in ["error", "no entend", "formato", "inválido"]):
-            return "WARNING"
-        else:
-            return "UNKNOWN"
+    @staticmethod
+    def evaluate_result(expected: str, actual: str) -> str:
+        """Evalúa si el resultado es correcto (ver response_matchers.py)"""
+        return DEFAULT_EVALUATOR.evaluate({"expected": expected}, actual)["status"]
     
     def save_results(self, filename: str = None):
-        """Guarda resultados en archivo CSV"""
+        """Cierra el JSONL y exporta CSV, más percentiles de latencia en CSV y JSON"""
         if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"test_results_{timestamp}.csv"
+            filename = f"{self.sink.base}.csv"
         
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['test_id', 'name', 'input', 'expected', 'actual', 'status', 'timestamp']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            writer.writeheader()
-            for result in self.results:
-                writer.writerow(result)
+        self.sink.close()
+        self.sink.export_csv(filename, RESULT_FIELDNAMES)
         
-        print(f"📊 Results saved to: {filename}")
+        latency_csv, latency_json = latency_filenames(filename)
+        report = self.sink.summary.latency
+        report.save_csv(latency_csv)
+        report.save_json(latency_json)
+        
+        print(f"📊 Results saved to: {filename} (JSONL: {', '.join(self.sink.paths)})")
+        print(f"⏱️  Latency saved to: {latency_csv}, {latency_json}")
     
     def print_summary(self):
-        """Imprime resumen de resultados"""
-        total = len(self.results)
+        """Imprime resumen de resultados (incremental: se puede llamar en medio de la corrida)"""
+        summary = self.sink.summary
+        total = summary.total
         if total == 0:
             print("No test results available")
             return
         
-        passed = len([r for r in self.results if r['status'] == 'PASS'])
-        failed = len([r for r in self.results if r['status'] == 'FAIL'])
-        warnings = len([r for r in self.results if r['status'] == 'WARNING'])
-        timeouts = len([r for r in self.results if r['status'] == 'TIMEOUT'])
-        unknown = len([r for r in self.results if r['status'] == 'UNKNOWN'])
+        passed = summary.count('PASS')
+        failed = summary.count('FAIL')
+        warnings = summary.count('WARNING')
+        timeouts = summary.count('TIMEOUT')
+        unknown = summary.count('UNKNOWN')
         
         print("\n" + "="*50)
         print("📊 TEST SUMMARY")
@@ -159,6 +255,8 @@ class BotTester:
         print(f"⏱️  TIMEOUT: {timeouts} ({timeouts/total*100:.1f}%)")
         print(f"❓ UNKNOWN: {unknown} ({unknown/total*100:.1f}%)")
         print("="*50)
+        
+        summary.latency.print_report()
 
 # Casos de prueba definidos
 TEST_CASES = [
@@ -167,19 +265,22 @@ TEST_CASES = [
         "id": "TC-001-01",
         "name": "Caso básico completo",
         "input": "2 CERS mañana 14hs Hospital Italiano Dr. García",
-        "expected": "confirmás estos datos"
+        "expected": "confirmás estos datos",
+        "expected_fields": {"cirugia": "CERS", "cantidad": "2", "lugar": "Hospital Italiano", "cirujano": "García"}
     },
     {
         "id": "TC-001-02", 
         "name": "Apendicectomía con fecha absoluta",
         "input": "Apendicectomía 15/08/2025 16:30 Sanatorio Anchorena Dr. López",
-        "expected": "confirmás estos datos"
+        "expected": "confirmás estos datos",
+        "expected_fields": {"fecha_hora": "15/08/2025 16:30", "lugar": "Sanatorio Anchorena", "cirujano": "López"}
     },
     {
         "id": "TC-001-03",
         "name": "Fecha relativa - hoy",
         "input": "3 adenoides hoy 10hs Clínica Santa Isabel Dr. Martínez", 
-        "expected": "confirmás estos datos"
+        "expected": "confirmás estos datos",
+        "expected_fields": {"cantidad": "3", "lugar": "Clínica Santa Isabel", "cirujano": "Martínez"}
     },
     
     # ERRORES TIPOGRÁFICOS
@@ -187,7 +288,8 @@ TEST_CASES = [
         "id": "TC-002-01",
         "name": "Errores tipográficos múltiples",
         "input": "2 SERC mañana 14sh Hospital Itlaiano Dr. Garsia",
-        "expected": "CERS"  # Esperamos que corrija
+        "expected": "CERS",  # Esperamos que corrija
+        "expected_fields": {"cirugia": "CERS", "lugar": "Hospital Italiano"}
     },
     {
         "id": "TC-002-02",
@@ -281,6 +383,7 @@ def main():
     # Configuración (obtener de variables de entorno)
     bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
     chat_id = os.getenv('TEST_CHAT_ID')
+    api_url = os.getenv('TELEGRAM_API_URL', TELEGRAM_API_URL)
     
     if not bot_token or not chat_id:
         print("❌ Error: Se requieren variables de entorno:")
@@ -289,17 +392,20 @@ def main():
         return
     
     # Inicializar tester
-    tester = BotTester(bot_token, chat_id)
+    tester = BotTester(bot_token, chat_id, api_url)
     
     print(f"🎯 Ejecutando {len(TEST_CASES)} casos de prueba...")
     print(f"📱 Chat ID: {chat_id}")
+    if tester.use_fake_api:
+        print(f"🧪 Fake Bot API: {api_url}")
     print("-" * 50)
     
     # Ejecutar todos los casos de prueba
     for test_case in TEST_CASES:
         try:
             tester.run_test_case(test_case)
-            time.sleep(3)  # Pausa entre tests para no saturar
+            if not tester.use_fake_api:
+                time.sleep(3)  # Pausa entre tests para no saturar
         except KeyboardInterrupt:
             print("\n⏹️  Testing interrumpido por usuario")
             break
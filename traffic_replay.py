@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Replay de tráfico capturado en producción contra fake_telegram_api.py
+
+Lee la captura anonimizada que escribe el bot con TRAFFIC_CAPTURE=true (.jsonl.gz con
+updates entrantes, transcripciones y envíos salientes) en streaming: nunca se carga
+entera, solo una ventana de --lookahead segundos de log para asociar a cada update su
+transcripción (voz/audio) y la latencia que tuvo en producción (primer envío del bot al
+mismo chat). Los updates se reinyectan a 1x, 10x o a máxima velocidad respetando los
+intervalos entre llegadas (escalados) y el orden dentro de cada chat: cada chat anónimo
+se mapea a un chat sintético y tiene su propio worker.
+
+Reporta la forma de la llegada (tasa media, pico por segundo), cuánto se atrasó el
+replay respecto del horario programado y la latencia hasta la primera respuesta de
+cada update, comparada con la de producción.
+
+Los contactos no se reinyectan (el harness no los simula) y los audios sin
+transcripción en la ventana tampoco; los callbacks se tocan sobre el último teclado
+inline que mandó el bot en ese chat.
+
+Uso:
+    python3 traffic_replay.py traffic/capture-20250815-080000.jsonl.gz --speed 1
+    python3 traffic_replay.py traffic/capture-20250815-080000.jsonl.gz --speed 10 --output replay_10x.json
+    python3 traffic_replay.py traffic/capture-20250815-080000.jsonl.gz --speed max --max-pending 500
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterator, Optional
+
+from fake_telegram_api import HarnessClient
+from latency_stats import LatencyHistogram
+from load_test_bot import DEFAULT_API_URL
+
+CHAT_ID_BASE = 920_000_000  # Rango reservado para chats sintéticos del replay
+DEFAULT_LOOKAHEAD = 120.0
+REPLAYED_TYPES = ("message", "voice", "audio", "callback")
+
+
+# ----------------------------------------------------------------------
+# Lectura de la captura
+# ----------------------------------------------------------------------
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Líneas de la captura de a una; una captura en curso termina en la última tanda escrita"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as stream:
+        try:
+            for line in stream:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Última línea a medio escribir
+                    continue
+        except (EOFError, zlib.error):
+            # El gzip todavía no se cerró (el bot sigue grabando): se replaya lo que hay
+            pass
+
+
+def iter_inbound(path: str, lookahead: float = DEFAULT_LOOKAHEAD) -> Iterator[Dict[str, Any]]:
+    """
+    Updates entrantes en orden de llegada, cada uno con su transcripción (si era audio) y
+    captured_reply_ms: cuánto tardó en producción el primer envío del bot a ese chat.
+    Un update sale recién cuando el log avanzó `lookahead` segundos más allá de él; la
+    memoria queda acotada a esa ventana.
+    """
+    window: Deque[Dict[str, Any]] = deque()
+    awaiting_reply: Dict[str, Dict[str, Any]] = {}
+    awaiting_transcript: Dict[tuple, Dict[str, Any]] = {}
+
+    def release(event: Dict[str, Any]) -> Dict[str, Any]:
+        if awaiting_reply.get(event["chat"]) is event:
+            del awaiting_reply[event["chat"]]
+        awaiting_transcript.pop((event["chat"], event.get("message_id")), None)
+        return event
+
+    for record in iter_records(path):
+        direction = record.get("dir")
+        chat = record.get("chat")
+
+        if direction == "in":
+            window.append(record)
+            awaiting_reply[chat] = record
+            if record.get("type") in ("voice", "audio"):
+                awaiting_transcript[(chat, record.get("message_id"))] = record
+        elif direction == "transcript":
+            event = awaiting_transcript.pop((chat, record.get("message_id")), None)
+            if event is not None:
+                event["transcript"] = record.get("text")
+        elif direction == "out":
+            event = awaiting_reply.pop(chat, None)
+            if event is not None:
+                event["captured_reply_ms"] = round((record["t"] - event["t"]) * 1000, 1)
+
+        now = record.get("t", 0)
+        while window and window[0]["t"] < now - lookahead:
+            yield release(window.popleft())
+
+    while window:
+        yield release(window.popleft())
+
+
+class ArrivalShape:
+    """Tasa de llegada del log por segundo, sin guardar la serie completa"""
+
+    def __init__(self):
+        self.events = 0
+        self.first_t: Optional[float] = None
+        self.last_t: Optional[float] = None
+        self._second: Optional[int] = None
+        self._count = 0
+        self.per_second = LatencyHistogram()  # Reusado como histograma de conteos por segundo
+        self.peak = 0
+
+    def add(self, t: float):
+        self.events += 1
+        self.first_t = t if self.first_t is None else self.first_t
+        self.last_t = t
+        second = int(t)
+        if second != self._second:
+            self._close_second()
+            self._second = second
+        self._count += 1
+
+    def _close_second(self):
+        if self._second is not None:
+            self.per_second.record(self._count)
+            self.peak = max(self.peak, self._count)
+        self._count = 0
+
+    def summary(self) -> Dict[str, Any]:
+        self._close_second()
+        self._second = None
+        duration = (self.last_t - self.first_t) if self.events > 1 else 0.0
+        return {
+            "events": self.events,
+            "log_duration_s": round(duration, 1),
+            "mean_rate": round(self.events / duration, 3) if duration else None,
+            "busy_seconds": self.per_second.count,
+            "p50_per_busy_second": self.per_second.percentile(50),
+            "p99_per_busy_second": self.per_second.percentile(99),
+            "peak_per_second": self.peak
+        }
+
+
+# ----------------------------------------------------------------------
+# Replay
+# ----------------------------------------------------------------------
+
+class ChatReplay:
+    def __init__(self, chat_id: int):
+        self.chat_id = chat_id
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.worker_active = False
+        self.collector: Optional[asyncio.Task] = None
+        self.cursor = 0
+        self.keyboard_message_id: Optional[int] = None
+        self.keyboard_ready = asyncio.Event()
+        self.outstanding: Dict[int, Dict[str, Any]] = {}
+
+
+class TrafficReplayer:
+    def __init__(self, api_url: str, speed: float, timeout: float = 60, max_pending: int = 1000,
+                 chat_id_base: int = CHAT_ID_BASE, idle: float = 30):
+        self.harness = HarnessClient(api_url)
+        self.speed = speed
+        self.timeout = timeout
+        self.idle = idle
+        self.chat_id_base = chat_id_base
+        self.pending = asyncio.Semaphore(max_pending)
+
+        # Chat anónimo -> chat sintético (con su cursor y último teclado, que sobreviven a los workers)
+        self.chats: Dict[str, ChatReplay] = {}
+        self.tasks = set()
+
+        self.arrival = ArrivalShape()
+        self.first_reply: Dict[str, LatencyHistogram] = {}
+        self.captured: Dict[str, LatencyHistogram] = {}
+        self.lag = LatencyHistogram()
+        self.counts: Dict[str, int] = {}
+        self.started_at = 0.0
+        self.finished_at = 0.0
+
+    async def __aenter__(self):
+        await self.harness.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.harness.__aexit__(*exc)
+
+    def count(self, key: str, n: int = 1):
+        self.counts[key] = self.counts.get(key, 0) + n
+
+    async def run(self, events: Iterator[Dict[str, Any]], limit: Optional[int] = None):
+        self.started_at = time.time()
+        first_t = None
+
+        for index, event in enumerate(events):
+            if limit is not None and index >= limit:
+                break
+            self.arrival.add(event["t"])
+            if event.get("type") not in REPLAYED_TYPES:
+                self.count(f"skipped_{event.get('type')}")
+                continue
+
+            if first_t is None:
+                first_t = event["t"]
+            due = self.started_at + (event["t"] - first_t) / self.speed if self.speed else time.time()
+            delay = due - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            # Contrapresión: como mucho max_pending updates leídos y sin enviar/medir
+            await self.pending.acquire()
+            self.dispatch(event, due)
+
+        # Fin del log: los workers terminan apenas vacían su cola, sin esperar el tiempo ocioso
+        for chat in self.chats.values():
+            if chat.worker_active:
+                chat.queue.put_nowait(None)
+        while self.tasks:
+            await asyncio.gather(*list(self.tasks))
+        self.finished_at = time.time()
+
+    def dispatch(self, event: Dict[str, Any], due: float):
+        chat = self.chats.get(event["chat"])
+        if chat is None:
+            chat = self.chats[event["chat"]] = ChatReplay(self.chat_id_base + len(self.chats))
+
+        chat.queue.put_nowait((event, due))
+        if not chat.worker_active:
+            chat.worker_active = True
+            self.spawn(self.chat_worker(chat))
+        if chat.collector is None or chat.collector.done():
+            chat.collector = self.spawn(self.collect_replies(chat))
+
+    def spawn(self, coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def chat_worker(self, chat: ChatReplay):
+        """Envía los updates de un chat en orden, cada uno no antes de su horario"""
+        while True:
+            try:
+                item = await asyncio.wait_for(chat.queue.get(), self.idle)
+            except asyncio.TimeoutError:
+                if chat.queue.empty():
+                    # Sin await entre el chequeo y la marca: el próximo update arranca otro worker
+                    chat.worker_active = False
+                    return
+                continue
+            if item is None:
+                chat.worker_active = False
+                return
+
+            event, due = item
+
+            try:
+                delay = due - time.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self.replay_event(chat, event, due)
+            except Exception as exc:
+                self.count("errors")
+                print(f"⚠️  Chat {chat.chat_id}: {exc}")
+            finally:
+                self.pending.release()
+
+    async def replay_event(self, chat: ChatReplay, event: Dict[str, Any], due: float):
+        kind = event["type"]
+        if kind == "message":
+            sent_at = time.time()
+            injected = await self.harness.send_message(chat.chat_id, event.get("text") or "")
+        elif kind in ("voice", "audio"):
+            if not event.get("transcript"):
+                self.count(f"skipped_{kind}_sin_transcripcion")
+                return
+            sent_at = time.time()
+            injected = await self.harness.send_voice(chat.chat_id, event["transcript"], kind,
+                                                     bool(event.get("forwarded")))
+        else:
+            # El callback necesita un teclado del bot en este chat sintético
+            try:
+                await asyncio.wait_for(chat.keyboard_ready.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                self.count("skipped_callback_sin_teclado")
+                return
+            sent_at = time.time()
+            injected = await self.harness.send_callback(chat.chat_id, chat.keyboard_message_id, event.get("data") or "")
+
+        self.lag.record(max(sent_at - due, 0) * 1000)
+        self.count(f"sent_{kind}")
+        chat.outstanding[injected["update_id"]] = {"kind": kind, "sent_at": sent_at,
+                                                   "captured_reply_ms": event.get("captured_reply_ms")}
+
+    async def collect_replies(self, chat: ChatReplay):
+        """Long-poll de las respuestas del chat: primera respuesta por update y último teclado inline"""
+        while chat.worker_active or chat.outstanding:
+            replies = await self.harness.wait_for_replies(chat.chat_id, chat.cursor, 1.0)
+            now = time.time()
+            for reply in replies:
+                chat.cursor = reply["seq"]
+                if "inline_keyboard" in (reply.get("reply_markup") or {}):
+                    chat.keyboard_message_id = reply["message_id"]
+                    chat.keyboard_ready.set()
+                measured = chat.outstanding.pop(reply.get("update_id"), None)
+                if measured is not None:
+                    self.record_reply(measured, (now - measured["sent_at"]) * 1000)
+
+            for update_id, measured in list(chat.outstanding.items()):
+                if now - measured["sent_at"] > self.timeout:
+                    del chat.outstanding[update_id]
+                    self.count("timeouts")
+
+    def record_reply(self, measured: Dict[str, Any], elapsed_ms: float):
+        kind = measured["kind"]
+        self.first_reply.setdefault(kind, LatencyHistogram()).record(elapsed_ms)
+        if measured["captured_reply_ms"] is not None:
+            self.captured.setdefault(kind, LatencyHistogram()).record(measured["captured_reply_ms"])
+
+    def summary(self) -> Dict[str, Any]:
+        wall = self.finished_at - self.started_at
+        all_replay, all_captured = LatencyHistogram(), LatencyHistogram()
+        for histogram in self.first_reply.values():
+            all_replay.merge(histogram)
+        for histogram in self.captured.values():
+            all_captured.merge(histogram)
+
+        return {
+            "speed": self.speed or "max",
+            "wall_duration_s": round(wall, 1),
+            "chats": len(self.chats),
+            "arrival": self.arrival.summary(),
+            "counts": dict(sorted(self.counts.items())),
+            "schedule_lag_ms": self.lag.summary(),
+            "first_reply_ms": {
+                "all": {"replay": all_replay.summary(), "captured": all_captured.summary()},
+                **{kind: {"replay": self.first_reply[kind].summary(),
+                          "captured": self.captured.get(kind, LatencyHistogram()).summary()}
+                   for kind in sorted(self.first_reply)}
+            }
+        }
+
+
+def print_report(summary: Dict[str, Any]):
+    arrival = summary["arrival"]
+    print("\n" + "=" * 80)
+    speed = "máxima velocidad" if summary["speed"] == "max" else f"{summary['speed']:g}x"
+    print(f"📼 REPLAY DE TRÁFICO ({speed})")
+    print("=" * 80)
+    print(f"Updates en el log: {arrival['events']} en {arrival['log_duration_s']}s de captura "
+          f"({summary['chats']} chats replayados)")
+    print(f"Llegada: {arrival['mean_rate'] or 0} upd/s promedio, p50 {arrival['p50_per_busy_second']:.0f} / "
+          f"p99 {arrival['p99_per_busy_second']:.0f} / pico {arrival['peak_per_second']} por segundo con tráfico")
+    print(f"Replay: {summary['wall_duration_s']}s de reloj")
+    for key, value in summary["counts"].items():
+        print(f"   {key}: {value}")
+
+    lag = summary["schedule_lag_ms"]
+    print(f"Atraso sobre el horario: p50 {lag['p50']:.0f} ms, p99 {lag['p99']:.0f} ms, max {lag['max']:.0f} ms")
+
+    print(f"\n{'Tipo':<10} {'n':>6} {'replay p50':>11} {'replay p99':>11} {'prod p50':>10} {'prod p99':>10}")
+    print("-" * 62)
+    for kind, row in summary["first_reply_ms"].items():
+        replay, captured = row["replay"], row["captured"]
+        print(f"{kind:<10} {replay['count']:>6} {replay['p50']:>9.0f}ms {replay['p99']:>9.0f}ms "
+              f"{captured['p50']:>8.0f}ms {captured['p99']:>8.0f}ms")
+
+
+def parse_speed(value: str) -> float:
+    if value.lower() in ("max", "0"):
+        return 0.0
+    speed = float(value.lower().rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("La velocidad tiene que ser positiva o 'max'")
+    return speed
+
+
+async def main_async(args):
+    events = iter_inbound(args.capture, args.lookahead)
+    async with TrafficReplayer(args.api_url, args.speed, timeout=args.timeout, max_pending=args.max_pending,
+                               chat_id_base=args.chat_id_base) as replayer:
+        await replayer.run(events, args.limit)
+    return replayer.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay de tráfico capturado (TRAFFIC_CAPTURE) contra fake_telegram_api.py")
+    parser.add_argument("capture", help="Captura .jsonl.gz (o .jsonl) escrita por el bot")
+    parser.add_argument("--api-url", default=os.getenv("TELEGRAM_API_URL", DEFAULT_API_URL))
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="1, 10, ... o 'max' (sin esperar los intervalos)")
+    parser.add_argument("--lookahead", type=float, default=DEFAULT_LOOKAHEAD,
+                        help="Segundos de log leídos por delante para asociar transcripciones y respuestas")
+    parser.add_argument("--max-pending", type=int, default=1000, help="Updates leídos y todavía no enviados como máximo")
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout por respuesta en segundos")
+    parser.add_argument("--limit", type=int, help="Replayar solo los primeros N updates")
+    parser.add_argument("--chat-id-base", type=int, default=CHAT_ID_BASE)
+    parser.add_argument("--output", help="Resumen JSON (default: traffic_replay_<timestamp>.json)")
+    args = parser.parse_args()
+
+    summary = asyncio.run(main_async(args))
+    print_report(summary)
+
+    output = args.output or f"traffic_replay_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resumen guardado en {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Throughput de ingestión del webhook de RegistroCx (TELEGRAM_UPDATE_MODE=webhook)
+
+POSTea updates sintéticos directo a /telegram/webhook del bot, sin pasar por Telegram
+ni por fake_telegram_api.py, y mide:
+    - updates aceptados por segundo y latencia del POST (lo que Telegram ve del bot)
+    - 503 por cola llena (TELEGRAM_UPDATE_QUEUE_CAPACITY) y otros errores
+    - con --metrics-url, cuánto tarda el bot en procesar lo aceptado (update_receive
+      de /metrics) y el pico de la cola (update_queue_depth)
+
+Las respuestas del bot salen por TELEGRAM_API_URL: apuntarlo a fake_telegram_api.py.
+Los chats sintéticos no están registrados, así que la mayoría de los updates recorre onboarding.
+
+Modos:
+    --rate N         loop abierto: N updates/s durante --duration, aunque el bot se atrase
+    --rate 0         loop cerrado: --concurrency POSTs en vuelo, lo más rápido posible
+
+Uso:
+    python3 webhook_ingest_bench.py --webhook-url http://127.0.0.1:8080/telegram/webhook --rate 500 --duration 30
+    python3 webhook_ingest_bench.py --rate 0 --concurrency 200 --chats 2000 --metrics-url http://127.0.0.1:8080/metrics
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from bot_metrics import GaugePeak, scrape
+from latency_stats import LatencyHistogram
+from test_bot_automated import TEST_CASES
+
+DEFAULT_WEBHOOK_URL = "http://127.0.0.1:8080/telegram/webhook"
+CHAT_ID_BASE = 860_000_000  # Rango reservado para chats sintéticos de ingestión
+UPDATE_ID_BASE = 500_000_000
+
+
+class IngestBench:
+    def __init__(self, webhook_url: str, secret: Optional[str], chats: int, chat_id_base: int,
+                 update_id_base: int):
+        self.webhook_url = webhook_url
+        self.headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+        self.chats = chats
+        self.chat_id_base = chat_id_base
+        self.next_update_id = update_id_base
+        self.latency = LatencyHistogram()
+        self.status_counts: Dict[str, int] = {}
+        self.started_at = 0.0
+        self.finished_at = 0.0
+
+    def build_update(self) -> Dict[str, Any]:
+        update_id = self.next_update_id
+        self.next_update_id += 1
+        chat_id = self.chat_id_base + update_id % self.chats
+        text = TEST_CASES[update_id % len(TEST_CASES)]["input"]
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Ingest", "language_code": "es"},
+                "chat": {"id": chat_id, "type": "private", "first_name": "Ingest"},
+                "date": int(time.time()),
+                "text": text
+            }
+        }
+
+    async def post(self, session: aiohttp.ClientSession, scheduled_at: Optional[float] = None):
+        update = self.build_update()
+        started = scheduled_at or time.time()
+        try:
+            async with session.post(self.webhook_url, json=update, headers=self.headers) as response:
+                await response.read()
+                status = str(response.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = type(e).__name__
+        # Desde scheduled_at en loop abierto: el atraso del generador también cuenta
+        self.latency.record((time.time() - started) * 1000)
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    async def run_open_loop(self, session: aiohttp.ClientSession, rate: float, duration: float):
+        self.started_at = time.time()
+        tasks = set()
+        for k in range(int(rate * duration)):
+            scheduled_at = self.started_at + k / rate
+            delay = scheduled_at - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(self.post(session, scheduled_at))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+        self.finished_at = time.time()
+
+    async def run_closed_loop(self, session: aiohttp.ClientSession, concurrency: int, duration: float):
+        self.started_at = time.time()
+        deadline = self.started_at + duration
+
+        async def sender():
+            while time.time() < deadline:
+                await self.post(session)
+
+        await asyncio.gather(*(sender() for _ in range(concurrency)))
+        self.finished_at = time.time()
+
+    @property
+    def sent(self) -> int:
+        return sum(self.status_counts.values())
+
+    @property
+    def accepted(self) -> int:
+        return self.status_counts.get("200", 0)
+
+    @property
+    def elapsed(self) -> float:
+        return max(self.finished_at - self.started_at, 1e-9)
+
+
+async def wait_for_drain(metrics_url: str, before, accepted: int, timeout: float) -> Optional[float]:
+    """Segundos hasta que update_receive contó todos los updates aceptados; None si no terminó"""
+    started = time.time()
+    target = before.stages.get("update_receive", {}).get("count", 0.0) + accepted
+    while time.time() - started < timeout:
+        snapshot = await scrape(metrics_url)
+        if snapshot and snapshot.stages.get("update_receive", {}).get("count", 0.0) >= target:
+            return time.time() - started
+        await asyncio.sleep(0.5)
+    return None
+
+
+async def run(args) -> Dict[str, Any]:
+    bench = IngestBench(args.webhook_url, args.secret, args.chats, args.chat_id_base, args.update_id_base)
+    metrics_before = await scrape(args.metrics_url) if args.metrics_url else None
+    gauges = GaugePeak(args.metrics_url) if metrics_before else None
+
+    connector = aiohttp.TCPConnector(limit=args.connections)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=args.timeout)) as session:
+        sampler = asyncio.create_task(gauges.run(session)) if gauges else None
+        mode = f"{args.rate:.0f} updates/s" if args.rate else f"{args.concurrency} en vuelo"
+        print(f"📮 POST a {args.webhook_url} ({mode}, {args.chats} chats, {args.duration:.0f}s)")
+        try:
+            if args.rate:
+                await bench.run_open_loop(session, args.rate, args.duration)
+            else:
+                await bench.run_closed_loop(session, args.concurrency, args.duration)
+
+            drain_seconds = None
+            if metrics_before is not None:
+                print("⏳ Esperando que el bot procese lo aceptado...")
+                drain_seconds = await wait_for_drain(args.metrics_url, metrics_before, bench.accepted, args.drain_timeout)
+        finally:
+            if sampler:
+                sampler.cancel()
+
+    result = {
+        "webhook_url": args.webhook_url,
+        "mode": "open" if args.rate else "closed",
+        "target_rate": args.rate,
+        "concurrency": args.concurrency if not args.rate else None,
+        "chats": args.chats,
+        "elapsed_seconds": bench.elapsed,
+        "sent": bench.sent,
+        "accepted": bench.accepted,
+        "accepted_per_second": bench.accepted / bench.elapsed,
+        "statuses": bench.status_counts,
+        "post_ms": {f"p{p}": bench.latency.percentile(p) for p in (50, 90, 99)},
+        "post_ms_max": bench.latency.percentile(100),
+        "drain_seconds": drain_seconds,
+        "processed_per_second": bench.accepted / (bench.elapsed + drain_seconds) if drain_seconds is not None else None,
+        "gauge_peaks": gauges.peaks if gauges else {}
+    }
+    print_result(result)
+    return result
+
+
+def print_result(result: Dict[str, Any]):
+    print("\n" + "=" * 60)
+    print("📮 INGESTIÓN POR WEBHOOK")
+    print("=" * 60)
+    print(f"Enviados:    {result['sent']} en {result['elapsed_seconds']:.1f}s")
+    print(f"Aceptados:   {result['accepted']} ({result['accepted_per_second']:.1f}/s)")
+    for status, count in sorted(result["statuses"].items()):
+        if status != "200":
+            print(f"  {status:<10} {count}")
+    post = result["post_ms"]
+    print(f"POST ms:     p50 {post['p50']:.1f}  p90 {post['p90']:.1f}  p99 {post['p99']:.1f}  max {result['post_ms_max']:.1f}")
+    if result["drain_seconds"] is not None:
+        print(f"Procesado:   {result['processed_per_second']:.1f}/s (drenó la cola en {result['drain_seconds']:.1f}s)")
+    elif result["gauge_peaks"]:
+        print("Procesado:   ⚠️  el bot no terminó de procesar antes de --drain-timeout")
+    peaks = result["gauge_peaks"]
+    if "update_queue_depth" in peaks:
+        print(f"Cola pico:   {peaks['update_queue_depth']:.0f} updates "
+              f"(workers ocupados pico {peaks.get('update_workers_busy', 0):.0f}/{peaks.get('update_workers', 0):.0f})")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput de ingestión del webhook del bot")
+    parser.add_argument("--webhook-url", default=os.getenv("TELEGRAM_WEBHOOK_URL", DEFAULT_WEBHOOK_URL))
+    parser.add_argument("--secret", default=os.getenv("TELEGRAM_WEBHOOK_SECRET"), help="X-Telegram-Bot-Api-Secret-Token")
+    parser.add_argument("--rate", type=float, default=200, help="Updates por segundo (0 = loop cerrado con --concurrency)")
+    parser.add_argument("--concurrency", type=int, default=100, help="POSTs en vuelo en loop cerrado")
+    parser.add_argument("--duration", type=float, default=30, help="Duración en segundos")
+    parser.add_argument("--chats", type=int, default=1000, help="Chats sintéticos entre los que se reparten los updates")
+    parser.add_argument("--chat-id-base", type=int, default=CHAT_ID_BASE)
+    parser.add_argument("--update-id-base", type=int, default=UPDATE_ID_BASE)
+    parser.add_argument("--connections", type=int, default=0, help="Conexiones HTTP simultáneas (0 = sin límite)")
+    parser.add_argument("--timeout", type=float, default=30, help="Timeout por POST en segundos")
+    parser.add_argument("--metrics-url", default=os.getenv("BOT_METRICS_URL"),
+                        help="URL de /metrics del bot: mide el procesamiento además de la ingestión")
+    parser.add_argument("--drain-timeout", type=float, default=300, help="Máximo a esperar que el bot procese lo aceptado")
+    parser.add_argument("--output", help="Archivo JSON con el resultado")
+    args = parser.parse_args()
+
+    if args.rate < 0:
+        parser.error("--rate no puede ser negativo")
+
+    try:
+        result = asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\n⏹️  Benchmark interrumpido por usuario")
+        return
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"💾 Resultado guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()